@@ -18,6 +18,7 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
+from app.core.response_cache import cached_response, CacheNamespace
 from app.models.user import User
 from app.models.achievement import AchievementDefinition, UserStats, UserAchievement, AchievementStatus
 from app.models.points import PointsReason, PointsLedger
@@ -64,28 +65,24 @@ BADGE_EXCHANGE_RATES = {
     summary="获取所有成就定义",
     description="获取所有可用成就的定义信息。",
 )
+@cached_response(CacheNamespace.ACHIEVEMENT_DEFINITIONS)
 async def get_achievement_definitions(
     db: AsyncSession = Depends(get_db),
 ):
     """获取所有成就定义"""
-    result = await db.execute(
-        select(AchievementDefinition)
-        .where(AchievementDefinition.is_active == True)
-        .order_by(AchievementDefinition.sort_order)
-    )
-    definitions = result.scalars().all()
+    _, definitions = await achievement_service.get_cached_definitions(db)
 
     return {
         "items": [
             {
-                "achievement_key": d.achievement_key,
-                "name": d.name,
-                "description": d.description,
-                "category": d.category,
-                "badge_icon": d.badge_icon,
-                "badge_tier": d.badge_tier,
-                "points": d.points,
-                "target_value": d.target_value,
+                "achievement_key": d["achievement_key"],
+                "name": d["name"],
+                "description": d["description"],
+                "category": d["category"],
+                "badge_icon": d["badge_icon"],
+                "badge_tier": d["badge_tier"],
+                "points": d["points"],
+                "target_value": d["target_value"],
             }
             for d in definitions
         ],
@@ -266,6 +263,26 @@ async def remove_my_badge(
     }
 
 
+@router.get(
+    "/users/achievements/bulk",
+    summary="批量获取用户的成就和徽章",
+    description="批量获取多个用户的已解锁成就和展示徽章（公开信息），用于排行榜、列表页展示。",
+)
+async def get_users_achievements_bulk(
+    user_ids: List[int] = Query(..., description="用户ID列表，如 ?user_ids=1&user_ids=2"),
+    db: AsyncSession = Depends(get_db),
+):
+    """批量获取用户的成就和徽章"""
+    try:
+        items = await achievement_service.get_users_achievements_bulk(db, user_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "items": {str(user_id): item for user_id, item in items.items()},
+    }
+
+
 @router.get(
     "/users/{user_id}/achievements",
     summary="获取指定用户的成就",
@@ -10,15 +10,16 @@ from sqlalchemy import select, func, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.core.database import get_db
+from app.core.database import get_db, async_session_maker
+from app.core.swr_cache import SWRCache
+from app.core.response_cache import invalidates, CacheNamespace
 from app.api.v1.endpoints.user import get_current_user_dep as get_current_user
 from app.models.user import User
 from app.models.points import (
     UserPoints, PointsLedger, PointsReason,
     DailySignin, SigninMilestone,
     LotteryConfig, LotteryPrize, LotteryDraw,
-    UserItem, ApiKeyCode, ExchangeItem, ExchangeRecord,
-    ScratchCard
+    UserItem, ApiKeyCode, ExchangeItem, ExchangeRecord
 )
 
 router = APIRouter()
@@ -138,47 +139,55 @@ class DashboardStats(BaseModel):
 
 # ========== 仪表盘 ==========
 
-@router.get("/dashboard", response_model=DashboardStats)
-async def get_dashboard(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """获取仪表盘数据"""
-    require_admin(current_user)
-    today = datetime.now().date()
+# 仪表盘聚合查询较重，短时缓存并单飞，多个管理员同时打开只查询一次
+_DASHBOARD_CACHE_TTL = 30
 
-    # 总用户数
-    total_users = await db.scalar(select(func.count(User.id)))
+_dashboard_cache = SWRCache(
+    "admin_dashboard",
+    ttl=_DASHBOARD_CACHE_TTL,
+    stale_ttl=_DASHBOARD_CACHE_TTL * 2,
+    max_entries=50,
+)
 
-    # 今日活跃用户（有签到或抽奖）
-    signin_users = await db.scalar(
-        select(func.count(func.distinct(DailySignin.user_id)))
-        .where(DailySignin.signin_date == today)
-    )
 
-    # 积分总流通量
-    total_earned = await db.scalar(
-        select(func.coalesce(func.sum(UserPoints.total_earned), 0))
-    )
+@_dashboard_cache.cached(key=lambda: "stats")
+async def _load_dashboard_stats() -> DashboardStats:
+    """统计仪表盘数据（带缓存）"""
+    async with async_session_maker() as db:
+        today = datetime.now().date()
 
-    # 今日签到数
-    total_signins = await db.scalar(
-        select(func.count(DailySignin.id))
-        .where(DailySignin.signin_date == today)
-    )
+        # 总用户数
+        total_users = await db.scalar(select(func.count(User.id)))
 
-    # 今日抽奖数
-    total_draws = await db.scalar(
-        select(func.count(LotteryDraw.id))
-        .where(func.date(LotteryDraw.created_at) == today)
-    )
+        # 今日活跃用户（有签到或抽奖）
+        signin_users = await db.scalar(
+            select(func.count(func.distinct(DailySignin.user_id)))
+            .where(DailySignin.signin_date == today)
+        )
 
-    # 今日下注数
-    from app.models.points import PredictionBet
-    total_bets = await db.scalar(
-        select(func.count(PredictionBet.id))
-        .where(func.date(PredictionBet.created_at) == today)
-    )
+        # 积分总流通量
+        total_earned = await db.scalar(
+            select(func.coalesce(func.sum(UserPoints.total_earned), 0))
+        )
+
+        # 今日签到数
+        total_signins = await db.scalar(
+            select(func.count(DailySignin.id))
+            .where(DailySignin.signin_date == today)
+        )
+
+        # 今日抽奖数
+        total_draws = await db.scalar(
+            select(func.count(LotteryDraw.id))
+            .where(func.date(LotteryDraw.created_at) == today)
+        )
+
+        # 今日下注数
+        from app.models.points import PredictionBet
+        total_bets = await db.scalar(
+            select(func.count(PredictionBet.id))
+            .where(func.date(PredictionBet.created_at) == today)
+        )
 
     return DashboardStats(
         total_users=total_users or 0,
@@ -190,14 +199,18 @@ async def get_dashboard(
     )
 
 
-@router.get("/dashboard/charts")
-async def get_dashboard_charts(
-    days: int = Query(7, le=30),
+@router.get("/dashboard", response_model=DashboardStats)
+async def get_dashboard(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
 ):
-    """获取仪表盘图表数据"""
+    """获取仪表盘数据"""
     require_admin(current_user)
+    return await _load_dashboard_stats()
+
+
+@_dashboard_cache.cached(key=lambda days: ("charts", days))
+async def _load_dashboard_charts(days: int) -> dict:
+    """统计仪表盘图表数据（带缓存）"""
     from datetime import timedelta
     from app.models.points import PredictionBet
 
@@ -207,68 +220,69 @@ async def get_dashboard_charts(
     # 生成日期列表
     date_list = [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
 
-    # 每日签到趋势
-    signin_result = await db.execute(
-        select(DailySignin.signin_date, func.count(DailySignin.id))
-        .where(DailySignin.signin_date >= start_date)
-        .group_by(DailySignin.signin_date)
-    )
-    signin_data = {str(row[0]): row[1] for row in signin_result.fetchall()}
+    async with async_session_maker() as db:
+        # 每日签到趋势
+        signin_result = await db.execute(
+            select(DailySignin.signin_date, func.count(DailySignin.id))
+            .where(DailySignin.signin_date >= start_date)
+            .group_by(DailySignin.signin_date)
+        )
+        signin_data = {str(row[0]): row[1] for row in signin_result.fetchall()}
 
-    # 每日抽奖趋势
-    draw_result = await db.execute(
-        select(func.date(LotteryDraw.created_at), func.count(LotteryDraw.id))
-        .where(func.date(LotteryDraw.created_at) >= start_date)
-        .group_by(func.date(LotteryDraw.created_at))
-    )
-    draw_data = {str(row[0]): row[1] for row in draw_result.fetchall()}
+        # 每日抽奖趋势
+        draw_result = await db.execute(
+            select(func.date(LotteryDraw.created_at), func.count(LotteryDraw.id))
+            .where(func.date(LotteryDraw.created_at) >= start_date)
+            .group_by(func.date(LotteryDraw.created_at))
+        )
+        draw_data = {str(row[0]): row[1] for row in draw_result.fetchall()}
 
-    # 每日下注趋势
-    bet_result = await db.execute(
-        select(func.date(PredictionBet.created_at), func.count(PredictionBet.id))
-        .where(func.date(PredictionBet.created_at) >= start_date)
-        .group_by(func.date(PredictionBet.created_at))
-    )
-    bet_data = {str(row[0]): row[1] for row in bet_result.fetchall()}
+        # 每日下注趋势
+        bet_result = await db.execute(
+            select(func.date(PredictionBet.created_at), func.count(PredictionBet.id))
+            .where(func.date(PredictionBet.created_at) >= start_date)
+            .group_by(func.date(PredictionBet.created_at))
+        )
+        bet_data = {str(row[0]): row[1] for row in bet_result.fetchall()}
 
-    # 每日新增用户
-    user_result = await db.execute(
-        select(func.date(User.created_at), func.count(User.id))
-        .where(func.date(User.created_at) >= start_date)
-        .group_by(func.date(User.created_at))
-    )
-    user_data = {str(row[0]): row[1] for row in user_result.fetchall()}
+        # 每日新增用户
+        user_result = await db.execute(
+            select(func.date(User.created_at), func.count(User.id))
+            .where(func.date(User.created_at) >= start_date)
+            .group_by(func.date(User.created_at))
+        )
+        user_data = {str(row[0]): row[1] for row in user_result.fetchall()}
 
-    # 用户角色分布
-    role_result = await db.execute(
-        select(User.role, func.count(User.id))
-        .group_by(User.role)
-    )
-    role_distribution = [{"name": row[0], "value": row[1]} for row in role_result.fetchall()]
+        # 用户角色分布
+        role_result = await db.execute(
+            select(User.role, func.count(User.id))
+            .group_by(User.role)
+        )
+        role_distribution = [{"name": row[0], "value": row[1]} for row in role_result.fetchall()]
 
-    # 奖品类型分布
-    prize_result = await db.execute(
-        select(LotteryDraw.prize_type, func.count(LotteryDraw.id))
-        .group_by(LotteryDraw.prize_type)
-    )
-    prize_distribution = [{"name": row[0], "value": row[1]} for row in prize_result.fetchall()]
+        # 奖品类型分布
+        prize_result = await db.execute(
+            select(LotteryDraw.prize_type, func.count(LotteryDraw.id))
+            .group_by(LotteryDraw.prize_type)
+        )
+        prize_distribution = [{"name": row[0], "value": row[1]} for row in prize_result.fetchall()]
 
-    # 积分流入流出（近7天）
-    points_in_result = await db.execute(
-        select(func.date(PointsLedger.created_at), func.sum(PointsLedger.amount))
-        .where(PointsLedger.amount > 0)
-        .where(func.date(PointsLedger.created_at) >= start_date)
-        .group_by(func.date(PointsLedger.created_at))
-    )
-    points_in_data = {str(row[0]): int(row[1] or 0) for row in points_in_result.fetchall()}
+        # 积分流入流出（近7天）
+        points_in_result = await db.execute(
+            select(func.date(PointsLedger.created_at), func.sum(PointsLedger.amount))
+            .where(PointsLedger.amount > 0)
+            .where(func.date(PointsLedger.created_at) >= start_date)
+            .group_by(func.date(PointsLedger.created_at))
+        )
+        points_in_data = {str(row[0]): int(row[1] or 0) for row in points_in_result.fetchall()}
 
-    points_out_result = await db.execute(
-        select(func.date(PointsLedger.created_at), func.sum(func.abs(PointsLedger.amount)))
-        .where(PointsLedger.amount < 0)
-        .where(func.date(PointsLedger.created_at) >= start_date)
-        .group_by(func.date(PointsLedger.created_at))
-    )
-    points_out_data = {str(row[0]): int(row[1] or 0) for row in points_out_result.fetchall()}
+        points_out_result = await db.execute(
+            select(func.date(PointsLedger.created_at), func.sum(func.abs(PointsLedger.amount)))
+            .where(PointsLedger.amount < 0)
+            .where(func.date(PointsLedger.created_at) >= start_date)
+            .group_by(func.date(PointsLedger.created_at))
+        )
+        points_out_data = {str(row[0]): int(row[1] or 0) for row in points_out_result.fetchall()}
 
     return {
         "dates": date_list,
@@ -283,6 +297,16 @@ async def get_dashboard_charts(
     }
 
 
+@router.get("/dashboard/charts")
+async def get_dashboard_charts(
+    days: int = Query(7, le=30),
+    current_user: User = Depends(get_current_user),
+):
+    """获取仪表盘图表数据"""
+    require_admin(current_user)
+    return await _load_dashboard_charts(days)
+
+
 # ========== 用户管理 ==========
 
 @router.get("/users")
@@ -688,6 +712,7 @@ async def get_lottery_configs(
 
 
 @router.post("/lottery/configs")
+@invalidates(CacheNamespace.LOTTERY_INFO)
 async def create_lottery_config(
     request: LotteryConfigCreateRequest,
     current_user: User = Depends(get_current_user),
@@ -717,6 +742,7 @@ async def create_lottery_config(
 
 
 @router.put("/lottery/configs/{config_id}")
+@invalidates(CacheNamespace.LOTTERY_INFO)
 async def update_lottery_config(
     config_id: int,
     request: LotteryConfigUpdateRequest,
@@ -747,6 +773,7 @@ async def update_lottery_config(
 
 
 @router.post("/lottery/prizes")
+@invalidates(CacheNamespace.LOTTERY_INFO)
 async def create_prize(
     request: PrizeCreateRequest,
     current_user: User = Depends(get_current_user),
@@ -774,6 +801,7 @@ async def create_prize(
 
 
 @router.put("/lottery/prizes/{prize_id}")
+@invalidates(CacheNamespace.LOTTERY_INFO)
 async def update_prize(
     prize_id: int,
     request: PrizeUpdateRequest,
@@ -812,6 +840,7 @@ async def update_prize(
 
 
 @router.delete("/lottery/prizes/{prize_id}")
+@invalidates(CacheNamespace.LOTTERY_INFO)
 async def delete_prize(
     prize_id: int,
     current_user: User = Depends(get_current_user),
@@ -935,6 +964,176 @@ async def list_api_keys(
     }
 
 
+@router.get("/api-keys/stock")
+async def get_api_key_stock(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取 API Key 库存汇总（按用途和金额分池）及分配指标"""
+    require_admin(current_user)
+
+    from app.core.config import settings
+    from app.services.api_key_pool_service import ApiKeyPoolService
+
+    return {
+        "pools": await ApiKeyPoolService.get_stock_summary(db),
+        "low_stock_threshold": settings.API_KEY_LOW_STOCK_THRESHOLD,
+        "metrics": ApiKeyPoolService.get_metrics(),
+    }
+
+
+@router.get("/inventory/metrics")
+async def get_inventory_metrics(
+    current_user: User = Depends(get_current_user),
+):
+    """获取奖品/商品库存预占指标（预占、售罄、锁等待）"""
+    require_admin(current_user)
+
+    from app.services.inventory_service import InventoryService
+
+    return {"metrics": InventoryService.get_metrics()}
+
+
+@router.get("/caches/metrics")
+async def get_cache_metrics(
+    current_user: User = Depends(get_current_user),
+):
+    """获取进程内缓存指标（命中、过期、淘汰、单飞合并）"""
+    require_admin(current_user)
+
+    from app.core.response_cache import ResponseCache
+
+    return {
+        "swr": SWRCache.get_all_metrics(),
+        "response": ResponseCache.get_metrics(),
+    }
+
+
+@router.get("/http-clients/metrics")
+async def get_http_client_metrics(
+    current_user: User = Depends(get_current_user),
+):
+    """获取出站 HTTP 连接池指标（请求数、新建连接数、复用率、重试）"""
+    require_admin(current_user)
+
+    from app.core.http_clients import HttpClients
+
+    return HttpClients.get_metrics()
+
+
+@router.get("/events/stats")
+async def get_domain_event_stats(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取领域事件队列统计（积压、失败数、处理延迟）"""
+    require_admin(current_user)
+
+    from app.services.event_bus import EventBus
+
+    return await EventBus.get_stats(db)
+
+
+@router.post("/events/retry")
+async def retry_failed_domain_events(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """将处理失败的领域事件重新放回队列"""
+    require_admin(current_user)
+
+    from app.services.event_bus import EventBus
+
+    count = await EventBus.retry_failed(db)
+    await db.commit()
+    return {"success": True, "requeued": count}
+
+
+class AchievementReevaluateRequest(BaseModel):
+    achievement_keys: Optional[List[str]] = None  # 为空时重算全部可重算成就
+
+
+@router.post("/achievements/reevaluate")
+@invalidates(CacheNamespace.ACHIEVEMENT_DEFINITIONS)
+async def reevaluate_achievements(
+    request: AchievementReevaluateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """提交成就批量重算任务（新增成就或调整目标后使用）"""
+    require_admin(current_user)
+
+    from app.services import achievement_service
+    from app.services.scheduler import schedule_achievement_reevaluation
+
+    # 只是提前拒绝；其他 worker 同时提交时由任务锁保证只有一个在运行
+    if (await achievement_service.get_reevaluation_status(db))["running"]:
+        raise HTTPException(status_code=409, detail="成就重算任务正在进行中")
+    if not schedule_achievement_reevaluation(request.achievement_keys):
+        raise HTTPException(status_code=503, detail="定时任务调度器未运行")
+
+    return {"success": True}
+
+
+@router.get("/achievements/reevaluate")
+async def get_achievement_reevaluation_status(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取成就批量重算任务进度"""
+    require_admin(current_user)
+
+    from app.services import achievement_service
+
+    return await achievement_service.get_reevaluation_status(db)
+
+
+class RankingRebuildRequest(BaseModel):
+    board: Optional[str] = None  # 榜单名（如 cheer:1），为空时重建全部榜单
+
+
+@router.post("/rankings/rebuild")
+async def rebuild_rankings(
+    request: RankingRebuildRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """从数据库重建排行榜"""
+    require_admin(current_user)
+
+    from app.services.ranking_service import RankingService
+
+    if request.board:
+        try:
+            boards = {request.board: await RankingService.rebuild(db, request.board)}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        boards = await RankingService.rebuild_all(db)
+    return {"success": True, "boards": boards, "metrics": RankingService.get_metrics()}
+
+
+@router.get("/scratch-pool")
+async def get_scratch_pool(
+    config_id: Optional[int] = Query(None, description="刮刮乐配置ID，不传则使用当前进行中的活动"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取刮刮乐预生成卡池审计信息（各状态数量、封存卡片奖品分布）"""
+    require_admin(current_user)
+
+    from app.services.lottery_service import LotteryService
+    from app.services.scratch_pool_service import ScratchCardPoolService
+
+    if config_id is None:
+        config = await LotteryService.get_scratch_config(db)
+        if not config:
+            raise HTTPException(status_code=404, detail="当前没有进行中的刮刮乐活动")
+        config_id = config.id
+
+    return await ScratchCardPoolService.get_pool_summary(db, config_id)
+
+
 @router.post("/api-keys")
 async def create_api_key(
     request: ApiKeyCreateRequest,
@@ -1042,33 +1241,28 @@ async def delete_api_key(
 
 # ========== API Key 监控（参赛者 Key 消耗） ==========
 
-@router.get("/apikey-monitor/summary")
-async def get_apikey_monitor_summary(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """获取所有参赛者 API Key 消耗汇总"""
-    require_admin(current_user)
-
+@_dashboard_cache.cached(key=lambda: "apikey_monitor")
+async def _load_apikey_monitor_summary() -> dict:
+    """汇总所有参赛者 API Key 消耗（带缓存，逐个查询第三方额度）"""
     from app.models.registration import Registration, RegistrationStatus
-    from app.services.quota_service import quota_service
+    from app.services.quota_poller import QuotaPoller
     from sqlalchemy.orm import selectinload
 
     # 获取所有有 API Key 的报名
-    reg_query = (
-        select(Registration)
-        .options(selectinload(Registration.user))
-        .where(
-            Registration.status.in_([
-                RegistrationStatus.SUBMITTED.value,
-                RegistrationStatus.APPROVED.value,
-            ]),
-            Registration.api_key.isnot(None),
-            Registration.api_key != "",
+    async with async_session_maker() as db:
+        reg_result = await db.execute(
+            select(Registration)
+            .options(selectinload(Registration.user))
+            .where(
+                Registration.status.in_([
+                    RegistrationStatus.SUBMITTED.value,
+                    RegistrationStatus.APPROVED.value,
+                ]),
+                Registration.api_key.isnot(None),
+                Registration.api_key != "",
+            )
         )
-    )
-    reg_result = await db.execute(reg_query)
-    registrations = reg_result.scalars().all()
+        registrations = reg_result.scalars().all()
 
     if not registrations:
         return {
@@ -1079,9 +1273,8 @@ async def get_apikey_monitor_summary(
             "active_count": 0,
         }
 
-    # 批量查询额度
-    api_keys = [(r.id, r.api_key) for r in registrations]
-    quota_map = await quota_service.batch_get_quota(api_keys)
+    # 优先读取后台轮询的最新快照
+    quota_map, updated_at, source = await QuotaPoller.get_quota_map(registrations)
 
     # 构建结果
     items = []
@@ -1148,9 +1341,48 @@ async def get_apikey_monitor_summary(
         "active_count": active_count,
         "success_count": len([i for i in items if i["query_status"] == "ok"]),
         "error_count": len([i for i in items if i["query_status"] == "error"]),
+        "updated_at": updated_at.isoformat(),
+        "source": source,
     }
 
 
+@router.get("/apikey-monitor/poller")
+async def get_quota_poller_status(
+    current_user: User = Depends(get_current_user),
+):
+    """获取额度后台轮询状态（最近一轮结果、累计指标）"""
+    require_admin(current_user)
+
+    from app.services.quota_poller import QuotaPoller
+
+    return QuotaPoller.get_metrics()
+
+
+@router.post("/apikey-monitor/poll")
+async def trigger_quota_poll(
+    current_user: User = Depends(get_current_user),
+):
+    """立即执行一轮额度轮询（其他 worker 正在轮询时跳过）"""
+    require_admin(current_user)
+
+    from app.services.quota_poller import QuotaPoller
+
+    summary = await QuotaPoller.poll_all()
+    if summary is None:
+        return {"success": False, "message": "已有轮询正在进行"}
+    _dashboard_cache.invalidate("apikey_monitor")
+    return {"success": True, "round": summary}
+
+
+@router.get("/apikey-monitor/summary")
+async def get_apikey_monitor_summary(
+    current_user: User = Depends(get_current_user),
+):
+    """获取所有参赛者 API Key 消耗汇总"""
+    require_admin(current_user)
+    return await _load_apikey_monitor_summary()
+
+
 @router.get("/apikey-monitor/{registration_id}/logs")
 async def get_apikey_monitor_logs(
     registration_id: int,
@@ -1161,7 +1393,7 @@ async def get_apikey_monitor_logs(
     """获取单个参赛者的 API 调用日志"""
     require_admin(current_user)
 
-    import httpx
+    from app.core.http_clients import HttpClients, Upstream
     from app.models.registration import Registration
     from app.core.config import settings
 
@@ -1187,51 +1419,52 @@ async def get_apikey_monitor_logs(
     url = f"{base_url.rstrip('/')}/api/log/token"
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(
-                url,
-                params={
-                    "key": registration.api_key,
-                    "p": 0,
-                    "order": "desc",
-                },
-                headers={"Accept": "application/json"}
-            )
-
-            if resp.status_code != 200:
-                return {
-                    "registration_id": registration_id,
-                    "logs": [],
-                    "status": "error",
-                    "message": f"日志查询失败: {resp.status_code}",
-                }
-
-            data = resp.json()
-            if not data.get("success"):
-                return {
-                    "registration_id": registration_id,
-                    "logs": [],
-                    "status": "error",
-                    "message": "日志查询失败",
-                }
-
-            logs = data.get("data", [])
-            if not isinstance(logs, list):
-                logs = []
+        client = HttpClients.get(Upstream.QUOTA)
+        resp = await client.get(
+            url,
+            params={
+                "key": registration.api_key,
+                "p": 0,
+                "order": "desc",
+            },
+            headers={"Accept": "application/json"},
+            timeout=15.0,
+        )
 
-            # API 返回的数据是按时间升序排列的（最早在前）
-            # 我们需要取最后的 limit 条（最新的），然后反转顺序（最新在前）
-            recent_logs = logs[-limit:] if len(logs) > limit else logs
-            recent_logs = list(reversed(recent_logs))  # 反转，最新的在前面
+        if resp.status_code != 200:
+            return {
+                "registration_id": registration_id,
+                "logs": [],
+                "status": "error",
+                "message": f"日志查询失败: {resp.status_code}",
+            }
 
+        data = resp.json()
+        if not data.get("success"):
             return {
                 "registration_id": registration_id,
-                "title": registration.title,
-                "logs": recent_logs,
-                "total": len(logs),
-                "status": "ok",
+                "logs": [],
+                "status": "error",
+                "message": "日志查询失败",
             }
 
+        logs = data.get("data", [])
+        if not isinstance(logs, list):
+            logs = []
+
+        # API 返回的数据是按时间升序排列的（最早在前）
+        # 我们需要取最后的 limit 条（最新的），然后反转顺序（最新在前）
+        recent_logs = logs[-limit:] if len(logs) > limit else logs
+        recent_logs = list(reversed(recent_logs))  # 反转，最新的在前面
+
+        return {
+            "registration_id": registration_id,
+            "title": registration.title,
+            "logs": recent_logs,
+            "total": len(logs),
+            "status": "ok",
+        }
+
     except Exception as e:
         return {
             "registration_id": registration_id,
@@ -1250,7 +1483,7 @@ async def get_all_apikey_logs(
     """获取所有参赛者的 API 调用日志汇总"""
     require_admin(current_user)
 
-    import httpx
+    from app.core.http_clients import HttpClients, Upstream
     from app.models.registration import Registration, RegistrationStatus
     from app.core.config import settings
     from sqlalchemy.orm import selectinload
@@ -1275,43 +1508,44 @@ async def get_all_apikey_logs(
     base_url = settings.QUOTA_BASE_URLS[0] if settings.QUOTA_BASE_URLS else "https://api.ikuncode.cc"
     url = f"{base_url.rstrip('/')}/api/log/token"
 
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        for reg in registrations:
-            if not reg.api_key:
-                continue
-
-            try:
-                resp = await client.get(
-                    url,
-                    params={
-                        "key": reg.api_key,
-                        "p": 0,
-                        "order": "desc",
-                    },
-                    headers={"Accept": "application/json"}
-                )
-
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data.get("success"):
-                        logs = data.get("data", [])
-                        if isinstance(logs, list):
-                            # API 返回的数据是按时间升序排列的（最早在前）
-                            # 取最后 50 条（最新的）
-                            recent_logs = logs[-50:] if len(logs) > 50 else logs
-                            # 添加用户信息到每条日志
-                            for log in recent_logs:
-                                log["_registration_id"] = reg.id
-                                log["_title"] = reg.title
-                                log["_user"] = {
-                                    "id": reg.user.id,
-                                    "username": reg.user.username,
-                                    "display_name": reg.user.display_name,
-                                    "avatar_url": reg.user.avatar_url,
-                                } if reg.user else None
-                                all_logs.append(log)
-            except Exception:
-                continue
+    client = HttpClients.get(Upstream.QUOTA)
+    for reg in registrations:
+        if not reg.api_key:
+            continue
+
+        try:
+            resp = await client.get(
+                url,
+                params={
+                    "key": reg.api_key,
+                    "p": 0,
+                    "order": "desc",
+                },
+                headers={"Accept": "application/json"},
+                timeout=15.0,
+            )
+
+            if resp.status_code == 200:
+                data = resp.json()
+                if data.get("success"):
+                    logs = data.get("data", [])
+                    if isinstance(logs, list):
+                        # API 返回的数据是按时间升序排列的（最早在前）
+                        # 取最后 50 条（最新的）
+                        recent_logs = logs[-50:] if len(logs) > 50 else logs
+                        # 添加用户信息到每条日志
+                        for log in recent_logs:
+                            log["_registration_id"] = reg.id
+                            log["_title"] = reg.title
+                            log["_user"] = {
+                                "id": reg.user.id,
+                                "username": reg.user.username,
+                                "display_name": reg.user.display_name,
+                                "avatar_url": reg.user.avatar_url,
+                            } if reg.user else None
+                            all_logs.append(log)
+        except Exception:
+            continue
 
     # 按时间排序
     all_logs.sort(key=lambda x: x.get("created_at", 0), reverse=True)
@@ -1703,22 +1937,10 @@ async def get_activity_stats(
         select(func.count(DailySignin.id))
     ) or 0
 
-    # 抽奖次数
-    total_lottery_draws = await db.scalar(
-        select(func.count(LotteryDraw.id))
-    ) or 0
-
-    # 刮刮乐次数
-    total_scratch_cards = 0
-    try:
-        total_scratch_cards = await db.scalar(
-            select(func.count(ScratchCard.id))
-        ) or 0
-    except Exception:
-        pass
-
-    # 扭蛋机次数 (暂无独立模型，跟踪抽奖记录中的扭蛋类型)
-    total_gacha_draws = 0
+    # 各游戏游玩次数（统一游戏记录表单次聚合）
+    from app.services.play_history_service import PlayHistoryService
+    from app.models.play_event import PlayGame
+    game_stats = await PlayHistoryService.get_game_stats(db)
 
     # 兑换次数
     total_exchanges = 0
@@ -1741,10 +1963,11 @@ async def get_activity_stats(
         "points_issued_today": int(points_issued_today),
         "points_spent_today": int(points_spent_today),
         "total_signins": total_signins,
-        "total_lottery_draws": total_lottery_draws,
-        "total_scratch_cards": total_scratch_cards,
-        "total_gacha_draws": total_gacha_draws,
-        "total_slot_plays": 0,  # 老虎机是纯前端，无后端记录
+        "total_lottery_draws": game_stats[PlayGame.LOTTERY]["plays"],
+        "total_scratch_cards": game_stats[PlayGame.SCRATCH]["plays"],
+        "total_gacha_draws": game_stats[PlayGame.GACHA]["plays"],
+        "total_slot_plays": game_stats[PlayGame.SLOT]["plays"],
+        "games": game_stats,
         "total_exchanges": total_exchanges,
         "active_users_today": active_users_today,
     }
@@ -1790,21 +2013,12 @@ async def get_daily_activity_stats(
         .where(DailySignin.signin_date == query_date)
     ) or 0
 
-    # 当日抽奖次数
-    lottery_draws = await db.scalar(
-        select(func.count(LotteryDraw.id))
-        .where(func.date(LotteryDraw.created_at) == query_date)
-    ) or 0
-
-    # 当日刮刮乐次数
-    scratch_cards = 0
-    try:
-        scratch_cards = await db.scalar(
-            select(func.count(ScratchCard.id))
-            .where(func.date(ScratchCard.created_at) == query_date)
-        ) or 0
-    except Exception:
-        pass
+    # 当日各游戏游玩次数
+    from app.services.play_history_service import PlayHistoryService
+    from app.models.play_event import PlayGame
+    play_counts = (
+        await PlayHistoryService.get_daily_play_counts(db, query_date, query_date)
+    ).get(query_date.isoformat(), {})
 
     # 当日兑换次数
     exchanges = 0
@@ -1827,10 +2041,10 @@ async def get_daily_activity_stats(
         "points_issued": int(points_issued),
         "points_spent": int(points_spent),
         "signins": signins,
-        "lottery_draws": lottery_draws,
-        "scratch_cards": scratch_cards,
-        "gacha_draws": 0,
-        "slot_plays": 0,
+        "lottery_draws": play_counts.get(PlayGame.LOTTERY, 0),
+        "scratch_cards": play_counts.get(PlayGame.SCRATCH, 0),
+        "gacha_draws": play_counts.get(PlayGame.GACHA, 0),
+        "slot_plays": play_counts.get(PlayGame.SLOT, 0),
         "exchanges": exchanges,
         "active_users": active_users,
     }
@@ -1861,6 +2075,11 @@ async def get_range_activity_stats(
     if (end - start).days > 90:
         raise HTTPException(status_code=400, detail="查询范围不能超过90天")
 
+    # 各游戏每日游玩次数一次性分组查询
+    from app.services.play_history_service import PlayHistoryService
+    from app.models.play_event import PlayGame
+    daily_play_counts = await PlayHistoryService.get_daily_play_counts(db, start, end)
+
     # 获取每日数据
     daily_stats = []
     current = start
@@ -1885,21 +2104,7 @@ async def get_range_activity_stats(
             .where(DailySignin.signin_date == current)
         ) or 0
 
-        # 当日抽奖次数
-        lottery_draws = await db.scalar(
-            select(func.count(LotteryDraw.id))
-            .where(func.date(LotteryDraw.created_at) == current)
-        ) or 0
-
-        # 当日刮刮乐次数
-        scratch_cards = 0
-        try:
-            scratch_cards = await db.scalar(
-                select(func.count(ScratchCard.id))
-                .where(func.date(ScratchCard.created_at) == current)
-            ) or 0
-        except Exception:
-            pass
+        play_counts = daily_play_counts.get(current.isoformat(), {})
 
         # 当日兑换次数
         exchanges = 0
@@ -1922,10 +2127,10 @@ async def get_range_activity_stats(
             "points_issued": int(points_issued),
             "points_spent": int(points_spent),
             "signins": signins,
-            "lottery_draws": lottery_draws,
-            "scratch_cards": scratch_cards,
-            "gacha_draws": 0,
-            "slot_plays": 0,
+            "lottery_draws": play_counts.get(PlayGame.LOTTERY, 0),
+            "scratch_cards": play_counts.get(PlayGame.SCRATCH, 0),
+            "gacha_draws": play_counts.get(PlayGame.GACHA, 0),
+            "slot_plays": play_counts.get(PlayGame.SLOT, 0),
             "exchanges": exchanges,
             "active_users": active_users,
         })
@@ -1957,10 +2162,13 @@ async def get_exchange_items_admin(
     """获取所有兑换商品（管理员）"""
     require_admin(current_user)
 
+    from app.services.inventory_service import InventoryService
+
     result = await db.execute(
         select(ExchangeItem).order_by(ExchangeItem.sort_order, ExchangeItem.id)
     )
     items = result.scalars().all()
+    stock_map = await InventoryService.get_exchange_stock(db, items)
 
     return {
         "items": [
@@ -1970,7 +2178,7 @@ async def get_exchange_items_admin(
                 "description": item.description,
                 "item_type": item.item_type.value if hasattr(item.item_type, 'value') else item.item_type,
                 "price": item.cost_points,  # 前端使用 price，后端字段是 cost_points
-                "stock": item.stock,
+                "stock": stock_map[item.id],
                 "daily_limit": item.daily_limit,
                 "total_limit": item.total_limit,
                 "is_active": item.is_active,
@@ -1985,6 +2193,7 @@ async def get_exchange_items_admin(
 
 
 @router.put("/exchange/items/{item_id}")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def update_exchange_item(
     item_id: int,
     request: ExchangeItemUpdateRequest,
@@ -2004,7 +2213,10 @@ async def update_exchange_item(
     if request.price is not None:
         item.cost_points = request.price
     if request.stock is not None:
+        from app.services.inventory_service import InventoryService
         item.stock = request.stock
+        # 直接设置库存时清空分片，新值即为总库存
+        await InventoryService.reset_shards(db, item_id)
     if request.daily_limit is not None:
         item.daily_limit = request.daily_limit
     if request.total_limit is not None:
@@ -2033,6 +2245,7 @@ class ExchangeItemCreateRequest(BaseModel):
 
 
 @router.post("/exchange/items")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def create_exchange_item_admin(
     request: ExchangeItemCreateRequest,
     current_user: User = Depends(get_current_user),
@@ -2070,6 +2283,7 @@ async def create_exchange_item_admin(
 
 
 @router.delete("/exchange/items/{item_id}")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def delete_exchange_item_admin(
     item_id: int,
     current_user: User = Depends(get_current_user),
@@ -2091,6 +2305,7 @@ async def delete_exchange_item_admin(
 
 
 @router.post("/exchange/items/{item_id}/add-stock")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def add_item_stock_admin(
     item_id: int,
     quantity: int = Query(..., ge=1, description="添加的库存数量"),
@@ -2110,13 +2325,23 @@ async def add_item_stock_admin(
     if item.stock is None:
         return {"success": True, "message": "该商品为无限库存", "stock": None}
 
-    item.stock += quantity
+    from app.services.inventory_service import InventoryService
+
+    # 原子累加，避免覆盖并发兑换的库存扣减
+    await db.execute(
+        update(ExchangeItem)
+        .where(ExchangeItem.id == item_id)
+        .values(stock=ExchangeItem.stock + quantity)
+    )
     await db.commit()
+    await db.refresh(item)
+    stock_map = await InventoryService.get_exchange_stock(db, [item])
 
-    return {"success": True, "message": f"已补充{quantity}个库存", "stock": item.stock}
+    return {"success": True, "message": f"已补充{quantity}个库存", "stock": stock_map[item.id]}
 
 
 @router.post("/exchange/items/{item_id}/toggle")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def toggle_item_status_admin(
     item_id: int,
     current_user: User = Depends(get_current_user),
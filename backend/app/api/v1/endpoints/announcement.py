@@ -9,9 +9,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
+from app.core.response_cache import cached_response, invalidates, CacheNamespace
 from app.api.v1.endpoints.registration import get_current_user, get_optional_user
 from app.models.user import User, UserRole
 from app.models.announcement import Announcement
+from app.services.live_hub import LiveHub, LiveChannel, LiveEvent
 from app.schemas.announcement import (
     AnnouncementCreate,
     AnnouncementUpdate,
@@ -56,11 +58,22 @@ def build_announcement_response(announcement: Announcement) -> dict:
     }
 
 
+def _push_announcement(announcement: Announcement) -> None:
+    """推送新公告到全局实时频道（事务提交后调用）"""
+    LiveHub.publish(LiveChannel.GLOBAL, LiveEvent.ANNOUNCEMENT, {
+        "id": announcement.id,
+        "title": announcement.title,
+        "type": announcement.type.value if hasattr(announcement.type, 'value') else announcement.type,
+        "is_pinned": announcement.is_pinned,
+    })
+
+
 # ============================================================================
 # 公开接口 - 查看公告
 # ============================================================================
 
 @router.get("/public", summary="获取公开公告列表")
+@cached_response(CacheNamespace.ANNOUNCEMENTS)
 async def get_public_announcements(
     limit: int = Query(10, ge=1, le=50, description="返回数量"),
     offset: int = Query(0, ge=0, description="偏移量"),
@@ -198,6 +211,7 @@ async def list_announcements(
 
 
 @router.post("", summary="创建公告", status_code=status.HTTP_201_CREATED)
+@invalidates(CacheNamespace.ANNOUNCEMENTS)
 async def create_announcement(
     payload: AnnouncementCreate,
     db: AsyncSession = Depends(get_db),
@@ -230,6 +244,9 @@ async def create_announcement(
     result = await db.execute(query)
     announcement = result.scalar_one()
 
+    if announcement.is_active:
+        _push_announcement(announcement)
+
     return build_announcement_response(announcement)
 
 
@@ -261,6 +278,7 @@ async def get_announcement(
 
 
 @router.put("/{announcement_id}", summary="更新公告")
+@invalidates(CacheNamespace.ANNOUNCEMENTS)
 async def update_announcement(
     announcement_id: int,
     payload: AnnouncementUpdate,
@@ -309,6 +327,7 @@ async def update_announcement(
 
 
 @router.delete("/{announcement_id}", summary="删除公告", status_code=status.HTTP_204_NO_CONTENT)
+@invalidates(CacheNamespace.ANNOUNCEMENTS)
 async def delete_announcement(
     announcement_id: int,
     db: AsyncSession = Depends(get_db),
@@ -334,6 +353,7 @@ async def delete_announcement(
 
 
 @router.post("/{announcement_id}/publish", summary="发布公告")
+@invalidates(CacheNamespace.ANNOUNCEMENTS)
 async def publish_announcement(
     announcement_id: int,
     db: AsyncSession = Depends(get_db),
@@ -362,11 +382,13 @@ async def publish_announcement(
 
     await db.commit()
     await db.refresh(announcement)
+    _push_announcement(announcement)
 
     return build_announcement_response(announcement)
 
 
 @router.post("/{announcement_id}/toggle-pin", summary="切换置顶状态")
+@invalidates(CacheNamespace.ANNOUNCEMENTS)
 async def toggle_pin_announcement(
     announcement_id: int,
     db: AsyncSession = Depends(get_db),
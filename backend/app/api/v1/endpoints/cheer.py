@@ -14,16 +14,19 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from pydantic import BaseModel
 from app.core.rate_limit import limiter, RateLimits
 from sqlalchemy import select, func, desc, and_
+from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
 from app.models.registration import Registration, RegistrationStatus
-from app.models.cheer import Cheer, CheerType, CheerStats
+from app.models.cheer import Cheer, CheerType, CheerHeatStats
 from app.models.user import User
 from app.models.points import UserItem
 from app.api.v1.endpoints.registration import get_current_user, get_optional_user, get_contest_or_404
-from app.services import achievement_service
+from app.services.cheer_stats_service import CheerStatsService
+from app.services.live_hub import LiveHub, LiveChannel, LiveEvent
+from app.services.ranking_service import RankingService, RankingKind
 
 # 道具分数配置（给选手加的分数）
 ITEM_POINTS = {
@@ -142,81 +145,102 @@ async def cheer_registration(
     )
     db.add(cheer)
 
-    # 更新统计
-    stats_result = await db.execute(
-        select(CheerStats).where(CheerStats.registration_id == registration_id)
-    )
-    stats = stats_result.scalar_one_or_none()
-
-    if not stats:
-        stats = CheerStats(registration_id=registration_id)
-        db.add(stats)
-
-    # 根据类型增加计数（每种道具的次数+1）
-    if payload.cheer_type == CheerType.CHEER:
-        stats.cheer_count += 1
-    elif payload.cheer_type == CheerType.COFFEE:
-        stats.coffee_count += 1
-    elif payload.cheer_type == CheerType.ENERGY:
-        stats.energy_count += 1
-    elif payload.cheer_type == CheerType.PIZZA:
-        stats.pizza_count += 1
-    elif payload.cheer_type == CheerType.STAR:
-        stats.star_count += 1
-
-    # 总分按道具分数增加
-    stats.total_count += item_points
-
-    # 更新用户成就进度
-    has_message = bool(payload.message and payload.message.strip())
-    user_stats = await achievement_service.update_user_stats_on_cheer(
-        db,
-        current_user.id,
-        payload.cheer_type.value,
-        has_message,
-        registration_id,
+    # 更新选手统计（类型计数 +1，总分按道具分数增加；写入随机分片，避免热门选手单行锁竞争）
+    await CheerStatsService.increment(db, registration_id, payload.cheer_type, item_points)
+
+    # 热力榜汇总：按 (比赛, 打气用户) 累加次数和热力值
+    # last_cheer_at 与 cheers.created_at 一样使用 UTC（035 回填取自 MAX(cheers.created_at)）
+    now = datetime.utcnow()
+    type_column = f"{payload.cheer_type.value}_count"
+    await db.execute(
+        insert(CheerHeatStats).values(
+            contest_id=registration.contest_id,
+            user_id=current_user.id,
+            total_count=1,
+            heat_value=item_points,
+            last_cheer_at=now,
+            **{type_column: 1},
+        ).on_duplicate_key_update(
+            total_count=CheerHeatStats.total_count + 1,
+            heat_value=CheerHeatStats.heat_value + item_points,
+            last_cheer_at=now,
+            **{type_column: getattr(CheerHeatStats, type_column) + 1},
+        )
     )
 
-    # 检查并解锁成就
     # 获取比赛开始日期用于 early_supporter 成就
     from app.models.contest import Contest
     contest_start_date = None
     if registration.contest_id:
+        # Contest 没有 start_date 字段，以报名开始时间作为比赛开始时间
         contest_result = await db.execute(
-            select(Contest.start_date).where(Contest.id == registration.contest_id)
+            select(Contest.signup_start).where(Contest.id == registration.contest_id)
         )
-        contest_start_date = contest_result.scalar_one_or_none()
-
-    newly_unlocked = await achievement_service.check_and_unlock_achievements(
-        db, current_user.id, user_stats, contest_start_date
-    )
+        contest_start = contest_result.scalar_one_or_none()
+        contest_start_date = contest_start.date() if contest_start else None
 
     # 确保 cheer 有 id
     await db.flush()
 
-    # 记录任务进度（打气任务）
-    from app.services.task_service import TaskService
-    from app.models.task import TaskType
-    await TaskService.record_event(
-        db=db,
-        user_id=current_user.id,
-        task_type=TaskType.CHEER,
-        delta=1,
+    # 成就进度和任务进度由事件总线异步处理
+    from app.services.event_bus import EventBus
+    from app.models.domain_event import DomainEventType
+    await EventBus.publish(
+        db,
+        DomainEventType.CHEER_CREATED,
         event_key=f"cheer:{cheer.id}",
-        ref_type="cheer",
-        ref_id=cheer.id,
-        auto_claim=True,
+        user_id=current_user.id,
+        payload={
+            "cheer_id": cheer.id,
+            "registration_id": registration_id,
+            "cheer_type": payload.cheer_type.value,
+            "has_message": bool(payload.message and payload.message.strip()),
+            "contest_start_date": contest_start_date.isoformat() if contest_start_date else None,
+        },
     )
 
+    # 读取合并后的总分（含本次打气）
+    stats = await CheerStatsService.get_stats(db, registration_id)
+
     await db.commit()
 
-    response_message = "打气成功！"
-    if newly_unlocked:
-        response_message += f" 解锁新成就: {len(newly_unlocked)}个"
+    # 事务提交后增量更新人气榜。先累加再推算原名次：榜单未构建时读取会从数据库重建，
+    # 重建结果已包含本次打气，此时不能再累加，也没有可比较的原名次
+    board = RankingService.board_key(RankingKind.CHEER, registration.contest_id)
+    new_score = await RankingService.incr(board, registration_id, item_points)
+    old_rank = new_rank = None
+    if new_score is not None:
+        new_rank = await RankingService.rank(db, board, registration_id)
+        old_rank = await RankingService.rank_by_score(
+            db, board, registration_id, new_score - item_points
+        )
+
+    # 推送打气统计和名次变化
+    channel = LiveChannel.contest(registration.contest_id)
+    LiveHub.publish(channel, LiveEvent.CHEER, {
+        "registration_id": registration_id,
+        "cheer_type": payload.cheer_type.value,
+        "points": item_points,
+        "stats": {
+            "cheer": stats.cheer_count,
+            "coffee": stats.coffee_count,
+            "energy": stats.energy_count,
+            "pizza": stats.pizza_count,
+            "star": stats.star_count,
+            "total": stats.total_count,
+        },
+    })
+    if new_rank is not None and old_rank is not None and new_rank != old_rank:
+        LiveHub.publish(channel, LiveEvent.RANK_CHANGE, {
+            "board": RankingKind.CHEER,
+            "registration_id": registration_id,
+            "old_rank": old_rank,
+            "rank": new_rank,
+        })
 
     return CheerResponse(
         success=True,
-        message=response_message,
+        message="打气成功！",
         cheer_type=payload.cheer_type.value,
         total_cheers=stats.total_count,
     )
@@ -237,7 +261,7 @@ async def get_contest_cheers_stats(
 
     性能优化：
     - 使用一次查询获取所有 registration_ids
-    - 使用 IN 查询批量获取所有 CheerStats
+    - 使用 IN 查询批量获取所有打气统计（基础行 + 分片）
     - 如果用户已登录，使用一次查询获取当天所有打气记录
     - 避免 N+1 查询问题
     """
@@ -256,11 +280,8 @@ async def get_contest_cheers_stats(
     if not registration_ids:
         return {"data": {}}
 
-    # 批量获取所有打气统计（一次查询）
-    stats_result = await db.execute(
-        select(CheerStats).where(CheerStats.registration_id.in_(registration_ids))
-    )
-    stats_map = {s.registration_id: s for s in stats_result.scalars().all()}
+    # 批量获取所有打气统计（基础行 + 分片）
+    stats_map = await CheerStatsService.get_stats_map(db, registration_ids)
 
     # 如果用户已登录，批量查询当天是否已打气（一次查询，按类型分组）
     user_cheered_today_map = {}
@@ -320,10 +341,7 @@ async def get_registration_cheers(
 ):
     """获取选手的打气统计"""
     # 获取统计数据
-    stats_result = await db.execute(
-        select(CheerStats).where(CheerStats.registration_id == registration_id)
-    )
-    stats = stats_result.scalar_one_or_none()
+    stats = (await CheerStatsService.get_stats_map(db, [registration_id])).get(registration_id)
 
     # 检查当前用户今天是否已打气
     user_cheered_today = {}
@@ -395,48 +413,39 @@ async def get_cheer_leaderboard(
     db: AsyncSession = Depends(get_db),
 ):
     """获取人气排行榜"""
-    # 获取比赛的所有报名ID
-    reg_query = select(Registration.id).where(
-        Registration.contest_id == contest_id,
-        Registration.status.in_([
-            RegistrationStatus.SUBMITTED.value,
-            RegistrationStatus.APPROVED.value,
-        ])
+    # 排名来自排行榜引擎，详情再按报名ID批量读取；
+    # 多取一些，过滤掉尚未移出榜单的已撤回报名后仍能凑满 limit
+    entries = await RankingService.top(
+        db, RankingService.board_key(RankingKind.CHEER, contest_id), limit * 2
     )
-    reg_result = await db.execute(reg_query)
-    registration_ids = [r for r in reg_result.scalars().all()]
-
-    if not registration_ids:
+    if not entries:
         return {"items": [], "total": 0}
 
-    # 获取排行榜
-    stats_query = (
-        select(CheerStats)
-        .where(CheerStats.registration_id.in_(registration_ids))
-        .order_by(CheerStats.total_count.desc())
-        .limit(limit)
-    )
-    stats_result = await db.execute(stats_query)
-    stats_list = stats_result.scalars().all()
-
-    # 获取报名详情
-    if stats_list:
-        detail_query = (
-            select(Registration)
-            .options(selectinload(Registration.user))
-            .where(Registration.id.in_([s.registration_id for s in stats_list]))
+    registration_ids = [int(member) for _, member, _ in entries]
+    stats_map = await CheerStatsService.get_stats_map(db, registration_ids)
+    stats_list = [stats_map[reg_id] for reg_id in registration_ids if reg_id in stats_map]
+
+    # 获取报名详情（过滤榜单重建前已撤回的报名）
+    detail_query = (
+        select(Registration)
+        .options(selectinload(Registration.user))
+        .where(
+            Registration.id.in_(registration_ids),
+            Registration.status.in_([
+                RegistrationStatus.SUBMITTED.value,
+                RegistrationStatus.APPROVED.value,
+            ])
         )
-        detail_result = await db.execute(detail_query)
-        reg_map = {r.id: r for r in detail_result.scalars().all()}
-    else:
-        reg_map = {}
+    )
+    detail_result = await db.execute(detail_query)
+    reg_map = {r.id: r for r in detail_result.scalars().all()}
 
     items = []
-    for rank, stats in enumerate(stats_list, 1):
+    for stats in stats_list:
         reg = reg_map.get(stats.registration_id)
-        if reg:
+        if reg and len(items) < limit:
             items.append({
-                "rank": rank,
+                "rank": len(items) + 1,
                 "registration_id": stats.registration_id,
                 "title": reg.title,
                 "stats": {
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import Optional, List
 
 from app.core.database import get_db
+from app.core.response_cache import cached_response, invalidates, CacheNamespace
 from app.api.v1.endpoints.user import get_current_user_dep as get_current_user
 from app.models.user import User
 from app.services.exchange_service import ExchangeService
@@ -65,6 +66,7 @@ class ExchangeHistoryItem(BaseModel):
 # ========== 接口 ==========
 
 @router.get("/items", response_model=List[ExchangeItemInfo])
+@cached_response(CacheNamespace.EXCHANGE_ITEMS, ttl=10)
 async def get_exchange_items(
     db: AsyncSession = Depends(get_db)
 ):
@@ -129,6 +131,7 @@ async def get_user_tickets(
 
 from sqlalchemy import select, update
 from app.models.points import ExchangeItem, ExchangeItemType
+from app.services.inventory_service import InventoryService
 
 
 def require_admin(user: User):
@@ -199,6 +202,7 @@ async def get_exchange_items_admin(
         select(ExchangeItem).order_by(ExchangeItem.sort_order, ExchangeItem.id)
     )
     items = result.scalars().all()
+    stock_map = await InventoryService.get_exchange_stock(db, items)
 
     return [
         ExchangeItemAdminInfo(
@@ -208,7 +212,7 @@ async def get_exchange_items_admin(
             item_type=item.item_type.value,
             item_value=item.item_value,
             cost_points=item.cost_points,
-            stock=item.stock,
+            stock=stock_map[item.id],
             daily_limit=item.daily_limit,
             total_limit=item.total_limit,
             icon=item.icon,
@@ -221,6 +225,7 @@ async def get_exchange_items_admin(
 
 
 @router.post("/admin/items")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def create_exchange_item(
     data: ExchangeItemCreate,
     current_user: User = Depends(get_current_user),
@@ -256,6 +261,7 @@ async def create_exchange_item(
 
 
 @router.put("/admin/items/{item_id}")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def update_exchange_item(
     item_id: int,
     data: ExchangeItemUpdate,
@@ -276,11 +282,16 @@ async def update_exchange_item(
     for key, value in update_data.items():
         setattr(item, key, value)
 
+    # 直接设置库存时清空分片，新值即为总库存
+    if "stock" in update_data:
+        await InventoryService.reset_shards(db, item_id)
+
     await db.commit()
     return {"success": True, "message": "商品更新成功"}
 
 
 @router.delete("/admin/items/{item_id}")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def delete_exchange_item(
     item_id: int,
     current_user: User = Depends(get_current_user),
@@ -302,6 +313,7 @@ async def delete_exchange_item(
 
 
 @router.post("/admin/items/{item_id}/add-stock")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def add_item_stock(
     item_id: int,
     quantity: int = Query(..., ge=1, description="添加的库存数量"),
@@ -322,13 +334,21 @@ async def add_item_stock(
         # 无限库存商品不需要补货
         return {"success": True, "message": "该商品为无限库存", "stock": None}
 
-    item.stock += quantity
+    # 原子累加，避免覆盖并发兑换的库存扣减
+    await db.execute(
+        update(ExchangeItem)
+        .where(ExchangeItem.id == item_id)
+        .values(stock=ExchangeItem.stock + quantity)
+    )
     await db.commit()
+    await db.refresh(item)
+    stock_map = await InventoryService.get_exchange_stock(db, [item])
 
-    return {"success": True, "message": f"已补充{quantity}个库存", "stock": item.stock}
+    return {"success": True, "message": f"已补充{quantity}个库存", "stock": stock_map[item.id]}
 
 
 @router.post("/admin/items/{item_id}/toggle")
+@invalidates(CacheNamespace.EXCHANGE_ITEMS)
 async def toggle_item_status(
     item_id: int,
     current_user: User = Depends(get_current_user),
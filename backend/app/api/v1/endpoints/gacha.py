@@ -16,12 +16,16 @@ from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
+from app.core.response_cache import cached_response, invalidates, CacheNamespace
 from app.core.rate_limit import limiter, RateLimits
 from app.api.v1.endpoints.user import get_current_user_dep as get_current_user
 from app.models.user import User
 from app.models.points import PointsReason, UserItem
 from app.models.gacha import GachaConfig, GachaPrize, GachaDraw, GachaPrizeType
 from app.services.points_service import PointsService
+from app.services.inventory_service import InventoryService, InventoryKind
+from app.services.play_history_service import PlayHistoryService
+from app.models.play_event import PlayGame
 
 router = APIRouter()
 
@@ -260,6 +264,7 @@ async def get_gacha_status(
 
 
 @router.get("/prizes", response_model=GachaPrizesResponse)
+@cached_response(CacheNamespace.GACHA_PRIZES)
 async def get_gacha_prizes(db: AsyncSession = Depends(get_db)):
     """获取扭蛋机奖池列表"""
     config = await get_active_config(db)
@@ -325,8 +330,10 @@ async def play_gacha(
                 description="扭蛋机抽奖", auto_commit=False
             )
 
-        # 随机抽取奖品
-        prize = weighted_random_choice(config.prizes)
+        # 随机抽取奖品并预占库存（售罄的奖品排除后重抽）
+        prize = await InventoryService.reserve_drawn(
+            db, InventoryKind.GACHA_PRIZE, config.prizes, weighted_random_choice
+        )
         prize_value = prize.prize_value or {}
         if isinstance(prize_value, str):
             prize_value = json.loads(prize_value)
@@ -367,18 +374,6 @@ async def play_gacha(
                 result_prize_value = {"message": "抱歉，API Key兑换码已被抽完！"}
                 result_is_rare = False
 
-        # 扣减库存（使用原子 UPDATE 防止并发超卖）
-        if prize.stock is not None:
-            from sqlalchemy import text
-            deduct_result = await db.execute(
-                text("UPDATE gacha_prizes SET stock = stock - 1 WHERE id = :prize_id AND stock > 0"),
-                {"prize_id": prize.id}
-            )
-            if deduct_result.rowcount == 0:
-                # 库存扣减失败（已被其他请求抢完）
-                await db.rollback()
-                raise ValueError("奖品库存不足，请重试")
-
         # 记录抽奖
         draw = GachaDraw(
             user_id=user_id, config_id=config.id, prize_id=prize.id,
@@ -387,22 +382,29 @@ async def play_gacha(
             is_rare=result_is_rare, used_ticket=used_ticket
         )
         db.add(draw)
-
-        # 记录任务进度
-        from app.services.task_service import TaskService
-        from app.models.task import TaskType
-        await TaskService.record_event(
-            db=db, user_id=user_id, task_type=TaskType.GACHA, delta=1,
-            event_key=f"gacha:{datetime.utcnow().timestamp()}",
-            ref_type="gacha", ref_id=0, auto_claim=True
+        await db.flush()
+
+        payout_points = 0
+        if result_prize_type == GachaPrizeType.POINTS.value:
+            payout_points = int(result_prize_value.get("amount", 0) or 0)
+        await PlayHistoryService.record(
+            db, user_id, PlayGame.GACHA, draw.id,
+            cost_points=actual_cost,
+            payout_points=payout_points,
+            prize_name=result_prize_name,
+            is_rare=result_is_rare
         )
 
-        # 更新成就进度并检测解锁
-        from app.services.achievement_service import (
-            update_user_stats_on_gacha, check_and_unlock_achievements
+        # 任务进度和成就由事件总线异步处理
+        from app.services.event_bus import EventBus
+        from app.models.domain_event import DomainEventType
+        await EventBus.publish(
+            db,
+            DomainEventType.GACHA_PLAYED,
+            event_key=f"gacha:{draw.id}",
+            user_id=user_id,
+            payload={"draw_id": draw.id, "is_rare": result_is_rare},
         )
-        user_stats = await update_user_stats_on_gacha(db, user_id, result_is_rare)
-        await check_and_unlock_achievements(db, user_id, user_stats)
 
         await db.commit()
 
@@ -468,6 +470,7 @@ async def get_gacha_admin_config(
 
 
 @router.put("/admin/config/{config_id}")
+@invalidates(CacheNamespace.GACHA_PRIZES)
 async def update_gacha_config(
     config_id: int,
     data: GachaConfigUpdate,
@@ -523,6 +526,7 @@ async def get_gacha_prizes_admin(
 
 
 @router.post("/admin/prizes/{config_id}")
+@invalidates(CacheNamespace.GACHA_PRIZES)
 async def create_gacha_prize(
     config_id: int,
     data: GachaPrizeCreate,
@@ -551,6 +555,7 @@ async def create_gacha_prize(
 
 
 @router.put("/admin/prizes/{config_id}/{prize_id}")
+@invalidates(CacheNamespace.GACHA_PRIZES)
 async def update_gacha_prize(
     config_id: int,
     prize_id: int,
@@ -580,6 +585,7 @@ async def update_gacha_prize(
 
 
 @router.delete("/admin/prizes/{config_id}/{prize_id}")
+@invalidates(CacheNamespace.GACHA_PRIZES)
 async def delete_gacha_prize(
     config_id: int,
     prize_id: int,
@@ -11,7 +11,7 @@ from datetime import date, datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select, func, desc
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -19,6 +19,7 @@ from app.core.database import get_db
 from app.models.registration import Registration, RegistrationStatus
 from app.models.github_stats import GitHubStats, GitHubSyncLog
 from app.services.github_service import github_service, GitHubService
+from app.services.ranking_service import RankingService, RankingKind
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -194,66 +195,24 @@ async def get_github_leaderboard(
     db: AsyncSession = Depends(get_db),
 ):
     """获取 GitHub 排行榜"""
-    # 获取所有报名ID
-    reg_query = select(Registration.id).where(
-        Registration.contest_id == contest_id,
-        Registration.status.in_([
-            RegistrationStatus.SUBMITTED.value,
-            RegistrationStatus.APPROVED.value,
-        ])
-    )
-    reg_result = await db.execute(reg_query)
-    registration_ids = [r for r in reg_result.scalars().all()]
-
-    if not registration_ids:
-        return {"items": [], "total": 0, "type": leaderboard_type}
-
-    if leaderboard_type == "commits":
-        # 按累计提交数排行
-        query = (
-            select(
-                GitHubStats.registration_id,
-                func.sum(GitHubStats.commits_count).label("total")
-            )
-            .where(GitHubStats.registration_id.in_(registration_ids))
-            .group_by(GitHubStats.registration_id)
-            .order_by(desc("total"))
-            .limit(limit)
-        )
-    elif leaderboard_type == "additions":
-        # 按代码增量排行
-        query = (
-            select(
-                GitHubStats.registration_id,
-                func.sum(GitHubStats.additions).label("total")
-            )
-            .where(GitHubStats.registration_id.in_(registration_ids))
-            .group_by(GitHubStats.registration_id)
-            .order_by(desc("total"))
-            .limit(limit)
-        )
-    else:
-        # 默认按提交数
-        query = (
-            select(
-                GitHubStats.registration_id,
-                func.sum(GitHubStats.commits_count).label("total")
-            )
-            .where(GitHubStats.registration_id.in_(registration_ids))
-            .group_by(GitHubStats.registration_id)
-            .order_by(desc("total"))
-            .limit(limit)
-        )
+    # 排名来自排行榜引擎（streak 等未维护榜单的类型按提交数排行）
+    kind = RankingKind.GITHUB_ADDITIONS if leaderboard_type == "additions" else RankingKind.GITHUB_COMMITS
+    # 多取一些，过滤掉尚未移出榜单的已撤回报名后仍能凑满 limit
+    entries = await RankingService.top(db, RankingService.board_key(kind, contest_id), limit * 2)
+    rankings = [(int(member), int(score)) for _, member, score in entries]
 
-    result = await db.execute(query)
-    rankings = result.all()
-
-    # 获取报名详情
+    # 获取报名详情（过滤榜单重建前已撤回的报名）
     if rankings:
         detail_query = (
             select(Registration)
             .options(selectinload(Registration.user))
-            .where(Registration.id.in_([r[0] for r in rankings]))
+            .where(
+                Registration.id.in_([r[0] for r in rankings]),
+                Registration.status.in_([
+                    RegistrationStatus.SUBMITTED.value,
+                    RegistrationStatus.APPROVED.value,
+                ])
+            )
         )
         detail_result = await db.execute(detail_query)
         reg_map = {r.id: r for r in detail_result.scalars().all()}
@@ -261,11 +220,11 @@ async def get_github_leaderboard(
         reg_map = {}
 
     items = []
-    for rank, (reg_id, total) in enumerate(rankings, 1):
+    for reg_id, total in rankings:
         reg = reg_map.get(reg_id)
-        if reg:
+        if reg and len(items) < limit:
             items.append({
-                "rank": rank,
+                "rank": len(items) + 1,
                 "registration_id": reg_id,
                 "title": reg.title,
                 "value": total or 0,
@@ -398,6 +357,10 @@ async def sync_github_stats(
 
     await db.commit()
 
+    # 每日统计为覆盖写入，使该比赛的 GitHub 榜单失效后按需重建
+    for kind in (RankingKind.GITHUB_COMMITS, RankingKind.GITHUB_ADDITIONS):
+        await RankingService.invalidate(RankingService.board_key(kind, registration.contest_id))
+
     return {
         "success": True,
         "registration_id": registration_id,
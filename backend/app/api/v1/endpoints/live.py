@@ -0,0 +1,73 @@
+"""
+实时推送 API（Server-Sent Events）
+
+前端订阅后接收增量事件，替代对打气统计、排行榜、中奖动态、公告的轮询：
+- /live/contests/{contest_id}/stream：比赛频道 + 全局频道
+- /live/stream：全局频道（公告、稀有中奖）
+
+连接不占用数据库会话，空闲时按间隔发送心跳注释保持连接。
+"""
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.live_hub import LiveHub, LiveChannel
+
+router = APIRouter()
+
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # 关闭 Nginx 缓冲，事件立即下发
+}
+
+
+def _stream(request: Request, channels: List[str]) -> StreamingResponse:
+    """订阅频道并返回 SSE 响应"""
+    try:
+        queue = LiveHub.subscribe(channels)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    async def event_stream():
+        try:
+            # 断线后客户端 3 秒重连
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=settings.LIVE_FEED_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield LiveHub.format_sse(message)
+        finally:
+            LiveHub.unsubscribe(queue, channels)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.get(
+    "/contests/{contest_id}/stream",
+    summary="比赛实时推送",
+    description="SSE 推送比赛的打气统计变化、人气榜名次变化，以及全局的稀有中奖和新公告。",
+)
+async def stream_contest(contest_id: int, request: Request):
+    """比赛实时推送"""
+    return _stream(request, [LiveChannel.contest(contest_id), LiveChannel.GLOBAL])
+
+
+@router.get(
+    "/stream",
+    summary="全局实时推送",
+    description="SSE 推送稀有中奖和新公告。",
+)
+async def stream_global(request: Request):
+    """全局实时推送"""
+    return _stream(request, [LiveChannel.GLOBAL])
@@ -1,6 +1,6 @@
 """
 积分系统 API
-包含：签到、积分查询、积分历史
+包含：签到、积分查询、积分历史、游戏活动时间线
 """
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -104,6 +104,28 @@ async def get_points_history(
     }
 
 
+@router.get("/activity")
+@limiter.limit(RateLimits.READ)
+async def get_play_activity(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    game: Optional[str] = Query(None, description="游戏类型: lottery/scratch/gacha/slot"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取我的游戏活动时间线（抽奖、刮刮乐、扭蛋机、老虎机）"""
+    from app.services.play_history_service import PlayHistoryService
+    from app.models.play_event import PlayGame
+
+    if game and game not in PlayGame.ALL:
+        raise HTTPException(status_code=400, detail="不支持的游戏类型")
+    try:
+        return await PlayHistoryService.get_timeline(db, current_user.id, cursor, limit, game)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/statistics")
 async def get_points_statistics(
     current_user: User = Depends(get_current_user),
@@ -171,17 +193,10 @@ async def signin(
 ):
     """每日签到"""
     try:
-        result = await SigninService.signin(db, current_user.id)
-
-        # 记录日志
-        from app.services.log_service import log_signin
-        await log_signin(
-            db, current_user.id,
-            points=result.get("points_earned", 0),
-            streak=result.get("streak_day", 1),
-            request=request
-        )
-        await db.commit()
+        # 签到日志随签到事件异步写入
+        from app.services.log_service import get_client_info
+        ip_address, user_agent = get_client_info(request)
+        result = await SigninService.signin(db, current_user.id, ip_address, user_agent)
 
         return SigninResponse(**result)
     except ValueError as e:
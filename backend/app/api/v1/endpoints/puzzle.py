@@ -4,7 +4,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, text
+from sqlalchemy import select, update, text, bindparam
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from typing import List, Optional
@@ -13,6 +13,7 @@ import json
 from app.core.database import get_db
 from app.api.v1.endpoints.user import get_current_user_dep as get_current_user, get_current_user_optional
 from app.models.user import User
+from app.services.ranking_service import RankingService, RankingKind, puzzle_score
 
 router = APIRouter()
 
@@ -74,6 +75,13 @@ async def sync_puzzle_progress(
     })
     await db.commit()
 
+    # 事务提交后更新排行榜（未完成任何关卡的用户不上榜）
+    await RankingService.set(
+        RankingService.board_key(RankingKind.PUZZLE),
+        current_user.id,
+        puzzle_score(total_solved, total_time) if total_solved > 0 else None,
+    )
+
     return {
         "success": True,
         "total_solved": total_solved,
@@ -129,29 +137,36 @@ async def get_puzzle_leaderboard(
     获取码神挑战排行榜
     按完成关卡数排序，关卡数相同则按用时排序
     """
-    sql = text("""
-        SELECT
-            p.user_id,
-            p.total_solved,
-            p.total_time,
-            p.total_errors,
-            p.last_solved_at,
-            u.username,
-            u.display_name,
-            u.avatar_url
-        FROM puzzle_progress p
-        JOIN users u ON p.user_id = u.id
-        WHERE p.total_solved > 0
-        ORDER BY p.total_solved DESC, p.total_time ASC
-        LIMIT :limit
-    """)
-    result = await db.execute(sql, {"limit": limit})
-    rows = result.fetchall()
+    board = RankingService.board_key(RankingKind.PUZZLE)
+    entries = await RankingService.top(db, board, limit)
+    user_ids = [int(member) for _, member, _ in entries]
+
+    rows_by_user = {}
+    if user_ids:
+        sql = text("""
+            SELECT
+                p.user_id,
+                p.total_solved,
+                p.total_time,
+                p.total_errors,
+                p.last_solved_at,
+                u.username,
+                u.display_name,
+                u.avatar_url
+            FROM puzzle_progress p
+            JOIN users u ON p.user_id = u.id
+            WHERE p.user_id IN :user_ids
+        """).bindparams(bindparam("user_ids", expanding=True))
+        result = await db.execute(sql, {"user_ids": user_ids})
+        rows_by_user = {row.user_id: row for row in result.fetchall()}
 
     items = []
-    for idx, row in enumerate(rows):
+    for user_id in user_ids:
+        row = rows_by_user.get(user_id)
+        if not row:
+            continue
         items.append({
-            "rank": idx + 1,
+            "rank": len(items) + 1,
             "user": {
                 "id": row.user_id,
                 "username": row.username,
@@ -169,25 +184,7 @@ async def get_puzzle_leaderboard(
     # 查询当前用户排名
     my_rank = None
     if current_user:
-        # 先检查用户是否有进度记录
-        check_sql = text("SELECT total_solved, total_time FROM puzzle_progress WHERE user_id = :user_id")
-        check_result = await db.execute(check_sql, {"user_id": current_user.id})
-        user_progress = check_result.fetchone()
-
-        if user_progress and user_progress.total_solved > 0:
-            # 用户有记录，计算排名
-            rank_sql = text("""
-                SELECT COUNT(*) + 1 as user_rank FROM puzzle_progress
-                WHERE total_solved > :user_solved
-                OR (total_solved = :user_solved AND total_time < :user_time)
-            """)
-            rank_result = await db.execute(rank_sql, {
-                "user_solved": user_progress.total_solved,
-                "user_time": user_progress.total_time
-            })
-            rank_row = rank_result.fetchone()
-            if rank_row:
-                my_rank = rank_row.user_rank
+        my_rank = await RankingService.rank(db, board, current_user.id)
 
     return {
         "items": items,
@@ -6,12 +6,9 @@
 - 获取额度消耗排行榜
 - 获取调用日志
 - 获取选手在线状态
+- 获取选手额度用量曲线和比赛消耗速率
 """
-import asyncio
 import logging
-import httpx
-import time
-from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime, timezone
 
@@ -20,67 +17,53 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.core.database import get_db
+from app.core.database import get_db, async_session_maker
+from app.core.http_clients import HttpClients, Upstream
+from app.core.swr_cache import SWRCache
 from app.core.config import settings
 from app.models.registration import Registration, RegistrationStatus
 from app.services.quota_service import quota_service, QuotaInfo
+from app.services.quota_poller import QuotaPoller
+from app.services.quota_series_service import QuotaSeriesService
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-# ========== Contest 级别在线状态缓存（避免惊群） ==========
-@dataclass
-class _ContestOnlineCacheEntry:
-    """Contest 在线状态缓存条目"""
-    data: dict[int, bool]
-    created_at: float
-    lock: asyncio.Lock
-
-
-_contest_online_cache: dict[int, _ContestOnlineCacheEntry] = {}
+# ========== Contest 级别缓存（单飞避免惊群，过期后先返回旧值再后台刷新） ==========
 _CONTEST_ONLINE_CACHE_TTL = 10  # 10秒缓存
+_QUOTA_LEADERBOARD_CACHE_TTL = 10
+_QUOTA_SERIES_CACHE_TTL = 60  # 快照每轮询周期才更新一次
+
+_contest_online_cache = SWRCache(
+    "contest_online_status",
+    ttl=_CONTEST_ONLINE_CACHE_TTL,
+    stale_ttl=_CONTEST_ONLINE_CACHE_TTL * 3,
+    max_entries=200,
+)
+_quota_leaderboard_cache = SWRCache(
+    "quota_leaderboard",
+    ttl=_QUOTA_LEADERBOARD_CACHE_TTL,
+    stale_ttl=_QUOTA_LEADERBOARD_CACHE_TTL * 3,
+    max_entries=200,
+)
+_quota_series_cache = SWRCache(
+    "quota_series",
+    ttl=_QUOTA_SERIES_CACHE_TTL,
+    stale_ttl=_QUOTA_SERIES_CACHE_TTL * 2,
+    max_entries=1000,
+)
 
 
-async def _get_contest_online_status_cached(
-    contest_id: int,
-    db: AsyncSession
-) -> dict[int, bool]:
+@_contest_online_cache.cached()
+async def _get_contest_online_status_cached(contest_id: int) -> dict[int, bool]:
     """
     获取 contest 的在线状态（带缓存，避免惊群）
-    """
-    global _contest_online_cache
 
-    now = time.time()
-    entry = _contest_online_cache.get(contest_id)
-
-    # 缓存命中且未过期
-    if entry and (now - entry.created_at) < _CONTEST_ONLINE_CACHE_TTL:
-        return entry.data
-
-    # 需要刷新：创建或复用锁
-    if entry is None:
-        entry = _ContestOnlineCacheEntry(
-            data={},
-            created_at=0,
-            lock=asyncio.Lock()
-        )
-        _contest_online_cache[contest_id] = entry
-
-    # 尝试获取锁，避免同时多个请求都去查询
-    if entry.lock.locked():
-        # 另一个协程正在刷新，等待完成后返回缓存
-        async with entry.lock:
-            return entry.data
-
-    async with entry.lock:
-        # 双重检查：可能在等锁期间已被其他协程刷新
-        now = time.time()
-        if (now - entry.created_at) < _CONTEST_ONLINE_CACHE_TTL:
-            return entry.data
-
-        # 执行实际查询
-        reg_query = (
+    使用独立会话查询报名，第三方查询期间不占用数据库连接。
+    """
+    async with async_session_maker() as db:
+        reg_result = await db.execute(
             select(Registration.id, Registration.api_key)
             .where(
                 Registration.contest_id == contest_id,
@@ -90,79 +73,59 @@ async def _get_contest_online_status_cached(
                 ])
             )
         )
-        reg_result = await db.execute(reg_query)
         rows = reg_result.all()
 
-        api_keys: list[tuple[int, str]] = []
-        for row in rows:
-            reg_id = row[0]
-            api_key = row[1] or ""
-            api_keys.append((reg_id, api_key))
-
-        status_map = await quota_service.batch_get_online_status(api_keys)
-
-        # 更新缓存
-        entry.data = status_map
-        entry.created_at = time.time()
+    api_keys: list[tuple[int, str]] = [(row[0], row[1] or "") for row in rows]
+    return await quota_service.batch_get_online_status(api_keys)
 
-        return status_map
 
+@_quota_leaderboard_cache.cached()
+async def _build_quota_leaderboard(contest_id: int) -> tuple[list[dict], datetime, str]:
+    """
+    构建 contest 的完整额度排行（带缓存）
 
-@router.get(
-    "/contests/{contest_id}/quota-leaderboard",
-    summary="获取额度消耗排行榜",
-    description="获取比赛选手的 API 额度消耗排行榜（实时查询）。",
-)
-async def get_quota_leaderboard(
-    contest_id: int,
-    limit: int = Query(50, ge=1, le=100, description="返回数量"),
-    db: AsyncSession = Depends(get_db),
-):
-    """获取额度消耗排行榜"""
-
+    Returns:
+        (已排序不含名次的条目, 数据时间, 来源 snapshot/live)
+    """
     # 获取所有已设置 api_key 的报名
-    reg_query = (
-        select(Registration)
-        .options(selectinload(Registration.user))
-        .where(
-            Registration.contest_id == contest_id,
-            Registration.status.in_([
-                RegistrationStatus.SUBMITTED.value,
-                RegistrationStatus.APPROVED.value,
-            ]),
-            Registration.api_key.isnot(None),
-            Registration.api_key != "",
+    async with async_session_maker() as db:
+        reg_result = await db.execute(
+            select(Registration)
+            .options(selectinload(Registration.user))
+            .where(
+                Registration.contest_id == contest_id,
+                Registration.status.in_([
+                    RegistrationStatus.SUBMITTED.value,
+                    RegistrationStatus.APPROVED.value,
+                ]),
+                Registration.api_key.isnot(None),
+                Registration.api_key != "",
+            )
         )
-    )
-    reg_result = await db.execute(reg_query)
-    registrations = reg_result.scalars().all()
+        registrations = reg_result.scalars().all()
 
     if not registrations:
-        return {
-            "items": [],
-            "total": 0,
-            "message": "暂无选手设置 API Key",
-        }
+        return [], datetime.now().replace(microsecond=0), "live"
 
-    # 批量查询额度
-    api_keys = [(r.id, r.api_key) for r in registrations]
-    quota_map = await quota_service.batch_get_quota(api_keys)
+    # 优先读取后台轮询的最新快照
+    quota_map, updated_at, source = await QuotaPoller.get_quota_map(registrations, contest_id)
 
     # 构建结果并排序
     items = []
     for reg in registrations:
         quota_info = quota_map.get(reg.id)
+        user = {
+            "id": reg.user.id,
+            "username": reg.user.username,
+            "display_name": reg.user.display_name,
+            "avatar_url": reg.user.avatar_url,
+        } if reg.user else None
 
         if quota_info:
             items.append({
                 "registration_id": reg.id,
                 "title": reg.title,
-                "user": {
-                    "id": reg.user.id,
-                    "username": reg.user.username,
-                    "display_name": reg.user.display_name,
-                    "avatar_url": reg.user.avatar_url,
-                } if reg.user else None,
+                "user": user,
                 "quota": {
                     "used": round(quota_info.used, 2),
                     "today_used": round(quota_info.today_used, 2),
@@ -177,12 +140,7 @@ async def get_quota_leaderboard(
             items.append({
                 "registration_id": reg.id,
                 "title": reg.title,
-                "user": {
-                    "id": reg.user.id,
-                    "username": reg.user.username,
-                    "display_name": reg.user.display_name,
-                    "avatar_url": reg.user.avatar_url,
-                } if reg.user else None,
+                "user": user,
                 "quota": None,
                 "status": "error",
             })
@@ -194,16 +152,69 @@ async def get_quota_leaderboard(
             -(x["quota"]["used"] if x["quota"] else 0),  # 按 used 降序
         )
     )
+    return items, updated_at, source
+
+
+@_quota_series_cache.cached(key=lambda *args: ("usage",) + args)
+async def _load_registration_usage(
+    registration_id: int,
+    hours: int,
+    resolution_seconds: int
+) -> Optional[list[dict]]:
+    """加载选手额度用量曲线（带缓存），报名不存在时返回 None"""
+    async with async_session_maker() as db:
+        exists = await db.scalar(
+            select(Registration.id).where(Registration.id == registration_id)
+        )
+        if exists is None:
+            return None
+        points = await QuotaSeriesService.get_registration_curve(
+            db, registration_id, hours, resolution_seconds
+        )
+    return [
+        {"ts": datetime.fromtimestamp(ts).isoformat(), "used": round(used, 4)}
+        for ts, used in points
+    ]
+
+
+@_quota_series_cache.cached(key=lambda *args: ("burn_rate",) + args)
+async def _load_contest_burn_rate(contest_id: int, hours: int, bucket_seconds: int) -> dict:
+    """加载比赛额度消耗速率（带缓存）"""
+    async with async_session_maker() as db:
+        return await QuotaSeriesService.get_contest_burn_rate(db, contest_id, hours, bucket_seconds)
+
+
+@router.get(
+    "/contests/{contest_id}/quota-leaderboard",
+    summary="获取额度消耗排行榜",
+    description="获取比赛选手的 API 额度消耗排行榜（读取后台轮询的最新快照，updated_at 为数据时间）。",
+)
+async def get_quota_leaderboard(
+    contest_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=100, description="返回数量"),
+):
+    """获取额度消耗排行榜"""
+    items, updated_at, source = await _build_quota_leaderboard(contest_id)
+    response.headers["Cache-Control"] = f"public, max-age={_QUOTA_LEADERBOARD_CACHE_TTL}"
+
+    if not items:
+        return {
+            "items": [],
+            "total": 0,
+            "message": "暂无选手设置 API Key",
+        }
 
-    # 添加排名
-    for i, item in enumerate(items[:limit], 1):
-        item["rank"] = i
+    # 添加排名（复制条目，不修改缓存中的数据）
+    ranked = [{**item, "rank": i} for i, item in enumerate(items[:limit], 1)]
 
     return {
-        "items": items[:limit],
+        "items": ranked,
         "total": len(items),
         "successful_queries": len([i for i in items if i["status"] == "ok"]),
         "failed_queries": len([i for i in items if i["status"] == "error"]),
+        "updated_at": updated_at.isoformat(),
+        "source": source,
     }
 
 
@@ -215,7 +226,6 @@ async def get_quota_leaderboard(
 async def get_contest_online_status(
     contest_id: int,
     response: Response,
-    db: AsyncSession = Depends(get_db),
 ):
     """
     获取比赛所有选手的在线状态
@@ -224,7 +234,7 @@ async def get_contest_online_status(
         {registration_id: bool} 字典，True 表示在线
     """
     # 使用 contest 级别缓存，避免惊群效应
-    status_map = await _get_contest_online_status_cached(contest_id, db)
+    status_map = await _get_contest_online_status_cached(contest_id)
 
     # 设置 HTTP 缓存，与内存缓存对齐
     response.headers["Cache-Control"] = f"public, max-age={_CONTEST_ONLINE_CACHE_TTL}"
@@ -337,52 +347,53 @@ async def get_registration_quota_logs(
     url = f"{base_url.rstrip('/')}/api/log/token"
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # 添加排序参数，获取最新的日志
-            resp = await client.get(
-                url,
-                params={
-                    "key": registration.api_key,
-                    "p": 0,  # 第一页
-                    "order": "desc",  # 倒序（最新的在前）
-                },
-                headers={"Accept": "application/json"}
-            )
+        client = HttpClients.get(Upstream.QUOTA)
+        # 添加排序参数，获取最新的日志
+        resp = await client.get(
+            url,
+            params={
+                "key": registration.api_key,
+                "p": 0,  # 第一页
+                "order": "desc",  # 倒序（最新的在前）
+            },
+            headers={"Accept": "application/json"},
+            timeout=10.0,
+        )
 
-            if resp.status_code != 200:
-                return {
-                    "registration_id": registration_id,
-                    "logs": [],
-                    "status": "error",
-                    "message": f"日志查询失败: {resp.status_code}",
-                }
-
-            data = resp.json()
-            if not data.get("success"):
-                return {
-                    "registration_id": registration_id,
-                    "logs": [],
-                    "status": "error",
-                    "message": "日志查询失败",
-                }
-
-            logs = data.get("data", [])
-            if not isinstance(logs, list):
-                logs = []
-
-            # API 返回的数据是按时间升序排列的（最早在前）
-            # 取最后的 limit 条（最新的），然后反转顺序（最新在前）
-            total_logs = len(logs)
-            recent_logs = logs[-limit:] if len(logs) > limit else logs
-            recent_logs = list(reversed(recent_logs))  # 反转，最新的在前面
+        if resp.status_code != 200:
+            return {
+                "registration_id": registration_id,
+                "logs": [],
+                "status": "error",
+                "message": f"日志查询失败: {resp.status_code}",
+            }
 
+        data = resp.json()
+        if not data.get("success"):
             return {
                 "registration_id": registration_id,
-                "logs": recent_logs,
-                "total": total_logs,
-                "status": "ok",
+                "logs": [],
+                "status": "error",
+                "message": "日志查询失败",
             }
 
+        logs = data.get("data", [])
+        if not isinstance(logs, list):
+            logs = []
+
+        # API 返回的数据是按时间升序排列的（最早在前）
+        # 取最后的 limit 条（最新的），然后反转顺序（最新在前）
+        total_logs = len(logs)
+        recent_logs = logs[-limit:] if len(logs) > limit else logs
+        recent_logs = list(reversed(recent_logs))  # 反转，最新的在前面
+
+        return {
+            "registration_id": registration_id,
+            "logs": recent_logs,
+            "total": total_logs,
+            "status": "ok",
+        }
+
     except Exception as e:
         logger.warning("获取调用日志失败: %s", e)
         return {
@@ -391,3 +402,48 @@ async def get_registration_quota_logs(
             "status": "error",
             "message": f"日志查询失败: {str(e)}",
         }
+
+
+@router.get(
+    "/registrations/{registration_id}/quota-usage",
+    summary="获取选手额度用量曲线",
+    description="基于后台轮询快照的已使用额度曲线，超过快照保留期的部分读取按天压缩的用量序列。",
+)
+async def get_registration_quota_usage(
+    registration_id: int,
+    response: Response,
+    hours: int = Query(24, ge=1, le=24 * 30, description="时间范围（小时）"),
+    resolution_minutes: int = Query(10, ge=1, le=24 * 60, description="采样间隔（分钟）"),
+):
+    """获取选手额度用量曲线"""
+    points = await _load_registration_usage(registration_id, hours, resolution_minutes * 60)
+    if points is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="报名记录不存在"
+        )
+
+    response.headers["Cache-Control"] = f"public, max-age={_QUOTA_SERIES_CACHE_TTL}"
+    return {
+        "registration_id": registration_id,
+        "hours": hours,
+        "resolution_seconds": resolution_minutes * 60,
+        "points": points,
+    }
+
+
+@router.get(
+    "/contests/{contest_id}/quota-burn-rate",
+    summary="获取比赛额度消耗速率",
+    description="按时间桶统计比赛全体选手的额度消耗和每小时速率，以及各选手的平均/最近速率（时间范围不超过快照保留期）。",
+)
+async def get_contest_quota_burn_rate(
+    contest_id: int,
+    response: Response,
+    hours: int = Query(6, ge=1, le=48, description="时间范围（小时）"),
+    bucket_minutes: int = Query(10, ge=2, le=240, description="时间桶（分钟）"),
+):
+    """获取比赛额度消耗速率"""
+    data = await _load_contest_burn_rate(contest_id, hours, bucket_minutes * 60)
+    response.headers["Cache-Control"] = f"public, max-age={_QUOTA_SERIES_CACHE_TTL}"
+    return {"contest_id": contest_id, **data}
@@ -18,6 +18,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
+from app.core.response_cache import cached_response, invalidates, CacheNamespace
 from app.core.security import decode_token
 from app.models.contest import Contest, ContestPhase
 from app.models.registration import Registration, RegistrationStatus
@@ -27,6 +28,7 @@ from app.schemas.registration import (
     RegistrationResponse,
     RegistrationUpdate,
 )
+from app.services.ranking_service import RankingService
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -182,6 +184,7 @@ def check_signup_phase(contest: Contest) -> None:
     summary="创建报名",
     description="为当前登录用户创建比赛报名。每个用户在每个比赛只能报名一次。",
 )
+@invalidates(CacheNamespace.PUBLIC_REGISTRATIONS)
 async def create_registration(
     contest_id: int,
     payload: RegistrationCreate,
@@ -218,6 +221,9 @@ async def create_registration(
 
             await db.commit()
 
+            # 撤回时已移出榜单，重新生效后从数据库重建（恢复历史打气和 GitHub 数据）
+            await RankingService.invalidate_contest(contest_id)
+
             # 重新加载以确保 user 关系已加载
             result = await db.execute(
                 select(Registration)
@@ -320,6 +326,7 @@ async def get_my_registration(
     summary="更新我的报名",
     description="更新当前登录用户的报名信息。仅在报名阶段且报名未被审核通过时可修改。",
 )
+@invalidates(CacheNamespace.PUBLIC_REGISTRATIONS)
 async def update_my_registration(
     contest_id: int,
     payload: RegistrationUpdate,
@@ -373,6 +380,7 @@ async def update_my_registration(
     summary="撤回报名",
     description="撤回当前登录用户的报名（软删除，状态变为 withdrawn）。",
 )
+@invalidates(CacheNamespace.PUBLIC_REGISTRATIONS)
 async def withdraw_my_registration(
     contest_id: int,
     db: AsyncSession = Depends(get_db),
@@ -397,6 +405,7 @@ async def withdraw_my_registration(
 
     registration.status = RegistrationStatus.WITHDRAWN.value
     await db.commit()
+    await RankingService.remove_registration(contest_id, registration.id)
 
     # 重新加载以获取最新数据
     result = await db.execute(
@@ -453,6 +462,7 @@ async def check_registration_status(
     summary="获取公开的参赛选手列表",
     description="获取指定比赛已通过审核或已提交的报名列表（公开展示）。",
 )
+@cached_response(CacheNamespace.PUBLIC_REGISTRATIONS)
 async def list_public_registrations(
     contest_id: int,
     db: AsyncSession = Depends(get_db),
@@ -593,6 +603,7 @@ async def list_all_registrations(
     summary="审核通过报名",
     description="管理员审核通过报名，用户角色将升级为参赛者。",
 )
+@invalidates(CacheNamespace.PUBLIC_REGISTRATIONS)
 async def approve_registration(
     contest_id: int,
     registration_id: int,
@@ -659,6 +670,7 @@ async def approve_registration(
     summary="拒绝报名",
     description="管理员拒绝报名申请。",
 )
+@invalidates(CacheNamespace.PUBLIC_REGISTRATIONS)
 async def reject_registration(
     contest_id: int,
     registration_id: int,
@@ -701,6 +713,7 @@ async def reject_registration(
     registration.status = RegistrationStatus.REJECTED.value
 
     await db.commit()
+    await RankingService.remove_registration(contest_id, registration.id)
 
     # 重新加载
     result = await db.execute(
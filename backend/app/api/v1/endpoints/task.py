@@ -10,7 +10,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -115,6 +115,8 @@ async def list_task_definitions(
 
 @router.get("/me", summary="获取我的任务列表")
 async def get_my_tasks(
+    request: Request,
+    response: Response,
     schedule: TaskSchedule = Query(TaskSchedule.DAILY, description="任务周期"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -143,13 +145,24 @@ async def get_my_tasks(
         "stats": {"total": 6, "completed": 3, "claimed": 2}
     }
     ```
+
+    响应带 ETag，请求头 If-None-Match 与之相同时返回 304
     """
-    return await TaskService.get_user_tasks(
+    board, etag = await TaskService.get_user_task_board(
         db=db,
         user_id=current_user.id,
         schedule=schedule,
     )
 
+    # 面板未变化时返回 304，前端轮询无需重新下载
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return board
+
 
 @router.post("/me/{task_id}/claim", summary="领取任务奖励")
 async def claim_task_reward(
@@ -193,6 +206,31 @@ async def claim_task_reward(
         )
 
 
+@router.post("/me/claim-all", summary="一键领取任务和成就奖励")
+async def claim_all_rewards(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    一键领取当前周期全部已完成任务的奖励和全部已解锁成就的奖励（同一事务）
+
+    返回格式：
+    ```json
+    {
+        "tasks": [{"task_id": 1, "period_start": "2025-01-15", "reward_points": 20, "request_id": "task:123:1:2025-01-15"}],
+        "achievements": [{"achievement_key": "cheer_first", "points": 10}],
+        "task_points": 20,
+        "achievement_points": 10
+    }
+    ```
+    """
+    from app.services.reward_claim_service import RewardClaimService
+
+    result = await RewardClaimService.claim_all(db=db, user_id=current_user.id)
+    await db.commit()
+    return result
+
+
 # =========================================================================
 # 管理端点
 # =========================================================================
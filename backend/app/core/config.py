@@ -72,12 +72,80 @@ class Settings(BaseSettings):
     QUOTA_USAGE_LOOKBACK_DAYS: int = 90  # OpenAI usage 查询天数
     QUOTA_PER_USD: int = 500000  # NewAPI 额度换算比率
 
+    # 额度后台轮询与快照
+    QUOTA_POLL_ENABLED: bool = True  # 定时轮询所有选手额度并写入快照
+    QUOTA_POLL_INTERVAL_SECONDS: int = 120  # 轮询周期
+    QUOTA_POLL_KEYS_PER_SECOND: float = 5.0  # 每秒最多开始查询的 key 数（上游限速预算，每个 key 约 3 次请求）
+    QUOTA_SNAPSHOT_MAX_AGE_SECONDS: int = 600  # 最新快照超过该时间视为过期，接口回退实时查询
+    QUOTA_SNAPSHOT_RETENTION_HOURS: int = 48  # 原始快照保留时间（需大于 25 小时，保证前一天压缩前不被删除）
+    QUOTA_SERIES_RESOLUTION_SECONDS: int = 600  # 按天压缩用量序列的采样间隔
+    QUOTA_SERIES_COARSE_AFTER_DAYS: int = 7  # 超过该天数的用量序列再次降采样
+    QUOTA_SERIES_COARSE_RESOLUTION_SECONDS: int = 3600  # 再次降采样后的采样间隔
+
     # 选手在线状态配置（基于 API 调用日志）
     ONLINE_STATUS_WINDOW_SECONDS: int = 300  # 5 分钟内有调用视为在线
     ONLINE_STATUS_CACHE_TTL_OK_SECONDS: int = 30  # 成功结果缓存（短期）
     ONLINE_STATUS_CACHE_TTL_STALE_SECONDS: int = 60  # stale-while-revalidate 窗口
     ONLINE_STATUS_CACHE_TTL_ERROR_SECONDS: int = 10  # 失败缓存（更短）
 
+    # API Key 兑换码库存告警
+    API_KEY_LOW_STOCK_THRESHOLD: int = 5  # 可用数量低于此值时告警
+    API_KEY_STOCK_CHECK_INTERVAL_SECONDS: int = 60  # 同一库存池余量检查的最小间隔
+
+    # 库存预占（热门兑换商品分片）
+    INVENTORY_HOT_SHARDS: int = 8  # 热门商品库存分片数
+    INVENTORY_SHARD_LEASE_SIZE: int = 10  # 分片每次从主库存租借的数量
+
+    # 刮刮乐预生成卡池
+    SCRATCH_POOL_ENABLED: bool = True  # 是否启用预生成卡池（关闭后购买时实时抽奖）
+    SCRATCH_POOL_TARGET_SIZE: int = 200  # 卡池补充到的封存卡片数量
+    SCRATCH_POOL_REFILL_THRESHOLD: int = 50  # 封存卡片低于此值时补充
+    SCRATCH_POOL_BATCH_SIZE: int = 50  # 每个事务生成的卡片数量（控制奖品库存行持锁时间）
+
+    # 领域事件总线（事务性发件箱）
+    EVENT_BUS_INLINE: bool = False  # 在发布事务内直接处理事件（测试/单进程调试）
+    EVENT_BUS_POLL_INTERVAL_SECONDS: int = 2  # 后台消费者轮询间隔
+    EVENT_BUS_BATCH_SIZE: int = 100  # 每批领取的事件数量
+    EVENT_BUS_MAX_ATTEMPTS: int = 8  # 最大尝试次数，超过后标记为 FAILED
+
+    # 任务定义进程内索引
+    TASK_DEFINITION_INDEX_TTL_SECONDS: int = 30  # 索引指纹校验间隔（其他进程修改定义后的最大延迟）
+    TASK_BOARD_CACHE_MAX_ENTRIES: int = 20000  # 用户任务面板快照缓存上限
+    TASK_EVENT_DEDUPE_GRACE_DAYS: int = 3  # 周期结束后事件去重记录的保留天数
+    TASK_MAINTENANCE_BATCH_SIZE: int = 1000  # 周期维护任务每批处理的记录数
+
+    # 成就定义缓存
+    ACHIEVEMENT_DEFINITION_CACHE_TTL_SECONDS: int = 30  # 版本指纹校验间隔
+    ACHIEVEMENT_REEVALUATE_BATCH_SIZE: int = 500  # 批量重算每批用户数
+    ACHIEVEMENT_REEVALUATE_PAUSE_MS: int = 50  # 批量重算批次间隔（毫秒）
+
+    # 打气统计分片
+    CHEER_STATS_SHARDS: int = 8  # 每个选手的统计增量分片数
+    CHEER_STATS_FOLD_BATCH_SIZE: int = 200  # 分片合并每批处理的选手数
+
+    # 排行榜引擎
+    RANKING_BACKEND: str = "memory"  # memory（进程内）或 redis（多进程共享，需可用的 REDIS_URL）
+    RANKING_MEMORY_TTL_SECONDS: int = 60  # 进程内榜单从数据库重建的间隔（其他进程写入的最大延迟）
+    RANKING_REDIS_TTL_SECONDS: int = 600  # Redis 榜单构建标记的有效期，过期后下次读取从数据库重建（修正重建期间丢失的增量）
+
+    # 公开接口响应缓存
+    RESPONSE_CACHE_BACKEND: str = "memory"  # memory（进程内 LRU）或 redis（多 worker 共享，失效立即生效）
+    RESPONSE_CACHE_DEFAULT_TTL_SECONDS: int = 60  # 默认服务端缓存时间
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000  # 进程内缓存条目上限
+
+    # 实时推送（SSE）
+    LIVE_FEED_BACKEND: str = "memory"  # memory（仅本进程）或 redis（多 worker 通过 Redis pub/sub 转发）
+    LIVE_FEED_QUEUE_SIZE: int = 100  # 每个连接的待发送消息上限，超出丢弃最旧的消息
+    LIVE_FEED_HEARTBEAT_SECONDS: int = 15  # 空闲心跳间隔
+    LIVE_FEED_MAX_SUBSCRIBERS: int = 5000  # 每个 worker 的连接上限
+
+    # 出站 HTTP 连接池（GitHub、Linux.do、额度查询共用进程级客户端）
+    HTTP_CLIENT_HTTP2: bool = True  # 安装了 h2 时启用 HTTP/2，否则自动退回 HTTP/1.1
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 30.0  # 空闲长连接保留时间
+    HTTP_CLIENT_CONNECT_RETRIES: int = 2  # 建连失败重试次数（传输层，指数退避）
+    HTTP_CLIENT_MAX_RETRIES: int = 2  # 幂等请求遇到超时/429/5xx 的重试次数
+    HTTP_CLIENT_RETRY_BACKOFF_SECONDS: float = 0.5  # 重试退避基数，第 n 次等待 基数 * 2^(n-1) 秒
+
     class Config:
         env_file = ".env"
         case_sensitive = True
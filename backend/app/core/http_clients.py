@@ -0,0 +1,222 @@
+"""
+出站 HTTP 客户端注册表
+
+每个上游一个进程级 httpx.AsyncClient，复用 TCP/TLS 连接：
+- 各上游独立的连接池上限和超时，互不占用
+- 安装了 h2 时启用 HTTP/2（单连接多路复用）
+- 传输层对建连失败重试；request() 对幂等请求的超时、429、5xx 按指数退避重试
+- 通过 httpcore trace 统计新建连接数，得出连接复用率
+- 显式传入 transport 后 httpx 不再读取代理环境变量，这里按 HTTP(S)_PROXY / ALL_PROXY / NO_PROXY 自行挂载
+
+应用生命周期中 start() 创建、close() 关闭；脚本等未经过 lifespan 的场景在首次 get() 时创建。
+"""
+import asyncio
+import importlib.util
+import logging
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+_RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class Upstream:
+    """出站上游"""
+    GITHUB = "github"        # GitHub API 与 OAuth
+    LINUX_DO = "linux_do"    # Linux.do OAuth
+    QUOTA = "quota"          # 额度查询（NewAPI / OpenAI 兼容接口）
+
+
+@dataclass
+class _UpstreamConfig:
+    """上游连接池配置"""
+    timeout: float
+    max_connections: int
+    max_keepalive_connections: int
+
+
+def _upstream_configs() -> Dict[str, _UpstreamConfig]:
+    # 批量额度查询、批量在线状态查询、后台轮询各自按 QUOTA_MAX_CONCURRENCY 限制并发，
+    # 三者可能同时进行，连接池按总和设置，避免互相占满连接池导致 PoolTimeout
+    quota_concurrency = max(1, settings.QUOTA_MAX_CONCURRENCY) * 3
+    return {
+        Upstream.GITHUB: _UpstreamConfig(timeout=15.0, max_connections=20, max_keepalive_connections=10),
+        Upstream.LINUX_DO: _UpstreamConfig(timeout=15.0, max_connections=20, max_keepalive_connections=10),
+        Upstream.QUOTA: _UpstreamConfig(
+            timeout=settings.QUOTA_TIMEOUT_SECONDS,
+            max_connections=quota_concurrency,
+            max_keepalive_connections=quota_concurrency,
+        ),
+    }
+
+
+def _proxy_mounts(
+    make_transport: Callable[..., httpx.AsyncHTTPTransport]
+) -> Dict[str, Optional[httpx.AsyncBaseTransport]]:
+    """
+    按代理环境变量构建 httpx mounts（与 httpx 自身 trust_env 的规则一致）
+
+    NO_PROXY 中的主机挂载为 None，即使用客户端默认的直连 transport。
+    """
+    proxies = urllib.request.getproxies()
+    mounts: Dict[str, Optional[httpx.AsyncBaseTransport]] = {}
+    for scheme in ("http", "https", "all"):
+        url = proxies.get(scheme)
+        if url:
+            if "://" not in url:
+                url = f"http://{url}"
+            mounts[f"{scheme}://"] = make_transport(proxy=url)
+    if not mounts:
+        return {}
+
+    for host in (proxies.get("no") or "").split(","):
+        host = host.strip()
+        if not host:
+            continue
+        if host == "*":
+            return {}
+        if "://" in host:
+            mounts[host] = None
+        elif host.lower() == "localhost":
+            mounts["all://localhost"] = None
+        else:
+            mounts[f"all://*{host.lstrip('.')}"] = None
+    return mounts
+
+
+class HttpClients:
+    """出站 HTTP 客户端注册表"""
+
+    _clients: Dict[str, httpx.AsyncClient] = {}
+
+    # 运行指标（进程内）{上游: {指标: 值}}
+    _metrics: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _upstream_metrics(upstream: str) -> Dict[str, int]:
+        return HttpClients._metrics.setdefault(upstream, {
+            "requests": 0,
+            "new_connections": 0,
+            "retries": 0,
+            "errors": 0,
+        })
+
+    @staticmethod
+    def _create(upstream: str) -> httpx.AsyncClient:
+        config = _upstream_configs()[upstream]
+        metrics = HttpClients._upstream_metrics(upstream)
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                metrics["new_connections"] += 1
+
+        async def on_request(request: httpx.Request) -> None:
+            metrics["requests"] += 1
+            request.extensions["trace"] = trace
+
+        limits = httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        http2 = settings.HTTP_CLIENT_HTTP2 and _HTTP2_AVAILABLE
+
+        def make_transport(proxy: Optional[str] = None) -> httpx.AsyncHTTPTransport:
+            return httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=limits,
+                retries=settings.HTTP_CLIENT_CONNECT_RETRIES,
+                proxy=httpx.Proxy(proxy) if proxy else None,
+            )
+
+        return httpx.AsyncClient(
+            timeout=config.timeout,
+            follow_redirects=False,
+            transport=make_transport(),
+            mounts=_proxy_mounts(make_transport),
+            event_hooks={"request": [on_request]},
+        )
+
+    @staticmethod
+    def get(upstream: str) -> httpx.AsyncClient:
+        """获取上游的共享客户端（不要关闭或用 async with 包裹）"""
+        client = HttpClients._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = HttpClients._create(upstream)
+            HttpClients._clients[upstream] = client
+        return client
+
+    @staticmethod
+    async def request(
+        upstream: str,
+        method: str,
+        url: str,
+        *,
+        max_retries: Optional[int] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        发送请求；幂等请求遇到超时、网络错误、429、5xx 时按指数退避重试
+
+        非幂等请求（如 OAuth 换 token 的 POST）只依赖传输层的建连重试，不会重复提交。
+        """
+        client = HttpClients.get(upstream)
+        metrics = HttpClients._upstream_metrics(upstream)
+        retries = settings.HTTP_CLIENT_MAX_RETRIES if max_retries is None else max_retries
+        if method.upper() not in _IDEMPOTENT_METHODS:
+            retries = 0
+
+        attempt = 0
+        while True:
+            try:
+                resp = await client.request(method, url, **kwargs)
+                if resp.status_code not in _RETRY_STATUSES or attempt >= retries:
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                if attempt >= retries:
+                    metrics["errors"] += 1
+                    raise
+                reason = repr(e)
+
+            attempt += 1
+            metrics["retries"] += 1
+            delay = settings.HTTP_CLIENT_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            logger.debug(f"出站请求重试 {upstream} {method} {url}（第 {attempt} 次，{reason}），等待 {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def start() -> None:
+        """创建全部上游客户端（应用启动时调用）"""
+        for upstream in _upstream_configs():
+            HttpClients.get(upstream)
+        if settings.HTTP_CLIENT_HTTP2 and not _HTTP2_AVAILABLE:
+            logger.info("未安装 h2，出站请求使用 HTTP/1.1")
+
+    @staticmethod
+    async def close() -> None:
+        """关闭全部客户端（应用退出时调用）"""
+        clients, HttpClients._clients = HttpClients._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """获取出站连接指标快照（复用率 = 1 - 新建连接数 / 请求数）"""
+        upstreams = {}
+        for upstream, metrics in HttpClients._metrics.items():
+            requests = metrics["requests"]
+            upstreams[upstream] = {
+                **metrics,
+                "reuse_rate": round(1 - metrics["new_connections"] / requests, 4) if requests else None,
+            }
+        return {"http2": settings.HTTP_CLIENT_HTTP2 and _HTTP2_AVAILABLE, "upstreams": upstreams}
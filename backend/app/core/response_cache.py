@@ -0,0 +1,263 @@
+"""
+公开接口响应缓存
+
+为公开、变化少、访问量大的 GET 接口缓存序列化后的响应体：
+- @cached_response(命名空间, ttl)：按 路径 + 排序后的查询参数 缓存，响应带强 ETag 和 Cache-Control，
+  请求头 If-None-Match 命中时直接返回 304
+- @invalidates(命名空间...)：管理员写接口成功返回后使对应命名空间失效
+- RESPONSE_CACHE_BACKEND=redis 时缓存存放在 Redis，多 worker 共享且失效立即生效；
+  默认进程内 LRU，失效只作用于当前进程，其他进程最迟 TTL 后刷新
+- cached_value：缓存接口中与用户无关的部分数据（响应含用户信息、不能整体缓存时使用）
+
+仅缓存接口正常返回的结果；抛出 HTTPException 或直接返回 Response 的请求不缓存。
+"""
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - 未安装 redis 时只能使用进程内缓存
+    aioredis = None
+
+_REDIS_PREFIX = "respcache:"
+
+# (过期时间, ETag, 响应体)
+_Entry = Tuple[float, str, bytes]
+
+
+class CacheNamespace:
+    """响应缓存命名空间（写接口按命名空间失效）"""
+    PUBLIC_REGISTRATIONS = "public_registrations"
+    ANNOUNCEMENTS = "announcements"
+    ACHIEVEMENT_DEFINITIONS = "achievement_definitions"
+    GACHA_PRIZES = "gacha_prizes"
+    LOTTERY_INFO = "lottery_info"
+    EXCHANGE_ITEMS = "exchange_items"
+
+
+class ResponseCache:
+    """响应缓存存储"""
+
+    _entries: "OrderedDict[str, _Entry]" = OrderedDict()
+    _redis = None
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "hits": 0,
+        "misses": 0,
+        "not_modified": 0,
+        "invalidations": 0,
+        "redis_errors": 0,
+    }
+
+    @staticmethod
+    def _use_redis() -> bool:
+        return settings.RESPONSE_CACHE_BACKEND == "redis" and aioredis is not None
+
+    @staticmethod
+    def _get_redis():
+        if ResponseCache._redis is None:
+            ResponseCache._redis = aioredis.from_url(settings.REDIS_URL)
+        return ResponseCache._redis
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """强 ETag：响应体摘要"""
+        return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    @staticmethod
+    async def get(key: str) -> Optional[Tuple[str, bytes]]:
+        """读取缓存，返回 (ETag, 响应体)"""
+        if ResponseCache._use_redis():
+            try:
+                raw = await ResponseCache._get_redis().get(_REDIS_PREFIX + key)
+            except Exception as e:
+                ResponseCache._metrics["redis_errors"] += 1
+                logger.warning(f"响应缓存 Redis 读取失败: {key}: {e}")
+                return None
+            if raw is None:
+                return None
+            etag, _, body = raw.partition(b"\n")
+            return etag.decode(), body
+
+        entry = ResponseCache._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, etag, body = entry
+        if expires_at <= time.monotonic():
+            del ResponseCache._entries[key]
+            return None
+        ResponseCache._entries.move_to_end(key)
+        return etag, body
+
+    @staticmethod
+    async def set(key: str, etag: str, body: bytes, ttl: int) -> None:
+        """写入缓存"""
+        if ResponseCache._use_redis():
+            try:
+                await ResponseCache._get_redis().set(
+                    _REDIS_PREFIX + key, etag.encode() + b"\n" + body, ex=ttl
+                )
+            except Exception as e:
+                ResponseCache._metrics["redis_errors"] += 1
+                logger.warning(f"响应缓存 Redis 写入失败: {key}: {e}")
+            return
+
+        ResponseCache._entries[key] = (time.monotonic() + ttl, etag, body)
+        ResponseCache._entries.move_to_end(key)
+        while len(ResponseCache._entries) > settings.RESPONSE_CACHE_MAX_ENTRIES:
+            ResponseCache._entries.popitem(last=False)
+
+    @staticmethod
+    async def invalidate(*namespaces: str) -> None:
+        """使命名空间下的全部缓存失效"""
+        for namespace in namespaces:
+            prefix = f"{namespace}:"
+            for key in [k for k in ResponseCache._entries if k.startswith(prefix)]:
+                del ResponseCache._entries[key]
+
+            if ResponseCache._use_redis():
+                try:
+                    redis = ResponseCache._get_redis()
+                    keys = [k async for k in redis.scan_iter(match=f"{_REDIS_PREFIX}{prefix}*")]
+                    if keys:
+                        await redis.delete(*keys)
+                except Exception as e:
+                    ResponseCache._metrics["redis_errors"] += 1
+                    logger.warning(f"响应缓存 Redis 失效失败: {namespace}: {e}")
+            ResponseCache._metrics["invalidations"] += 1
+
+    @staticmethod
+    async def close() -> None:
+        """关闭 Redis 连接（应用退出时调用）"""
+        if ResponseCache._redis is not None:
+            await ResponseCache._redis.aclose()
+            ResponseCache._redis = None
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """获取响应缓存指标快照"""
+        return {
+            **ResponseCache._metrics,
+            "backend": "redis" if ResponseCache._use_redis() else "memory",
+            "memory_entries": len(ResponseCache._entries),
+        }
+
+
+def _request_key(namespace: str, request: Request) -> str:
+    """缓存 key：命名空间 + 路径 + 排序后的查询参数"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{namespace}:{request.url.path}?{query}"
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def cached_response(namespace: str, ttl: int = None, max_age: int = 0):
+    """
+    响应缓存装饰器（放在 @router.get 之下）
+
+    Args:
+        namespace: 缓存命名空间（CacheNamespace），写接口按命名空间失效
+        ttl: 服务端缓存秒数，默认 RESPONSE_CACHE_DEFAULT_TTL_SECONDS
+        max_age: 浏览器缓存秒数，默认 0（每次携带 ETag 重新验证）
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        signature = inspect.signature(func)
+        request_param = next(
+            (name for name, p in signature.parameters.items() if p.annotation is Request),
+            None,
+        )
+        # 接口没有声明 Request 参数时追加一个，由 FastAPI 注入
+        if request_param is None:
+            request_param = "_cache_request"
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(request_param, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
+
+        cache_control = f"public, max-age={max_age}" + (", must-revalidate" if max_age == 0 else "")
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs[request_param]
+            if request_param == "_cache_request":
+                kwargs.pop(request_param)
+
+            key = _request_key(namespace, request)
+            cached = await ResponseCache.get(key)
+            if cached is not None:
+                ResponseCache._metrics["hits"] += 1
+                etag, body = cached
+            else:
+                ResponseCache._metrics["misses"] += 1
+                result = await func(*args, **kwargs)
+                if isinstance(result, Response):
+                    return result
+                body = json.dumps(
+                    jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")
+                ).encode("utf-8")
+                etag = ResponseCache.make_etag(body)
+                await ResponseCache.set(
+                    key, etag, body, ttl or settings.RESPONSE_CACHE_DEFAULT_TTL_SECONDS
+                )
+
+            headers = {"ETag": etag, "Cache-Control": cache_control}
+            if _not_modified(request, etag):
+                ResponseCache._metrics["not_modified"] += 1
+                return Response(status_code=304, headers=headers)
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*namespaces: str):
+    """写接口装饰器（放在 @router.post/put/delete 之下）：成功返回后使命名空间失效"""
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            await ResponseCache.invalidate(*namespaces)
+            return result
+        return wrapper
+
+    return decorator
+
+
+async def cached_value(
+    namespace: str,
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: int = None
+) -> Any:
+    """缓存可 JSON 序列化的数据（与响应缓存共用存储和失效）"""
+    full_key = f"{namespace}:value:{key}"
+    cached = await ResponseCache.get(full_key)
+    if cached is not None:
+        ResponseCache._metrics["hits"] += 1
+        return json.loads(cached[1])
+
+    ResponseCache._metrics["misses"] += 1
+    value = await loader()
+    body = json.dumps(jsonable_encoder(value), ensure_ascii=False).encode("utf-8")
+    await ResponseCache.set(full_key, "", body, ttl or settings.RESPONSE_CACHE_DEFAULT_TTL_SECONDS)
+    return value
@@ -0,0 +1,249 @@
+"""
+单飞 + 过期可用（stale-while-revalidate）异步缓存
+
+用于耗时聚合和第三方查询，防止缓存失效瞬间的并发击穿：
+- 新鲜期内直接返回缓存
+- 过期后的陈旧窗口内立即返回旧值，并在后台单飞刷新
+- 无可用缓存时，同一 key 的并发调用只执行一次加载，其余等待同一结果
+- 加载失败时有旧值则继续使用旧值（可按异常类型关闭），否则按错误 TTL 缓存异常，期间直接抛出
+- 条目按最近访问顺序存放在 OrderedDict 中，命中、写入、淘汰均为 O(1)；
+  写入时先从队首清理已完全过期的条目，仍超过上限再按 LRU 淘汰
+
+注意：加载函数可能在请求结束后于后台执行，不能依赖请求内的数据库会话或 HTTP 客户端。
+"""
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Any]]
+ErrorTTL = Union[float, Callable[[BaseException], float]]
+
+
+@dataclass
+class _Entry:
+    """缓存条目"""
+    value: Any
+    fresh_until: float                       # 新鲜期截止时间
+    stale_until: float                       # 陈旧期截止时间
+    error: Optional[BaseException] = None    # 负缓存的异常
+
+
+class SWRCache:
+    """单飞 + 过期可用异步缓存"""
+
+    # 已创建的缓存实例（指标汇总）
+    _instances: Dict[str, "SWRCache"] = {}
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0,
+        error_ttl: ErrorTTL = 0,
+        max_entries: int = 1000,
+        stale_on_error: Callable[[BaseException], bool] = lambda exc: True,
+    ):
+        """
+        Args:
+            name: 缓存名称（日志和指标）
+            ttl: 新鲜期（秒）
+            stale_ttl: 新鲜期之后的陈旧窗口（秒），窗口内返回旧值并后台刷新
+            error_ttl: 加载失败的负缓存时间（秒），可为按异常返回秒数的函数；0 表示不缓存失败
+            max_entries: 最大条目数，超出按 LRU 淘汰
+            stale_on_error: 加载失败时是否允许继续使用旧值
+        """
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self.stale_on_error = stale_on_error
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._metrics: Dict[str, int] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "loads": 0,
+            "errors": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        SWRCache._instances[name] = self
+
+    # =========================================================================
+    # 读取
+    # =========================================================================
+
+    async def get(self, key: Hashable, loader: Loader) -> Any:
+        """获取缓存值，必要时调用 loader 加载"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now < entry.fresh_until:
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                if entry.error is not None:
+                    # 同一异常对象重复抛出，清掉上次的调用栈避免不断累积
+                    raise entry.error.with_traceback(None)
+                return entry.value
+            if entry.error is None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                self._metrics["stale_hits"] += 1
+                self._refresh(key, loader)
+                return entry.value
+            if now >= entry.stale_until:
+                # 已完全过期，访问时顺带删除
+                del self._entries[key]
+                self._metrics["expirations"] += 1
+
+        self._metrics["misses"] += 1
+        if key in self._inflight:
+            self._metrics["coalesced"] += 1
+        # shield：单个等待方被取消时不影响共享的加载任务
+        return await asyncio.shield(self._start(key, loader))
+
+    async def refresh(self, key: Hashable, loader: Loader) -> Any:
+        """强制加载并写入缓存（有进行中的加载时复用），失败处理同 get"""
+        return await asyncio.shield(self._start(key, loader))
+
+    def peek(self, key: Hashable) -> Any:
+        """读取未过期（含陈旧期）的缓存值，不触发加载，没有时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None or entry.error is not None or time.monotonic() >= entry.stale_until:
+            return None
+        return entry.value
+
+    # =========================================================================
+    # 写入与失效
+    # =========================================================================
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        """直接写入缓存值"""
+        now = time.monotonic()
+        fresh_until = now + (self.ttl if ttl is None else ttl)
+        self._store(key, _Entry(value, fresh_until, fresh_until + self.stale_ttl))
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """使单个 key 失效；不传 key 时清空全部"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _store(self, key: Hashable, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._purge_expired_head()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._metrics["evictions"] += 1
+
+    def _purge_expired_head(self) -> None:
+        """从最久未访问端删除已完全过期的条目，遇到未过期条目即停止（均摊 O(1)）"""
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now < entry.stale_until:
+                break
+            del self._entries[key]
+            self._metrics["expirations"] += 1
+
+    # =========================================================================
+    # 加载
+    # =========================================================================
+
+    def _start(self, key: Hashable, loader: Loader) -> asyncio.Future:
+        """启动（或复用进行中的）加载任务"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _refresh(self, key: Hashable, loader: Loader) -> None:
+        """后台刷新，结果只写入缓存"""
+        task = self._start(key, loader)
+        # 取走异常，避免 "Task exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _error_ttl(self, exc: BaseException) -> float:
+        return self.error_ttl(exc) if callable(self.error_ttl) else self.error_ttl
+
+    async def _load(self, key: Hashable, loader: Loader) -> Any:
+        self._metrics["loads"] += 1
+        try:
+            value = await loader()
+        except Exception as exc:
+            self._metrics["errors"] += 1
+            now = time.monotonic()
+            error_ttl = self._error_ttl(exc)
+            previous = self._entries.get(key)
+
+            # 有旧值时继续使用旧值，错误 TTL 内不再重试
+            if (
+                previous is not None
+                and previous.error is None
+                and now < previous.stale_until
+                and self.stale_on_error(exc)
+            ):
+                logger.info(f"{self.name} 加载失败，使用旧值: {exc}")
+                previous.fresh_until = min(previous.stale_until, now + error_ttl)
+                return previous.value
+
+            if error_ttl > 0:
+                self._store(key, _Entry(None, now + error_ttl, now + error_ttl, error=exc))
+            else:
+                self._entries.pop(key, None)
+            raise
+
+        now = time.monotonic()
+        self._store(key, _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl))
+        return value
+
+    # =========================================================================
+    # 装饰器
+    # =========================================================================
+
+    def cached(self, key: Callable[..., Hashable] = None):
+        """
+        协程装饰器：按参数缓存返回值
+
+        Args:
+            key: 由调用参数生成缓存 key 的函数，默认使用 (args, sorted(kwargs))
+        """
+        def decorator(func: Callable[..., Awaitable[Any]]):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+                return await self.get(cache_key, lambda: func(*args, **kwargs))
+
+            wrapper.cache = self
+            return wrapper
+
+        return decorator
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取缓存指标快照"""
+        lookups = self._metrics["hits"] + self._metrics["stale_hits"] + self._metrics["misses"]
+        return {
+            **self._metrics,
+            "hit_rate": round((self._metrics["hits"] + self._metrics["stale_hits"]) / lookups, 4) if lookups else None,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+        }
+
+    @staticmethod
+    def get_all_metrics() -> Dict[str, Dict[str, Any]]:
+        """获取全部缓存实例的指标快照 {名称: 指标}"""
+        return {name: cache.get_metrics() for name, cache in SWRCache._instances.items()}
@@ -10,9 +10,13 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
+from app.core.http_clients import HttpClients
 from app.core.rate_limit import limiter, rate_limit_exceeded_handler
+from app.core.response_cache import ResponseCache
 from app.api.v1 import router as api_router
 from app.services.scheduler import start_scheduler, shutdown_scheduler
+from app.services.ranking_service import RankingService
+from app.services.live_hub import LiveHub
 from app.middleware import RequestLoggerMiddleware
 
 logger = logging.getLogger(__name__)
@@ -24,11 +28,19 @@ async def lifespan(app: FastAPI):
     # 启动时检查关键配置
     _check_security_config()
 
+    # 出站 HTTP 连接池
+    await HttpClients.start()
+
     # 启动定时任务
     start_scheduler()
+    await LiveHub.start()
     yield
     # 关闭时执行
     shutdown_scheduler()
+    await LiveHub.stop()
+    await RankingService.close()
+    await ResponseCache.close()
+    await HttpClients.close()
 
 
 def _check_security_config():
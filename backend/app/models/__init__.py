@@ -9,11 +9,13 @@ from app.models.submission_review import SubmissionReview
 from app.models.registration import Registration, RegistrationStatus
 from app.models.vote import Vote
 from app.models.github_stats import GitHubStats, GitHubSyncLog
-from app.models.cheer import Cheer, CheerType, CheerStats
+from app.models.cheer import Cheer, CheerType, CheerStats, CheerStatsShard, CheerHeatStats
 from app.models.achievement import (
     AchievementDefinition,
+    AchievementReevaluationRun,
     UserAchievement,
     UserBadgeShowcase,
+    UserCheeredProject,
     UserStats,
     AchievementTier,
     AchievementStatus,
@@ -21,6 +23,9 @@ from app.models.achievement import (
 )
 from app.models.system_log import SystemLog, LogAction
 from app.models.request_log import RequestLog
+from app.models.play_event import PlayEvent, PlayGame
+from app.models.domain_event import DomainEvent, DomainEventType, DomainEventStatus
+from app.models.quota import QuotaSnapshot, QuotaSnapshotStatus, QuotaUsageSeries
 
 __all__ = [
     "Base",
@@ -40,9 +45,13 @@ __all__ = [
     "Cheer",
     "CheerType",
     "CheerStats",
+    "CheerStatsShard",
+    "CheerHeatStats",
     "AchievementDefinition",
+    "AchievementReevaluationRun",
     "UserAchievement",
     "UserBadgeShowcase",
+    "UserCheeredProject",
     "UserStats",
     "AchievementTier",
     "AchievementStatus",
@@ -50,4 +59,12 @@ __all__ = [
     "SystemLog",
     "LogAction",
     "RequestLog",
+    "PlayEvent",
+    "PlayGame",
+    "DomainEvent",
+    "DomainEventType",
+    "DomainEventStatus",
+    "QuotaSnapshot",
+    "QuotaSnapshotStatus",
+    "QuotaUsageSeries",
 ]
@@ -105,6 +105,19 @@ class UserBadgeShowcase(Base):
     )
 
 
+class UserCheeredProject(Base):
+    """用户打气过的项目（去重集合，维护 UserStats.unique_projects_cheered）"""
+    __tablename__ = "user_cheered_projects"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    registration_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=text("CURRENT_TIMESTAMP")
+    )
+
+
 class UserStats(Base):
     """用户统计数据"""
     __tablename__ = "user_stats"
@@ -119,6 +132,7 @@ class UserStats(Base):
     consecutive_days: Mapped[int] = mapped_column(Integer, default=0)
     max_consecutive_days: Mapped[int] = mapped_column(Integer, default=0)
     last_cheer_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    unique_projects_cheered: Mapped[int] = mapped_column(Integer, default=0)
 
     # 扭蛋相关
     total_gacha_count: Mapped[int] = mapped_column(Integer, default=0)
@@ -145,3 +159,20 @@ class UserStats(Base):
 
     # Relationships
     user = relationship("User", back_populates="stats")
+
+
+class AchievementReevaluationRun(Base):
+    """成就批量重算任务记录（多 worker 共享进度，最新一条即当前/最近一次任务）"""
+    __tablename__ = "achievement_reevaluation_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    status: Mapped[str] = mapped_column(String(16), default="running")  # running/finished/failed
+    achievement_keys: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    updated: Mapped[int] = mapped_column(Integer, default=0)
+    unlocked: Mapped[int] = mapped_column(Integer, default=0)
+    last_user_id: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
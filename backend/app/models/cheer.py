@@ -10,6 +10,7 @@ from sqlalchemy import (
     String,
     Integer,
     ForeignKey,
+    DateTime,
     UniqueConstraint,
     Index,
     Enum as SQLEnum,
@@ -85,7 +86,7 @@ class CheerStats(BaseModel):
     打气统计表（聚合表）
 
     按报名ID聚合统计各类型打气数量，避免每次都 COUNT。
-    由触发器或定时任务更新。
+    打气只写入 CheerStatsShard 分片，由定时任务并入本表。
     """
     __tablename__ = "cheer_stats"
 
@@ -113,3 +114,80 @@ class CheerStats(BaseModel):
 
     def __repr__(self):
         return f"<CheerStats(registration_id={self.registration_id}, total={self.total_count})>"
+
+
+class CheerStatsShard(BaseModel):
+    """
+    打气统计增量分片
+
+    打气时随机累加一个分片行，热门选手的并发打气不再串行等待 cheer_stats 单行的行锁。
+    选手打气统计 = cheer_stats + SUM(cheer_stats_shards)，定时任务将分片并回 cheer_stats。
+    """
+    __tablename__ = "cheer_stats_shards"
+
+    registration_id = Column(
+        Integer,
+        ForeignKey("registrations.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="关联报名ID"
+    )
+    shard_no = Column(Integer, nullable=False, comment="分片序号")
+
+    # 各类型增量
+    cheer_count = Column(Integer, nullable=False, default=0, comment="普通打气数")
+    coffee_count = Column(Integer, nullable=False, default=0, comment="咖啡数")
+    energy_count = Column(Integer, nullable=False, default=0, comment="能量饮料数")
+    pizza_count = Column(Integer, nullable=False, default=0, comment="披萨数")
+    star_count = Column(Integer, nullable=False, default=0, comment="星星数")
+    total_count = Column(Integer, nullable=False, default=0, comment="总打气数")
+
+    __table_args__ = (
+        UniqueConstraint("registration_id", "shard_no", name="uk_registration_shard"),
+    )
+
+
+class CheerHeatStats(BaseModel):
+    """
+    热力榜汇总表
+
+    按 (比赛, 打气用户) 聚合打赏次数和热力值（道具分数之和），
+    打气事务内增量更新，热力榜直接按索引读取前 N 名。
+    """
+    __tablename__ = "cheer_heat_stats"
+
+    # 使用 (contest_id, user_id) 作为主键
+    id = None
+    contest_id = Column(
+        Integer,
+        ForeignKey("contests.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="比赛ID"
+    )
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="打气用户ID"
+    )
+
+    # 各类型次数
+    cheer_count = Column(Integer, nullable=False, default=0, comment="普通打气数")
+    coffee_count = Column(Integer, nullable=False, default=0, comment="咖啡数")
+    energy_count = Column(Integer, nullable=False, default=0, comment="能量饮料数")
+    pizza_count = Column(Integer, nullable=False, default=0, comment="披萨数")
+    star_count = Column(Integer, nullable=False, default=0, comment="星星数")
+
+    # 总计
+    total_count = Column(Integer, nullable=False, default=0, comment="总打气次数")
+    heat_value = Column(Integer, nullable=False, default=0, comment="热力值（道具分数之和）")
+    last_cheer_at = Column(DateTime, nullable=True, comment="最近一次打气时间")
+
+    # ORM 关系
+    user = relationship("User", backref="cheer_heat_stats")
+
+    __table_args__ = (
+        Index("idx_heat_rank", "contest_id", "heat_value", "last_cheer_at"),
+    )
+
+    def __repr__(self):
+        return f"<CheerHeatStats(contest_id={self.contest_id}, user_id={self.user_id}, heat={self.heat_value})>"
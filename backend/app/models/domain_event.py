@@ -0,0 +1,49 @@
+"""
+领域事件发件箱模型
+
+热点接口在业务事务内写入一条事件，后台消费者异步处理任务进度、成就和系统日志。
+"""
+from datetime import datetime
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, JSON, Index
+
+from app.models.base import Base
+
+
+class DomainEventType:
+    """领域事件类型"""
+    CHEER_CREATED = "cheer.created"
+    GACHA_PLAYED = "gacha.played"
+    SIGNIN_COMPLETED = "signin.completed"
+
+
+class DomainEventStatus:
+    """事件处理状态"""
+    PENDING = "PENDING"  # 待处理（含等待重试）
+    DONE = "DONE"        # 已处理
+    FAILED = "FAILED"    # 超过最大重试次数
+
+
+class DomainEvent(Base):
+    """
+    领域事件发件箱
+
+    event_key 唯一，与业务幂等 key 保持一致（如 "cheer:123"），重复发布会被忽略。
+    不继承 BaseModel，因为事件只需要创建时间和处理时间
+    """
+    __tablename__ = "domain_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_type = Column(String(50), nullable=False, comment="事件类型")
+    event_key = Column(String(128), nullable=False, unique=True, comment="幂等key")
+    user_id = Column(Integer, nullable=True, comment="用户ID")
+    payload = Column(JSON, nullable=True, comment="事件数据")
+    status = Column(String(16), nullable=False, default=DomainEventStatus.PENDING, comment="处理状态")
+    attempts = Column(Integer, nullable=False, default=0, comment="已尝试次数")
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, comment="下次可处理时间")
+    last_error = Column(Text, nullable=True, comment="最近一次失败原因")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, comment="发布时间")
+    processed_at = Column(DateTime, nullable=True, comment="处理完成时间")
+
+    __table_args__ = (
+        Index("idx_status_next", "status", "next_attempt_at", "id"),
+    )
@@ -0,0 +1,46 @@
+"""
+统一游戏记录模型
+
+抽奖、刮刮乐、扭蛋机、老虎机每次游玩写入一条紧凑记录，
+用于"我的活动"时间线（游标分页）和后台按游戏统计，无需多表 UNION。
+"""
+from datetime import datetime
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, DateTime, Index, UniqueConstraint
+
+from app.models.base import Base
+
+
+class PlayGame:
+    """游戏类型"""
+    LOTTERY = "lottery"
+    SCRATCH = "scratch"
+    GACHA = "gacha"
+    SLOT = "slot"
+
+    ALL = (LOTTERY, SCRATCH, GACHA, SLOT)
+
+
+class PlayEvent(Base):
+    """
+    游戏记录
+
+    只追加写入；刮刮乐在购买时写入，刮开时补填一次奖品结果。
+    不继承 BaseModel，因为记录不需要 updated_at 字段
+    """
+    __tablename__ = "play_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, comment="用户ID")
+    game = Column(String(20), nullable=False, comment="游戏类型")
+    cost_points = Column(Integer, nullable=False, default=0, comment="消耗积分")
+    payout_points = Column(Integer, nullable=False, default=0, comment="获得积分（惩罚为负）")
+    ref_id = Column(Integer, nullable=False, comment="原始记录ID（各游戏记录表）")
+    prize_name = Column(String(100), nullable=True, comment="奖品名称")
+    is_rare = Column(Boolean, nullable=False, default=False, comment="是否稀有")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, comment="游玩时间")
+
+    __table_args__ = (
+        UniqueConstraint("game", "ref_id", name="uk_game_ref"),
+        Index("idx_user_time", "user_id", "created_at"),
+        Index("idx_game_time", "game", "created_at"),
+    )
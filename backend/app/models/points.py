@@ -6,7 +6,7 @@ from decimal import Decimal
 from typing import Optional
 from sqlalchemy import (
     Column, Integer, String, Text, Boolean, Date, DateTime,
-    ForeignKey, Enum, DECIMAL, UniqueConstraint, Index
+    ForeignKey, Enum, DECIMAL, UniqueConstraint, Index, JSON
 )
 from sqlalchemy.orm import relationship
 import enum
@@ -185,6 +185,11 @@ class ApiKeyCode(BaseModel):
     # 关系
     assigned_user = relationship("User", backref="api_key_codes")
 
+    __table_args__ = (
+        Index("idx_api_key_status_desc", "status", "description", "id"),
+        Index("idx_api_key_status_quota", "status", "quota", "id"),
+    )
+
 
 class LotteryDraw(BaseModel):
     """抽奖记录"""
@@ -205,6 +210,25 @@ class LotteryDraw(BaseModel):
     config = relationship("LotteryConfig", backref="draws")
 
 
+class LotteryLuckyStats(BaseModel):
+    """欧皇榜汇总（稀有奖品中奖统计，抽奖事务内增量维护）"""
+    __tablename__ = "lottery_lucky_stats"
+
+    # 使用 user_id 作为主键
+    id = None
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    rare_win_count = Column(Integer, nullable=False, default=0, comment="稀有奖品中奖次数")
+    last_win_at = Column(DateTime, nullable=True, comment="最近一次稀有中奖时间")
+    recent_prizes = Column(JSON, nullable=True, comment="最近获得的稀有奖品名称（去重，有上限）")
+
+    # 关系
+    user = relationship("User", backref="lucky_stats")
+
+    __table_args__ = (
+        Index("idx_lucky_rank", "rare_win_count", "last_win_at"),
+    )
+
+
 class PredictionMarket(BaseModel):
     """竞猜市场"""
     __tablename__ = "prediction_markets"
@@ -310,6 +334,34 @@ class ScratchCard(BaseModel):
     config = relationship("LotteryConfig", backref="scratch_cards")
 
 
+class SealedScratchCardStatus(str, enum.Enum):
+    """预生成刮刮乐卡片状态"""
+    SEALED = "SEALED"    # 已封存，等待售出
+    CLAIMED = "CLAIMED"  # 已售出，生成了用户卡片
+    VOIDED = "VOIDED"    # 奖池配置变更后作废，库存已归还
+
+
+class SealedScratchCard(BaseModel):
+    """预生成的刮刮乐卡片（奖品在生成时确定并预占库存，售出前可审计）"""
+    __tablename__ = "scratch_card_pool"
+
+    config_id = Column(Integer, ForeignKey("lottery_configs.id", ondelete="CASCADE"), nullable=False)
+    config_version = Column(String(40), nullable=False, comment="生成时的奖池配置指纹")
+    prize_id = Column(Integer, nullable=False, comment="预定奖品ID")
+    prize_type = Column(String(20), nullable=False)
+    prize_name = Column(String(100), nullable=False)
+    prize_value = Column(String(255), nullable=True)
+    is_rare = Column(Boolean, nullable=False, default=False)
+    stock_reserved = Column(Boolean, nullable=False, default=False, comment="生成时是否预占了奖品库存")
+    status = Column(Enum(SealedScratchCardStatus), nullable=False, default=SealedScratchCardStatus.SEALED)
+    card_id = Column(Integer, nullable=True, comment="售出后对应的刮刮乐卡片ID")
+    claimed_at = Column(DateTime, nullable=True, comment="售出时间")
+
+    __table_args__ = (
+        Index("idx_pool_claim", "config_id", "status", "config_version", "id"),
+    )
+
+
 class ExchangeItemType(str, enum.Enum):
     """兑换商品类型"""
     LOTTERY_TICKET = "LOTTERY_TICKET"      # 抽奖券（免费抽奖次数）
@@ -342,6 +394,19 @@ class ExchangeItem(BaseModel):
     )
 
 
+class ExchangeItemStockShard(BaseModel):
+    """热门兑换商品库存分片（从商品主库存分批租借，分散行锁竞争）"""
+    __tablename__ = "exchange_item_stock_shards"
+
+    item_id = Column(Integer, ForeignKey("exchange_items.id", ondelete="CASCADE"), nullable=False)
+    shard_no = Column(Integer, nullable=False, comment="分片序号")
+    stock = Column(Integer, nullable=False, default=0, comment="分片剩余库存")
+
+    __table_args__ = (
+        UniqueConstraint("item_id", "shard_no", name="uk_item_shard"),
+    )
+
+
 class ExchangeRecord(BaseModel):
     """积分兑换记录"""
     __tablename__ = "exchange_records"
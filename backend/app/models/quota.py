@@ -0,0 +1,92 @@
+"""
+额度快照模型
+
+后台轮询任务定期查询所有选手的 API 额度和在线状态，每轮为每个报名写入一行快照。
+同一轮的快照 polled_at 相同，排行榜和监控接口读取最新一轮，不再按请求实时扇出查询第三方接口。
+已结束日期的快照按天压缩为差分编码的用量序列，用于长期趋势曲线。
+"""
+from sqlalchemy import (
+    Column,
+    String,
+    Text,
+    Integer,
+    Float,
+    Boolean,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+)
+
+from app.models.base import BaseModel
+
+
+class QuotaSnapshotStatus:
+    """快照查询状态"""
+    OK = "ok"
+    ERROR = "error"
+
+
+class QuotaSnapshot(BaseModel):
+    """
+    额度快照表
+
+    每轮轮询每个报名一行，查询失败的报名写入 status=error、额度为空的行。
+    """
+    __tablename__ = "quota_snapshots"
+
+    registration_id = Column(
+        Integer,
+        ForeignKey("registrations.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="关联报名ID"
+    )
+    contest_id = Column(Integer, nullable=False, comment="比赛ID")
+    polled_at = Column(DateTime, nullable=False, comment="轮次时间（同一轮相同）")
+    status = Column(String(20), nullable=False, default=QuotaSnapshotStatus.OK, comment="查询状态 ok/error")
+
+    # 额度（美元），查询失败时为空
+    used = Column(Float, nullable=True, comment="已使用额度")
+    remaining = Column(Float, nullable=True, comment="剩余额度")
+    total = Column(Float, nullable=True, comment="总额度")
+    today_used = Column(Float, nullable=True, comment="今日消耗")
+    is_unlimited = Column(Boolean, nullable=False, default=False, comment="是否无限额度")
+    quota_username = Column(String(100), nullable=True, comment="上游用户名")
+    quota_group = Column(String(100), nullable=True, comment="上游用户组")
+
+    is_online = Column(Boolean, nullable=True, comment="在线状态（查询失败为空）")
+
+    __table_args__ = (
+        Index("idx_quota_snapshot_contest_polled", "contest_id", "polled_at"),
+        Index("idx_quota_snapshot_registration_polled", "registration_id", "polled_at"),
+        Index("idx_quota_snapshot_polled", "polled_at"),
+    )
+
+
+class QuotaUsageSeries(BaseModel):
+    """
+    额度用量日序列表
+
+    已结束日期的原始快照按天压缩为一行：降采样后的 (时间, 已使用额度) 点列，
+    时间和额度都做差分编码（额度单位 0.0001 美元），存为紧凑 JSON 整数数组。
+    原始快照超过保留期删除后，历史曲线由本表提供。
+    """
+    __tablename__ = "quota_usage_series"
+
+    registration_id = Column(
+        Integer,
+        ForeignKey("registrations.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="关联报名ID"
+    )
+    contest_id = Column(Integer, nullable=False, comment="比赛ID")
+    series_date = Column(Date, nullable=False, comment="日期")
+    resolution_seconds = Column(Integer, nullable=False, comment="采样间隔（秒）")
+    point_count = Column(Integer, nullable=False, default=0, comment="点数")
+    points = Column(Text, nullable=False, comment="差分编码点列 [t0, v0, dt1, dv1, ...]")
+
+    __table_args__ = (
+        UniqueConstraint("registration_id", "series_date", name="uk_quota_series_registration_date"),
+        Index("idx_quota_series_contest_date", "contest_id", "series_date"),
+    )
@@ -193,4 +193,5 @@ class UserTaskEvent(BaseModel):
     __table_args__ = (
         UniqueConstraint("user_id", "schedule", "period_start", "event_key", name="uq_user_period_event"),
         Index("idx_user_type_period", "user_id", "task_type", "schedule", "period_start"),
+        Index("idx_schedule_period", "schedule", "period_start"),
     )
@@ -2,20 +2,29 @@
 成就系统服务
 负责成就进度计算、解锁检测和统计更新
 """
+import asyncio
+import logging
+import time
 from datetime import date, datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import func, select, update
+from sqlalchemy import and_, case, func, select, text, update
+from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.database import async_session_maker, engine
 from app.models.achievement import (
     AchievementDefinition,
+    AchievementReevaluationRun,
     AchievementStatus,
     UserAchievement,
     UserBadgeShowcase,
+    UserCheeredProject,
     UserStats,
 )
-from app.models.cheer import Cheer
+
+logger = logging.getLogger(__name__)
 
 
 # 成就规则配置
@@ -67,6 +76,125 @@ ACHIEVEMENT_RULES = {
 }
 
 
+# 规则类型依赖的用户统计字段
+RULE_TYPE_STATS = {
+    "cheer_count": ("total_cheers_given",),
+    "cheer_types": ("cheer_types_used",),
+    "message_count": ("total_cheers_with_message",),
+    "streak": ("consecutive_days",),
+    "unique_projects": ("unique_projects_cheered",),
+    "early_bird": ("total_cheers_given",),
+    "gacha_count": ("total_gacha_count",),
+    "gacha_rare": ("gacha_rare_count",),
+    "daily_task_streak": ("max_daily_task_streak",),
+    "weekly_task_complete": ("weekly_tasks_completed",),
+    "prediction_accuracy": ("prediction_total", "prediction_correct"),
+    "easter_egg": (),  # 手动颁发，不依赖统计
+}
+
+# 目标是规则内部阈值、不取成就定义 target_value 的规则类型（准确率百分比，定义中为展示用的 1）
+FIXED_TARGET_RULE_TYPES = {"prediction_accuracy", "early_bird"}
+
+# 各事件会改变的用户统计字段
+EVENT_STATS = {
+    "cheer": (
+        "total_cheers_given", "total_cheers_with_message", "cheer_types_used",
+        "consecutive_days", "unique_projects_cheered",
+    ),
+    "gacha": ("total_gacha_count", "gacha_rare_count"),
+    "prediction": ("prediction_total", "prediction_correct"),
+    "task": ("max_daily_task_streak", "weekly_tasks_completed"),
+}
+
+
+def _build_rules_by_stat() -> dict[str, list[str]]:
+    """按依赖的统计字段索引成就规则"""
+    index: dict[str, list[str]] = {}
+    for key, rule in ACHIEVEMENT_RULES.items():
+        for stat in RULE_TYPE_STATS.get(rule["type"], ()):
+            index.setdefault(stat, []).append(key)
+    return index
+
+
+# {统计字段: [成就key]}
+RULES_BY_STAT = _build_rules_by_stat()
+
+# 可自动评估的全部成就key（排除手动颁发的彩蛋类）
+AUTO_RULE_KEYS = sorted({key for keys in RULES_BY_STAT.values() for key in keys})
+
+
+def get_rule_keys_for_event(event: Optional[str] = None) -> list[str]:
+    """获取受事件影响的成就key，event 为空时返回全部可自动评估的成就"""
+    if event is None:
+        return AUTO_RULE_KEYS
+    keys = set()
+    for stat in EVENT_STATS.get(event, ()):
+        keys.update(RULES_BY_STAT.get(stat, ()))
+    return sorted(keys)
+
+
+def _rule_target(rule: dict, target_value: Optional[int] = None) -> int:
+    """规则的解锁目标：优先使用成就定义的 target_value（管理员可修改），缺失时使用内置规则"""
+    if target_value is None or rule["type"] in FIXED_TARGET_RULE_TYPES:
+        return rule["target"]
+    return target_value
+
+
+def _evaluate_rule(
+    rule: dict,
+    stats: UserStats,
+    contest_start_date: Optional[date] = None,
+    target_value: Optional[int] = None,
+) -> Optional[tuple[int, bool]]:
+    """计算规则的 (进度, 是否解锁)，无法自动评估时返回 None"""
+    rule_type = rule["type"]
+    target = _rule_target(rule, target_value)
+
+    if rule_type == "cheer_count":
+        progress = stats.total_cheers_given
+    elif rule_type == "cheer_types":
+        progress = len(stats.cheer_types_used or [])
+    elif rule_type == "message_count":
+        progress = stats.total_cheers_with_message
+    elif rule_type == "streak":
+        progress = stats.consecutive_days
+    elif rule_type == "unique_projects":
+        progress = stats.unique_projects_cheered or 0
+    elif rule_type == "early_bird":
+        # 早期支持者：比赛开始 N 天内打气
+        if contest_start_date and stats.total_cheers_given > 0:
+            days_from_start = rule.get("days_from_start", 3)
+            deadline = contest_start_date + timedelta(days=days_from_start)
+            if date.today() <= deadline:
+                return 1, True
+        return 0, False
+
+    # ========== 扭蛋类成就 ==========
+    elif rule_type == "gacha_count":
+        progress = stats.total_gacha_count
+    elif rule_type == "gacha_rare":
+        progress = stats.gacha_rare_count
+
+    # ========== 任务类成就 ==========
+    elif rule_type == "daily_task_streak":
+        progress = stats.max_daily_task_streak
+    elif rule_type == "weekly_task_complete":
+        progress = stats.weekly_tasks_completed
+
+    # ========== 竞猜类成就 ==========
+    elif rule_type == "prediction_accuracy":
+        # 竞猜准确率需要至少10次竞猜
+        if stats.prediction_total < 10:
+            return 0, False
+        progress = int((stats.prediction_correct / stats.prediction_total) * 100)
+
+    # ========== 彩蛋类成就（手动颁发，这里不自动检测）==========
+    else:
+        return None
+
+    return progress, progress >= target
+
+
 async def get_or_create_user_stats(db: AsyncSession, user_id: int) -> UserStats:
     """获取或创建用户统计（并发安全）"""
     result = await db.execute(
@@ -148,6 +276,15 @@ async def update_user_stats_on_cheer(
     if has_message:
         stats.total_cheers_with_message += 1
 
+    # 更新打气过的不同项目数（INSERT IGNORE 命中已有记录时不计数）
+    result = await db.execute(
+        insert(UserCheeredProject)
+        .values(user_id=user_id, registration_id=project_id)
+        .prefix_with("IGNORE")
+    )
+    if result.rowcount:
+        stats.unique_projects_cheered = (stats.unique_projects_cheered or 0) + 1
+
     # 更新打气类型集合
     types_used = stats.cheer_types_used or []
     if cheer_type not in types_used:
@@ -179,118 +316,97 @@ async def update_user_stats_on_cheer(
     return stats
 
 
+def _user_achievements_upsert(rows: list[dict]):
+    """
+    构造成就进度批量 upsert 语句；已被并发解锁/领取的记录不回退状态
+
+    MySQL 按书写顺序逐个赋值，后面的 CASE 读到的是已更新的列，
+    因此 status 必须最后赋值（传有序列表，字典会被 SQLAlchemy 按表列顺序重排）。
+    """
+    stmt = insert(UserAchievement).values(rows)
+    is_locked = UserAchievement.status == AchievementStatus.LOCKED.value
+    return stmt.on_duplicate_key_update([
+        ("progress_value", case((is_locked, stmt.inserted.progress_value), else_=UserAchievement.progress_value)),
+        ("unlocked_at", case((is_locked, stmt.inserted.unlocked_at), else_=UserAchievement.unlocked_at)),
+        ("status", case((is_locked, stmt.inserted.status), else_=UserAchievement.status)),
+    ])
+
+
+async def _upsert_user_achievements(db: AsyncSession, rows: list[dict]) -> None:
+    """批量写入成就进度"""
+    await db.execute(_user_achievements_upsert(rows))
+
+
 async def check_and_unlock_achievements(
     db: AsyncSession,
     user_id: int,
     stats: UserStats,
     contest_start_date: Optional[date] = None,
+    event: Optional[str] = None,
 ) -> list[str]:
-    """检查并解锁成就，返回新解锁的成就key列表"""
-    newly_unlocked = []
+    """
+    检查并解锁成就，返回新解锁的成就key列表
+
+    只评估受本次事件影响的规则（event 为空时评估全部规则），
+    一次查询加载成就定义和用户成就记录，只批量写入进度有变化的记录。
+    """
+    candidate_keys = get_rule_keys_for_event(event)
+    if not candidate_keys:
+        return []
 
-    # 获取所有活跃成就定义
+    # 一次查询加载候选成就的定义和用户记录
     result = await db.execute(
-        select(AchievementDefinition).where(AchievementDefinition.is_active == True)
+        select(AchievementDefinition.achievement_key, AchievementDefinition.target_value, UserAchievement)
+        .outerjoin(
+            UserAchievement,
+            and_(
+                UserAchievement.achievement_key == AchievementDefinition.achievement_key,
+                UserAchievement.user_id == user_id,
+            ),
+        )
+        .where(
+            AchievementDefinition.is_active == True,
+            AchievementDefinition.achievement_key.in_(candidate_keys),
+        )
     )
-    definitions = result.scalars().all()
-
-    for definition in definitions:
-        key = definition.achievement_key
-        rule = ACHIEVEMENT_RULES.get(key)
-        if not rule:
-            continue
+    rows = result.all()
 
-        # 获取用户成就记录
-        user_ach = await get_or_create_user_achievement(db, user_id, key)
+    changed = []
+    newly_unlocked = []
+    now = datetime.utcnow()
 
+    for key, target_value, user_ach in rows:
         # 已解锁则跳过
-        if user_ach.status != AchievementStatus.LOCKED.value:
+        if user_ach is not None and user_ach.status != AchievementStatus.LOCKED.value:
             continue
 
-        # 计算进度和是否解锁
-        progress = 0
-        should_unlock = False
-
-        rule_type = rule["type"]
-        target = rule["target"]
-
-        if rule_type == "cheer_count":
-            progress = stats.total_cheers_given
-            should_unlock = progress >= target
-
-        elif rule_type == "cheer_types":
-            progress = len(stats.cheer_types_used or [])
-            should_unlock = progress >= target
-
-        elif rule_type == "message_count":
-            progress = stats.total_cheers_with_message
-            should_unlock = progress >= target
-
-        elif rule_type == "streak":
-            progress = stats.consecutive_days
-            should_unlock = progress >= target
-
-        elif rule_type == "unique_projects":
-            # 查询用户打气过的不同项目数
-            result = await db.execute(
-                select(func.count(func.distinct(Cheer.registration_id))).where(
-                    Cheer.user_id == user_id
-                )
-            )
-            progress = result.scalar() or 0
-            should_unlock = progress >= target
-
-        elif rule_type == "early_bird":
-            # 早期支持者：比赛开始 N 天内打气
-            if contest_start_date and stats.total_cheers_given > 0:
-                days_from_start = rule.get("days_from_start", 3)
-                deadline = contest_start_date + timedelta(days=days_from_start)
-                if date.today() <= deadline:
-                    progress = 1
-                    should_unlock = True
-
-        # ========== 扭蛋类成就 ==========
-        elif rule_type == "gacha_count":
-            progress = stats.total_gacha_count
-            should_unlock = progress >= target
-
-        elif rule_type == "gacha_rare":
-            progress = stats.gacha_rare_count
-            should_unlock = progress >= target
-
-        # ========== 任务类成就 ==========
-        elif rule_type == "daily_task_streak":
-            progress = stats.max_daily_task_streak
-            should_unlock = progress >= target
-
-        elif rule_type == "weekly_task_complete":
-            progress = stats.weekly_tasks_completed
-            should_unlock = progress >= target
-
-        # ========== 竞猜类成就 ==========
-        elif rule_type == "prediction_accuracy":
-            # 竞猜准确率需要至少10次竞猜
-            if stats.prediction_total >= 10:
-                accuracy = (stats.prediction_correct / stats.prediction_total) * 100
-                progress = int(accuracy)
-                should_unlock = progress >= target
-
-        # ========== 彩蛋类成就（手动颁发，这里不自动检测）==========
-        elif rule_type == "easter_egg":
-            # 彩蛋成就通过特定 API 手动颁发，这里跳过
+        rule = ACHIEVEMENT_RULES[key]
+        evaluated = _evaluate_rule(rule, stats, contest_start_date, target_value)
+        if evaluated is None:
             continue
+        progress, should_unlock = evaluated
 
-        # 更新进度
-        user_ach.progress_value = progress
+        # 没有记录等同于进度为 0
+        old_progress = user_ach.progress_value if user_ach is not None else 0
+        if progress == old_progress and not should_unlock:
+            continue
 
-        # 解锁成就
+        changed.append({
+            "user_id": user_id,
+            "achievement_key": key,
+            "status": AchievementStatus.UNLOCKED.value if should_unlock else AchievementStatus.LOCKED.value,
+            "progress_value": progress,
+            "unlocked_at": now if should_unlock else None,
+        })
         if should_unlock:
-            user_ach.status = AchievementStatus.UNLOCKED.value
-            user_ach.unlocked_at = datetime.utcnow()
             newly_unlocked.append(key)
 
-            # 更新用户统计中的解锁数
-            stats.achievements_unlocked += 1
+    if changed:
+        await _upsert_user_achievements(db, changed)
+
+    if newly_unlocked:
+        # 更新用户统计中的解锁数
+        stats.achievements_unlocked += len(newly_unlocked)
 
     await db.flush()
     return newly_unlocked
@@ -299,77 +415,111 @@ async def check_and_unlock_achievements(
 async def claim_achievement(
     db: AsyncSession, user_id: int, achievement_key: str
 ) -> tuple[bool, int]:
-    """领取成就奖励，返回(是否成功, 获得积分)"""
-    # 获取成就定义
-    result = await db.execute(
-        select(AchievementDefinition).where(
-            AchievementDefinition.achievement_key == achievement_key
-        )
-    )
-    definition = result.scalar_one_or_none()
-    if not definition:
+    """领取成就奖励，返回(是否成功, 获得积分)；未解锁或已领取时返回 (False, 0)"""
+    from app.services.reward_claim_service import RewardClaimService
+
+    try:
+        result = await RewardClaimService.claim_achievement(db, user_id, achievement_key)
+    except ValueError:
+        return False, 0
+    if result["already_claimed"]:
         return False, 0
+    return True, result["points"]
 
-    # 获取用户成就
-    result = await db.execute(
-        select(UserAchievement).where(
-            UserAchievement.user_id == user_id,
-            UserAchievement.achievement_key == achievement_key,
-        )
-    )
-    user_ach = result.scalar_one_or_none()
 
-    if not user_ach or user_ach.status != AchievementStatus.UNLOCKED.value:
-        return False, 0
+# 成就定义缓存（按版本指纹失效）
+# 定义表很小且极少变化，读取接口不再每次联表查询；
+# 每 ACHIEVEMENT_DEFINITION_CACHE_TTL_SECONDS 秒用 (数量, 最大ID, 最近更新时间) 校验一次版本
+_definition_cache: dict = {
+    "version": None,
+    "checked_at": 0.0,
+    "by_key": {},   # {achievement_key: 定义字典}，含未启用的定义（徽章展示需要）
+    "active": [],   # 启用的定义，按 sort_order 排序
+}
 
-    # 领取
-    user_ach.status = AchievementStatus.CLAIMED.value
-    user_ach.claimed_at = datetime.utcnow()
+# 批量查询的最大用户数
+BULK_MAX_USERS = 100
 
-    # 增加积分
-    stats = await get_or_create_user_stats(db, user_id)
-    stats.total_points += definition.points
 
-    await db.flush()
-    return True, definition.points
+def _serialize_definition(d: AchievementDefinition) -> dict:
+    return {
+        "achievement_key": d.achievement_key,
+        "name": d.name,
+        "description": d.description,
+        "category": d.category,
+        "badge_icon": d.badge_icon,
+        "badge_tier": d.badge_tier,
+        "points": d.points,
+        "target_value": d.target_value,
+        "is_active": bool(d.is_active),
+        "sort_order": d.sort_order,
+    }
 
 
-async def get_user_achievements(
-    db: AsyncSession, user_id: int
-) -> list[dict]:
-    """获取用户所有成就及进度"""
-    # 获取所有成就定义
-    result = await db.execute(
-        select(AchievementDefinition)
-        .where(AchievementDefinition.is_active == True)
-        .order_by(AchievementDefinition.sort_order)
-    )
-    definitions = result.scalars().all()
+def invalidate_definition_cache() -> None:
+    """成就定义变更后调用，下次读取时重新加载"""
+    _definition_cache["version"] = None
+    _definition_cache["checked_at"] = 0.0
+
+
+async def get_cached_definitions(db: AsyncSession) -> tuple[dict, list[dict]]:
+    """获取缓存的成就定义，返回 ({key: 定义}, 启用的定义列表)"""
+    now = time.monotonic()
+    if (
+        _definition_cache["version"] is not None
+        and now - _definition_cache["checked_at"] < settings.ACHIEVEMENT_DEFINITION_CACHE_TTL_SECONDS
+    ):
+        return _definition_cache["by_key"], _definition_cache["active"]
 
-    # 获取用户成就记录
     result = await db.execute(
-        select(UserAchievement).where(UserAchievement.user_id == user_id)
+        select(
+            func.count(AchievementDefinition.id),
+            func.max(AchievementDefinition.id),
+            func.max(AchievementDefinition.updated_at),
+        )
     )
-    user_achs = {ua.achievement_key: ua for ua in result.scalars().all()}
+    version = tuple(result.one())
+
+    if version != _definition_cache["version"]:
+        result = await db.execute(
+            select(AchievementDefinition).order_by(
+                AchievementDefinition.sort_order, AchievementDefinition.id
+            )
+        )
+        definitions = [_serialize_definition(d) for d in result.scalars().all()]
+        _definition_cache["by_key"] = {d["achievement_key"]: d for d in definitions}
+        _definition_cache["active"] = [d for d in definitions if d["is_active"]]
+        _definition_cache["version"] = version
+
+    _definition_cache["checked_at"] = now
+    return _definition_cache["by_key"], _definition_cache["active"]
 
+
+def _build_achievement_items(
+    active_definitions: list[dict], user_achs: dict, public_only: bool = False
+) -> list[dict]:
+    """组装用户成就列表，public_only 时只保留已解锁/已领取的成就"""
     achievements = []
-    for d in definitions:
-        user_ach = user_achs.get(d.achievement_key)
+    for d in active_definitions:
+        user_ach = user_achs.get(d["achievement_key"])
         progress_value = user_ach.progress_value if user_ach else 0
         status = user_ach.status if user_ach else AchievementStatus.LOCKED.value
+        if public_only and status == AchievementStatus.LOCKED.value:
+            continue
 
         # 计算进度百分比
-        progress_percent = min(100, int((progress_value / d.target_value) * 100)) if d.target_value > 0 else 0
+        target_value = d["target_value"]
+        progress_percent = min(100, int((progress_value / target_value) * 100)) if target_value > 0 else 0
 
         achievements.append({
-            "achievement_key": d.achievement_key,
-            "name": d.name,
-            "description": d.description,
-            "category": d.category,
-            "badge_icon": d.badge_icon,
-            "badge_tier": d.badge_tier,
-            "points": d.points,
-            "target_value": d.target_value,
+            "achievement_key": d["achievement_key"],
+            "name": d["name"],
+            "description": d["description"],
+            "category": d["category"],
+            "badge_icon": d["badge_icon"],
+            "badge_tier": d["badge_tier"],
+            "points": d["points"],
+            "target_value": target_value,
             "status": status,
             "progress_value": progress_value,
             "progress_percent": progress_percent,
@@ -380,32 +530,101 @@ async def get_user_achievements(
     return achievements
 
 
+def _build_badge_items(definitions_by_key: dict, showcases: list) -> list[dict]:
+    """组装徽章展示列表（跳过定义已不存在的徽章）"""
+    badges = []
+    for showcase in showcases:
+        definition = definitions_by_key.get(showcase.achievement_key)
+        if not definition:
+            continue
+        badges.append({
+            "slot": showcase.slot,
+            "achievement_key": showcase.achievement_key,
+            "name": definition["name"],
+            "badge_icon": definition["badge_icon"],
+            "badge_tier": definition["badge_tier"],
+        })
+    return badges
+
+
+async def get_user_achievements(
+    db: AsyncSession, user_id: int
+) -> list[dict]:
+    """获取用户所有成就及进度"""
+    _, active_definitions = await get_cached_definitions(db)
+
+    # 获取用户成就记录
+    result = await db.execute(
+        select(UserAchievement).where(UserAchievement.user_id == user_id)
+    )
+    user_achs = {ua.achievement_key: ua for ua in result.scalars().all()}
+
+    return _build_achievement_items(active_definitions, user_achs)
+
+
 async def get_user_badge_showcase(
     db: AsyncSession, user_id: int
 ) -> list[dict]:
     """获取用户展示的徽章"""
+    definitions_by_key, _ = await get_cached_definitions(db)
+
     result = await db.execute(
-        select(UserBadgeShowcase, AchievementDefinition)
-        .join(
-            AchievementDefinition,
-            UserBadgeShowcase.achievement_key == AchievementDefinition.achievement_key,
-        )
+        select(UserBadgeShowcase)
         .where(UserBadgeShowcase.user_id == user_id)
         .order_by(UserBadgeShowcase.slot)
     )
-    rows = result.all()
+    return _build_badge_items(definitions_by_key, result.scalars().all())
 
-    badges = []
-    for showcase, definition in rows:
-        badges.append({
-            "slot": showcase.slot,
-            "achievement_key": showcase.achievement_key,
-            "name": definition.name,
-            "badge_icon": definition.badge_icon,
-            "badge_tier": definition.badge_tier,
-        })
 
-    return badges
+async def get_users_achievements_bulk(
+    db: AsyncSession, user_ids: list[int], public_only: bool = True
+) -> dict[int, dict]:
+    """
+    批量获取多个用户的成就和展示徽章
+
+    成就定义来自缓存，用户成就和徽章展示各一次查询。
+
+    Returns:
+        {user_id: {"achievements": [...], "badges": [...], "total_unlocked": n}}
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if len(user_ids) > BULK_MAX_USERS:
+        raise ValueError(f"一次最多查询 {BULK_MAX_USERS} 个用户")
+    if not user_ids:
+        return {}
+
+    definitions_by_key, active_definitions = await get_cached_definitions(db)
+
+    achievement_query = select(UserAchievement).where(UserAchievement.user_id.in_(user_ids))
+    if public_only:
+        achievement_query = achievement_query.where(
+            UserAchievement.status != AchievementStatus.LOCKED.value
+        )
+    result = await db.execute(achievement_query)
+    user_achs: dict[int, dict] = {user_id: {} for user_id in user_ids}
+    for ua in result.scalars().all():
+        user_achs[ua.user_id][ua.achievement_key] = ua
+
+    result = await db.execute(
+        select(UserBadgeShowcase)
+        .where(UserBadgeShowcase.user_id.in_(user_ids))
+        .order_by(UserBadgeShowcase.user_id, UserBadgeShowcase.slot)
+    )
+    showcases: dict[int, list] = {user_id: [] for user_id in user_ids}
+    for showcase in result.scalars().all():
+        showcases[showcase.user_id].append(showcase)
+
+    items = {}
+    for user_id in user_ids:
+        achievements = _build_achievement_items(active_definitions, user_achs[user_id], public_only)
+        items[user_id] = {
+            "achievements": achievements,
+            "badges": _build_badge_items(definitions_by_key, showcases[user_id]),
+            "total_unlocked": sum(
+                1 for a in achievements if a["status"] != AchievementStatus.LOCKED.value
+            ),
+        }
+    return items
 
 
 async def set_badge_showcase(
@@ -545,3 +764,272 @@ async def update_user_stats_on_task_complete(
 
     await db.flush()
     return stats
+
+
+# ============================================================================
+# 成就批量重算
+# ============================================================================
+
+# 依赖打气发生时间、无法从统计数据重算的规则类型
+NON_REEVALUABLE_RULE_TYPES = {"early_bird", "easter_egg"}
+
+# 批量重算任务锁：各 worker 都运行调度器，MySQL GET_LOCK 保证同一时刻只有一个任务
+_REEVALUATE_LOCK_NAME = "achievement_reevaluate"
+
+
+async def get_reevaluation_status(db: AsyncSession) -> dict:
+    """
+    获取批量重算任务进度
+
+    进度读取最新一条任务记录（任意 worker 可查询），running 以任务锁是否被持有为准；
+    记录仍为 running 但锁已释放（worker 中途退出）时状态为 interrupted。
+    """
+    run = await db.scalar(
+        select(AchievementReevaluationRun)
+        .order_by(AchievementReevaluationRun.id.desc())
+        .limit(1)
+    )
+    running = await db.scalar(
+        text("SELECT IS_USED_LOCK(:name)"), {"name": _REEVALUATE_LOCK_NAME}
+    ) is not None
+    if run is None:
+        return {
+            "running": running,
+            "status": None,
+            "achievement_keys": [],
+            "total": 0,
+            "processed": 0,
+            "updated": 0,
+            "unlocked": 0,
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+
+    status = run.status
+    if status == "running" and not running:
+        status = "interrupted"
+    return {
+        "running": running,
+        "status": status,
+        "achievement_keys": run.achievement_keys or [],
+        "total": run.total,
+        "processed": run.processed,
+        "updated": run.updated,
+        "unlocked": run.unlocked,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "error": run.error,
+    }
+
+
+async def _reevaluate_chunk(
+    db: AsyncSession,
+    stats_rows: list[UserStats],
+    rule_keys: list[str],
+    now: datetime,
+    definitions_by_key: dict,
+) -> tuple[int, int]:
+    """
+    对一批用户统计重算成就（不提交事务）
+
+    按规则逐列计算整批用户的进度，一次查询读取已有记录，一条语句批量写入变化的记录。
+    解锁目标取 definitions_by_key 中成就定义的 target_value。
+
+    Returns:
+        (写入记录数, 新解锁数)
+    """
+    user_ids = [row.user_id for row in stats_rows]
+    result = await db.execute(
+        select(
+            UserAchievement.user_id,
+            UserAchievement.achievement_key,
+            UserAchievement.status,
+            UserAchievement.progress_value,
+        ).where(
+            UserAchievement.user_id.in_(user_ids),
+            UserAchievement.achievement_key.in_(rule_keys),
+        )
+    )
+    existing = {(row.user_id, row.achievement_key): row for row in result.fetchall()}
+
+    changed = []
+    unlocked_by_user: dict[int, int] = {}
+    for key in rule_keys:
+        rule = ACHIEVEMENT_RULES[key]
+        target_value = definitions_by_key.get(key, {}).get("target_value")
+        column = [_evaluate_rule(rule, stats, target_value=target_value) for stats in stats_rows]
+        for stats, evaluated in zip(stats_rows, column):
+            if evaluated is None:
+                continue
+            progress, should_unlock = evaluated
+            current = existing.get((stats.user_id, key))
+            if current is not None and current.status != AchievementStatus.LOCKED.value:
+                continue
+            old_progress = current.progress_value if current is not None else 0
+            if progress == old_progress and not should_unlock:
+                continue
+
+            changed.append({
+                "user_id": stats.user_id,
+                "achievement_key": key,
+                "status": AchievementStatus.UNLOCKED.value if should_unlock else AchievementStatus.LOCKED.value,
+                "progress_value": progress,
+                "unlocked_at": now if should_unlock else None,
+            })
+            if should_unlock:
+                unlocked_by_user[stats.user_id] = unlocked_by_user.get(stats.user_id, 0) + 1
+
+    if changed:
+        await _upsert_user_achievements(db, changed)
+
+    if unlocked_by_user:
+        # 按 user_achievements 重新计数而不是累加增量：读取已有记录时未加锁，
+        # 并发的实时解锁或另一次重算抢先解锁时 CASE 不会改写状态，累加会重复计数
+        unlocked_count = (
+            select(func.count())
+            .select_from(UserAchievement)
+            .where(
+                UserAchievement.user_id == UserStats.user_id,
+                UserAchievement.status != AchievementStatus.LOCKED.value,
+            )
+            .scalar_subquery()
+        )
+        await db.execute(
+            update(UserStats)
+            .where(UserStats.user_id.in_(list(unlocked_by_user)))
+            .values(achievements_unlocked=unlocked_count)
+            .execution_options(synchronize_session=False)
+        )
+
+    return len(changed), sum(unlocked_by_user.values())
+
+
+async def reevaluate_all_users(
+    achievement_keys: Optional[list[str]] = None,
+    batch_size: Optional[int] = None,
+) -> dict:
+    """
+    按 user_id 分批重算全部用户的成就（会分批提交事务）
+
+    新增成就定义或调整目标后调用：按主键游标分批读取 user_stats，每批一个短事务，
+    批次之间暂停 ACHIEVEMENT_REEVALUATE_PAUSE_MS 毫秒，避免长时间占用主库。
+    持有 MySQL GET_LOCK 期间运行，其他 worker 上的重复提交直接失败；
+    进度随每批事务写入 achievement_reevaluation_runs，通过 get_reevaluation_status 查询。
+
+    Args:
+        achievement_keys: 需要重算的成就，默认全部可从统计数据重算的已启用成就
+    """
+    # 锁绑定在连接上，整个任务持有同一连接，结束后显式释放
+    async with engine.connect() as lock_conn:
+        acquired = await lock_conn.scalar(
+            text("SELECT GET_LOCK(:name, 0)"), {"name": _REEVALUATE_LOCK_NAME}
+        )
+        if not acquired:
+            raise ValueError("成就重算任务正在进行中")
+        try:
+            return await _run_reevaluation(achievement_keys, batch_size)
+        finally:
+            await lock_conn.execute(
+                text("SELECT RELEASE_LOCK(:name)"), {"name": _REEVALUATE_LOCK_NAME}
+            )
+
+
+async def _finish_reevaluation_run(run_id: int, status: str, error: Optional[str] = None) -> None:
+    """记录任务结束状态"""
+    async with async_session_maker() as db:
+        await db.execute(
+            update(AchievementReevaluationRun)
+            .where(AchievementReevaluationRun.id == run_id)
+            .values(status=status, error=error, finished_at=datetime.utcnow())
+        )
+        await db.commit()
+
+
+async def _run_reevaluation(
+    achievement_keys: Optional[list[str]],
+    batch_size: Optional[int],
+) -> dict:
+    """执行批量重算（调用方已持有任务锁）"""
+    batch_size = batch_size or settings.ACHIEVEMENT_REEVALUATE_BATCH_SIZE
+
+    # 定义刚被修改，跳过缓存的 TTL 直接重新校验
+    invalidate_definition_cache()
+    async with async_session_maker() as db:
+        definitions_by_key, active_definitions = await get_cached_definitions(db)
+        active_keys = {d["achievement_key"] for d in active_definitions}
+        rule_keys = [
+            key for key in (achievement_keys or AUTO_RULE_KEYS)
+            if key in active_keys
+            and key in ACHIEVEMENT_RULES
+            and ACHIEVEMENT_RULES[key]["type"] not in NON_REEVALUABLE_RULE_TYPES
+        ]
+        total = await db.scalar(select(func.count()).select_from(UserStats))
+        run = AchievementReevaluationRun(
+            status="running",
+            achievement_keys=rule_keys,
+            total=int(total or 0),
+            started_at=datetime.utcnow(),
+        )
+        db.add(run)
+        await db.commit()
+        run_id = run.id
+
+    summary = {
+        "run_id": run_id,
+        "achievement_keys": rule_keys,
+        "total": int(total or 0),
+        "processed": 0,
+        "updated": 0,
+        "unlocked": 0,
+    }
+
+    try:
+        last_user_id = 0
+        while rule_keys:
+            async with async_session_maker() as db:
+                try:
+                    result = await db.execute(
+                        select(UserStats)
+                        .where(UserStats.user_id > last_user_id)
+                        .order_by(UserStats.user_id)
+                        .limit(batch_size)
+                    )
+                    stats_rows = list(result.scalars().all())
+                    if not stats_rows:
+                        break
+
+                    updated, unlocked = await _reevaluate_chunk(
+                        db, stats_rows, rule_keys, datetime.utcnow(), definitions_by_key
+                    )
+                    # 进度与本批写入在同一事务提交
+                    await db.execute(
+                        update(AchievementReevaluationRun)
+                        .where(AchievementReevaluationRun.id == run_id)
+                        .values(
+                            processed=AchievementReevaluationRun.processed + len(stats_rows),
+                            updated=AchievementReevaluationRun.updated + updated,
+                            unlocked=AchievementReevaluationRun.unlocked + unlocked,
+                            last_user_id=stats_rows[-1].user_id,
+                        )
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+
+            last_user_id = stats_rows[-1].user_id
+            summary["processed"] += len(stats_rows)
+            summary["updated"] += updated
+            summary["unlocked"] += unlocked
+
+            if len(stats_rows) < batch_size:
+                break
+            await asyncio.sleep(settings.ACHIEVEMENT_REEVALUATE_PAUSE_MS / 1000)
+    except Exception as e:
+        logger.error(f"成就批量重算失败: {e}")
+        await _finish_reevaluation_run(run_id, "failed", str(e)[:500])
+        raise
+
+    await _finish_reevaluation_run(run_id, "finished")
+    return summary
@@ -0,0 +1,208 @@
+"""
+API Key 兑换码库存分配服务
+
+统一抽奖、刮刮乐、扭蛋机、老虎机、积分兑换的兑换码分配逻辑：
+- 使用 FOR UPDATE SKIP LOCKED 取号，并发中奖者不再排队争抢同一行
+- 条件 UPDATE（status=AVAILABLE）兜底，防止重复分配
+- 分配后按库存池节流检查余量，低于阈值时输出告警
+"""
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Dict, Any, List, Tuple
+
+from sqlalchemy import select, func, and_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.points import ApiKeyCode, ApiKeyStatus
+
+logger = logging.getLogger(__name__)
+
+
+class ApiKeyPoolService:
+    """API Key 库存池服务"""
+
+    # SKIP LOCKED 下候选行被并发事务抢先更新时的最大重试次数
+    MAX_ASSIGN_ATTEMPTS = 3
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "assigned": 0,
+        "out_of_stock": 0,
+        "lost_race": 0,
+        "low_stock_alerts": 0,
+    }
+
+    # 每个库存池上次余量检查时间 {pool_key: monotonic_ts}
+    _last_stock_check: Dict[Tuple[Optional[str], Optional[str]], float] = {}
+
+    @staticmethod
+    def _pool_key(
+        usage_type: Optional[str],
+        quota_amount: Optional[float]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """库存池标识：(用途, 金额)"""
+        return (usage_type, str(quota_amount) if quota_amount is not None else None)
+
+    @staticmethod
+    def _pool_filters(usage_type: Optional[str], quota_amount: Optional[float]) -> List[Any]:
+        """构建库存池筛选条件"""
+        filters = [ApiKeyCode.status == ApiKeyStatus.AVAILABLE]
+        if usage_type:
+            filters.append(ApiKeyCode.description == usage_type)
+        if quota_amount is not None:
+            filters.append(ApiKeyCode.quota == Decimal(str(quota_amount)))
+        return filters
+
+    @staticmethod
+    async def assign(
+        db: AsyncSession,
+        user_id: int,
+        usage_type: str = None,
+        quota_amount: float = None,
+        relabel: str = None,
+        skip_locked: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        从库存池分配一个 API Key 给用户（不提交事务）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            usage_type: 用途类型，对应 api_key_codes.description，为空则不限用途
+            quota_amount: 金额筛选（积分兑换按金额分配），为空则不限金额
+            relabel: 分配后改写的 description（如积分兑换标记为"兑换"）
+            skip_locked: 是否跳过被其他事务锁定的行（压测对比时可关闭）
+
+        Returns:
+            分配成功返回包含 code 和 quota 的字典，库存不足返回 None
+        """
+        filters = ApiKeyPoolService._pool_filters(usage_type, quota_amount)
+
+        for _ in range(ApiKeyPoolService.MAX_ASSIGN_ATTEMPTS):
+            query = (
+                select(ApiKeyCode.id, ApiKeyCode.code, ApiKeyCode.quota, ApiKeyCode.description)
+                .where(and_(*filters))
+                .order_by(ApiKeyCode.id)
+                .limit(1)
+                .with_for_update(skip_locked=skip_locked)
+            )
+            row = (await db.execute(query)).first()
+
+            if not row:
+                ApiKeyPoolService._metrics["out_of_stock"] += 1
+                logger.warning(f"API Key 库存耗尽: usage_type={usage_type}, quota={quota_amount}")
+                return None
+
+            values = {
+                "status": ApiKeyStatus.ASSIGNED,
+                "assigned_user_id": user_id,
+                "assigned_at": datetime.now(),
+            }
+            if relabel:
+                values["description"] = relabel
+
+            # 条件更新兜底：只有仍为 AVAILABLE 时才分配
+            update_result = await db.execute(
+                update(ApiKeyCode)
+                .where(
+                    and_(
+                        ApiKeyCode.id == row.id,
+                        ApiKeyCode.status == ApiKeyStatus.AVAILABLE
+                    )
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if update_result.rowcount == 0:
+                ApiKeyPoolService._metrics["lost_race"] += 1
+                continue
+
+            ApiKeyPoolService._metrics["assigned"] += 1
+            await ApiKeyPoolService._maybe_alert_low_stock(db, usage_type, quota_amount)
+
+            return {
+                "code": row.code,
+                "quota": float(row.quota) if row.quota else 0,
+                "description": relabel or row.description
+            }
+
+        ApiKeyPoolService._metrics["out_of_stock"] += 1
+        return None
+
+    @staticmethod
+    async def count_available(
+        db: AsyncSession,
+        usage_type: str = None,
+        quota_amount: float = None
+    ) -> int:
+        """统计库存池剩余可用数量"""
+        filters = ApiKeyPoolService._pool_filters(usage_type, quota_amount)
+        result = await db.execute(
+            select(func.count(ApiKeyCode.id)).where(and_(*filters))
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    async def _maybe_alert_low_stock(
+        db: AsyncSession,
+        usage_type: Optional[str],
+        quota_amount: Optional[float]
+    ) -> None:
+        """按库存池节流检查余量，低于阈值时告警"""
+        pool_key = ApiKeyPoolService._pool_key(usage_type, quota_amount)
+        now = time.monotonic()
+        last_check = ApiKeyPoolService._last_stock_check.get(pool_key, 0.0)
+        if now - last_check < settings.API_KEY_STOCK_CHECK_INTERVAL_SECONDS:
+            return
+        ApiKeyPoolService._last_stock_check[pool_key] = now
+
+        try:
+            remaining = await ApiKeyPoolService.count_available(db, usage_type, quota_amount)
+        except Exception as e:
+            # 余量检查失败不影响分配主流程
+            logger.error(f"API Key 余量检查失败: {e}")
+            return
+
+        if remaining < settings.API_KEY_LOW_STOCK_THRESHOLD:
+            ApiKeyPoolService._metrics["low_stock_alerts"] += 1
+            logger.warning(
+                f"API Key 库存告急: usage_type={usage_type}, quota={quota_amount}, "
+                f"剩余 {remaining} 个（阈值 {settings.API_KEY_LOW_STOCK_THRESHOLD}）"
+            )
+
+    @staticmethod
+    async def get_stock_summary(db: AsyncSession) -> List[Dict[str, Any]]:
+        """
+        按用途和金额汇总可用库存，并标记低库存池
+
+        只汇总仍有可用兑换码的库存池：已全部分配或分配后改写用途（如"兑换"）的分组
+        可用数恒为 0，纳入会每次检查都误报告急；库存耗尽由分配时的告警日志提示。
+        """
+        result = await db.execute(
+            select(
+                ApiKeyCode.description,
+                ApiKeyCode.quota,
+                func.count(ApiKeyCode.id).label("available")
+            )
+            .where(ApiKeyCode.status == ApiKeyStatus.AVAILABLE)
+            .group_by(ApiKeyCode.description, ApiKeyCode.quota)
+            .order_by(ApiKeyCode.description, ApiKeyCode.quota)
+        )
+        threshold = settings.API_KEY_LOW_STOCK_THRESHOLD
+        return [
+            {
+                "usage_type": row.description,
+                "quota": float(row.quota) if row.quota else 0,
+                "available": int(row.available),
+                "is_low": int(row.available) < threshold,
+            }
+            for row in result.fetchall()
+        ]
+
+    @staticmethod
+    def get_metrics() -> Dict[str, int]:
+        """获取分配指标快照"""
+        return dict(ApiKeyPoolService._metrics)
@@ -0,0 +1,197 @@
+"""
+打气统计服务
+
+选手打气统计由 cheer_stats 基础行和 cheer_stats_shards 增量分片组成：
+- 打气时随机选择一个分片 upsert 累加，只锁该分片行，热门选手的并发打气不再串行
+- 读取时 基础行 + SUM(分片) 合并，批量读取为两次 IN 查询
+- 定时任务按批将分片并回基础行并删除，限制分片行数量
+"""
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+from sqlalchemy import select, func, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.mysql import insert
+
+from app.core.config import settings
+from app.models.cheer import CheerType, CheerStats, CheerStatsShard
+
+logger = logging.getLogger(__name__)
+
+_COUNT_FIELDS = (
+    "cheer_count",
+    "coffee_count",
+    "energy_count",
+    "pizza_count",
+    "star_count",
+    "total_count",
+)
+
+
+@dataclass
+class CheerCounts:
+    """选手打气统计（基础行与分片合并后的结果）"""
+    registration_id: int
+    cheer_count: int = 0
+    coffee_count: int = 0
+    energy_count: int = 0
+    pizza_count: int = 0
+    star_count: int = 0
+    total_count: int = 0
+
+
+class CheerStatsService:
+    """打气统计服务"""
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "increments": 0,
+        "folded_registrations": 0,
+        "folded_shards": 0,
+    }
+
+    @staticmethod
+    async def increment(
+        db: AsyncSession,
+        registration_id: int,
+        cheer_type: CheerType,
+        points: int
+    ) -> None:
+        """
+        累加选手打气统计（不提交事务）
+
+        类型计数 +1，总分按道具分数增加；写入随机分片行。
+        """
+        shard_no = random.randrange(max(1, settings.CHEER_STATS_SHARDS))
+        type_column = f"{cheer_type.value}_count"
+        await db.execute(
+            insert(CheerStatsShard).values(
+                registration_id=registration_id,
+                shard_no=shard_no,
+                total_count=points,
+                **{type_column: 1},
+            ).on_duplicate_key_update(
+                total_count=CheerStatsShard.total_count + points,
+                **{type_column: getattr(CheerStatsShard, type_column) + 1},
+            )
+        )
+        CheerStatsService._metrics["increments"] += 1
+
+    @staticmethod
+    async def get_stats_map(
+        db: AsyncSession,
+        registration_ids: Iterable[int]
+    ) -> Dict[int, CheerCounts]:
+        """批量获取选手打气统计 {报名ID: CheerCounts}，没有任何打气的选手不包含在结果中"""
+        registration_ids = list(registration_ids)
+        if not registration_ids:
+            return {}
+
+        stats_map: Dict[int, CheerCounts] = {}
+
+        def _add(registration_id: int, values) -> None:
+            counts = stats_map.setdefault(registration_id, CheerCounts(registration_id))
+            for field, value in zip(_COUNT_FIELDS, values):
+                setattr(counts, field, getattr(counts, field) + int(value or 0))
+
+        base_result = await db.execute(
+            select(CheerStats.registration_id, *[getattr(CheerStats, f) for f in _COUNT_FIELDS])
+            .where(CheerStats.registration_id.in_(registration_ids))
+        )
+        for row in base_result.fetchall():
+            _add(row[0], row[1:])
+
+        shard_result = await db.execute(
+            select(
+                CheerStatsShard.registration_id,
+                *[func.sum(getattr(CheerStatsShard, f)) for f in _COUNT_FIELDS]
+            )
+            .where(CheerStatsShard.registration_id.in_(registration_ids))
+            .group_by(CheerStatsShard.registration_id)
+        )
+        for row in shard_result.fetchall():
+            _add(row[0], row[1:])
+
+        return stats_map
+
+    @staticmethod
+    async def get_stats(db: AsyncSession, registration_id: int) -> CheerCounts:
+        """获取单个选手打气统计"""
+        stats_map = await CheerStatsService.get_stats_map(db, [registration_id])
+        return stats_map.get(registration_id) or CheerCounts(registration_id)
+
+    @staticmethod
+    async def fold_shards(db: AsyncSession, batch_size: int = None) -> int:
+        """
+        将一批选手的分片并回基础行并删除分片（会提交事务），返回处理的选手数
+
+        分片行 FOR UPDATE 加锁后合并，期间对这些选手的打气会短暂等待；
+        按报名ID顺序加锁，与打气事务不会形成死锁环。
+        """
+        batch_size = batch_size or settings.CHEER_STATS_FOLD_BATCH_SIZE
+        result = await db.execute(
+            select(CheerStatsShard.registration_id)
+            .group_by(CheerStatsShard.registration_id)
+            .order_by(CheerStatsShard.registration_id)
+            .limit(batch_size)
+        )
+        registration_ids = list(result.scalars().all())
+        if not registration_ids:
+            return 0
+
+        shard_result = await db.execute(
+            select(CheerStatsShard)
+            .where(CheerStatsShard.registration_id.in_(registration_ids))
+            .order_by(CheerStatsShard.registration_id, CheerStatsShard.shard_no)
+            .with_for_update()
+        )
+        shards = list(shard_result.scalars().all())
+
+        totals: Dict[int, Dict[str, int]] = {}
+        for shard in shards:
+            total = totals.setdefault(shard.registration_id, dict.fromkeys(_COUNT_FIELDS, 0))
+            for field in _COUNT_FIELDS:
+                total[field] += getattr(shard, field) or 0
+
+        for registration_id, total in totals.items():
+            await db.execute(
+                insert(CheerStats).values(
+                    registration_id=registration_id, **total
+                ).on_duplicate_key_update(**{
+                    field: getattr(CheerStats, field) + value
+                    for field, value in total.items()
+                })
+            )
+
+        await db.execute(
+            delete(CheerStatsShard)
+            .where(CheerStatsShard.id.in_([shard.id for shard in shards]))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        CheerStatsService._metrics["folded_registrations"] += len(totals)
+        CheerStatsService._metrics["folded_shards"] += len(shards)
+        return len(totals)
+
+    @staticmethod
+    async def fold_all(db: AsyncSession) -> int:
+        """分批合并全部分片，返回处理的选手数"""
+        started = time.perf_counter()
+        total = 0
+        while True:
+            folded = await CheerStatsService.fold_shards(db)
+            total += folded
+            if folded < settings.CHEER_STATS_FOLD_BATCH_SIZE:
+                break
+        if total:
+            logger.debug(f"打气统计分片合并: {total} 个选手, 耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+        return total
+
+    @staticmethod
+    def get_metrics() -> Dict[str, int]:
+        """获取打气统计指标快照"""
+        return dict(CheerStatsService._metrics)
@@ -0,0 +1,298 @@
+"""
+领域事件总线（事务性发件箱）
+
+热点接口在自身事务内调用 publish 写入一条 domain_events 记录，
+后台消费者按 FOR UPDATE SKIP LOCKED 批量领取并执行已注册的处理器（任务进度、成就、系统日志）：
+- 事件与业务数据同事务提交，不会丢失或凭空产生
+- 每个事件在独立 SAVEPOINT 中处理，处理结果与事件状态同事务提交，保证只生效一次
+- 失败按指数退避重试，超过最大次数标记为 FAILED
+- 死锁（MySQL 1213）会回滚整个批次事务，消费者立即重新领取该批次
+- EVENT_BUS_INLINE 开启时在发布事务内直接处理（测试/单进程调试）
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.domain_event import DomainEvent, DomainEventStatus
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[AsyncSession, DomainEvent], Awaitable[None]]
+
+# 重试退避上限（秒）
+_MAX_BACKOFF_SECONDS = 300
+# 批次遇到死锁时的最大立即重试次数
+_MAX_DEADLOCK_RETRIES = 3
+_MYSQL_DEADLOCK = 1213
+
+
+def _is_deadlock(exc: OperationalError) -> bool:
+    args = getattr(exc.orig, "args", ())
+    return bool(args) and args[0] == _MYSQL_DEADLOCK
+
+
+class EventBus:
+    """领域事件总线"""
+
+    # {事件类型: [(处理器名称, 处理器)]}
+    _handlers: Dict[str, List[Tuple[str, EventHandler]]] = {}
+    _handlers_loaded = False
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, float] = {
+        "published": 0,
+        "duplicates": 0,
+        "processed": 0,
+        "retried": 0,
+        "failed": 0,
+        "deadlock_retries": 0,
+        "last_lag_ms": 0.0,
+        "max_lag_ms": 0.0,
+    }
+
+    @staticmethod
+    def subscribe(event_type: str) -> Callable[[EventHandler], EventHandler]:
+        """注册事件处理器（装饰器）"""
+        def decorator(handler: EventHandler) -> EventHandler:
+            EventBus._handlers.setdefault(event_type, []).append((handler.__name__, handler))
+            return handler
+        return decorator
+
+    @staticmethod
+    def _ensure_handlers() -> None:
+        """延迟加载处理器模块，避免与业务服务循环导入"""
+        if not EventBus._handlers_loaded:
+            import app.services.event_handlers  # noqa: F401
+            EventBus._handlers_loaded = True
+
+    @staticmethod
+    async def publish(
+        db: AsyncSession,
+        event_type: str,
+        event_key: str,
+        user_id: Optional[int] = None,
+        payload: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        发布事件（不提交事务，随业务事务一起提交）
+
+        Args:
+            event_type: 事件类型（DomainEventType）
+            event_key: 全局唯一的幂等key，重复发布会被忽略
+            user_id: 用户ID
+            payload: 事件数据（需可 JSON 序列化）
+
+        Returns:
+            首次发布返回 True，重复发布返回 False
+        """
+        now = datetime.utcnow()
+        inline = settings.EVENT_BUS_INLINE
+        result = await db.execute(
+            insert(DomainEvent)
+            .values(
+                event_type=event_type,
+                event_key=event_key,
+                user_id=user_id,
+                payload=payload,
+                status=DomainEventStatus.DONE if inline else DomainEventStatus.PENDING,
+                attempts=1 if inline else 0,
+                next_attempt_at=now,
+                created_at=now,
+                processed_at=now if inline else None,
+            )
+            .prefix_with("IGNORE")
+        )
+        if not result.rowcount:
+            EventBus._metrics["duplicates"] += 1
+            return False
+
+        EventBus._metrics["published"] += 1
+        if inline:
+            event = DomainEvent(
+                event_type=event_type,
+                event_key=event_key,
+                user_id=user_id,
+                payload=payload,
+                created_at=now,
+            )
+            await EventBus._dispatch(db, event)
+            EventBus._metrics["processed"] += 1
+        return True
+
+    @staticmethod
+    async def _dispatch(db: AsyncSession, event: DomainEvent) -> None:
+        """依次执行事件的全部处理器"""
+        EventBus._ensure_handlers()
+        for name, handler in EventBus._handlers.get(event.event_type, []):
+            logger.debug(f"处理事件 {event.event_key}: {name}")
+            await handler(db, event)
+
+    @staticmethod
+    def _backoff_seconds(attempts: int) -> int:
+        """第 N 次失败后的重试间隔"""
+        return min(_MAX_BACKOFF_SECONDS, 2 ** attempts)
+
+    @staticmethod
+    async def process_batch(db: AsyncSession, limit: int = None) -> Dict[str, int]:
+        """
+        领取并处理一批到期事件（会提交事务）
+
+        Returns:
+            {"processed": 处理成功数, "retried": 等待重试数, "failed": 放弃数}
+        """
+        limit = limit or settings.EVENT_BUS_BATCH_SIZE
+        result = await db.execute(
+            select(DomainEvent)
+            .where(
+                DomainEvent.status == DomainEventStatus.PENDING,
+                DomainEvent.next_attempt_at <= datetime.utcnow()
+            )
+            .order_by(DomainEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        events = list(result.scalars().all())
+        summary = {"processed": 0, "retried": 0, "failed": 0}
+
+        for event in events:
+            # 处理器可能使会话中的对象过期，先取出需要的字段
+            event_id = event.id
+            event_key = event.event_key
+            created_at = event.created_at
+            attempts = event.attempts + 1
+
+            try:
+                async with db.begin_nested():
+                    await EventBus._dispatch(db, event)
+            except Exception as e:
+                gave_up = attempts >= settings.EVENT_BUS_MAX_ATTEMPTS
+                values = {
+                    "attempts": attempts,
+                    "last_error": str(e)[:2000],
+                    "next_attempt_at": datetime.utcnow() + timedelta(
+                        seconds=EventBus._backoff_seconds(attempts)
+                    ),
+                }
+                if gave_up:
+                    values["status"] = DomainEventStatus.FAILED
+                    summary["failed"] += 1
+                    EventBus._metrics["failed"] += 1
+                    logger.error(f"事件处理失败，已放弃: {event_key}, 尝试 {attempts} 次: {e}")
+                else:
+                    summary["retried"] += 1
+                    EventBus._metrics["retried"] += 1
+                    logger.warning(f"事件处理失败，稍后重试: {event_key}, 第 {attempts} 次: {e}")
+                await db.execute(
+                    update(DomainEvent)
+                    .where(DomainEvent.id == event_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                continue
+
+            processed_at = datetime.utcnow()
+            await db.execute(
+                update(DomainEvent)
+                .where(DomainEvent.id == event_id)
+                .values(
+                    status=DomainEventStatus.DONE,
+                    attempts=attempts,
+                    processed_at=processed_at,
+                    last_error=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            lag_ms = (processed_at - created_at).total_seconds() * 1000
+            EventBus._metrics["last_lag_ms"] = lag_ms
+            EventBus._metrics["max_lag_ms"] = max(EventBus._metrics["max_lag_ms"], lag_ms)
+            EventBus._metrics["processed"] += 1
+            summary["processed"] += 1
+
+        await db.commit()
+        return summary
+
+    @staticmethod
+    async def drain(max_batches: int = 10) -> Dict[str, int]:
+        """后台消费入口：连续处理到期事件，直到队列为空或达到批次上限"""
+        total = {"processed": 0, "retried": 0, "failed": 0}
+        deadlocks = 0
+        for _ in range(max_batches):
+            async with async_session_maker() as db:
+                try:
+                    summary = await EventBus.process_batch(db)
+                except OperationalError as e:
+                    # 死锁时 InnoDB 已回滚整个事务（SAVEPOINT 无法单独保留），整批重新领取
+                    await db.rollback()
+                    if not _is_deadlock(e) or deadlocks >= _MAX_DEADLOCK_RETRIES:
+                        raise
+                    deadlocks += 1
+                    EventBus._metrics["deadlock_retries"] += 1
+                    logger.warning(f"事件批次遇到死锁，重新领取: 第 {deadlocks} 次")
+                    continue
+                except Exception:
+                    await db.rollback()
+                    raise
+            for key in total:
+                total[key] += summary[key]
+            if sum(summary.values()) < settings.EVENT_BUS_BATCH_SIZE:
+                break
+        return total
+
+    @staticmethod
+    async def retry_failed(db: AsyncSession, event_ids: Optional[List[int]] = None) -> int:
+        """将 FAILED 事件重新放回待处理队列（不提交事务），返回数量"""
+        stmt = update(DomainEvent).where(DomainEvent.status == DomainEventStatus.FAILED)
+        if event_ids:
+            stmt = stmt.where(DomainEvent.id.in_(event_ids))
+        result = await db.execute(
+            stmt.values(
+                status=DomainEventStatus.PENDING,
+                attempts=0,
+                next_attempt_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    async def get_stats(db: AsyncSession) -> Dict[str, Any]:
+        """事件队列统计：按状态计数、最早待处理事件的积压时长及进程内指标"""
+        result = await db.execute(
+            select(DomainEvent.status, func.count(DomainEvent.id))
+            .where(DomainEvent.status != DomainEventStatus.DONE)
+            .group_by(DomainEvent.status)
+        )
+        counts = {DomainEventStatus.PENDING: 0, DomainEventStatus.FAILED: 0}
+        counts.update({status: count for status, count in result.fetchall()})
+
+        oldest_pending = await db.scalar(
+            select(func.min(DomainEvent.created_at))
+            .where(DomainEvent.status == DomainEventStatus.PENDING)
+        )
+        lag_seconds = (
+            (datetime.utcnow() - oldest_pending).total_seconds() if oldest_pending else 0
+        )
+
+        return {
+            "pending": counts[DomainEventStatus.PENDING],
+            "failed": counts[DomainEventStatus.FAILED],
+            "oldest_pending_lag_seconds": round(lag_seconds, 1),
+            "inline": settings.EVENT_BUS_INLINE,
+            "metrics": EventBus.get_metrics(),
+        }
+
+    @staticmethod
+    def get_metrics() -> Dict[str, float]:
+        """获取事件总线指标快照"""
+        return {
+            **EventBus._metrics,
+            "last_lag_ms": round(EventBus._metrics["last_lag_ms"], 2),
+            "max_lag_ms": round(EventBus._metrics["max_lag_ms"], 2),
+        }
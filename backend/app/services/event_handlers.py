@@ -0,0 +1,122 @@
+"""
+领域事件处理器
+
+由 EventBus 在处理事件时延迟导入并注册。处理器在消费者事务的 SAVEPOINT 内执行，
+不提交事务；任务进度沿用原有的 event_key 去重，保证重放安全。
+"""
+from datetime import date
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.domain_event import DomainEvent, DomainEventType
+from app.models.system_log import LogAction
+from app.models.task import TaskType
+from app.services.event_bus import EventBus
+
+
+# ========== 打气 ==========
+
+@EventBus.subscribe(DomainEventType.CHEER_CREATED)
+async def record_cheer_task(db: AsyncSession, event: DomainEvent) -> None:
+    """打气任务进度"""
+    from app.services.task_service import TaskService
+
+    cheer_id = event.payload["cheer_id"]
+    await TaskService.record_event(
+        db=db,
+        user_id=event.user_id,
+        task_type=TaskType.CHEER,
+        delta=1,
+        event_key=f"cheer:{cheer_id}",
+        ref_type="cheer",
+        ref_id=cheer_id,
+        auto_claim=True,
+    )
+
+
+@EventBus.subscribe(DomainEventType.CHEER_CREATED)
+async def update_cheer_achievements(db: AsyncSession, event: DomainEvent) -> None:
+    """打气成就统计与解锁"""
+    from app.services import achievement_service
+
+    payload = event.payload
+    user_stats = await achievement_service.update_user_stats_on_cheer(
+        db,
+        event.user_id,
+        payload["cheer_type"],
+        payload["has_message"],
+        payload["registration_id"],
+    )
+    contest_start_date = payload.get("contest_start_date")
+    await achievement_service.check_and_unlock_achievements(
+        db,
+        event.user_id,
+        user_stats,
+        date.fromisoformat(contest_start_date) if contest_start_date else None,
+        event="cheer",
+    )
+
+
+# ========== 扭蛋机 ==========
+
+@EventBus.subscribe(DomainEventType.GACHA_PLAYED)
+async def record_gacha_task(db: AsyncSession, event: DomainEvent) -> None:
+    """扭蛋任务进度"""
+    from app.services.task_service import TaskService
+
+    draw_id = event.payload["draw_id"]
+    await TaskService.record_event(
+        db=db,
+        user_id=event.user_id,
+        task_type=TaskType.GACHA,
+        delta=1,
+        event_key=f"gacha:{draw_id}",
+        ref_type="gacha",
+        ref_id=draw_id,
+        auto_claim=True,
+    )
+
+
+@EventBus.subscribe(DomainEventType.GACHA_PLAYED)
+async def update_gacha_achievements(db: AsyncSession, event: DomainEvent) -> None:
+    """扭蛋成就统计与解锁"""
+    from app.services.achievement_service import (
+        update_user_stats_on_gacha, check_and_unlock_achievements
+    )
+
+    user_stats = await update_user_stats_on_gacha(db, event.user_id, event.payload["is_rare"])
+    await check_and_unlock_achievements(db, event.user_id, user_stats, event="gacha")
+
+
+# ========== 签到 ==========
+
+@EventBus.subscribe(DomainEventType.SIGNIN_COMPLETED)
+async def record_signin_task(db: AsyncSession, event: DomainEvent) -> None:
+    """签到任务进度"""
+    from app.services.task_service import TaskService
+
+    payload = event.payload
+    await TaskService.record_event(
+        db=db,
+        user_id=event.user_id,
+        task_type=TaskType.SIGNIN,
+        delta=1,
+        event_key=f"signin:{payload['signin_date']}",
+        ref_type="daily_signin",
+        ref_id=payload["signin_id"],
+        auto_claim=True,
+    )
+
+
+@EventBus.subscribe(DomainEventType.SIGNIN_COMPLETED)
+async def log_signin_action(db: AsyncSession, event: DomainEvent) -> None:
+    """签到系统日志"""
+    from app.services.log_service import log_action
+
+    payload = event.payload
+    await log_action(
+        db, LogAction.SIGNIN, event.user_id,
+        f"每日签到成功，获得 {payload['points']} 积分，连续签到 {payload['streak']} 天",
+        ip_address=payload.get("ip_address"),
+        user_agent=payload.get("user_agent"),
+    )
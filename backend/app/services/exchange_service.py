@@ -1,7 +1,7 @@
 """
 积分兑换商城服务
 """
-from datetime import datetime, date
+from datetime import date
 from typing import Optional, List, Dict, Any
 
 from sqlalchemy import select, func, and_, update
@@ -10,9 +10,11 @@ from sqlalchemy.dialects.mysql import insert
 
 from app.models.points import (
     ExchangeItem, ExchangeRecord, UserExchangeQuota,
-    ExchangeItemType, PointsReason, ApiKeyCode, ApiKeyStatus
+    ExchangeItemType, PointsReason
 )
 from app.services.points_service import PointsService
+from app.services.api_key_pool_service import ApiKeyPoolService
+from app.services.inventory_service import InventoryService, InventoryKind
 
 
 class ExchangeService:
@@ -27,6 +29,7 @@ class ExchangeService:
             .order_by(ExchangeItem.sort_order, ExchangeItem.id)
         )
         items = result.scalars().all()
+        stock_map = await InventoryService.get_exchange_stock(db, items)
 
         return [
             {
@@ -35,12 +38,12 @@ class ExchangeService:
                 "description": item.description,
                 "item_type": item.item_type.value,
                 "cost_points": item.cost_points,
-                "stock": item.stock,
+                "stock": stock_map[item.id],
                 "daily_limit": item.daily_limit,
                 "total_limit": item.total_limit,
                 "icon": item.icon,
                 "is_hot": item.is_hot,
-                "has_stock": item.stock is None or item.stock > 0
+                "has_stock": stock_map[item.id] is None or stock_map[item.id] > 0
             }
             for item in items
         ]
@@ -148,11 +151,10 @@ class ExchangeService:
         """
         执行兑换
         """
-        # 获取商品信息（加锁）
+        # 获取商品信息（不锁商品行，库存由 InventoryService 条件扣减）
         result = await db.execute(
             select(ExchangeItem)
             .where(ExchangeItem.id == item_id)
-            .with_for_update()
         )
         item = result.scalar_one_or_none()
 
@@ -162,10 +164,6 @@ class ExchangeService:
         if not item.is_active:
             raise ValueError("商品已下架")
 
-        # 检查库存
-        if item.stock is not None and item.stock < quantity:
-            raise ValueError("库存不足")
-
         # ========== 使用计数表进行并发安全的限购检查 ==========
         # 使用 INSERT ... ON DUPLICATE KEY UPDATE 原子性地增加计数
         # 然后检查计数是否超过限制，如果超过则回滚
@@ -218,6 +216,12 @@ class ExchangeService:
         total_cost = item.cost_points * quantity
 
         try:
+            # 先预占库存，售罄时直接失败，不再扣积分
+            if item.stock is not None:
+                await InventoryService.reserve(
+                    db, InventoryKind.EXCHANGE_ITEM, item_id, quantity, hot=item.is_hot
+                )
+
             # 扣除积分
             await PointsService.deduct_points(
                 db=db,
@@ -228,10 +232,6 @@ class ExchangeService:
                 auto_commit=False
             )
 
-            # 扣减库存
-            if item.stock is not None:
-                item.stock -= quantity
-
             # 发放奖励
             reward_value = None
             reward_message = None
@@ -356,28 +356,7 @@ class ExchangeService:
         Returns:
             分配成功返回包含 code 和 quota 的字典，失败返回 None
         """
-        query = select(ApiKeyCode).where(ApiKeyCode.status == ApiKeyStatus.AVAILABLE)
-
-        if usage_type:
-            query = query.where(ApiKeyCode.description == usage_type)
-
-        result = await db.execute(
-            query.limit(1).with_for_update()
-        )
-        api_key = result.scalar_one_or_none()
-
-        if not api_key:
-            return None
-
-        api_key.status = ApiKeyStatus.ASSIGNED
-        api_key.assigned_user_id = user_id
-        api_key.assigned_at = datetime.now()
-
-        return {
-            "code": api_key.code,
-            "quota": float(api_key.quota) if api_key.quota else 0,
-            "description": api_key.description
-        }
+        return await ApiKeyPoolService.assign(db, user_id, usage_type=usage_type)
 
     @staticmethod
     async def _assign_api_key_by_quota(
@@ -396,35 +375,10 @@ class ExchangeService:
         Returns:
             分配成功返回包含 code 和 quota 的字典，失败返回 None
         """
-        from decimal import Decimal
-
-        # 按金额匹配可用的 API Key
-        result = await db.execute(
-            select(ApiKeyCode)
-            .where(
-                and_(
-                    ApiKeyCode.status == ApiKeyStatus.AVAILABLE,
-                    ApiKeyCode.quota == Decimal(str(quota_amount))
-                )
-            )
-            .limit(1)
-            .with_for_update()
+        # 按金额匹配可用的 API Key，分配后标记为兑换来源
+        return await ApiKeyPoolService.assign(
+            db, user_id, quota_amount=quota_amount, relabel="兑换"
         )
-        api_key = result.scalar_one_or_none()
-
-        if not api_key:
-            return None
-
-        api_key.status = ApiKeyStatus.ASSIGNED
-        api_key.assigned_user_id = user_id
-        api_key.assigned_at = datetime.now()
-        api_key.description = "兑换"  # 标记为兑换来源
-
-        return {
-            "code": api_key.code,
-            "quota": float(api_key.quota) if api_key.quota else 0,
-            "description": "兑换"
-        }
 
     @staticmethod
     async def get_exchange_history(
@@ -3,9 +3,8 @@ GitHub OAuth2 服务
 """
 from typing import Any, Dict, List, Optional
 
-import httpx
-
 from app.core.config import settings
+from app.core.http_clients import HttpClients, Upstream
 
 
 class GitHubOAuthError(RuntimeError):
@@ -37,12 +36,13 @@ async def exchange_code_for_token(code: str) -> str:
         "code": code,
     }
 
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.post(
-            settings.GITHUB_TOKEN_URL,
-            data=payload,
-            headers={"Accept": "application/json"},
-        )
+    resp = await HttpClients.request(
+        Upstream.GITHUB,
+        "POST",
+        settings.GITHUB_TOKEN_URL,
+        data=payload,
+        headers={"Accept": "application/json"},
+    )
 
     if resp.status_code >= 400:
         raise GitHubOAuthError(
@@ -77,15 +77,16 @@ async def fetch_github_userinfo(access_token: str) -> Dict[str, Any]:
     Raises:
         GitHubOAuthError: 获取失败时抛出
     """
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.get(
-            settings.GITHUB_USERINFO_URL,
-            headers={
-                "Accept": "application/vnd.github+json",
-                "Authorization": f"Bearer {access_token}",
-                "X-GitHub-Api-Version": "2022-11-28",
-            },
-        )
+    resp = await HttpClients.request(
+        Upstream.GITHUB,
+        "GET",
+        settings.GITHUB_USERINFO_URL,
+        headers={
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {access_token}",
+            "X-GitHub-Api-Version": "2022-11-28",
+        },
+    )
 
     if resp.status_code >= 400:
         raise GitHubOAuthError(
@@ -112,15 +113,16 @@ async def fetch_github_emails(access_token: str) -> List[Dict[str, Any]]:
     Raises:
         GitHubOAuthError: 获取失败时抛出
     """
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.get(
-            "https://api.github.com/user/emails",
-            headers={
-                "Accept": "application/vnd.github+json",
-                "Authorization": f"Bearer {access_token}",
-                "X-GitHub-Api-Version": "2022-11-28",
-            },
-        )
+    resp = await HttpClients.request(
+        Upstream.GITHUB,
+        "GET",
+        "https://api.github.com/user/emails",
+        headers={
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {access_token}",
+            "X-GitHub-Api-Version": "2022-11-28",
+        },
+    )
 
     if resp.status_code >= 400:
         # 邮箱获取失败不是致命错误，返回空列表
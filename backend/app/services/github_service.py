@@ -5,12 +5,12 @@ GitHub 数据采集服务
 支持公开仓库的免授权访问，以及通过 Token 提高 API 限额。
 """
 import re
-import httpx
 from datetime import date, datetime, timedelta
 from typing import Optional
 from urllib.parse import urlparse
 
 from app.core.config import settings
+from app.core.http_clients import HttpClients, Upstream
 
 
 class GitHubService:
@@ -59,18 +59,19 @@ class GitHubService:
 
     async def get_repo_info(self, owner: str, repo: str) -> dict | None:
         """获取仓库基本信息"""
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.get(
-                    f"{self.BASE_URL}/repos/{owner}/{repo}",
-                    headers=self.headers,
-                    timeout=10.0,
-                )
-                if resp.status_code == 200:
-                    return resp.json()
-                return None
-            except Exception:
-                return None
+        try:
+            resp = await HttpClients.request(
+                Upstream.GITHUB,
+                "GET",
+                f"{self.BASE_URL}/repos/{owner}/{repo}",
+                headers=self.headers,
+                timeout=10.0,
+            )
+            if resp.status_code == 200:
+                return resp.json()
+            return None
+        except Exception:
+            return None
 
     async def get_commits(
         self,
@@ -99,34 +100,36 @@ class GitHubService:
         if until:
             params["until"] = until.isoformat() + "Z"
 
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.get(
-                    f"{self.BASE_URL}/repos/{owner}/{repo}/commits",
-                    headers=self.headers,
-                    params=params,
-                    timeout=15.0,
-                )
-                if resp.status_code == 200:
-                    return resp.json()
-                return []
-            except Exception:
-                return []
+        try:
+            resp = await HttpClients.request(
+                Upstream.GITHUB,
+                "GET",
+                f"{self.BASE_URL}/repos/{owner}/{repo}/commits",
+                headers=self.headers,
+                params=params,
+                timeout=15.0,
+            )
+            if resp.status_code == 200:
+                return resp.json()
+            return []
+        except Exception:
+            return []
 
     async def get_commit_detail(self, owner: str, repo: str, sha: str) -> dict | None:
         """获取单个提交的详细信息（包含代码行数统计）"""
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.get(
-                    f"{self.BASE_URL}/repos/{owner}/{repo}/commits/{sha}",
-                    headers=self.headers,
-                    timeout=10.0,
-                )
-                if resp.status_code == 200:
-                    return resp.json()
-                return None
-            except Exception:
-                return None
+        try:
+            resp = await HttpClients.request(
+                Upstream.GITHUB,
+                "GET",
+                f"{self.BASE_URL}/repos/{owner}/{repo}/commits/{sha}",
+                headers=self.headers,
+                timeout=10.0,
+            )
+            if resp.status_code == 200:
+                return resp.json()
+            return None
+        except Exception:
+            return None
 
     async def get_daily_stats(
         self,
@@ -263,19 +266,21 @@ class GitHubService:
 
     async def get_rate_limit(self) -> dict:
         """获取当前 API 限额状态"""
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.get(
-                    f"{self.BASE_URL}/rate_limit",
-                    headers=self.headers,
-                    timeout=5.0,
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return data.get("rate", {})
-                return {}
-            except Exception:
-                return {}
+        try:
+            resp = await HttpClients.request(
+                Upstream.GITHUB,
+                "GET",
+                f"{self.BASE_URL}/rate_limit",
+                headers=self.headers,
+                timeout=5.0,
+                max_retries=0,
+            )
+            if resp.status_code == 200:
+                data = resp.json()
+                return data.get("rate", {})
+            return {}
+        except Exception:
+            return {}
 
 
 # 全局服务实例
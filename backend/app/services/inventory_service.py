@@ -0,0 +1,365 @@
+"""
+库存预占服务
+
+统一扭蛋机奖品、抽奖奖品、兑换商品的库存扣减：
+- 发奖前先预占库存（条件 UPDATE stock = stock - n WHERE stock >= n），失败即售罄
+- 热门兑换商品使用库存分片：分片从主库存分批租借，购买只锁随机分片行；
+  单个分片和主库存都不足时合并各处余量扣减，总量足够就不会误报售罄
+- 加锁顺序固定为「选中的分片 → 主库存 → 其他分片」，持有主库存锁后其他分片一律 SKIP LOCKED，
+  不会在持有主库存锁时等待分片锁；仍发生死锁时转为 InventoryBusyError（提示稍后重试）
+- 记录预占、售罄、锁等待等指标
+"""
+import inspect
+import logging
+import random
+import time
+from typing import Dict, Any, List, Iterable, Callable
+
+from sqlalchemy import select, func, update, delete
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.mysql import insert
+
+from app.core.config import settings
+from app.models.gacha import GachaPrize
+from app.models.points import LotteryPrize, ExchangeItem, ExchangeItemStockShard
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStockError(ValueError):
+    """库存不足"""
+    pass
+
+
+class InventoryBusyError(ValueError):
+    """库存争用导致死锁或锁等待超时，事务已回滚，可稍后重试"""
+    pass
+
+
+class InventoryKind:
+    """库存类型"""
+    GACHA_PRIZE = "gacha_prize"
+    LOTTERY_PRIZE = "lottery_prize"
+    EXCHANGE_ITEM = "exchange_item"
+
+
+_MODELS = {
+    InventoryKind.GACHA_PRIZE: GachaPrize,
+    InventoryKind.LOTTERY_PRIZE: LotteryPrize,
+    InventoryKind.EXCHANGE_ITEM: ExchangeItem,
+}
+
+# 单次预占耗时超过该值（毫秒）视为发生锁等待
+_SLOW_RESERVE_MS = 50
+
+# MySQL 死锁、锁等待超时错误码
+_MYSQL_LOCK_ERRORS = (1213, 1205)
+
+
+def _new_metrics() -> Dict[str, float]:
+    return {
+        "reserved": 0,
+        "released": 0,
+        "sold_out": 0,
+        "shard_misses": 0,
+        "leases": 0,
+        "spanning_reservations": 0,
+        "lock_conflicts": 0,
+        "slow_reservations": 0,
+        "wait_ms_total": 0.0,
+    }
+
+
+class InventoryService:
+    """库存预占服务"""
+
+    _metrics: Dict[str, Dict[str, float]] = {kind: _new_metrics() for kind in _MODELS}
+
+    @staticmethod
+    def _record(kind: str, started: float, reserved: bool) -> None:
+        """记录一次预占结果和耗时"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        metrics = InventoryService._metrics[kind]
+        metrics["wait_ms_total"] += elapsed_ms
+        if elapsed_ms > _SLOW_RESERVE_MS:
+            metrics["slow_reservations"] += 1
+        if reserved:
+            metrics["reserved"] += 1
+        else:
+            metrics["sold_out"] += 1
+
+    @staticmethod
+    async def reserve(
+        db: AsyncSession,
+        kind: str,
+        item_id: int,
+        quantity: int = 1,
+        hot: bool = False
+    ) -> None:
+        """
+        预占库存（不提交事务，售罄抛出 OutOfStockError，死锁/锁等待超时抛出 InventoryBusyError）
+
+        仅对有限库存（stock 非 NULL）调用；无限库存无需预占。
+
+        Args:
+            db: 数据库会话
+            kind: 库存类型（InventoryKind）
+            item_id: 奖品/商品ID
+            quantity: 预占数量
+            hot: 是否为热门兑换商品（走分片库存）
+        """
+        started = time.perf_counter()
+
+        try:
+            if kind == InventoryKind.EXCHANGE_ITEM:
+                reserved = await InventoryService._reserve_exchange_item(db, item_id, quantity, hot)
+            else:
+                reserved = await InventoryService._reserve_row(db, _MODELS[kind], item_id, quantity)
+        except OperationalError as e:
+            args = getattr(e.orig, "args", ())
+            if not args or args[0] not in _MYSQL_LOCK_ERRORS:
+                raise
+            InventoryService._metrics[kind]["lock_conflicts"] += 1
+            logger.warning(f"库存预占锁冲突: kind={kind}, item_id={item_id}: {e}")
+            raise InventoryBusyError("当前兑换人数较多，请稍后重试") from e
+
+        InventoryService._record(kind, started, reserved)
+        if not reserved:
+            logger.info(f"库存售罄: kind={kind}, item_id={item_id}, quantity={quantity}")
+            raise OutOfStockError("库存不足")
+
+    @staticmethod
+    async def reserve_drawn(
+        db: AsyncSession,
+        kind: str,
+        candidates: Iterable[Any],
+        choose: Callable[[List[Any]], Any]
+    ) -> Any:
+        """
+        抽取奖品并预占库存
+
+        抽中的奖品已售罄时将其排除后重新抽取，直到抽中无限库存或预占成功的奖品。
+        choose 接收候选列表返回奖品（可为协程函数），候选为空时应抛出 ValueError。
+        """
+        candidates = list(candidates)
+        excluded = set()
+        while True:
+            prize = choose([p for p in candidates if p.id not in excluded])
+            if inspect.isawaitable(prize):
+                prize = await prize
+            if prize.stock is None:
+                return prize
+            try:
+                await InventoryService.reserve(db, kind, prize.id)
+                return prize
+            except OutOfStockError:
+                excluded.add(prize.id)
+
+    @staticmethod
+    async def release(
+        db: AsyncSession,
+        kind: str,
+        item_id: int,
+        quantity: int = 1
+    ) -> None:
+        """归还已预占的库存（不提交事务），如预生成的刮刮乐作废时"""
+        model = _MODELS[kind]
+        await db.execute(
+            update(model)
+            .where(model.id == item_id, model.stock.isnot(None))
+            .values(stock=model.stock + quantity)
+            .execution_options(synchronize_session=False)
+        )
+        InventoryService._metrics[kind]["released"] += quantity
+
+    @staticmethod
+    async def _reserve_row(db: AsyncSession, model, item_id: int, quantity: int) -> bool:
+        """在主库存行上条件扣减"""
+        result = await db.execute(
+            update(model)
+            .where(model.id == item_id, model.stock >= quantity)
+            .values(stock=model.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    @staticmethod
+    async def _take_from_shard(db: AsyncSession, item_id: int, quantity: int, shard_no: int) -> bool:
+        """从指定分片扣减库存（余量不足时分片行仍被锁住直到事务结束）"""
+        result = await db.execute(
+            update(ExchangeItemStockShard)
+            .where(
+                ExchangeItemStockShard.item_id == item_id,
+                ExchangeItemStockShard.shard_no == shard_no,
+                ExchangeItemStockShard.stock >= quantity
+            )
+            .values(stock=ExchangeItemStockShard.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    @staticmethod
+    async def _lease_to_shard(db: AsyncSession, item_id: int, shard_no: int, amount: int) -> int:
+        """从商品主库存租借一批库存到分片，返回实际租借数量"""
+        result = await db.execute(
+            select(ExchangeItem.stock)
+            .where(ExchangeItem.id == item_id)
+            .with_for_update()
+        )
+        main_stock = result.scalar()
+        if not main_stock or main_stock <= 0:
+            return 0
+
+        leased = min(main_stock, amount)
+        await db.execute(
+            update(ExchangeItem)
+            .where(ExchangeItem.id == item_id)
+            .values(stock=ExchangeItem.stock - leased)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            insert(ExchangeItemStockShard).values(
+                item_id=item_id,
+                shard_no=shard_no,
+                stock=leased
+            ).on_duplicate_key_update(
+                stock=ExchangeItemStockShard.stock + leased
+            )
+        )
+        InventoryService._metrics[InventoryKind.EXCHANGE_ITEM]["leases"] += 1
+        return leased
+
+    @staticmethod
+    async def _reserve_exchange_item(
+        db: AsyncSession,
+        item_id: int,
+        quantity: int,
+        hot: bool
+    ) -> bool:
+        """
+        兑换商品预占：普通商品扣主库存，热门商品扣随机分片
+
+        热门商品的分片不足时只向该分片租借（锁顺序：分片 → 主库存），
+        仍不足再合并主库存和其他分片扣减，不逐个扫描其他分片。
+        """
+        if not hot:
+            if await InventoryService._reserve_row(db, ExchangeItem, item_id, quantity):
+                return True
+            # 商品取消热门后，分片中可能仍有租借的余量
+            return await InventoryService._reserve_spanning(db, item_id, quantity)
+
+        shard_count = max(1, settings.INVENTORY_HOT_SHARDS)
+        lease_size = max(settings.INVENTORY_SHARD_LEASE_SIZE, quantity)
+        shard_no = random.randrange(shard_count)
+
+        if await InventoryService._take_from_shard(db, item_id, quantity, shard_no):
+            return True
+        InventoryService._metrics[InventoryKind.EXCHANGE_ITEM]["shard_misses"] += 1
+
+        leased = await InventoryService._lease_to_shard(db, item_id, shard_no, lease_size)
+        if leased and await InventoryService._take_from_shard(db, item_id, quantity, shard_no):
+            return True
+
+        # 主库存不足以补满该分片时，合并主库存和各分片扣减
+        return await InventoryService._reserve_spanning(db, item_id, quantity)
+
+    @staticmethod
+    async def _reserve_spanning(db: AsyncSession, item_id: int, quantity: int) -> bool:
+        """
+        合并主库存和各分片的余量扣减，总量不足返回 False
+
+        先锁主库存行，再锁分片行；其他事务正持有的分片跳过（SKIP LOCKED），
+        持有主库存锁时不等待分片锁，避免与「分片 → 主库存」顺序的租借互相死锁。
+        本事务已锁住的分片不会被跳过。
+        """
+        result = await db.execute(
+            select(ExchangeItem.stock)
+            .where(ExchangeItem.id == item_id)
+            .with_for_update()
+        )
+        main_stock = result.scalar() or 0
+        result = await db.execute(
+            select(ExchangeItemStockShard.shard_no, ExchangeItemStockShard.stock)
+            .where(
+                ExchangeItemStockShard.item_id == item_id,
+                ExchangeItemStockShard.stock > 0
+            )
+            .order_by(ExchangeItemStockShard.shard_no)
+            .with_for_update(skip_locked=True)
+        )
+        shards = result.all()
+        if main_stock + sum(stock for _, stock in shards) < quantity:
+            return False
+
+        remaining = quantity
+        take = min(main_stock, remaining)
+        if take > 0:
+            await db.execute(
+                update(ExchangeItem)
+                .where(ExchangeItem.id == item_id)
+                .values(stock=ExchangeItem.stock - take)
+                .execution_options(synchronize_session=False)
+            )
+            remaining -= take
+        for shard_no, stock in shards:
+            if remaining <= 0:
+                break
+            take = min(stock, remaining)
+            await db.execute(
+                update(ExchangeItemStockShard)
+                .where(
+                    ExchangeItemStockShard.item_id == item_id,
+                    ExchangeItemStockShard.shard_no == shard_no
+                )
+                .values(stock=ExchangeItemStockShard.stock - take)
+                .execution_options(synchronize_session=False)
+            )
+            remaining -= take
+
+        InventoryService._metrics[InventoryKind.EXCHANGE_ITEM]["spanning_reservations"] += 1
+        return True
+
+    @staticmethod
+    async def get_shard_totals(db: AsyncSession, item_ids: List[int]) -> Dict[int, int]:
+        """获取兑换商品分片中的库存合计 {商品ID: 数量}"""
+        if not item_ids:
+            return {}
+        result = await db.execute(
+            select(
+                ExchangeItemStockShard.item_id,
+                func.sum(ExchangeItemStockShard.stock)
+            )
+            .where(ExchangeItemStockShard.item_id.in_(item_ids))
+            .group_by(ExchangeItemStockShard.item_id)
+        )
+        return {row[0]: int(row[1] or 0) for row in result.fetchall()}
+
+    @staticmethod
+    async def get_exchange_stock(db: AsyncSession, items: List[ExchangeItem]) -> Dict[int, Any]:
+        """获取兑换商品可用库存（主库存 + 分片），无限库存为 None"""
+        shard_totals = await InventoryService.get_shard_totals(
+            db, [item.id for item in items if item.stock is not None]
+        )
+        return {
+            item.id: None if item.stock is None else item.stock + shard_totals.get(item.id, 0)
+            for item in items
+        }
+
+    @staticmethod
+    async def reset_shards(db: AsyncSession, item_id: int) -> None:
+        """清空商品库存分片（管理员直接设置库存时调用，新值即为总库存）"""
+        await db.execute(
+            delete(ExchangeItemStockShard).where(ExchangeItemStockShard.item_id == item_id)
+        )
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Dict[str, float]]:
+        """获取库存预占指标快照"""
+        return {
+            kind: {
+                **metrics,
+                "wait_ms_total": round(metrics["wait_ms_total"], 2),
+            }
+            for kind, metrics in InventoryService._metrics.items()
+        }
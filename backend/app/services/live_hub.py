@@ -0,0 +1,241 @@
+"""
+实时推送广播中心
+
+SSE 连接订阅频道（比赛频道、全局频道），写入路径在事务提交后发布增量事件：
+- 进程内每个连接一个有界队列，发布即 put_nowait，慢连接丢弃最旧的消息
+- LIVE_FEED_BACKEND=redis 时同时 PUBLISH 到 Redis，各 worker 订阅后转发给本进程连接，
+  一次数据变更只产生一条 Redis 消息，而不是每个观众一次轮询
+- publish_after_commit 把事件挂在会话上，事务提交后才发出，回滚则丢弃
+"""
+import asyncio
+import itertools
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - 未安装 redis 时只能进程内广播
+    aioredis = None
+
+_REDIS_CHANNEL_PREFIX = "live:"
+_SESSION_INFO_KEY = "live_hub_pending"
+
+
+class LiveChannel:
+    """推送频道"""
+    GLOBAL = "global"  # 公告、稀有中奖
+
+    @staticmethod
+    def contest(contest_id: int) -> str:
+        """比赛频道：打气、排名变化"""
+        return f"contest:{contest_id}"
+
+
+class LiveEvent:
+    """推送事件类型"""
+    CHEER = "cheer"                  # 选手打气统计变化
+    RANK_CHANGE = "rank_change"      # 排行榜名次变化
+    RARE_DRAW = "rare_draw"          # 稀有中奖
+    ANNOUNCEMENT = "announcement"    # 新公告
+
+
+class LiveHub:
+    """实时推送广播中心"""
+
+    # {频道: {连接队列}}
+    _subscribers: Dict[str, Set[asyncio.Queue]] = {}
+    _subscriber_count = 0
+    _origin = uuid.uuid4().hex
+    _seq = itertools.count(1)
+    _redis = None
+    _listener_task: Optional[asyncio.Task] = None
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "published": 0,
+        "delivered": 0,
+        "dropped": 0,
+        "relayed": 0,
+        "redis_errors": 0,
+    }
+
+    # =========================================================================
+    # 订阅
+    # =========================================================================
+
+    @staticmethod
+    def subscribe(channels: Iterable[str]) -> asyncio.Queue:
+        """订阅频道，返回连接队列；超过连接上限抛出 ValueError"""
+        if LiveHub._subscriber_count >= settings.LIVE_FEED_MAX_SUBSCRIBERS:
+            raise ValueError("实时推送连接数已满")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.LIVE_FEED_QUEUE_SIZE)
+        for channel in channels:
+            LiveHub._subscribers.setdefault(channel, set()).add(queue)
+        LiveHub._subscriber_count += 1
+        return queue
+
+    @staticmethod
+    def unsubscribe(queue: asyncio.Queue, channels: Iterable[str]) -> None:
+        """取消订阅（连接断开时调用）"""
+        for channel in channels:
+            queues = LiveHub._subscribers.get(channel)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del LiveHub._subscribers[channel]
+        LiveHub._subscriber_count = max(0, LiveHub._subscriber_count - 1)
+
+    @staticmethod
+    def format_sse(message: Dict[str, Any]) -> str:
+        """编码为 SSE 帧"""
+        data = json.dumps(message["data"], ensure_ascii=False, default=str)
+        return f"id: {message['id']}\nevent: {message['event']}\ndata: {data}\n\n"
+
+    # =========================================================================
+    # 发布
+    # =========================================================================
+
+    @staticmethod
+    def _deliver(channel: str, message: Dict[str, Any]) -> None:
+        """投递给本进程订阅该频道的连接，队列满时丢弃最旧的消息"""
+        for queue in list(LiveHub._subscribers.get(channel, ())):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+                LiveHub._metrics["dropped"] += 1
+            queue.put_nowait(message)
+            LiveHub._metrics["delivered"] += 1
+
+    @staticmethod
+    def publish(channel: str, event_type: str, data: Dict[str, Any]) -> None:
+        """发布事件（事务提交后调用）"""
+        message = {
+            "id": f"{LiveHub._origin[:8]}-{next(LiveHub._seq)}",
+            "event": event_type,
+            "data": {**data, "ts": datetime.now().isoformat()},
+        }
+        LiveHub._metrics["published"] += 1
+        LiveHub._deliver(channel, message)
+
+        if LiveHub._redis is not None:
+            payload = json.dumps(
+                {"origin": LiveHub._origin, "message": message},
+                ensure_ascii=False,
+                default=str,
+            )
+            try:
+                asyncio.get_running_loop().create_task(
+                    LiveHub._redis_publish(_REDIS_CHANNEL_PREFIX + channel, payload)
+                )
+            except RuntimeError:
+                # 无事件循环（脚本同步上下文），只做进程内投递
+                pass
+
+    @staticmethod
+    async def _redis_publish(redis_channel: str, payload: str) -> None:
+        try:
+            await LiveHub._redis.publish(redis_channel, payload)
+        except Exception as e:
+            LiveHub._metrics["redis_errors"] += 1
+            logger.warning(f"实时推送 Redis 发布失败: {redis_channel}: {e}")
+
+    @staticmethod
+    def publish_after_commit(
+        db: AsyncSession,
+        channel: str,
+        event_type: str,
+        data: Dict[str, Any]
+    ) -> None:
+        """在调用方事务提交后发布事件，回滚则丢弃"""
+        pending: List = db.sync_session.info.setdefault(_SESSION_INFO_KEY, [])
+        pending.append((channel, event_type, data))
+
+    # =========================================================================
+    # 跨进程转发
+    # =========================================================================
+
+    @staticmethod
+    async def start() -> None:
+        """启动 Redis 订阅（应用启动时调用），未启用 Redis 时为空操作"""
+        if settings.LIVE_FEED_BACKEND != "redis":
+            return
+        if aioredis is None:
+            logger.warning("未安装 redis，实时推送仅在本进程内广播")
+            return
+        LiveHub._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        LiveHub._listener_task = asyncio.create_task(LiveHub._listen())
+
+    @staticmethod
+    async def stop() -> None:
+        """停止 Redis 订阅（应用退出时调用）"""
+        if LiveHub._listener_task is not None:
+            LiveHub._listener_task.cancel()
+            try:
+                await LiveHub._listener_task
+            except asyncio.CancelledError:
+                pass
+            LiveHub._listener_task = None
+        if LiveHub._redis is not None:
+            await LiveHub._redis.aclose()
+            LiveHub._redis = None
+
+    @staticmethod
+    async def _listen() -> None:
+        """订阅全部推送频道，转发其他 worker 发布的事件；断线后重连"""
+        while True:
+            try:
+                pubsub = LiveHub._redis.pubsub()
+                await pubsub.psubscribe(_REDIS_CHANNEL_PREFIX + "*")
+                async for item in pubsub.listen():
+                    if item.get("type") != "pmessage":
+                        continue
+                    body = json.loads(item["data"])
+                    if body.get("origin") == LiveHub._origin:
+                        continue
+                    channel = item["channel"][len(_REDIS_CHANNEL_PREFIX):]
+                    LiveHub._deliver(channel, body["message"])
+                    LiveHub._metrics["relayed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LiveHub._metrics["redis_errors"] += 1
+                logger.warning(f"实时推送 Redis 订阅中断，稍后重连: {e}")
+                await asyncio.sleep(1)
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """获取实时推送指标快照"""
+        return {
+            **LiveHub._metrics,
+            "backend": "redis" if LiveHub._redis is not None else "memory",
+            "subscribers": LiveHub._subscriber_count,
+            "channels": len(LiveHub._subscribers),
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    """事务提交后发出挂起的事件"""
+    pending = session.info.pop(_SESSION_INFO_KEY, None)
+    for channel, event_type, data in pending or ():
+        LiveHub.publish(channel, event_type, data)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    """最外层事务回滚时丢弃挂起的事件（SAVEPOINT 回滚不影响外层事务提交后的推送）"""
+    if previous_transaction.parent is None:
+        session.info.pop(_SESSION_INFO_KEY, None)
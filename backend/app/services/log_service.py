@@ -3,7 +3,7 @@
 """
 import json
 import logging
-from typing import Optional, Any
+from typing import Optional, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Request
 
@@ -13,6 +13,16 @@ from app.models.system_log import SystemLog, LogAction
 logger = logging.getLogger(__name__)
 
 
+def get_client_info(request: Request) -> Tuple[Optional[str], str]:
+    """从请求中获取客户端 IP（考虑代理）和 UA"""
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        ip_address = forwarded.split(",")[0].strip()
+    else:
+        ip_address = request.client.host if request.client else None
+    return ip_address, request.headers.get("User-Agent", "")[:500]
+
+
 async def log_action(
     db: AsyncSession,
     action: str,
@@ -39,16 +49,9 @@ async def log_action(
     try:
         # 从 request 中获取 IP 和 UA
         if request:
-            if not ip_address:
-                # 尝试获取真实 IP（考虑代理）
-                forwarded = request.headers.get("X-Forwarded-For")
-                if forwarded:
-                    ip_address = forwarded.split(",")[0].strip()
-                else:
-                    ip_address = request.client.host if request.client else None
-
-            if not user_agent:
-                user_agent = request.headers.get("User-Agent", "")[:500]
+            request_ip, request_ua = get_client_info(request)
+            ip_address = ip_address or request_ip
+            user_agent = user_agent or request_ua
 
         log = SystemLog(
             user_id=user_id,
@@ -10,16 +10,26 @@ from sqlalchemy import select, func, and_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.mysql import insert
 
+from app.core.config import settings
 from app.models.points import (
     LotteryConfig, LotteryPrize, LotteryDraw, ApiKeyCode, UserItem,
-    PointsReason, PrizeType, ApiKeyStatus, ScratchCard, ScratchCardStatus
+    PointsReason, PrizeType, ScratchCard, ScratchCardStatus,
+    LotteryLuckyStats
 )
 from app.services.points_service import PointsService
+from app.services.api_key_pool_service import ApiKeyPoolService
+from app.services.inventory_service import InventoryService, InventoryKind
+from app.services.play_history_service import PlayHistoryService
+from app.services.scratch_pool_service import ScratchCardPoolService
+from app.models.play_event import PlayGame
 
 
 class LotteryService:
     """抽奖服务"""
 
+    # 欧皇榜每个用户保留的最近稀有奖品数量
+    LUCKY_RECENT_PRIZES_LIMIT = 10
+
     @staticmethod
     async def get_active_config(db: AsyncSession) -> Optional[LotteryConfig]:
         """获取当前激活的抽奖配置"""
@@ -110,32 +120,7 @@ class LotteryService:
         Returns:
             分配成功返回包含 code 和 quota 的字典，失败返回 None
         """
-        # 构建查询条件
-        query = select(ApiKeyCode).where(ApiKeyCode.status == ApiKeyStatus.AVAILABLE)
-
-        # 如果指定了用途类型，按用途筛选
-        if usage_type:
-            query = query.where(ApiKeyCode.description == usage_type)
-
-        # 原子操作：找一个可用的key并分配
-        result = await db.execute(
-            query.limit(1).with_for_update()
-        )
-        api_key = result.scalar_one_or_none()
-
-        if not api_key:
-            return None
-
-        # 更新状态
-        api_key.status = ApiKeyStatus.ASSIGNED
-        api_key.assigned_user_id = user_id
-        api_key.assigned_at = datetime.now()
-
-        return {
-            "code": api_key.code,
-            "quota": float(api_key.quota) if api_key.quota else 0,
-            "description": api_key.description
-        }
+        return await ApiKeyPoolService.assign(db, user_id, usage_type=usage_type)
 
     @staticmethod
     async def _add_user_item(db: AsyncSession, user_id: int, item_type: str, quantity: int = 1):
@@ -222,9 +207,11 @@ class LotteryService:
                     auto_commit=False
                 )
 
-            # 获取奖池并抽奖
+            # 获取奖池并抽奖，发奖前先预占库存（售罄的奖品排除后重抽）
             prizes = await LotteryService.get_prizes(db, config.id)
-            prize = await LotteryService._select_prize(prizes)
+            prize = await InventoryService.reserve_drawn(
+                db, InventoryKind.LOTTERY_PRIZE, prizes, LotteryService._select_prize
+            )
 
             # 处理奖品发放
             prize_name = prize.prize_name
@@ -233,6 +220,7 @@ class LotteryService:
             is_rare = prize.is_rare
             extra_message = None
             api_key_code = None  # 完整的 API Key 兑换码
+            payout_points = 0
 
             if prize.prize_type == PrizeType.ITEM:
                 # 发放道具
@@ -268,20 +256,9 @@ class LotteryService:
                         description=f"抽奖获得{points_amount}积分",
                         auto_commit=False
                     )
+                payout_points = points_amount
                 extra_message = f"获得{points_amount}积分"
 
-            # 扣减奖品库存（使用原子 UPDATE 防止并发超卖）
-            if prize.stock is not None:
-                from sqlalchemy import text
-                deduct_result = await db.execute(
-                    text("UPDATE lottery_prizes SET stock = stock - 1 WHERE id = :prize_id AND stock > 0"),
-                    {"prize_id": prize.id}
-                )
-                if deduct_result.rowcount == 0:
-                    # 库存扣减失败（已被其他请求抢完）
-                    await db.rollback()
-                    raise ValueError("奖品库存不足，请重试")
-
             # 创建抽奖记录（使用可能被修改的奖品信息）
             draw = LotteryDraw(
                 user_id=user_id,
@@ -297,6 +274,18 @@ class LotteryService:
             db.add(draw)
             await db.flush()
 
+            await PlayHistoryService.record(
+                db, user_id, PlayGame.LOTTERY, draw.id,
+                cost_points=actual_cost,
+                payout_points=payout_points,
+                prize_name=prize_name,
+                is_rare=is_rare
+            )
+
+            # 稀有中奖时同步更新欧皇榜汇总
+            if is_rare:
+                await LotteryService._record_rare_win(db, user_id, prize_name)
+
             # 记录任务进度（抽奖任务）
             from app.services.task_service import TaskService
             from app.models.task import TaskType
@@ -357,7 +346,45 @@ class LotteryService:
 
     @staticmethod
     async def get_lottery_info(db: AsyncSession, user_id: int = None) -> Dict[str, Any]:
-        """获取抽奖活动信息"""
+        """获取抽奖活动信息（活动与奖池部分与用户无关，走响应缓存）"""
+        from app.core.response_cache import cached_value, CacheNamespace
+
+        result = dict(await cached_value(
+            CacheNamespace.LOTTERY_INFO,
+            "active",
+            lambda: LotteryService._load_public_lottery_info(db),
+        ))
+        if not result["active"]:
+            return result
+
+        # 如果提供了用户ID，返回用户相关信息
+        if user_id:
+            from app.services.exchange_service import ExchangeService
+            cost_points = result["cost_points"]
+            daily_limit = result["daily_limit"]
+            today_count = await LotteryService.get_today_draw_count(db, user_id, result["config_id"])
+            balance = await PointsService.get_balance(db, user_id)
+            tickets = await ExchangeService.get_user_tickets(db, user_id)
+            lottery_tickets = tickets.get("LOTTERY_TICKET", 0)
+
+            # 有券可以无视日限直接抽奖，或者有足够积分且未达到日限
+            can_draw = lottery_tickets > 0 or (
+                balance >= cost_points and (daily_limit is None or today_count < daily_limit)
+            )
+
+            result.update({
+                "today_count": today_count,
+                "remaining_today": daily_limit - today_count if daily_limit else None,
+                "balance": balance,
+                "lottery_tickets": lottery_tickets,  # 抽奖券数量
+                "can_draw": can_draw
+            })
+
+        return result
+
+    @staticmethod
+    async def _load_public_lottery_info(db: AsyncSession) -> Dict[str, Any]:
+        """当前抽奖活动与奖池（不含用户信息）"""
         config = await LotteryService.get_active_config(db)
         if not config:
             return {"active": False, "message": "当前没有进行中的抽奖活动"}
@@ -375,7 +402,7 @@ class LotteryService:
             for p in prizes
         ]
 
-        result = {
+        return {
             "active": True,
             "config_id": config.id,
             "name": config.name,
@@ -386,29 +413,6 @@ class LotteryService:
             "ends_at": config.ends_at.isoformat() if config.ends_at else None
         }
 
-        # 如果提供了用户ID，返回用户相关信息
-        if user_id:
-            from app.services.exchange_service import ExchangeService
-            today_count = await LotteryService.get_today_draw_count(db, user_id, config.id)
-            balance = await PointsService.get_balance(db, user_id)
-            tickets = await ExchangeService.get_user_tickets(db, user_id)
-            lottery_tickets = tickets.get("LOTTERY_TICKET", 0)
-
-            # 有券可以无视日限直接抽奖，或者有足够积分且未达到日限
-            can_draw = lottery_tickets > 0 or (
-                balance >= config.cost_points and (config.daily_limit is None or today_count < config.daily_limit)
-            )
-
-            result.update({
-                "today_count": today_count,
-                "remaining_today": config.daily_limit - today_count if config.daily_limit else None,
-                "balance": balance,
-                "lottery_tickets": lottery_tickets,  # 抽奖券数量
-                "can_draw": can_draw
-            })
-
-        return result
-
     @staticmethod
     async def get_draw_history(
         db: AsyncSession,
@@ -505,68 +509,67 @@ class LotteryService:
             for key in keys
         ]
 
+    @staticmethod
+    async def _record_rare_win(db: AsyncSession, user_id: int, prize_name: str):
+        """
+        累加用户稀有中奖次数，并维护有上限的最近奖品列表（在抽奖事务内调用）
+        """
+        now = datetime.now()
+        stmt = insert(LotteryLuckyStats).values(
+            user_id=user_id,
+            rare_win_count=1,
+            last_win_at=now,
+            recent_prizes=[prize_name]
+        ).on_duplicate_key_update(
+            rare_win_count=LotteryLuckyStats.rare_win_count + 1,
+            last_win_at=now
+        )
+        result = await db.execute(stmt)
+
+        # rowcount == 1 为新插入，奖品列表已写入；否则行已被 upsert 锁定，直接更新列表
+        if result.rowcount != 1:
+            stats_result = await db.execute(
+                select(LotteryLuckyStats.recent_prizes)
+                .where(LotteryLuckyStats.user_id == user_id)
+            )
+            recent = [p for p in (stats_result.scalar() or []) if p != prize_name]
+            recent = [prize_name] + recent[:LotteryService.LUCKY_RECENT_PRIZES_LIMIT - 1]
+            await db.execute(
+                update(LotteryLuckyStats)
+                .where(LotteryLuckyStats.user_id == user_id)
+                .values(recent_prizes=recent)
+            )
+
     @staticmethod
     async def get_lucky_leaderboard(db: AsyncSession, limit: int = 50) -> List[Dict[str, Any]]:
-        """获取欧皇榜 - 按稀有奖品中奖次数排行"""
+        """获取欧皇榜 - 按稀有奖品中奖次数排行（读取汇总表，按索引取前 N）"""
         from app.models.user import User
-        from sqlalchemy import desc
 
-        # 统计每个用户获得稀有奖品的次数
         result = await db.execute(
-            select(
-                LotteryDraw.user_id,
-                func.count(LotteryDraw.id).label("win_count"),
-                func.max(LotteryDraw.created_at).label("last_win_at")
+            select(LotteryLuckyStats, User)
+            .join(User, LotteryLuckyStats.user_id == User.id)
+            .where(LotteryLuckyStats.rare_win_count > 0)
+            .order_by(
+                LotteryLuckyStats.rare_win_count.desc(),
+                LotteryLuckyStats.last_win_at.desc()
             )
-            .where(LotteryDraw.is_rare == True)
-            .group_by(LotteryDraw.user_id)
-            .order_by(desc("win_count"), desc("last_win_at"))
             .limit(limit)
         )
-        rankings = result.fetchall()
-
-        if not rankings:
-            return []
+        rows = result.fetchall()
 
-        # 获取用户详情
-        user_ids = [r[0] for r in rankings]
-        user_result = await db.execute(
-            select(User).where(User.id.in_(user_ids))
-        )
-        user_map = {u.id: u for u in user_result.scalars().all()}
-
-        # 获取每个用户最近中的奖品名称
-        prize_result = await db.execute(
-            select(
-                LotteryDraw.user_id,
-                func.group_concat(
-                    func.distinct(LotteryDraw.prize_name)
-                ).label("prizes")
-            )
-            .where(
-                LotteryDraw.is_rare == True,
-                LotteryDraw.user_id.in_(user_ids)
-            )
-            .group_by(LotteryDraw.user_id)
-        )
-        prize_map = {r[0]: r[1] for r in prize_result.fetchall()}
-
-        leaderboard = []
-        for rank, (user_id, win_count, last_win_at) in enumerate(rankings, 1):
-            user = user_map.get(user_id)
-            if user:
-                leaderboard.append({
-                    "rank": rank,
-                    "user_id": user_id,
-                    "username": user.username,
-                    "display_name": user.display_name,
-                    "avatar_url": user.avatar_url,
-                    "win_count": win_count,
-                    "last_win_at": last_win_at.isoformat() if last_win_at else None,
-                    "prizes_won": prize_map.get(user_id, "").split(",") if prize_map.get(user_id) else []
-                })
-
-        return leaderboard
+        return [
+            {
+                "rank": rank,
+                "user_id": user.id,
+                "username": user.username,
+                "display_name": user.display_name,
+                "avatar_url": user.avatar_url,
+                "win_count": stats.rare_win_count,
+                "last_win_at": stats.last_win_at.isoformat() if stats.last_win_at else None,
+                "prizes_won": stats.recent_prizes or []
+            }
+            for rank, (stats, user) in enumerate(rows, 1)
+        ]
 
     # ========== 刮刮乐相关方法 ==========
 
@@ -693,36 +696,52 @@ class LotteryService:
                     auto_commit=False
                 )
 
-            # 获取奖池并预选奖品
+            # 优先领取预生成的封存卡片（奖品已抽取、库存已预占）
             prizes = await LotteryService.get_prizes(db, config.id)
-            prize = await LotteryService._select_prize(prizes)
+            sealed = None
+            if settings.SCRATCH_POOL_ENABLED:
+                sealed = await ScratchCardPoolService.claim(
+                    db, config.id, ScratchCardPoolService.config_version(prizes)
+                )
 
-            # 创建刮刮乐卡片记录
-            card = ScratchCard(
-                user_id=user_id,
-                config_id=config.id,
-                cost_points=actual_cost,  # 使用实际消耗（使用券时为0）
-                prize_id=prize.id,
-                prize_type=prize.prize_type.value,
-                prize_name=prize.prize_name,
-                prize_value=prize.prize_value,
-                is_rare=prize.is_rare,
-                status=ScratchCardStatus.PURCHASED
-            )
+            if sealed:
+                card = ScratchCard(
+                    user_id=user_id,
+                    config_id=config.id,
+                    cost_points=actual_cost,  # 使用实际消耗（使用券时为0）
+                    prize_id=sealed.prize_id,
+                    prize_type=sealed.prize_type,
+                    prize_name=sealed.prize_name,
+                    prize_value=sealed.prize_value,
+                    is_rare=sealed.is_rare,
+                    status=ScratchCardStatus.PURCHASED
+                )
+            else:
+                # 卡池为空：实时预选奖品，同时预占库存（售罄的奖品排除后重抽）
+                prize = await InventoryService.reserve_drawn(
+                    db, InventoryKind.LOTTERY_PRIZE, prizes, LotteryService._select_prize
+                )
+                card = ScratchCard(
+                    user_id=user_id,
+                    config_id=config.id,
+                    cost_points=actual_cost,  # 使用实际消耗（使用券时为0）
+                    prize_id=prize.id,
+                    prize_type=prize.prize_type.value,
+                    prize_name=prize.prize_name,
+                    prize_value=prize.prize_value,
+                    is_rare=prize.is_rare,
+                    status=ScratchCardStatus.PURCHASED
+                )
             db.add(card)
             await db.flush()  # 获取 card.id
 
-            # 扣减奖品库存（使用原子 UPDATE 防止并发超卖）
-            if prize.stock is not None:
-                from sqlalchemy import text
-                deduct_result = await db.execute(
-                    text("UPDATE lottery_prizes SET stock = stock - 1 WHERE id = :prize_id AND stock > 0"),
-                    {"prize_id": prize.id}
-                )
-                if deduct_result.rowcount == 0:
-                    # 库存扣减失败（已被其他请求抢完）
-                    await db.rollback()
-                    raise ValueError("奖品库存不足，请重试")
+            if sealed:
+                await ScratchCardPoolService.bind_card(db, sealed.id, card.id)
+
+            # 奖品在刮开时才揭晓，先只记录消耗
+            await PlayHistoryService.record(
+                db, user_id, PlayGame.SCRATCH, card.id, cost_points=actual_cost
+            )
 
             await db.commit()
 
@@ -787,6 +806,7 @@ class LotteryService:
             extra_message = None
             prize_value = card.prize_value
             api_key_code = None  # 完整的 API Key 兑换码
+            payout_points = 0
 
             if card.prize_type == PrizeType.ITEM.value:
                 await LotteryService._add_user_item(db, user_id, card.prize_value)
@@ -823,8 +843,16 @@ class LotteryService:
                         description=f"刮刮乐获得{points_amount}积分",
                         auto_commit=False
                     )
+                payout_points = points_amount
                 extra_message = f"获得{points_amount}积分"
 
+            await PlayHistoryService.settle(
+                db, PlayGame.SCRATCH, card.id,
+                payout_points=payout_points,
+                prize_name=card.prize_name,
+                is_rare=card.is_rare
+            )
+
             await db.commit()
 
             return {
@@ -0,0 +1,199 @@
+"""
+统一游戏记录服务
+
+各游戏在自身事务内调用 record 写入 play_events（稀有中奖在提交后实时推送），
+"我的活动"时间线使用 (created_at, id) 游标分页，后台统计按游戏单表聚合。
+"""
+from datetime import datetime, date, timedelta
+from typing import Optional, Dict, Any, Tuple
+
+from sqlalchemy import select, func, and_, or_, update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.play_event import PlayEvent, PlayGame
+from app.services.live_hub import LiveHub, LiveChannel, LiveEvent
+
+_CURSOR_TIME_FORMAT = "%Y%m%d%H%M%S%f"
+
+
+class PlayHistoryService:
+    """统一游戏记录服务"""
+
+    @staticmethod
+    async def record(
+        db: AsyncSession,
+        user_id: int,
+        game: str,
+        ref_id: int,
+        cost_points: int = 0,
+        payout_points: int = 0,
+        prize_name: Optional[str] = None,
+        is_rare: bool = False
+    ) -> None:
+        """写入一条游戏记录（不提交事务，随调用方事务一起提交）"""
+        db.add(PlayEvent(
+            user_id=user_id,
+            game=game,
+            ref_id=ref_id,
+            cost_points=cost_points,
+            payout_points=payout_points,
+            prize_name=prize_name,
+            is_rare=is_rare,
+        ))
+
+        # 稀有中奖在事务提交后推送到全局频道
+        if is_rare:
+            from app.models.user import User
+            user = await db.get(User, user_id)
+            LiveHub.publish_after_commit(db, LiveChannel.GLOBAL, LiveEvent.RARE_DRAW, {
+                "game": game,
+                "prize_name": prize_name,
+                "user": {
+                    "id": user_id,
+                    "username": user.username if user else None,
+                    "display_name": user.display_name if user else None,
+                    "avatar_url": user.avatar_url if user else None,
+                },
+            })
+
+    @staticmethod
+    async def settle(
+        db: AsyncSession,
+        game: str,
+        ref_id: int,
+        payout_points: int = 0,
+        prize_name: Optional[str] = None,
+        is_rare: bool = False
+    ) -> None:
+        """补填延迟揭晓的结果（刮刮乐刮开时调用）"""
+        await db.execute(
+            update(PlayEvent)
+            .where(PlayEvent.game == game, PlayEvent.ref_id == ref_id)
+            .values(payout_points=payout_points, prize_name=prize_name, is_rare=is_rare)
+        )
+
+    @staticmethod
+    def encode_cursor(event: PlayEvent) -> str:
+        """游标格式：<created_at YYYYmmddHHMMSSffffff>_<id>"""
+        return f"{event.created_at.strftime(_CURSOR_TIME_FORMAT)}_{event.id}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        """解析游标，格式错误时抛出 ValueError"""
+        try:
+            ts, event_id = cursor.split("_", 1)
+            return datetime.strptime(ts, _CURSOR_TIME_FORMAT), int(event_id)
+        except ValueError:
+            raise ValueError("无效的游标")
+
+    @staticmethod
+    async def get_timeline(
+        db: AsyncSession,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        game: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        获取用户游戏时间线（按时间倒序，游标分页）
+
+        Returns:
+            {"items": [...], "next_cursor": str | None}
+        """
+        query = select(PlayEvent).where(PlayEvent.user_id == user_id)
+        if game:
+            query = query.where(PlayEvent.game == game)
+        if cursor:
+            cursor_time, cursor_id = PlayHistoryService.decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    PlayEvent.created_at < cursor_time,
+                    and_(PlayEvent.created_at == cursor_time, PlayEvent.id < cursor_id)
+                )
+            )
+
+        # 多取一条判断是否还有下一页
+        result = await db.execute(
+            query.order_by(PlayEvent.created_at.desc(), PlayEvent.id.desc()).limit(limit + 1)
+        )
+        events = list(result.scalars().all())
+        has_more = len(events) > limit
+        events = events[:limit]
+
+        return {
+            "items": [
+                {
+                    "id": e.id,
+                    "game": e.game,
+                    "cost_points": e.cost_points,
+                    "payout_points": e.payout_points,
+                    "prize_name": e.prize_name,
+                    "is_rare": e.is_rare,
+                    "ref_id": e.ref_id,
+                    "created_at": e.created_at.isoformat(),
+                }
+                for e in events
+            ],
+            "next_cursor": PlayHistoryService.encode_cursor(events[-1]) if has_more else None,
+        }
+
+    @staticmethod
+    async def get_game_stats(
+        db: AsyncSession,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        按游戏汇总游玩次数、消耗、产出、稀有次数（单表单次聚合）
+
+        Args:
+            start: 起始时间（含）
+            end: 截止时间（不含）
+        """
+        query = select(
+            PlayEvent.game,
+            func.count(PlayEvent.id),
+            func.coalesce(func.sum(PlayEvent.cost_points), 0),
+            func.coalesce(func.sum(PlayEvent.payout_points), 0),
+            func.coalesce(func.sum(case((PlayEvent.is_rare == True, 1), else_=0)), 0),
+        )
+        if start:
+            query = query.where(PlayEvent.created_at >= start)
+        if end:
+            query = query.where(PlayEvent.created_at < end)
+        result = await db.execute(query.group_by(PlayEvent.game))
+
+        stats = {
+            game: {"plays": 0, "cost_points": 0, "payout_points": 0, "rare_count": 0}
+            for game in PlayGame.ALL
+        }
+        for game, plays, cost, payout, rare in result.fetchall():
+            stats[game] = {
+                "plays": int(plays),
+                "cost_points": int(cost),
+                "payout_points": int(payout),
+                "rare_count": int(rare),
+            }
+        return stats
+
+    @staticmethod
+    async def get_daily_play_counts(
+        db: AsyncSession,
+        start: date,
+        end: date
+    ) -> Dict[str, Dict[str, int]]:
+        """按日期和游戏统计游玩次数 {"YYYY-MM-DD": {game: count}}（单次聚合）"""
+        day = func.date(PlayEvent.created_at)
+        result = await db.execute(
+            select(day, PlayEvent.game, func.count(PlayEvent.id))
+            .where(
+                PlayEvent.created_at >= datetime.combine(start, datetime.min.time()),
+                PlayEvent.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time())
+            )
+            .group_by(day, PlayEvent.game)
+        )
+        counts: Dict[str, Dict[str, int]] = {}
+        for play_date, game, count in result.fetchall():
+            key = play_date.isoformat() if hasattr(play_date, "isoformat") else str(play_date)
+            counts.setdefault(key, {})[game] = int(count)
+        return counts
@@ -351,11 +351,20 @@ class SigninService:
         return result.scalar_one_or_none() is not None
 
     @staticmethod
-    async def signin(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    async def signin(
+        db: AsyncSession,
+        user_id: int,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         每日签到
         返回签到结果，包含获得积分、连续天数、额外奖励等
         使用唯一约束处理并发问题
+
+        Args:
+            ip_address: 客户端IP（写入签到日志）
+            user_agent: 客户端UA（写入签到日志）
         """
         from sqlalchemy.exc import IntegrityError
 
@@ -412,18 +421,22 @@ class SigninService:
                     auto_commit=False
                 )
 
-            # 记录任务进度（签到任务）
-            from app.services.task_service import TaskService
-            from app.models.task import TaskType
-            await TaskService.record_event(
-                db=db,
+            # 任务进度和签到日志由事件总线异步处理
+            from app.services.event_bus import EventBus
+            from app.models.domain_event import DomainEventType
+            await EventBus.publish(
+                db,
+                DomainEventType.SIGNIN_COMPLETED,
+                event_key=f"signin:{user_id}:{today.isoformat()}",
                 user_id=user_id,
-                task_type=TaskType.SIGNIN,
-                delta=1,
-                event_key=f"signin:{today.isoformat()}",
-                ref_type="daily_signin",
-                ref_id=signin.id,
-                auto_claim=True,
+                payload={
+                    "signin_id": signin.id,
+                    "signin_date": today.isoformat(),
+                    "points": total_points,
+                    "streak": streak,
+                    "ip_address": ip_address,
+                    "user_agent": user_agent,
+                },
             )
 
             await db.commit()
@@ -250,7 +250,7 @@ class PredictionService:
             for user_id in all_user_ids:
                 is_winner = user_id in {bet.user_id for bet in winner_bets} if winner_total_stake > 0 else False
                 user_stats = await update_user_stats_on_prediction(db, user_id, is_winner)
-                await check_and_unlock_achievements(db, user_id, user_stats)
+                await check_and_unlock_achievements(db, user_id, user_stats, event="prediction")
 
             await db.commit()
             return stats
@@ -0,0 +1,272 @@
+"""
+额度后台轮询
+
+定时任务按周期查询所有已提交/已通过且设置了 API Key 的选手的额度和在线状态，
+每轮为每个报名写入一行 quota_snapshots（同一轮 polled_at 相同）：
+- 额度排行榜和 API Key 监控读取最新一轮快照，带快照时间；快照缺失或过期时由调用方回退实时查询
+- 按 QUOTA_POLL_KEYS_PER_SECOND 匀速发起查询，并发受 QUOTA_MAX_CONCURRENCY 限制，控制上游请求预算
+- 多个 worker 都运行调度器，通过 MySQL GET_LOCK 保证同一时刻只有一个 worker 在轮询
+- 上游查询失败但仍在额度缓存陈旧期内时，快照记录最近一次成功的值
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine, async_session_maker
+from app.models.quota import QuotaSnapshot, QuotaSnapshotStatus
+from app.models.registration import Registration, RegistrationStatus
+from app.services.quota_service import quota_service, QuotaInfo
+
+logger = logging.getLogger(__name__)
+
+_POLL_LOCK_NAME = "quota_poller"
+_PURGE_BATCH_SIZE = 5000
+
+
+class QuotaPoller:
+    """额度后台轮询"""
+
+    _last_round: Dict[str, Any] = {}
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "rounds": 0,
+        "skipped_locked": 0,
+        "keys_polled": 0,
+        "quota_errors": 0,
+        "online_errors": 0,
+        "snapshots_written": 0,
+        "snapshots_purged": 0,
+    }
+
+    # =========================================================================
+    # 轮询
+    # =========================================================================
+
+    @staticmethod
+    async def poll_all() -> Optional[Dict[str, Any]]:
+        """
+        执行一轮轮询并写入快照
+
+        Returns:
+            本轮统计；其他 worker 正在轮询时返回 None
+        """
+        # 锁绑定在连接上，整轮持有同一连接，结束后显式释放
+        async with engine.connect() as lock_conn:
+            acquired = await lock_conn.scalar(
+                text("SELECT GET_LOCK(:name, 0)"), {"name": _POLL_LOCK_NAME}
+            )
+            if not acquired:
+                QuotaPoller._metrics["skipped_locked"] += 1
+                return None
+            try:
+                return await QuotaPoller._poll_round()
+            finally:
+                await lock_conn.execute(
+                    text("SELECT RELEASE_LOCK(:name)"), {"name": _POLL_LOCK_NAME}
+                )
+
+    @staticmethod
+    async def _poll_round() -> Dict[str, Any]:
+        started = time.perf_counter()
+        polled_at = datetime.now().replace(microsecond=0)
+
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(Registration.id, Registration.contest_id, Registration.api_key)
+                .where(
+                    Registration.status.in_([
+                        RegistrationStatus.SUBMITTED.value,
+                        RegistrationStatus.APPROVED.value,
+                    ]),
+                    Registration.api_key.isnot(None),
+                    Registration.api_key != "",
+                )
+            )
+            registrations = result.all()
+
+        # key 去重：同一个 key 只查询一次
+        key_to_regs: Dict[str, List[Tuple[int, int]]] = {}
+        for reg_id, contest_id, api_key in registrations:
+            key_to_regs.setdefault(api_key, []).append((reg_id, contest_id))
+
+        results = await QuotaPoller._query_keys(list(key_to_regs))
+
+        snapshots = []
+        for api_key, regs in key_to_regs.items():
+            info, is_online = results.get(api_key, (None, None))
+            for reg_id, contest_id in regs:
+                snapshots.append(QuotaPoller._build_snapshot(reg_id, contest_id, polled_at, info, is_online))
+
+        async with async_session_maker() as db:
+            db.add_all(snapshots)
+            await db.commit()
+            purged = await QuotaPoller.purge_expired(db)
+
+        summary = {
+            "polled_at": polled_at.isoformat(),
+            "keys": len(key_to_regs),
+            "snapshots": len(snapshots),
+            "errors": len([s for s in snapshots if s.status == QuotaSnapshotStatus.ERROR]),
+            "purged": purged,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        QuotaPoller._metrics["rounds"] += 1
+        QuotaPoller._metrics["snapshots_written"] += len(snapshots)
+        QuotaPoller._last_round = summary
+        return summary
+
+    @staticmethod
+    async def _query_keys(api_keys: List[str]) -> Dict[str, Tuple[Optional[QuotaInfo], Optional[bool]]]:
+        """按限速预算匀速查询全部 key 的额度和在线状态"""
+        semaphore = asyncio.Semaphore(quota_service.max_concurrency)
+        interval = 1 / max(0.1, settings.QUOTA_POLL_KEYS_PER_SECOND)
+        results: Dict[str, Tuple[Optional[QuotaInfo], Optional[bool]]] = {}
+
+        async def query_key(api_key: str) -> None:
+            async with semaphore:
+                info = await quota_service.refresh_quota(api_key)
+                is_online = await quota_service.refresh_online_status(api_key)
+            if info is None:
+                QuotaPoller._metrics["quota_errors"] += 1
+            if is_online is None:
+                QuotaPoller._metrics["online_errors"] += 1
+            QuotaPoller._metrics["keys_polled"] += 1
+            results[api_key] = (info, is_online)
+
+        tasks = []
+        for api_key in api_keys:
+            tasks.append(asyncio.create_task(query_key(api_key)))
+            await asyncio.sleep(interval)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    @staticmethod
+    def _build_snapshot(
+        registration_id: int,
+        contest_id: int,
+        polled_at: datetime,
+        info: Optional[QuotaInfo],
+        is_online: Optional[bool]
+    ) -> QuotaSnapshot:
+        if info is None:
+            return QuotaSnapshot(
+                registration_id=registration_id,
+                contest_id=contest_id,
+                polled_at=polled_at,
+                status=QuotaSnapshotStatus.ERROR,
+                is_online=is_online,
+            )
+        return QuotaSnapshot(
+            registration_id=registration_id,
+            contest_id=contest_id,
+            polled_at=polled_at,
+            status=QuotaSnapshotStatus.OK,
+            used=info.used,
+            remaining=info.remaining,
+            total=info.total,
+            today_used=info.today_used,
+            is_unlimited=info.is_unlimited,
+            quota_username=info.username,
+            quota_group=info.group,
+            is_online=is_online,
+        )
+
+    @staticmethod
+    async def purge_expired(db: AsyncSession) -> int:
+        """分批删除超过保留期的快照（会提交事务），返回删除行数"""
+        cutoff = datetime.now() - timedelta(hours=settings.QUOTA_SNAPSHOT_RETENTION_HOURS)
+        total = 0
+        while True:
+            result = await db.execute(
+                delete(QuotaSnapshot)
+                .where(QuotaSnapshot.polled_at < cutoff)
+                .with_dialect_options(mysql_limit=_PURGE_BATCH_SIZE)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            total += result.rowcount or 0
+            if (result.rowcount or 0) < _PURGE_BATCH_SIZE:
+                break
+        QuotaPoller._metrics["snapshots_purged"] += total
+        return total
+
+    # =========================================================================
+    # 读取
+    # =========================================================================
+
+    @staticmethod
+    async def get_latest(
+        db: AsyncSession,
+        contest_id: Optional[int] = None
+    ) -> Optional[Tuple[datetime, Dict[int, QuotaSnapshot]]]:
+        """
+        读取最新一轮快照 (轮次时间, {报名ID: 快照})
+
+        contest_id 为空时读取全部比赛；没有快照或最新一轮超过 QUOTA_SNAPSHOT_MAX_AGE_SECONDS 时返回 None。
+        """
+        latest_query = select(func.max(QuotaSnapshot.polled_at))
+        if contest_id is not None:
+            latest_query = latest_query.where(QuotaSnapshot.contest_id == contest_id)
+        polled_at = await db.scalar(latest_query)
+        if polled_at is None:
+            return None
+        if datetime.now() - polled_at > timedelta(seconds=settings.QUOTA_SNAPSHOT_MAX_AGE_SECONDS):
+            return None
+
+        rows_query = select(QuotaSnapshot).where(QuotaSnapshot.polled_at == polled_at)
+        if contest_id is not None:
+            rows_query = rows_query.where(QuotaSnapshot.contest_id == contest_id)
+        result = await db.execute(rows_query)
+        return polled_at, {row.registration_id: row for row in result.scalars().all()}
+
+    @staticmethod
+    def to_quota_info(snapshot: Optional[QuotaSnapshot]) -> Optional[QuotaInfo]:
+        """快照转换为 QuotaInfo，查询失败的快照返回 None"""
+        if snapshot is None or snapshot.status != QuotaSnapshotStatus.OK:
+            return None
+        return QuotaInfo(
+            remaining=snapshot.remaining or 0.0,
+            used=snapshot.used or 0.0,
+            total=snapshot.total or 0.0,
+            today_used=snapshot.today_used or 0.0,
+            is_unlimited=bool(snapshot.is_unlimited),
+            username=snapshot.quota_username,
+            group=snapshot.quota_group,
+        )
+
+    @staticmethod
+    async def get_quota_map(
+        registrations: List[Registration],
+        contest_id: Optional[int] = None
+    ) -> Tuple[Dict[int, Optional[QuotaInfo]], datetime, str]:
+        """
+        获取报名的额度 ({报名ID: QuotaInfo | None}, 数据时间, 来源)
+
+        优先使用最新快照（来源 snapshot），快照不可用时实时批量查询（来源 live）。
+        使用独立会话读取快照，实时查询期间不占用数据库连接。
+        """
+        async with async_session_maker() as db:
+            latest = await QuotaPoller.get_latest(db, contest_id)
+        if latest is not None:
+            polled_at, snapshots = latest
+            quota_map = {
+                reg.id: QuotaPoller.to_quota_info(snapshots.get(reg.id))
+                for reg in registrations
+            }
+            return quota_map, polled_at, "snapshot"
+
+        api_keys = [(r.id, r.api_key) for r in registrations]
+        quota_map = await quota_service.batch_get_quota(api_keys)
+        return quota_map, datetime.now().replace(microsecond=0), "live"
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """获取轮询指标快照"""
+        return {**QuotaPoller._metrics, "last_round": QuotaPoller._last_round}
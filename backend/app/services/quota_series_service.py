@@ -0,0 +1,382 @@
+"""
+额度用量时间序列服务
+
+基于后台轮询写入的 quota_snapshots 提供用量曲线和消耗速率：
+- 原始快照按时间桶聚合（每桶取最后的已使用额度），在 SQL 中完成，返回行数 = 报名数 × 桶数
+- 已结束日期按天压缩为 quota_usage_series：降采样到 QUOTA_SERIES_RESOLUTION_SECONDS，
+  时间和额度差分编码为 JSON 整数数组；超过 QUOTA_SERIES_COARSE_AFTER_DAYS 的再降采样
+- 曲线读取 = 已压缩的日序列 + 尚未压缩的原始快照
+"""
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, literal_column, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.mysql import insert
+
+from app.core.config import settings
+from app.core.database import engine, async_session_maker
+from app.models.quota import QuotaSnapshot, QuotaSnapshotStatus, QuotaUsageSeries
+from app.models.registration import Registration
+
+logger = logging.getLogger(__name__)
+
+# 额度编码单位：0.0001 美元
+_VALUE_SCALE = 10000
+_COARSEN_BATCH_SIZE = 500
+_MAINTENANCE_LOCK_NAME = "quota_series_maintenance"
+
+# (Unix 秒, 已使用额度)
+Point = Tuple[int, float]
+
+
+# =============================================================================
+# 编码
+# =============================================================================
+
+def encode_points(points: List[Point]) -> str:
+    """差分编码点列：[t0, v0, dt1, dv1, ...]，额度按 0.0001 美元取整"""
+    flat: List[int] = []
+    prev_ts, prev_value = 0, 0
+    for ts, used in points:
+        value = int(round(used * _VALUE_SCALE))
+        flat.extend((ts - prev_ts, value - prev_value))
+        prev_ts, prev_value = ts, value
+    return json.dumps(flat, separators=(",", ":"))
+
+
+def decode_points(raw: str) -> List[Point]:
+    """解码 encode_points 的结果"""
+    flat = json.loads(raw) if raw else []
+    points: List[Point] = []
+    ts, value = 0, 0
+    for i in range(0, len(flat) - 1, 2):
+        ts += flat[i]
+        value += flat[i + 1]
+        points.append((ts, value / _VALUE_SCALE))
+    return points
+
+
+def downsample(points: List[Point], resolution_seconds: int) -> List[Point]:
+    """按时间桶降采样，每桶保留最后一个点（已使用额度是累计值）"""
+    result: List[Point] = []
+    last_bucket = None
+    for ts, used in points:
+        bucket = ts // resolution_seconds
+        if bucket == last_bucket:
+            result[-1] = (ts, used)
+        else:
+            result.append((ts, used))
+            last_bucket = bucket
+    return result
+
+
+class QuotaSeriesService:
+    """额度用量时间序列服务"""
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "compacted_days": 0,
+        "series_rows_written": 0,
+        "series_rows_coarsened": 0,
+    }
+
+    # =========================================================================
+    # 原始快照聚合
+    # =========================================================================
+
+    @staticmethod
+    async def _load_bucketed(
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+        *,
+        contest_id: Optional[int] = None,
+        registration_id: Optional[int] = None
+    ) -> Dict[int, List[Tuple[int, datetime, float]]]:
+        """
+        按时间桶聚合原始快照 {报名ID: [(桶序号, 桶内最后轮次时间, 已使用额度), ...]}
+
+        桶序号 = (polled_at - start) 秒数 DIV bucket_seconds，与数据库时区无关。
+        每桶取最后一次快照的已使用额度（ROW_NUMBER 窗口函数），桶内额度重置后取重置后的值。
+        """
+        bucket = func.timestampdiff(
+            literal_column("SECOND"), start, QuotaSnapshot.polled_at
+        ).op("DIV")(bucket_seconds)
+        row_no = func.row_number().over(
+            partition_by=(QuotaSnapshot.registration_id, bucket),
+            order_by=QuotaSnapshot.polled_at.desc(),
+        )
+        inner = (
+            select(
+                QuotaSnapshot.registration_id,
+                bucket.label("bucket"),
+                QuotaSnapshot.polled_at,
+                QuotaSnapshot.used,
+                row_no.label("row_no"),
+            )
+            .where(
+                QuotaSnapshot.status == QuotaSnapshotStatus.OK,
+                QuotaSnapshot.polled_at >= start,
+                QuotaSnapshot.polled_at < end,
+            )
+        )
+        if contest_id is not None:
+            inner = inner.where(QuotaSnapshot.contest_id == contest_id)
+        if registration_id is not None:
+            inner = inner.where(QuotaSnapshot.registration_id == registration_id)
+        inner = inner.subquery()
+
+        query = select(
+            inner.c.registration_id, inner.c.bucket, inner.c.polled_at, inner.c.used
+        ).where(inner.c.row_no == 1)
+
+        result = await db.execute(query)
+        buckets: Dict[int, List[Tuple[int, datetime, float]]] = {}
+        for reg_id, bucket_no, polled_at, used in result.fetchall():
+            buckets.setdefault(reg_id, []).append((int(bucket_no), polled_at, float(used or 0)))
+        for rows in buckets.values():
+            rows.sort(key=lambda row: row[0])
+        return buckets
+
+    # =========================================================================
+    # 按天压缩
+    # =========================================================================
+
+    @staticmethod
+    async def run_maintenance() -> Optional[Dict[str, int]]:
+        """
+        压缩待处理日期并对旧序列再降采样
+
+        多个 worker 同时触发时只有取得 MySQL 锁的一个执行，其余返回 None。
+        """
+        async with engine.connect() as lock_conn:
+            acquired = await lock_conn.scalar(
+                text("SELECT GET_LOCK(:name, 0)"), {"name": _MAINTENANCE_LOCK_NAME}
+            )
+            if not acquired:
+                return None
+            try:
+                async with async_session_maker() as db:
+                    compacted = await QuotaSeriesService.compact_pending(db)
+                    coarsened = await QuotaSeriesService.coarsen_old(db)
+                return {"compacted": compacted, "coarsened": coarsened}
+            finally:
+                await lock_conn.execute(
+                    text("SELECT RELEASE_LOCK(:name)"), {"name": _MAINTENANCE_LOCK_NAME}
+                )
+
+    @staticmethod
+    async def compact_day(db: AsyncSession, day: date) -> int:
+        """将一天的原始快照压缩为日序列（会提交事务，可重复执行），返回写入的报名数"""
+        resolution = settings.QUOTA_SERIES_RESOLUTION_SECONDS
+        start = datetime.combine(day, time.min)
+        buckets = await QuotaSeriesService._load_bucketed(
+            db, start, start + timedelta(days=1), resolution
+        )
+        if not buckets:
+            return 0
+
+        contest_result = await db.execute(
+            select(Registration.id, Registration.contest_id)
+            .where(Registration.id.in_(list(buckets)))
+        )
+        contest_map = dict(contest_result.fetchall())
+
+        written = 0
+        for reg_id, rows in buckets.items():
+            if reg_id not in contest_map:
+                continue
+            points = [(int(polled_at.timestamp()), used) for _, polled_at, used in rows]
+            encoded = encode_points(points)
+            await db.execute(
+                insert(QuotaUsageSeries).values(
+                    registration_id=reg_id,
+                    contest_id=contest_map[reg_id],
+                    series_date=day,
+                    resolution_seconds=resolution,
+                    point_count=len(points),
+                    points=encoded,
+                ).on_duplicate_key_update(
+                    contest_id=contest_map[reg_id],
+                    resolution_seconds=resolution,
+                    point_count=len(points),
+                    points=encoded,
+                )
+            )
+            written += 1
+        await db.commit()
+
+        QuotaSeriesService._metrics["compacted_days"] += 1
+        QuotaSeriesService._metrics["series_rows_written"] += written
+        return written
+
+    @staticmethod
+    async def compact_pending(db: AsyncSession) -> int:
+        """压缩最后一个已压缩日期之后、今天之前的全部日期，返回写入的行数"""
+        latest_day = await db.scalar(select(func.max(QuotaUsageSeries.series_date)))
+        earliest_polled = await db.scalar(select(func.min(QuotaSnapshot.polled_at)))
+        if earliest_polled is None:
+            return 0
+
+        day = earliest_polled.date()
+        if latest_day is not None and latest_day >= day:
+            day = latest_day + timedelta(days=1)
+
+        today = datetime.now().date()
+        total = 0
+        while day < today:
+            total += await QuotaSeriesService.compact_day(db, day)
+            day += timedelta(days=1)
+        return total
+
+    @staticmethod
+    async def coarsen_old(db: AsyncSession) -> int:
+        """将超过 QUOTA_SERIES_COARSE_AFTER_DAYS 的日序列再降采样（会提交事务），返回处理行数"""
+        coarse = settings.QUOTA_SERIES_COARSE_RESOLUTION_SECONDS
+        cutoff = datetime.now().date() - timedelta(days=settings.QUOTA_SERIES_COARSE_AFTER_DAYS)
+        total = 0
+        while True:
+            result = await db.execute(
+                select(QuotaUsageSeries)
+                .where(
+                    QuotaUsageSeries.series_date < cutoff,
+                    QuotaUsageSeries.resolution_seconds < coarse,
+                )
+                .limit(_COARSEN_BATCH_SIZE)
+            )
+            rows = list(result.scalars().all())
+            for row in rows:
+                points = downsample(decode_points(row.points), coarse)
+                row.points = encode_points(points)
+                row.point_count = len(points)
+                row.resolution_seconds = coarse
+            await db.commit()
+            total += len(rows)
+            if len(rows) < _COARSEN_BATCH_SIZE:
+                break
+        QuotaSeriesService._metrics["series_rows_coarsened"] += total
+        return total
+
+    # =========================================================================
+    # 读取
+    # =========================================================================
+
+    @staticmethod
+    async def get_registration_curve(
+        db: AsyncSession,
+        registration_id: int,
+        hours: int,
+        resolution_seconds: int
+    ) -> List[Point]:
+        """获取选手最近 hours 小时的已使用额度曲线（已压缩日序列 + 未压缩的原始快照）"""
+        now = datetime.now()
+        start = now - timedelta(hours=hours)
+        start_ts = int(start.timestamp())
+
+        result = await db.execute(
+            select(QuotaUsageSeries)
+            .where(
+                QuotaUsageSeries.registration_id == registration_id,
+                QuotaUsageSeries.series_date >= start.date(),
+            )
+            .order_by(QuotaUsageSeries.series_date)
+        )
+        series_rows = list(result.scalars().all())
+
+        points: List[Point] = []
+        raw_start = start
+        for row in series_rows:
+            points.extend(p for p in decode_points(row.points) if p[0] >= start_ts)
+            raw_start = max(raw_start, datetime.combine(row.series_date + timedelta(days=1), time.min))
+
+        buckets = await QuotaSeriesService._load_bucketed(
+            db, raw_start, now, resolution_seconds, registration_id=registration_id
+        )
+        points.extend(
+            (int(polled_at.timestamp()), used)
+            for _, polled_at, used in buckets.get(registration_id, [])
+        )
+        return downsample(points, resolution_seconds)
+
+    @staticmethod
+    async def get_contest_burn_rate(
+        db: AsyncSession,
+        contest_id: int,
+        hours: int,
+        bucket_seconds: int
+    ) -> Dict[str, Any]:
+        """
+        比赛额度消耗速率
+
+        Returns:
+            series: 每个时间桶全体选手的消耗（美元）与折算的每小时速率
+            registrations: 每个选手窗口内消耗、平均速率、最近一个桶的速率，按平均速率降序
+        """
+        hours = min(hours, settings.QUOTA_SNAPSHOT_RETENTION_HOURS)
+        now = datetime.now()
+        start = now - timedelta(hours=hours)
+        buckets = await QuotaSeriesService._load_bucketed(
+            db, start, now, bucket_seconds, contest_id=contest_id
+        )
+
+        bucket_count = hours * 3600 // bucket_seconds + 1
+        consumed_per_bucket = [0.0] * bucket_count
+        per_hour = 3600 / bucket_seconds
+        registrations = []
+
+        for reg_id, rows in buckets.items():
+            consumed = 0.0
+            recent_rate = 0.0
+            for (_, prev_at, prev_used), (bucket_no, polled_at, used) in zip(rows, rows[1:]):
+                # 额度被重置时已使用额度会变小，这一段不计消耗
+                delta = max(0.0, used - prev_used)
+                consumed += delta
+                if 0 <= bucket_no < bucket_count:
+                    consumed_per_bucket[bucket_no] += delta
+                elapsed = (polled_at - prev_at).total_seconds()
+                recent_rate = delta * 3600 / elapsed if elapsed > 0 else 0.0
+            span = (rows[-1][1] - rows[0][1]).total_seconds()
+            registrations.append({
+                "registration_id": reg_id,
+                "consumed": round(consumed, 4),
+                "rate_per_hour": round(consumed * 3600 / span, 4) if span > 0 else 0.0,
+                "recent_rate_per_hour": round(recent_rate, 4),
+                "latest_used": round(rows[-1][2], 4),
+            })
+
+        if registrations:
+            title_result = await db.execute(
+                select(Registration.id, Registration.title)
+                .where(Registration.id.in_([r["registration_id"] for r in registrations]))
+            )
+            titles = dict(title_result.fetchall())
+            for item in registrations:
+                item["title"] = titles.get(item["registration_id"])
+        registrations.sort(key=lambda r: r["rate_per_hour"], reverse=True)
+
+        series = [
+            {
+                "ts": (start + timedelta(seconds=i * bucket_seconds)).replace(microsecond=0).isoformat(),
+                "consumed": round(value, 4),
+                "rate_per_hour": round(value * per_hour, 4),
+            }
+            for i, value in enumerate(consumed_per_bucket)
+        ]
+        total_consumed = sum(consumed_per_bucket)
+        return {
+            "hours": hours,
+            "bucket_seconds": bucket_seconds,
+            "total_consumed": round(total_consumed, 4),
+            "rate_per_hour": round(total_consumed / hours, 4) if hours else 0.0,
+            "series": series,
+            "registrations": registrations,
+        }
+
+    @staticmethod
+    def get_metrics() -> Dict[str, int]:
+        """获取用量序列指标快照"""
+        return dict(QuotaSeriesService._metrics)
@@ -14,14 +14,12 @@ from typing import Optional, Literal
 from dataclasses import dataclass
 
 from app.core.config import settings
+from app.core.http_clients import HttpClients, Upstream
+from app.core.swr_cache import SWRCache
 
 
 logger = logging.getLogger(__name__)
 
-# 缓存缺失标记
-_MISSING = object()
-
-
 @dataclass
 class QuotaInfo:
     """额度信息"""
@@ -54,24 +52,6 @@ class QuotaTransientError(QuotaQueryError):
     pass
 
 
-@dataclass
-class _CacheEntry:
-    """缓存条目"""
-    value: Optional[QuotaInfo]
-    fresh_until: float       # 新鲜期截止时间
-    stale_until: float       # 陈旧期截止时间
-    last_error: Optional[str] = None
-
-
-@dataclass
-class _OnlineCacheEntry:
-    """在线状态缓存条目"""
-    value: bool
-    fresh_until: float
-    stale_until: float
-    last_error: Optional[str] = None
-
-
 class QuotaService:
     """
     额度查询服务
@@ -120,9 +100,27 @@ class QuotaService:
         self.online_cache_ttl_error = settings.ONLINE_STATUS_CACHE_TTL_ERROR_SECONDS
 
         # 内部状态
-        self._cache: dict[str, _CacheEntry] = {}
         self._preferred_base_url: dict[str, str] = {}  # 记录每个 key 上次成功的 base_url
-        self._online_cache: dict[str, _OnlineCacheEntry] = {}  # 在线状态缓存
+        # 额度缓存：认证失败说明 key 已失效，不回退旧数据，且负缓存更久
+        self._cache = SWRCache(
+            "quota",
+            ttl=max(1, self.cache_ttl_ok),
+            stale_ttl=max(1, self.cache_ttl_stale),
+            error_ttl=lambda exc: max(
+                1,
+                self.cache_ttl_auth_error if isinstance(exc, QuotaAuthFailed) else self.cache_ttl_error
+            ),
+            max_entries=self.MAX_CACHE_ENTRIES,
+            stale_on_error=lambda exc: not isinstance(exc, QuotaAuthFailed),
+        )
+        # 在线状态缓存
+        self._online_cache = SWRCache(
+            "online_status",
+            ttl=max(1, self.online_cache_ttl_ok),
+            stale_ttl=max(1, self.online_cache_ttl_stale),
+            error_ttl=max(1, self.online_cache_ttl_error),
+            max_entries=self.MAX_CACHE_ENTRIES,
+        )
 
     @staticmethod
     def _normalize_url(url: str) -> str:
@@ -142,127 +140,6 @@ class QuotaService:
         """获取 API Key 后 4 位（用于日志）"""
         return api_key[-4:] if len(api_key) >= 4 else "****"
 
-    def _cache_get(self, key_fp: str) -> _CacheEntry | object:
-        """从缓存获取结果"""
-        entry = self._cache.get(key_fp)
-        if entry is None:
-            return _MISSING
-
-        now = time.monotonic()
-        if now >= entry.stale_until:
-            # 超过陈旧期，删除缓存
-            self._cache.pop(key_fp, None)
-            return _MISSING
-
-        return entry
-
-    def _evict_oldest_cache(self) -> None:
-        """清理最旧的 10% 缓存条目"""
-        if not self._cache:
-            return
-        # 按 stale_until 排序，删除最旧的 10%
-        sorted_keys = sorted(
-            self._cache.keys(),
-            key=lambda k: self._cache[k].stale_until
-        )
-        to_remove = max(1, len(sorted_keys) // 10)
-        for key in sorted_keys[:to_remove]:
-            self._cache.pop(key, None)
-
-    def _cache_set(
-        self,
-        key_fp: str,
-        value: Optional[QuotaInfo],
-        *,
-        ok: bool,
-        last_error: Optional[str] = None,
-    ) -> None:
-        """设置缓存"""
-        now = time.monotonic()
-
-        # 缓存达到上限时清理最旧的条目
-        if len(self._cache) >= self.MAX_CACHE_ENTRIES:
-            self._evict_oldest_cache()
-
-        if ok:
-            # 成功：设置新鲜期和陈旧期
-            fresh_ttl = max(1, self.cache_ttl_ok)
-            stale_ttl = fresh_ttl + max(1, self.cache_ttl_stale)
-            self._cache[key_fp] = _CacheEntry(
-                value=value,
-                fresh_until=now + fresh_ttl,
-                stale_until=now + stale_ttl,
-                last_error=None,
-            )
-        else:
-            # 失败：只设置短期缓存
-            ttl = max(1, self.cache_ttl_error)
-            self._cache[key_fp] = _CacheEntry(
-                value=value,
-                fresh_until=now + ttl,
-                stale_until=now + ttl,
-                last_error=last_error,
-            )
-
-    # ========== 在线状态缓存方法 ==========
-
-    def _online_cache_get(self, key_fp: str) -> _OnlineCacheEntry | object:
-        """从在线状态缓存获取结果"""
-        entry = self._online_cache.get(key_fp)
-        if entry is None:
-            return _MISSING
-
-        now = time.monotonic()
-        if now >= entry.stale_until:
-            self._online_cache.pop(key_fp, None)
-            return _MISSING
-
-        return entry
-
-    def _evict_oldest_online_cache(self) -> None:
-        """清理最旧的 10% 在线状态缓存条目"""
-        if not self._online_cache:
-            return
-        sorted_keys = sorted(
-            self._online_cache.keys(),
-            key=lambda k: self._online_cache[k].stale_until
-        )
-        to_remove = max(1, len(sorted_keys) // 10)
-        for key in sorted_keys[:to_remove]:
-            self._online_cache.pop(key, None)
-
-    def _online_cache_set(
-        self,
-        key_fp: str,
-        value: bool,
-        *,
-        ok: bool,
-        last_error: Optional[str] = None,
-    ) -> None:
-        """设置在线状态缓存"""
-        now = time.monotonic()
-
-        if len(self._online_cache) >= self.MAX_CACHE_ENTRIES:
-            self._evict_oldest_online_cache()
-
-        if ok:
-            fresh_ttl = max(1, self.online_cache_ttl_ok)
-            stale_ttl = fresh_ttl + max(1, self.online_cache_ttl_stale)
-            self._online_cache[key_fp] = _OnlineCacheEntry(
-                value=value,
-                fresh_until=now + fresh_ttl,
-                stale_until=now + stale_ttl,
-                last_error=None,
-            )
-        else:
-            ttl = max(1, self.online_cache_ttl_error)
-            self._online_cache[key_fp] = _OnlineCacheEntry(
-                value=value,
-                fresh_until=now + ttl,
-                stale_until=now + ttl,
-                last_error=last_error,
-            )
-
     async def _query_openai_billing(
         self,
         api_key: str,
@@ -494,29 +371,50 @@ class QuotaService:
             return None
 
         key_fp = self._fingerprint(api_key)
-        key_suffix = self._key_suffix(api_key)
+        try:
+            return await self._cache.get(
+                key_fp, lambda: self._fetch_quota(api_key, key_fp, client)
+            )
+        except QuotaQueryError as e:
+            logger.debug(
+                "Quota query failed for key=***%s: %s",
+                self._key_suffix(api_key), e
+            )
+            return None
 
-        # 检查缓存
-        cached = self._cache_get(key_fp)
-        if cached is not _MISSING:
-            entry = cached
-            now = time.monotonic()
-            if now < entry.fresh_until:
-                # 缓存仍新鲜，直接返回
-                return entry.value
+    async def refresh_quota(self, api_key: str) -> Optional[QuotaInfo]:
+        """跳过新鲜缓存直接查询并刷新缓存（后台轮询使用），失败返回 None"""
+        if not api_key:
+            return None
 
-        owns_client = client is None
+        key_fp = self._fingerprint(api_key)
         try:
-            if client is None:
-                client = httpx.AsyncClient(
-                    timeout=self.timeout,
-                    limits=httpx.Limits(
-                        max_connections=self.max_concurrency,
-                        max_keepalive_connections=self.max_concurrency
-                    ),
-                    follow_redirects=False,
-                )
+            return await self._cache.refresh(
+                key_fp, lambda: self._fetch_quota(api_key, key_fp, None)
+            )
+        except QuotaQueryError:
+            return None
+
+    async def _fetch_quota(
+        self,
+        api_key: str,
+        key_fp: str,
+        client: Optional[httpx.AsyncClient]
+    ) -> QuotaInfo:
+        """
+        依次尝试各 base_url 和查询策略（缓存加载函数）
+
+        可能在调用方请求结束后于后台刷新时执行，传入的客户端已关闭时使用共享客户端。
 
+        Raises:
+            QuotaAuthFailed: 存在认证失败
+            QuotaTransientError: 其他失败
+        """
+        key_suffix = self._key_suffix(api_key)
+        if client is None or client.is_closed:
+            client = HttpClients.get(Upstream.QUOTA)
+
+        try:
             # base_url 尝试顺序：优先上次成功的
             preferred = self._preferred_base_url.get(key_fp)
             base_urls = list(self.base_urls)
@@ -558,7 +456,6 @@ class QuotaService:
                         )
 
                         self._preferred_base_url[key_fp] = base_url
-                        self._cache_set(key_fp, info, ok=True)
                         logger.debug(
                             "Quota query success (key=***%s, base_url=%s, strategy=%s, today=$%.2f)",
                             key_suffix, base_url, strategy, today_used
@@ -590,48 +487,22 @@ class QuotaService:
                         )
                         continue
 
-            # 全部失败：仅在非认证失败时尝试使用陈旧缓存
-            # 认证失败说明 key 已失效，不应返回旧数据
-            if not any_auth_failed and cached is not _MISSING:
-                entry = cached
-                now = time.monotonic()
-                if now < entry.stale_until and entry.value is not None:
-                    logger.info(
-                        "Quota query failed, using stale cache (key=***%s, error=%s)",
-                        key_suffix, last_error or entry.last_error or "unknown"
-                    )
-                    return entry.value
-
-            # 写入负缓存
+            # 全部失败：由缓存决定回退旧值或写入负缓存
             if any_auth_failed:
-                # 认证失败使用更长的缓存时间
-                self._cache_set(key_fp, None, ok=False, last_error=last_error)
-                self._cache[key_fp].fresh_until = time.monotonic() + self.cache_ttl_auth_error
-                self._cache[key_fp].stale_until = self._cache[key_fp].fresh_until
-            else:
-                self._cache_set(key_fp, None, ok=False, last_error=last_error)
+                raise QuotaAuthFailed(last_error or "auth failed")
+            raise QuotaTransientError(last_error or "all strategies exhausted")
 
-            logger.debug(
-                "Quota query failed for key=***%s: %s",
-                key_suffix, last_error or "all strategies exhausted"
-            )
-            return None
-
-        except httpx.TimeoutException:
+        except httpx.TimeoutException as e:
             logger.warning("Quota API timeout (key=***%s)", key_suffix)
-            self._cache_set(key_fp, None, ok=False, last_error="timeout")
-            return None
+            raise QuotaTransientError("timeout") from e
         except httpx.RequestError as e:
             logger.warning("Quota API request error (key=***%s): %s", key_suffix, e)
-            self._cache_set(key_fp, None, ok=False, last_error=str(e))
-            return None
+            raise QuotaTransientError(str(e)) from e
+        except QuotaQueryError:
+            raise
         except Exception as e:
             logger.exception("Quota API unexpected error (key=***%s): %s", key_suffix, e)
-            self._cache_set(key_fp, None, ok=False, last_error=str(e))
-            return None
-        finally:
-            if owns_client and client is not None:
-                await client.aclose()
+            raise QuotaTransientError(str(e)) from e
 
     async def batch_get_quota(
         self,
@@ -656,24 +527,15 @@ class QuotaService:
         if not key_to_reg_ids:
             return {}
 
-        # 并发控制
+        # 并发控制（连接复用共享客户端的连接池）
         semaphore = asyncio.Semaphore(self.max_concurrency)
-        limits = httpx.Limits(
-            max_connections=self.max_concurrency,
-            max_keepalive_connections=self.max_concurrency
-        )
 
-        async with httpx.AsyncClient(
-            timeout=self.timeout,
-            limits=limits,
-            follow_redirects=False
-        ) as client:
-            async def query_key(key: str) -> tuple[str, Optional[QuotaInfo]]:
-                async with semaphore:
-                    return key, await self.get_quota(key, client=client)
+        async def query_key(key: str) -> tuple[str, Optional[QuotaInfo]]:
+            async with semaphore:
+                return key, await self.get_quota(key)
 
-            tasks = [query_key(key) for key in key_to_reg_ids.keys()]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [query_key(key) for key in key_to_reg_ids.keys()]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # 构建结果映射
         quota_map: dict[int, Optional[QuotaInfo]] = {}
@@ -783,66 +645,56 @@ class QuotaService:
 
         window = int(window_seconds or self.online_window_seconds)
         key_fp = self._fingerprint(api_key)
-        key_suffix = self._key_suffix(api_key)
-
-        # 检查缓存
-        cached = self._online_cache_get(key_fp)
-        if cached is not _MISSING:
-            entry = cached
-            now = time.monotonic()
-            if now < entry.fresh_until:
-                return entry.value
-
-        owns_client = client is None
-        if owns_client:
-            limits = httpx.Limits(
-                max_connections=self.max_concurrency,
-                max_keepalive_connections=self.max_concurrency
-            )
-            client = httpx.AsyncClient(
-                timeout=self.timeout,
-                limits=limits,
-                follow_redirects=False
+        try:
+            return await self._online_cache.get(
+                (key_fp, window), lambda: self._fetch_online_status(api_key, window, client)
             )
+        except QuotaQueryError:
+            return False
 
+    async def refresh_online_status(self, api_key: str) -> Optional[bool]:
+        """跳过新鲜缓存直接查询在线状态并刷新缓存（后台轮询使用），失败返回 None"""
+        if not api_key:
+            return None
+
+        window = int(self.online_window_seconds)
+        key_fp = self._fingerprint(api_key)
         try:
-            last_error: Optional[str] = None
+            return await self._online_cache.refresh(
+                (key_fp, window), lambda: self._fetch_online_status(api_key, window, None)
+            )
+        except QuotaQueryError:
+            return None
 
-            for base_url in self.base_urls:
-                latest_ts, ok = await self._query_latest_log_ts(
-                    api_key, base_url=base_url, client=client
-                )
-                if not ok:
-                    last_error = "log_query_failed"
-                    continue
+    async def _fetch_online_status(
+        self,
+        api_key: str,
+        window: int,
+        client: Optional[httpx.AsyncClient]
+    ) -> bool:
+        """查询最新日志时间判定在线状态（缓存加载函数），全部 base_url 失败时抛出 QuotaTransientError"""
+        key_suffix = self._key_suffix(api_key)
+        if client is None or client.is_closed:
+            client = HttpClients.get(Upstream.QUOTA)
 
-                now_ts = time.time()
-                is_online = bool(
-                    latest_ts is not None and (now_ts - latest_ts) <= window
-                )
-                self._online_cache_set(key_fp, is_online, ok=True)
-                logger.debug(
-                    "Online status query success (key=***%s, is_online=%s, latest_ts=%s)",
-                    key_suffix, is_online, latest_ts
-                )
-                return is_online
-
-            # 全部失败：优先回退 stale
-            if cached is not _MISSING:
-                entry = cached
-                now = time.monotonic()
-                if now < entry.stale_until:
-                    logger.info(
-                        "Online status query failed, using stale cache (key=***%s, error=%s)",
-                        key_suffix, last_error or entry.last_error or "unknown"
-                    )
-                    return entry.value
-
-            self._online_cache_set(key_fp, False, ok=False, last_error=last_error)
-            return False
-        finally:
-            if owns_client and client is not None:
-                await client.aclose()
+        for base_url in self.base_urls:
+            latest_ts, ok = await self._query_latest_log_ts(
+                api_key, base_url=base_url, client=client
+            )
+            if not ok:
+                continue
+
+            now_ts = time.time()
+            is_online = bool(
+                latest_ts is not None and (now_ts - latest_ts) <= window
+            )
+            logger.debug(
+                "Online status query success (key=***%s, is_online=%s, latest_ts=%s)",
+                key_suffix, is_online, latest_ts
+            )
+            return is_online
+
+        raise QuotaTransientError("log_query_failed")
 
     async def batch_get_online_status(
         self,
@@ -873,26 +725,16 @@ class QuotaService:
             return status_map
 
         semaphore = asyncio.Semaphore(self.max_concurrency)
-        limits = httpx.Limits(
-            max_connections=self.max_concurrency,
-            max_keepalive_connections=self.max_concurrency
-        )
 
-        async with httpx.AsyncClient(
-            timeout=self.timeout,
-            limits=limits,
-            follow_redirects=False
-        ) as client:
-            async def query_key(key: str) -> tuple[str, bool]:
-                async with semaphore:
-                    return key, await self.get_online_status(
-                        key,
-                        window_seconds=window_seconds,
-                        client=client
-                    )
-
-            tasks = [query_key(key) for key in key_to_reg_ids.keys()]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        async def query_key(key: str) -> tuple[str, bool]:
+            async with semaphore:
+                return key, await self.get_online_status(
+                    key,
+                    window_seconds=window_seconds,
+                )
+
+        tasks = [query_key(key) for key in key_to_reg_ids.keys()]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
 
         for result in results:
             if isinstance(result, Exception):
@@ -905,5 +747,13 @@ class QuotaService:
         return status_map
 
 
+    def get_cache_metrics(self) -> dict:
+        """获取额度和在线状态缓存指标快照"""
+        return {
+            "quota": self._cache.get_metrics(),
+            "online_status": self._online_cache.get_metrics(),
+        }
+
+
 # 全局服务实例
 quota_service = QuotaService()
@@ -0,0 +1,466 @@
+"""
+排行榜引擎
+
+各排行榜统一维护为有序集合（成员 -> 分数，分数高者排前）：
+- RANKING_BACKEND=redis 时使用 Redis ZSET，多进程共享，写入路径增量 ZINCRBY/ZADD
+- 默认使用进程内有序表，按 RANKING_MEMORY_TTL_SECONDS 定期从数据库重建，弥补其他进程的写入
+- 榜单不存在（首次读取、失效后）时从数据库重建；写入路径只更新已构建的榜单，避免生成残缺榜单
+- Redis 榜单的构建标记按 RANKING_REDIS_TTL_SECONDS 过期，定期从数据库重建，修正重建期间丢失的增量
+- 报名撤回/被拒绝时移出所在比赛的榜单，重新报名时使比赛榜单失效
+- 支持前 N 名、用户排名、用户前后窗口查询，以及管理员/脚本全量重建
+
+榜单名格式为 "类型" 或 "类型:范围"（如 "cheer:1" 表示 1 号比赛的人气榜）。
+"""
+import bisect
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - 未安装 redis 时只能使用进程内榜单
+    aioredis = None
+
+# (排名, 成员, 分数)，排名从 1 开始
+RankEntry = Tuple[int, str, float]
+
+BoardLoader = Callable[[AsyncSession, Optional[str]], Awaitable[Dict[str, float]]]
+
+
+class RankingKind:
+    """排行榜类型"""
+    CHEER = "cheer"                        # 人气榜（按比赛），成员为报名ID
+    GITHUB_COMMITS = "github_commits"      # GitHub 提交数榜（按比赛），成员为报名ID
+    GITHUB_ADDITIONS = "github_additions"  # GitHub 代码增量榜（按比赛），成员为报名ID
+    PUZZLE = "puzzle"                      # 码神挑战榜，成员为用户ID
+
+
+# 按比赛划分、成员为报名ID的榜单类型
+CONTEST_BOARD_KINDS = (RankingKind.CHEER, RankingKind.GITHUB_COMMITS, RankingKind.GITHUB_ADDITIONS)
+
+
+class _MemoryBoard:
+    """进程内有序集合：字典保存分数，有序列表按 (-分数, 成员) 排列，排名查询为二分查找"""
+
+    def __init__(self, scores: Dict[str, float]):
+        self.scores = dict(scores)
+        self.order = sorted((-score, member) for member, score in self.scores.items())
+        self.loaded_at = time.monotonic()
+
+    def set(self, member: str, score: float) -> None:
+        self.remove(member)
+        self.scores[member] = score
+        bisect.insort(self.order, (-score, member))
+
+    def incr(self, member: str, delta: float) -> float:
+        score = self.scores.get(member, 0) + delta
+        self.set(member, score)
+        return score
+
+    def remove(self, member: str) -> None:
+        old = self.scores.pop(member, None)
+        if old is not None:
+            index = bisect.bisect_left(self.order, (-old, member))
+            del self.order[index]
+
+    def rank(self, member: str) -> Optional[int]:
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return bisect.bisect_left(self.order, (-score, member))
+
+    def range(self, start: int, stop: int) -> List[Tuple[str, float]]:
+        return [(member, -neg_score) for neg_score, member in self.order[max(0, start):stop]]
+
+
+class RankingService:
+    """排行榜引擎"""
+
+    _memory_boards: Dict[str, _MemoryBoard] = {}
+    _redis = None
+    _loaders: Dict[str, BoardLoader] = {}
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "reads": 0,
+        "writes": 0,
+        "rebuilds": 0,
+        "redis_errors": 0,
+    }
+
+    # =========================================================================
+    # 基础设施
+    # =========================================================================
+
+    @staticmethod
+    def board_key(kind: str, scope=None) -> str:
+        """生成榜单名"""
+        return kind if scope is None else f"{kind}:{scope}"
+
+    @staticmethod
+    def register_loader(kind: str) -> Callable[[BoardLoader], BoardLoader]:
+        """注册榜单的数据库重建函数（装饰器），函数返回 {成员: 分数}"""
+        def decorator(loader: BoardLoader) -> BoardLoader:
+            RankingService._loaders[kind] = loader
+            return loader
+        return decorator
+
+    @staticmethod
+    def _use_redis() -> bool:
+        return settings.RANKING_BACKEND == "redis" and aioredis is not None
+
+    @staticmethod
+    def _get_redis():
+        if RankingService._redis is None:
+            RankingService._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        return RankingService._redis
+
+    @staticmethod
+    def _redis_key(board: str) -> str:
+        return f"ranking:{board}"
+
+    @staticmethod
+    def _redis_marker(board: str) -> str:
+        # 空榜单在 Redis 中不存在，用标记区分"已构建的空榜单"和"未构建"
+        return f"ranking:{board}:built"
+
+    @staticmethod
+    async def close() -> None:
+        """关闭 Redis 连接（应用退出时调用）"""
+        if RankingService._redis is not None:
+            await RankingService._redis.aclose()
+            RankingService._redis = None
+
+    # =========================================================================
+    # 构建与失效
+    # =========================================================================
+
+    @staticmethod
+    async def _load(db: AsyncSession, board: str) -> Dict[str, float]:
+        """调用榜单类型对应的重建函数读取全部分数"""
+        kind, _, scope = board.partition(":")
+        loader = RankingService._loaders.get(kind)
+        if loader is None:
+            raise ValueError(f"未知的排行榜: {board}")
+        RankingService._metrics["rebuilds"] += 1
+        return await loader(db, scope or None)
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, board: str) -> int:
+        """从数据库重建榜单，返回成员数"""
+        scores = await RankingService._load(db, board)
+
+        if RankingService._use_redis():
+            try:
+                redis = RankingService._get_redis()
+                key = RankingService._redis_key(board)
+                tmp_key = f"{key}:rebuild"
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(tmp_key)
+                    if scores:
+                        pipe.zadd(tmp_key, scores)
+                        pipe.rename(tmp_key, key)
+                    else:
+                        pipe.delete(key)
+                    pipe.set(
+                        RankingService._redis_marker(board),
+                        int(time.time()),
+                        ex=settings.RANKING_REDIS_TTL_SECONDS,
+                    )
+                    await pipe.execute()
+                return len(scores)
+            except Exception as e:
+                RankingService._metrics["redis_errors"] += 1
+                logger.warning(f"Redis 排行榜重建失败，使用进程内榜单: {board}: {e}")
+
+        RankingService._memory_boards[board] = _MemoryBoard(scores)
+        return len(scores)
+
+    @staticmethod
+    async def rebuild_all(db: AsyncSession) -> Dict[str, int]:
+        """重建全部比赛的榜单及全局榜单，返回 {榜单名: 成员数}"""
+        from app.models.contest import Contest
+
+        result = await db.execute(select(Contest.id).order_by(Contest.id))
+        boards = [RankingService.board_key(RankingKind.PUZZLE)]
+        for contest_id in result.scalars().all():
+            boards.extend(RankingService.board_key(kind, contest_id) for kind in CONTEST_BOARD_KINDS)
+        return {board: await RankingService.rebuild(db, board) for board in boards}
+
+    @staticmethod
+    async def invalidate(board: str) -> None:
+        """使榜单失效，下次读取时从数据库重建"""
+        RankingService._memory_boards.pop(board, None)
+        if RankingService._use_redis():
+            try:
+                await RankingService._get_redis().delete(
+                    RankingService._redis_key(board), RankingService._redis_marker(board)
+                )
+            except Exception as e:
+                RankingService._metrics["redis_errors"] += 1
+                logger.warning(f"Redis 排行榜失效失败: {board}: {e}")
+
+    @staticmethod
+    async def remove_registration(contest_id: int, registration_id: int) -> None:
+        """报名撤回/被拒绝后，将其移出所在比赛的全部榜单"""
+        for kind in CONTEST_BOARD_KINDS:
+            await RankingService.set(RankingService.board_key(kind, contest_id), registration_id, None)
+
+    @staticmethod
+    async def invalidate_contest(contest_id: int) -> None:
+        """使比赛的全部榜单失效（报名重新生效时调用，下次读取从数据库重建）"""
+        for kind in CONTEST_BOARD_KINDS:
+            await RankingService.invalidate(RankingService.board_key(kind, contest_id))
+
+    @staticmethod
+    async def invalidate_kind(kind: str) -> None:
+        """使某类型的全部榜单失效"""
+        for board in [b for b in RankingService._memory_boards if b.partition(":")[0] == kind]:
+            del RankingService._memory_boards[board]
+        if RankingService._use_redis():
+            try:
+                redis = RankingService._get_redis()
+                keys = [key async for key in redis.scan_iter(match=f"ranking:{kind}*")]
+                if keys:
+                    await redis.delete(*keys)
+            except Exception as e:
+                RankingService._metrics["redis_errors"] += 1
+                logger.warning(f"Redis 排行榜失效失败: {kind}: {e}")
+
+    @staticmethod
+    async def _memory_board(db: AsyncSession, board: str) -> _MemoryBoard:
+        """获取进程内榜单，不存在或过期时重建"""
+        memory = RankingService._memory_boards.get(board)
+        if memory is None or time.monotonic() - memory.loaded_at >= settings.RANKING_MEMORY_TTL_SECONDS:
+            memory = _MemoryBoard(await RankingService._load(db, board))
+            RankingService._memory_boards[board] = memory
+        return memory
+
+    @staticmethod
+    async def _ensure_redis(db: AsyncSession, board: str):
+        """确保 Redis 榜单已构建，返回客户端；Redis 不可用时返回 None"""
+        try:
+            redis = RankingService._get_redis()
+            if not await redis.exists(RankingService._redis_marker(board)):
+                await RankingService.rebuild(db, board)
+            return redis
+        except Exception as e:
+            RankingService._metrics["redis_errors"] += 1
+            logger.warning(f"Redis 排行榜不可用，使用进程内榜单: {board}: {e}")
+            return None
+
+    # =========================================================================
+    # 写入（在业务事务提交后调用）
+    # =========================================================================
+
+    @staticmethod
+    async def incr(board: str, member, delta: float) -> Optional[float]:
+        """
+        累加成员分数（榜单未构建时忽略，重建时会包含该变更）
+
+        Returns:
+            累加后的分数；榜单未构建时返回 None
+        """
+        member = str(member)
+        RankingService._metrics["writes"] += 1
+        score = None
+
+        memory = RankingService._memory_boards.get(board)
+        if memory is not None:
+            score = memory.incr(member, delta)
+
+        if RankingService._use_redis():
+            try:
+                redis = RankingService._get_redis()
+                if await redis.exists(RankingService._redis_marker(board)):
+                    score = float(await redis.zincrby(RankingService._redis_key(board), delta, member))
+            except Exception as e:
+                RankingService._metrics["redis_errors"] += 1
+                logger.warning(f"Redis 排行榜写入失败，标记重建: {board}: {e}")
+                await RankingService.invalidate(board)
+                return None
+        return score
+
+    @staticmethod
+    async def set(board: str, member, score: Optional[float]) -> None:
+        """设置成员分数，score 为 None 时移出榜单（榜单未构建时忽略）"""
+        member = str(member)
+        RankingService._metrics["writes"] += 1
+
+        memory = RankingService._memory_boards.get(board)
+        if memory is not None:
+            if score is None:
+                memory.remove(member)
+            else:
+                memory.set(member, score)
+
+        if RankingService._use_redis():
+            try:
+                redis = RankingService._get_redis()
+                if await redis.exists(RankingService._redis_marker(board)):
+                    key = RankingService._redis_key(board)
+                    if score is None:
+                        await redis.zrem(key, member)
+                    else:
+                        await redis.zadd(key, {member: score})
+            except Exception as e:
+                RankingService._metrics["redis_errors"] += 1
+                logger.warning(f"Redis 排行榜写入失败，标记重建: {board}: {e}")
+                await RankingService.invalidate(board)
+
+    # =========================================================================
+    # 查询
+    # =========================================================================
+
+    @staticmethod
+    async def top(db: AsyncSession, board: str, limit: int, offset: int = 0) -> List[RankEntry]:
+        """获取第 offset+1 名起的 limit 个成员"""
+        RankingService._metrics["reads"] += 1
+        if RankingService._use_redis():
+            redis = await RankingService._ensure_redis(db, board)
+            if redis is not None:
+                rows = await redis.zrevrange(
+                    RankingService._redis_key(board), offset, offset + limit - 1, withscores=True
+                )
+                return [(offset + i + 1, member, score) for i, (member, score) in enumerate(rows)]
+
+        memory = await RankingService._memory_board(db, board)
+        rows = memory.range(offset, offset + limit)
+        return [(offset + i + 1, member, score) for i, (member, score) in enumerate(rows)]
+
+    @staticmethod
+    async def rank(db: AsyncSession, board: str, member) -> Optional[int]:
+        """获取成员排名（从 1 开始），不在榜单中返回 None"""
+        member = str(member)
+        RankingService._metrics["reads"] += 1
+        if RankingService._use_redis():
+            redis = await RankingService._ensure_redis(db, board)
+            if redis is not None:
+                index = await redis.zrevrank(RankingService._redis_key(board), member)
+                return None if index is None else index + 1
+
+        memory = await RankingService._memory_board(db, board)
+        index = memory.rank(member)
+        return None if index is None else index + 1
+
+    @staticmethod
+    async def rank_by_score(db: AsyncSession, board: str, member, score: float) -> int:
+        """成员分数为 score 时的排名（其他成员按当前分数，同分不计），用于推算变更前的名次"""
+        member = str(member)
+        RankingService._metrics["reads"] += 1
+        if RankingService._use_redis():
+            redis = await RankingService._ensure_redis(db, board)
+            if redis is not None:
+                key = RankingService._redis_key(board)
+                above = await redis.zcount(key, f"({score}", "+inf")
+                current = await redis.zscore(key, member)
+                if current is not None and float(current) > score:
+                    above -= 1
+                return above + 1
+
+        memory = await RankingService._memory_board(db, board)
+        above = bisect.bisect_left(memory.order, (-score, ""))
+        current = memory.scores.get(member)
+        if current is not None and current > score:
+            above -= 1
+        return above + 1
+
+    @staticmethod
+    async def around(db: AsyncSession, board: str, member, radius: int = 5) -> List[RankEntry]:
+        """获取成员前后各 radius 名（成员不在榜单中返回空列表）"""
+        rank = await RankingService.rank(db, board, member)
+        if rank is None:
+            return []
+        offset = max(0, rank - 1 - radius)
+        return await RankingService.top(db, board, limit=rank - offset + radius, offset=offset)
+
+    @staticmethod
+    def get_metrics() -> Dict[str, int]:
+        """获取排行榜引擎指标快照"""
+        return {
+            **RankingService._metrics,
+            "backend": "redis" if RankingService._use_redis() else "memory",
+            "memory_boards": len(RankingService._memory_boards),
+        }
+
+
+# =============================================================================
+# 榜单重建函数
+# =============================================================================
+
+async def _contest_registration_ids(db: AsyncSession, contest_id: int) -> List[int]:
+    """比赛中已提交/已通过的报名ID"""
+    from app.models.registration import Registration, RegistrationStatus
+
+    result = await db.execute(
+        select(Registration.id).where(
+            Registration.contest_id == contest_id,
+            Registration.status.in_([
+                RegistrationStatus.SUBMITTED.value,
+                RegistrationStatus.APPROVED.value,
+            ])
+        )
+    )
+    return list(result.scalars().all())
+
+
+@RankingService.register_loader(RankingKind.CHEER)
+async def _load_cheer_board(db: AsyncSession, scope: Optional[str]) -> Dict[str, float]:
+    from app.services.cheer_stats_service import CheerStatsService
+
+    registration_ids = await _contest_registration_ids(db, int(scope))
+    stats_map = await CheerStatsService.get_stats_map(db, registration_ids)
+    return {str(reg_id): float(stats.total_count) for reg_id, stats in stats_map.items()}
+
+
+async def _load_github_board(db: AsyncSession, scope: Optional[str], column) -> Dict[str, float]:
+    from app.models.github_stats import GitHubStats
+
+    registration_ids = await _contest_registration_ids(db, int(scope))
+    if not registration_ids:
+        return {}
+    result = await db.execute(
+        select(GitHubStats.registration_id, func.sum(column))
+        .where(GitHubStats.registration_id.in_(registration_ids))
+        .group_by(GitHubStats.registration_id)
+    )
+    return {str(reg_id): float(total or 0) for reg_id, total in result.fetchall()}
+
+
+@RankingService.register_loader(RankingKind.GITHUB_COMMITS)
+async def _load_github_commits_board(db: AsyncSession, scope: Optional[str]) -> Dict[str, float]:
+    from app.models.github_stats import GitHubStats
+
+    return await _load_github_board(db, scope, GitHubStats.commits_count)
+
+
+@RankingService.register_loader(RankingKind.GITHUB_ADDITIONS)
+async def _load_github_additions_board(db: AsyncSession, scope: Optional[str]) -> Dict[str, float]:
+    from app.models.github_stats import GitHubStats
+
+    return await _load_github_board(db, scope, GitHubStats.additions)
+
+
+def puzzle_score(total_solved: int, total_time: int) -> float:
+    """码神挑战分数：关卡数优先，其次用时越少越靠前"""
+    return float(total_solved) * 1e12 - float(total_time or 0)
+
+
+@RankingService.register_loader(RankingKind.PUZZLE)
+async def _load_puzzle_board(db: AsyncSession, scope: Optional[str]) -> Dict[str, float]:
+    from sqlalchemy import text
+
+    result = await db.execute(
+        text("SELECT user_id, total_solved, total_time FROM puzzle_progress WHERE total_solved > 0")
+    )
+    return {
+        str(row.user_id): puzzle_score(row.total_solved, row.total_time)
+        for row in result.fetchall()
+    }
@@ -0,0 +1,492 @@
+"""
+奖励领取服务
+
+任务奖励和成就奖励共用的领取流程：
+- 领取ID由 (类型, 用户, 奖励, 周期) 确定性生成，贯穿到 points_ledger 保证积分只发放一次
+- 一条条件 UPDATE 完成状态流转（任务 claimed_at IS NULL → 已领取，成就 unlocked → claimed），
+  以受影响行数判断是否抢到领取权，不再先查询再更新
+- 支持在一个事务内一键领取全部可领取的任务和成就奖励
+"""
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievement import AchievementStatus, UserAchievement, UserStats
+from app.models.points import PointsReason
+from app.models.task import TaskSchedule, TaskType, UserTaskClaim, UserTaskProgress
+
+logger = logging.getLogger(__name__)
+
+
+class RewardKind:
+    """奖励类型"""
+    TASK = "task"
+    ACHIEVEMENT = "achievement"
+
+
+class RewardClaimService:
+    """奖励领取服务"""
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "claimed": 0,
+        "already_claimed": 0,
+        "claim_all": 0,
+    }
+
+    @staticmethod
+    def claim_id(kind: str, user_id: int, reward_key: Any, period_start: Optional[date] = None) -> str:
+        """生成确定性的领取ID（同一奖励同一周期只会生成同一个ID）"""
+        parts = [kind, str(user_id), str(reward_key)]
+        if period_start is not None:
+            parts.append(period_start.isoformat())
+        return ":".join(parts)[:64]
+
+    # =========================================================================
+    # 任务奖励
+    # =========================================================================
+
+    @staticmethod
+    def _task_completed_condition():
+        return or_(
+            UserTaskProgress.completed_at.isnot(None),
+            UserTaskProgress.progress_value >= UserTaskProgress.target_value,
+        )
+
+    @staticmethod
+    async def claim_task(
+        db: AsyncSession,
+        user_id: int,
+        task_id: int,
+        request_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+        definition=None,
+    ) -> dict:
+        """
+        领取任务奖励（不提交事务）
+
+        Args:
+            request_id: 客户端指定的幂等ID，默认使用确定性领取ID
+            definition: 调用方已持有的任务定义快照（自动领取时传入）
+
+        Raises:
+            ValueError: 任务不存在、未启用或未完成
+        """
+        from app.services.task_service import TaskService, TaskDefinitionIndex, TaskBoardCache
+
+        now = now or datetime.utcnow()
+
+        task = definition
+        if task is None:
+            await TaskDefinitionIndex.ensure(db)
+            task = TaskDefinitionIndex.get(task_id)
+        if not task or not task.is_active:
+            raise ValueError("任务不存在或未启用")
+
+        period = TaskService.get_period(task.schedule, on_date=date.today())
+        claim_request_id = (
+            request_id or RewardClaimService.claim_id(RewardKind.TASK, user_id, task_id, period.period_start)
+        )[:64]
+
+        # 条件更新抢占领取权：只有已完成且未领取的进度会被更新
+        result = await db.execute(
+            update(UserTaskProgress)
+            .where(
+                UserTaskProgress.user_id == user_id,
+                UserTaskProgress.task_id == task_id,
+                UserTaskProgress.period_start == period.period_start,
+                UserTaskProgress.claimed_at.is_(None),
+                RewardClaimService._task_completed_condition(),
+            )
+            .values(claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+        if result.rowcount == 0:
+            progress_result = await db.execute(
+                select(UserTaskProgress.claimed_at).where(
+                    UserTaskProgress.user_id == user_id,
+                    UserTaskProgress.task_id == task_id,
+                    UserTaskProgress.period_start == period.period_start,
+                )
+            )
+            claimed_at = progress_result.scalar_one_or_none()
+            if claimed_at is None:
+                raise ValueError("任务未完成，无法领取")
+            return await RewardClaimService._already_claimed_task(
+                db, user_id, task, period.period_start, claim_request_id
+            )
+
+        TaskBoardCache.mark_claimed(user_id, task.schedule, period.period_start, task_id, now)
+
+        # 领取记录（兜底唯一约束：历史上已有领取记录时不重复发放）
+        insert_result = await db.execute(
+            insert(UserTaskClaim)
+            .values(
+                user_id=user_id,
+                task_id=task_id,
+                period_start=period.period_start,
+                reward_points=int(task.reward_points or 0),
+                reward_payload=task.reward_payload,
+                request_id=claim_request_id,
+                claimed_at=now,
+            )
+            .prefix_with("IGNORE")
+        )
+        if not insert_result.rowcount:
+            return await RewardClaimService._already_claimed_task(
+                db, user_id, task, period.period_start, claim_request_id
+            )
+
+        awarded_points = await RewardClaimService._award_task_points(
+            db, user_id, task, insert_result.lastrowid or None, claim_request_id
+        )
+
+        RewardClaimService._metrics["claimed"] += 1
+        return {
+            "success": True,
+            "task_id": task_id,
+            "already_claimed": False,
+            "period_start": period.period_start.isoformat(),
+            "reward_points": awarded_points,
+            "request_id": claim_request_id,
+        }
+
+    @staticmethod
+    async def _already_claimed_task(
+        db: AsyncSession,
+        user_id: int,
+        task,
+        period_start: date,
+        claim_request_id: str,
+    ) -> dict:
+        """已领取：幂等返回原领取记录"""
+        result = await db.execute(
+            select(UserTaskClaim).where(
+                UserTaskClaim.user_id == user_id,
+                UserTaskClaim.task_id == task.id,
+                UserTaskClaim.period_start == period_start,
+            )
+        )
+        claim = result.scalar_one_or_none()
+
+        RewardClaimService._metrics["already_claimed"] += 1
+        return {
+            "success": True,
+            "task_id": task.id,
+            "already_claimed": True,
+            "period_start": period_start.isoformat(),
+            "reward_points": claim.reward_points if claim else int(task.reward_points or 0),
+            "request_id": claim.request_id if claim else claim_request_id,
+        }
+
+    @staticmethod
+    async def _award_task_points(
+        db: AsyncSession,
+        user_id: int,
+        task,
+        claim_id: Optional[int],
+        claim_request_id: str,
+    ) -> int:
+        """发放任务奖励积分，返回发放数量"""
+        awarded_points = int(task.reward_points or 0)
+        if awarded_points <= 0:
+            return 0
+
+        from app.services.points_service import PointsService
+
+        reason = (
+            PointsReason.TASK_CHAIN_BONUS
+            if task.task_type == TaskType.CHAIN_BONUS
+            else PointsReason.TASK_REWARD
+        )
+        try:
+            await PointsService.add_points(
+                db=db,
+                user_id=user_id,
+                amount=awarded_points,
+                reason=reason,
+                ref_type="task_claim",
+                ref_id=claim_id,
+                description=f"任务奖励：{task.name}",
+                request_id=claim_request_id,
+                auto_commit=False,
+            )
+        except IntegrityError:
+            # points_ledger.request_id 已存在：幂等处理
+            pass
+        return awarded_points
+
+    # =========================================================================
+    # 成就奖励
+    # =========================================================================
+
+    @staticmethod
+    async def claim_achievement(
+        db: AsyncSession,
+        user_id: int,
+        achievement_key: str,
+        now: Optional[datetime] = None,
+    ) -> dict:
+        """
+        领取成就奖励（不提交事务）
+
+        成就积分计入 UserStats.total_points（成就积分，不进入可消费积分账本）。
+
+        Raises:
+            ValueError: 成就不存在或尚未解锁
+        """
+        from app.services import achievement_service
+
+        now = now or datetime.utcnow()
+        definitions_by_key, _ = await achievement_service.get_cached_definitions(db)
+        definition = definitions_by_key.get(achievement_key)
+        if not definition:
+            raise ValueError("成就不存在")
+
+        result = await db.execute(
+            update(UserAchievement)
+            .where(
+                UserAchievement.user_id == user_id,
+                UserAchievement.achievement_key == achievement_key,
+                UserAchievement.status == AchievementStatus.UNLOCKED.value,
+            )
+            .values(status=AchievementStatus.CLAIMED.value, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+        if result.rowcount == 0:
+            status_result = await db.execute(
+                select(UserAchievement.status).where(
+                    UserAchievement.user_id == user_id,
+                    UserAchievement.achievement_key == achievement_key,
+                )
+            )
+            if status_result.scalar_one_or_none() != AchievementStatus.CLAIMED.value:
+                raise ValueError("成就尚未解锁")
+            RewardClaimService._metrics["already_claimed"] += 1
+            return {
+                "success": True,
+                "achievement_key": achievement_key,
+                "already_claimed": True,
+                "points": int(definition["points"] or 0),
+                "request_id": RewardClaimService.claim_id(RewardKind.ACHIEVEMENT, user_id, achievement_key),
+            }
+
+        points = int(definition["points"] or 0)
+        await RewardClaimService._add_achievement_points(db, user_id, points)
+
+        RewardClaimService._metrics["claimed"] += 1
+        return {
+            "success": True,
+            "achievement_key": achievement_key,
+            "already_claimed": False,
+            "points": points,
+            "request_id": RewardClaimService.claim_id(RewardKind.ACHIEVEMENT, user_id, achievement_key),
+        }
+
+    @staticmethod
+    async def _add_achievement_points(db: AsyncSession, user_id: int, points: int) -> None:
+        """原子累加成就积分"""
+        if points <= 0:
+            return
+
+        from app.services import achievement_service
+
+        result = await db.execute(
+            update(UserStats)
+            .where(UserStats.user_id == user_id)
+            .values(total_points=UserStats.total_points + points)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await achievement_service.get_or_create_user_stats(db, user_id)
+            await db.execute(
+                update(UserStats)
+                .where(UserStats.user_id == user_id)
+                .values(total_points=UserStats.total_points + points)
+                .execution_options(synchronize_session=False)
+            )
+
+    # =========================================================================
+    # 一键领取
+    # =========================================================================
+
+    @staticmethod
+    async def claim_all(
+        db: AsyncSession,
+        user_id: int,
+        now: Optional[datetime] = None,
+    ) -> dict:
+        """
+        一键领取全部可领取的任务奖励（当前每日/每周周期）和成就奖励（不提交事务）
+
+        可领取的记录先加行锁一次性取出，再各用一条 UPDATE 批量改为已领取，全部在调用方的事务内完成。
+
+        Returns:
+            {
+                "tasks": [{"task_id", "period_start", "reward_points", "request_id"}],
+                "achievements": [{"achievement_key", "points"}],
+                "task_points": 发放的积分,
+                "achievement_points": 累加的成就积分,
+            }
+        """
+        now = now or datetime.utcnow()
+        tasks = await RewardClaimService._claim_all_tasks(db, user_id, now)
+        achievements = await RewardClaimService._claim_all_achievements(db, user_id, now)
+
+        RewardClaimService._metrics["claim_all"] += 1
+        RewardClaimService._metrics["claimed"] += len(tasks) + len(achievements)
+        return {
+            "tasks": tasks,
+            "achievements": achievements,
+            "task_points": sum(t["reward_points"] for t in tasks),
+            "achievement_points": sum(a["points"] for a in achievements),
+        }
+
+    @staticmethod
+    async def _claim_all_tasks(db: AsyncSession, user_id: int, now: datetime) -> List[dict]:
+        from app.services.task_service import TaskService, TaskDefinitionIndex, TaskBoardCache
+
+        await TaskDefinitionIndex.ensure(db)
+
+        # 当前每日/每周周期内的有效任务
+        definitions = {}
+        period_conditions = []
+        for schedule in (TaskSchedule.DAILY, TaskSchedule.WEEKLY):
+            period = TaskService.get_period(schedule, on_date=date.today())
+            schedule_tasks = TaskDefinitionIndex.active(schedule, now)
+            if not schedule_tasks:
+                continue
+            for task in schedule_tasks:
+                definitions[(task.id, period.period_start)] = task
+            period_conditions.append(and_(
+                UserTaskProgress.period_start == period.period_start,
+                UserTaskProgress.task_id.in_([t.id for t in schedule_tasks]),
+            ))
+        if not period_conditions:
+            return []
+
+        claimable = and_(
+            UserTaskProgress.user_id == user_id,
+            or_(*period_conditions),
+            UserTaskProgress.claimed_at.is_(None),
+            RewardClaimService._task_completed_condition(),
+        )
+        result = await db.execute(
+            select(UserTaskProgress.task_id, UserTaskProgress.period_start)
+            .where(claimable)
+            .with_for_update()
+        )
+        rows = [(row.task_id, row.period_start) for row in result.fetchall()]
+        rows = [row for row in rows if row in definitions]
+        if not rows:
+            return []
+
+        # 已加锁，条件更新全部命中
+        await db.execute(
+            update(UserTaskProgress)
+            .where(claimable)
+            .values(claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+        # 历史遗留的领取记录不重复发放
+        existing_result = await db.execute(
+            select(UserTaskClaim.task_id, UserTaskClaim.period_start).where(
+                UserTaskClaim.user_id == user_id,
+                or_(*[
+                    and_(UserTaskClaim.task_id == task_id, UserTaskClaim.period_start == period_start)
+                    for task_id, period_start in rows
+                ]),
+            )
+        )
+        existing = {(row.task_id, row.period_start) for row in existing_result.fetchall()}
+
+        claims = []
+        for task_id, period_start in rows:
+            task = definitions[(task_id, period_start)]
+            TaskBoardCache.mark_claimed(user_id, task.schedule, period_start, task_id, now)
+            if (task_id, period_start) in existing:
+                continue
+            claims.append({
+                "user_id": user_id,
+                "task_id": task_id,
+                "period_start": period_start,
+                "reward_points": int(task.reward_points or 0),
+                "reward_payload": task.reward_payload,
+                "request_id": RewardClaimService.claim_id(RewardKind.TASK, user_id, task_id, period_start),
+                "claimed_at": now,
+            })
+        if not claims:
+            return []
+
+        await db.execute(insert(UserTaskClaim).values(claims).prefix_with("IGNORE"))
+        id_result = await db.execute(
+            select(UserTaskClaim.id, UserTaskClaim.request_id).where(
+                UserTaskClaim.request_id.in_([c["request_id"] for c in claims])
+            )
+        )
+        claim_ids = {row.request_id: row.id for row in id_result.fetchall()}
+
+        claimed = []
+        for claim in claims:
+            task = definitions[(claim["task_id"], claim["period_start"])]
+            awarded_points = await RewardClaimService._award_task_points(
+                db, user_id, task, claim_ids.get(claim["request_id"]), claim["request_id"]
+            )
+            claimed.append({
+                "task_id": claim["task_id"],
+                "period_start": claim["period_start"].isoformat(),
+                "reward_points": awarded_points,
+                "request_id": claim["request_id"],
+            })
+        return claimed
+
+    @staticmethod
+    async def _claim_all_achievements(db: AsyncSession, user_id: int, now: datetime) -> List[dict]:
+        from app.services import achievement_service
+
+        definitions_by_key, _ = await achievement_service.get_cached_definitions(db)
+
+        result = await db.execute(
+            select(UserAchievement.achievement_key)
+            .where(
+                UserAchievement.user_id == user_id,
+                UserAchievement.status == AchievementStatus.UNLOCKED.value,
+            )
+            .with_for_update()
+        )
+        keys = [key for key in result.scalars().all() if key in definitions_by_key]
+        if not keys:
+            return []
+
+        await db.execute(
+            update(UserAchievement)
+            .where(
+                UserAchievement.user_id == user_id,
+                UserAchievement.achievement_key.in_(keys),
+                UserAchievement.status == AchievementStatus.UNLOCKED.value,
+            )
+            .values(status=AchievementStatus.CLAIMED.value, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+        claimed = [
+            {"achievement_key": key, "points": int(definitions_by_key[key]["points"] or 0)}
+            for key in keys
+        ]
+        await RewardClaimService._add_achievement_points(
+            db, user_id, sum(item["points"] for item in claimed)
+        )
+        return claimed
+
+    @staticmethod
+    def get_metrics() -> Dict[str, int]:
+        """获取领取指标快照"""
+        return dict(RewardClaimService._metrics)
@@ -4,6 +4,9 @@
 使用 APScheduler 实现定时任务：
 - 每小时同步所有选手的 GitHub 数据
 - 每日生成战报
+- 定期检查 API Key 兑换码库存
+- 每日维护任务周期（清理去重记录、预建下一周期进度）
+- 定期轮询选手 API 额度并写入快照
 """
 import logging
 from datetime import date, datetime
@@ -11,6 +14,8 @@ from typing import Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -130,6 +135,11 @@ async def sync_all_github_stats():
             await db.commit()
             logger.info(f"GitHub 数据同步完成: 成功 {success_count}, 失败 {fail_count}")
 
+            # 每日统计为覆盖写入，整类榜单失效后按需重建
+            from app.services.ranking_service import RankingService, RankingKind
+            await RankingService.invalidate_kind(RankingKind.GITHUB_COMMITS)
+            await RankingService.invalidate_kind(RankingKind.GITHUB_ADDITIONS)
+
         except Exception as e:
             logger.error(f"GitHub 数据同步任务异常: {e}")
             await db.rollback()
@@ -187,6 +197,211 @@ async def generate_daily_report():
             logger.error(f"生成每日战报异常: {e}")
 
 
+async def check_api_key_stock():
+    """
+    检查 API Key 兑换码库存
+
+    按用途和金额汇总可用库存，低于阈值的库存池输出告警日志。
+    """
+    from app.services.api_key_pool_service import ApiKeyPoolService
+
+    async with async_session_maker() as db:
+        try:
+            summary = await ApiKeyPoolService.get_stock_summary(db)
+            low_pools = [p for p in summary if p["is_low"]]
+            for pool in low_pools:
+                logger.warning(
+                    f"API Key 库存告急: 用途={pool['usage_type']}, 金额={pool['quota']}, "
+                    f"剩余 {pool['available']} 个"
+                )
+            logger.info(f"API Key 库存检查完成: {len(summary)} 个库存池, {len(low_pools)} 个告急")
+        except Exception as e:
+            logger.error(f"API Key 库存检查异常: {e}")
+
+
+async def refill_scratch_card_pool():
+    """
+    补充刮刮乐预生成卡池
+
+    作废已下线配置（或关闭卡池后全部）的封存卡片并归还库存；为当前进行中的刮刮乐活动作废旧配置的封存卡片，
+    并在余量不足时预生成新卡片。
+    """
+    from app.core.config import settings
+    from app.services.lottery_service import LotteryService
+    from app.services.scratch_pool_service import ScratchCardPoolService
+
+    async with async_session_maker() as db:
+        try:
+            config = await LotteryService.get_scratch_config(db)
+            if not settings.SCRATCH_POOL_ENABLED:
+                # 关闭卡池后购买不再领取封存卡片，全部作废并归还库存
+                config = None
+            voided = await ScratchCardPoolService.void_inactive(db, config.id if config else None)
+            await db.commit()
+            if voided:
+                logger.info(f"刮刮乐卡池清理完成: 作废已下线配置的封存卡片 {voided} 张")
+            if not config:
+                return
+            summary = await ScratchCardPoolService.refill(db, config)
+            if summary["voided"] or summary["generated"]:
+                logger.info(
+                    f"刮刮乐卡池补充完成: 配置={summary['config_id']}, 作废 {summary['voided']} 张, "
+                    f"生成 {summary['generated']} 张, 剩余 {summary['sealed']} 张"
+                )
+        except Exception as e:
+            logger.error(f"刮刮乐卡池补充异常: {e}")
+
+
+async def consume_domain_events():
+    """
+    消费领域事件发件箱
+
+    处理到期的待处理事件（任务进度、成就、系统日志），失败的事件按退避时间重试。
+    """
+    from app.services.event_bus import EventBus
+
+    try:
+        summary = await EventBus.drain()
+        if summary["retried"] or summary["failed"]:
+            logger.warning(
+                f"领域事件处理: 成功 {summary['processed']}, "
+                f"待重试 {summary['retried']}, 放弃 {summary['failed']}"
+            )
+    except Exception as e:
+        logger.error(f"领域事件消费异常: {e}")
+
+
+async def fold_cheer_stats_shards():
+    """
+    合并打气统计分片
+
+    将 cheer_stats_shards 中的增量并回 cheer_stats 并删除分片，限制分片行数量。
+    """
+    from app.services.cheer_stats_service import CheerStatsService
+
+    async with async_session_maker() as db:
+        try:
+            folded = await CheerStatsService.fold_all(db)
+            if folded:
+                logger.info(f"打气统计分片合并完成: {folded} 个选手")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"打气统计分片合并异常: {e}")
+
+
+async def poll_quota_snapshots():
+    """
+    轮询选手 API 额度
+
+    查询所有选手的额度和在线状态并写入 quota_snapshots，同时清理超过保留期的快照。
+    多个 worker 同时触发时只有取得锁的一个执行。
+    """
+    from app.services.quota_poller import QuotaPoller
+
+    try:
+        summary = await QuotaPoller.poll_all()
+        if summary:
+            logger.info(
+                f"额度轮询完成: {summary['keys']} 个 key, 快照 {summary['snapshots']} 条, "
+                f"失败 {summary['errors']}, 耗时 {summary['duration_ms']}ms"
+            )
+    except Exception as e:
+        logger.error(f"额度轮询异常: {e}")
+
+
+async def compact_quota_series():
+    """
+    压缩额度用量序列
+
+    将已结束日期的额度快照按天压缩为用量序列，并对超过一定天数的序列再降采样。
+    """
+    from app.services.quota_series_service import QuotaSeriesService
+
+    try:
+        summary = await QuotaSeriesService.run_maintenance()
+        if summary and (summary["compacted"] or summary["coarsened"]):
+            logger.info(
+                f"额度用量序列压缩完成: 写入 {summary['compacted']} 行, 再降采样 {summary['coarsened']} 行"
+            )
+    except Exception as e:
+        logger.error(f"额度用量序列压缩异常: {e}")
+
+
+async def purge_task_event_dedupe():
+    """
+    清理任务事件去重记录
+
+    删除已结束且超过保留期的每日/每周任务周期的 user_task_events 记录。
+    """
+    from app.models.task import TaskSchedule
+    from app.services.task_service import TaskService
+
+    async with async_session_maker() as db:
+        try:
+            for schedule in (TaskSchedule.DAILY, TaskSchedule.WEEKLY):
+                deleted = await TaskService.purge_event_dedupe(db, schedule)
+                if deleted:
+                    logger.info(f"任务事件去重记录清理完成: 周期={schedule.value}, 删除 {deleted} 条")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"任务事件去重记录清理异常: {e}")
+
+
+async def precreate_task_progress():
+    """
+    预建下一周期任务进度
+
+    在周期最后一天的深夜为活跃用户插入下一周期的空进度记录，削平零点的写入高峰。
+    """
+    from app.models.task import TaskSchedule
+    from app.services.task_service import TaskService
+
+    async with async_session_maker() as db:
+        try:
+            for schedule in (TaskSchedule.DAILY, TaskSchedule.WEEKLY):
+                created = await TaskService.precreate_next_period_progress(db, schedule)
+                if created:
+                    logger.info(f"下一周期任务进度预建完成: 周期={schedule.value}, 新建 {created} 条")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"预建任务进度异常: {e}")
+
+
+async def reevaluate_achievements(achievement_keys: Optional[list] = None):
+    """
+    成就批量重算（一次性任务）
+
+    管理员新增成就或调整目标后触发，按批重算全部用户的成就进度。
+    """
+    from app.services import achievement_service
+
+    try:
+        status = await achievement_service.reevaluate_all_users(achievement_keys)
+        logger.info(
+            f"成就批量重算完成: 用户 {status['processed']}, "
+            f"写入 {status['updated']} 条, 新解锁 {status['unlocked']} 个"
+        )
+    except Exception as e:
+        logger.error(f"成就批量重算异常: {e}")
+
+
+def schedule_achievement_reevaluation(achievement_keys: Optional[list] = None) -> bool:
+    """提交成就批量重算任务，调度器未运行时返回 False"""
+    if scheduler is None or not scheduler.running:
+        return False
+
+    scheduler.add_job(
+        reevaluate_achievements,
+        DateTrigger(run_date=datetime.now()),
+        args=[achievement_keys],
+        id="reevaluate_achievements",
+        name="成就批量重算",
+        replace_existing=True,
+        max_instances=1,
+    )
+    return True
+
+
 def init_scheduler():
     """初始化定时任务调度器"""
     global scheduler
@@ -211,6 +426,96 @@ def init_scheduler():
         replace_existing=True,
     )
 
+    # 每 10 分钟检查 API Key 库存
+    scheduler.add_job(
+        check_api_key_stock,
+        CronTrigger(minute="*/10"),
+        id="check_api_key_stock",
+        name="检查API Key库存",
+        replace_existing=True,
+    )
+
+    # 每分钟补充刮刮乐预生成卡池
+    scheduler.add_job(
+        refill_scratch_card_pool,
+        CronTrigger(minute="*"),
+        id="refill_scratch_card_pool",
+        name="补充刮刮乐卡池",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # 每 10 分钟合并打气统计分片
+    scheduler.add_job(
+        fold_cheer_stats_shards,
+        CronTrigger(minute="*/10"),
+        id="fold_cheer_stats_shards",
+        name="合并打气统计分片",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # 定期轮询选手 API 额度并写入快照
+    from app.core.config import settings
+    if settings.QUOTA_POLL_ENABLED:
+        scheduler.add_job(
+            poll_quota_snapshots,
+            IntervalTrigger(seconds=settings.QUOTA_POLL_INTERVAL_SECONDS),
+            id="poll_quota_snapshots",
+            name="轮询选手额度",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now(),
+        )
+
+    # 每小时第 20 分钟压缩已结束日期的额度用量序列（快照保留期内可补做遗漏的日期）
+    scheduler.add_job(
+        compact_quota_series,
+        CronTrigger(minute=20),
+        id="compact_quota_series",
+        name="压缩额度用量序列",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # 每天 03:30 清理已结束周期的任务事件去重记录
+    scheduler.add_job(
+        purge_task_event_dedupe,
+        CronTrigger(hour=3, minute=30),
+        id="purge_task_event_dedupe",
+        name="清理任务事件去重记录",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # 每天 23:30 为活跃用户预建下一周期任务进度
+    scheduler.add_job(
+        precreate_task_progress,
+        CronTrigger(hour=23, minute=30),
+        id="precreate_task_progress",
+        name="预建下一周期任务进度",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    # 消费领域事件发件箱（事件总线同步模式下无需消费）
+    if not settings.EVENT_BUS_INLINE:
+        scheduler.add_job(
+            consume_domain_events,
+            IntervalTrigger(seconds=settings.EVENT_BUS_POLL_INTERVAL_SECONDS),
+            id="consume_domain_events",
+            name="消费领域事件",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
     logger.info("定时任务调度器初始化完成")
     return scheduler
 
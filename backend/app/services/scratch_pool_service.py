@@ -0,0 +1,326 @@
+"""
+刮刮乐预生成卡池服务
+
+后台任务按奖池配置指纹预先生成一批封存卡片（奖品在生成时抽取并预占库存），
+购买时只需用 SKIP LOCKED 领取一张封存卡片并扣积分，不再在购买事务内抽奖和扣奖品库存。
+奖池配置变更后，旧指纹的封存卡片作废并归还库存；配置下线后，其封存卡片在补充任务中作废并归还库存。
+封存卡片的奖品分布可在售出前审计。
+"""
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy import select, func, and_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.points import (
+    LotteryConfig, LotteryPrize, SealedScratchCard, SealedScratchCardStatus
+)
+from app.services.inventory_service import InventoryService, InventoryKind
+
+logger = logging.getLogger(__name__)
+
+
+class ScratchCardPoolService:
+    """刮刮乐预生成卡池服务"""
+
+    # SKIP LOCKED 下候选卡片被并发事务抢先领取时的最大重试次数
+    MAX_CLAIM_ATTEMPTS = 3
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "claimed": 0,
+        "pool_misses": 0,
+        "generated": 0,
+        "voided": 0,
+    }
+
+    @staticmethod
+    def config_version(prizes: List[LotteryPrize]) -> str:
+        """
+        计算奖池配置指纹
+
+        只包含影响抽奖结果的字段，不包含库存（库存在生成时已预占）。
+        """
+        parts = sorted(
+            (
+                p.id,
+                p.prize_type.value if hasattr(p.prize_type, "value") else str(p.prize_type),
+                p.prize_name,
+                p.prize_value or "",
+                p.weight,
+                bool(p.is_rare),
+                bool(getattr(p, "is_enabled", True)),
+            )
+            for p in prizes
+        )
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    async def claim(
+        db: AsyncSession,
+        config_id: int,
+        config_version: str
+    ) -> Optional[SealedScratchCard]:
+        """
+        领取一张当前配置指纹下的封存卡片（不提交事务）
+
+        Returns:
+            领取成功返回封存卡片，卡池为空返回 None（调用方回退为实时抽奖）
+        """
+        for _ in range(ScratchCardPoolService.MAX_CLAIM_ATTEMPTS):
+            result = await db.execute(
+                select(SealedScratchCard)
+                .where(
+                    and_(
+                        SealedScratchCard.config_id == config_id,
+                        SealedScratchCard.status == SealedScratchCardStatus.SEALED,
+                        SealedScratchCard.config_version == config_version
+                    )
+                )
+                .order_by(SealedScratchCard.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            sealed = result.scalar_one_or_none()
+            if not sealed:
+                break
+
+            # 条件更新兜底：只有仍为 SEALED 时才领取
+            update_result = await db.execute(
+                update(SealedScratchCard)
+                .where(
+                    and_(
+                        SealedScratchCard.id == sealed.id,
+                        SealedScratchCard.status == SealedScratchCardStatus.SEALED
+                    )
+                )
+                .values(
+                    status=SealedScratchCardStatus.CLAIMED,
+                    claimed_at=datetime.now()
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if update_result.rowcount == 0:
+                continue
+
+            ScratchCardPoolService._metrics["claimed"] += 1
+            return sealed
+
+        ScratchCardPoolService._metrics["pool_misses"] += 1
+        return None
+
+    @staticmethod
+    async def bind_card(db: AsyncSession, sealed_id: int, card_id: int) -> None:
+        """记录封存卡片对应的用户卡片ID（卡片 flush 获得 ID 后调用）"""
+        await db.execute(
+            update(SealedScratchCard)
+            .where(SealedScratchCard.id == sealed_id)
+            .values(card_id=card_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def void_stale(db: AsyncSession, config_id: int, config_version: str) -> int:
+        """作废旧配置指纹下的封存卡片并归还预占的库存（不提交事务），返回作废数量"""
+        return await ScratchCardPoolService._void(
+            db,
+            SealedScratchCard.config_id == config_id,
+            SealedScratchCard.config_version != config_version,
+        )
+
+    @staticmethod
+    async def void_inactive(db: AsyncSession, active_config_id: Optional[int]) -> int:
+        """
+        作废已下线配置的封存卡片并归还预占的库存（不提交事务），返回作废数量
+
+        Args:
+            active_config_id: 当前进行中的刮刮乐配置ID，为空时作废全部封存卡片
+        """
+        conditions = []
+        if active_config_id is not None:
+            conditions.append(SealedScratchCard.config_id != active_config_id)
+        return await ScratchCardPoolService._void(db, *conditions)
+
+    @staticmethod
+    async def _void(db: AsyncSession, *conditions) -> int:
+        """作废满足条件的封存卡片并按奖品归还预占的库存（不提交事务）"""
+        result = await db.execute(
+            select(SealedScratchCard.id, SealedScratchCard.prize_id, SealedScratchCard.stock_reserved)
+            .where(
+                and_(
+                    SealedScratchCard.status == SealedScratchCardStatus.SEALED,
+                    *conditions
+                )
+            )
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.fetchall()
+        if not rows:
+            return 0
+
+        await db.execute(
+            update(SealedScratchCard)
+            .where(SealedScratchCard.id.in_([row.id for row in rows]))
+            .values(status=SealedScratchCardStatus.VOIDED)
+            .execution_options(synchronize_session=False)
+        )
+
+        released: Dict[int, int] = {}
+        for row in rows:
+            if row.stock_reserved:
+                released[row.prize_id] = released.get(row.prize_id, 0) + 1
+        for prize_id in sorted(released):
+            await InventoryService.release(db, InventoryKind.LOTTERY_PRIZE, prize_id, released[prize_id])
+
+        ScratchCardPoolService._metrics["voided"] += len(rows)
+        return len(rows)
+
+    @staticmethod
+    async def count_sealed(db: AsyncSession, config_id: int, config_version: str) -> int:
+        """统计当前配置指纹下剩余的封存卡片数量"""
+        result = await db.execute(
+            select(func.count(SealedScratchCard.id))
+            .where(
+                and_(
+                    SealedScratchCard.config_id == config_id,
+                    SealedScratchCard.status == SealedScratchCardStatus.SEALED,
+                    SealedScratchCard.config_version == config_version
+                )
+            )
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    async def _generate_batch(
+        db: AsyncSession,
+        config_id: int,
+        config_version: str,
+        prizes: List[LotteryPrize],
+        count: int
+    ) -> int:
+        """抽取奖品并预占库存，生成一批封存卡片（不提交事务）"""
+        from app.services.lottery_service import LotteryService
+
+        generated = 0
+        for _ in range(count):
+            try:
+                prize = await InventoryService.reserve_drawn(
+                    db, InventoryKind.LOTTERY_PRIZE, prizes, LotteryService._select_prize
+                )
+            except ValueError:
+                # 奖池已无可用奖品
+                break
+            db.add(SealedScratchCard(
+                config_id=config_id,
+                config_version=config_version,
+                prize_id=prize.id,
+                prize_type=prize.prize_type.value,
+                prize_name=prize.prize_name,
+                prize_value=prize.prize_value,
+                is_rare=prize.is_rare,
+                stock_reserved=prize.stock is not None,
+                status=SealedScratchCardStatus.SEALED
+            ))
+            generated += 1
+        return generated
+
+    @staticmethod
+    async def refill(db: AsyncSession, config: LotteryConfig) -> Dict[str, int]:
+        """
+        补充刮刮乐卡池（会分批提交事务）
+
+        先作废旧配置指纹的封存卡片，剩余封存卡片低于阈值时补充到目标数量。
+        """
+        from app.services.lottery_service import LotteryService
+
+        prizes = await LotteryService.get_prizes(db, config.id)
+        version = ScratchCardPoolService.config_version(prizes)
+
+        voided = await ScratchCardPoolService.void_stale(db, config.id, version)
+        await db.commit()
+
+        sealed = await ScratchCardPoolService.count_sealed(db, config.id, version)
+        generated = 0
+        if sealed < settings.SCRATCH_POOL_REFILL_THRESHOLD:
+            remaining = settings.SCRATCH_POOL_TARGET_SIZE - sealed
+            batch_size = max(1, settings.SCRATCH_POOL_BATCH_SIZE)
+            while remaining > 0:
+                try:
+                    batch = await ScratchCardPoolService._generate_batch(
+                        db, config.id, version, prizes, min(batch_size, remaining)
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+                if batch == 0:
+                    break
+                generated += batch
+                remaining -= batch
+
+        ScratchCardPoolService._metrics["generated"] += generated
+        return {
+            "config_id": config.id,
+            "voided": voided,
+            "generated": generated,
+            "sealed": sealed + generated,
+        }
+
+    @staticmethod
+    async def get_pool_summary(db: AsyncSession, config_id: int) -> Dict[str, Any]:
+        """卡池审计：按状态统计数量，并列出封存卡片的奖品分布"""
+        from app.services.lottery_service import LotteryService
+
+        prizes = await LotteryService.get_prizes(db, config_id)
+        version = ScratchCardPoolService.config_version(prizes)
+
+        status_result = await db.execute(
+            select(SealedScratchCard.status, func.count(SealedScratchCard.id))
+            .where(SealedScratchCard.config_id == config_id)
+            .group_by(SealedScratchCard.status)
+        )
+        by_status = {status.value: 0 for status in SealedScratchCardStatus}
+        for status, count in status_result.fetchall():
+            by_status[status.value if hasattr(status, "value") else status] = count
+
+        outcome_result = await db.execute(
+            select(
+                SealedScratchCard.prize_id,
+                SealedScratchCard.prize_name,
+                SealedScratchCard.is_rare,
+                func.count(SealedScratchCard.id).label("count")
+            )
+            .where(
+                and_(
+                    SealedScratchCard.config_id == config_id,
+                    SealedScratchCard.status == SealedScratchCardStatus.SEALED,
+                    SealedScratchCard.config_version == version
+                )
+            )
+            .group_by(SealedScratchCard.prize_id, SealedScratchCard.prize_name, SealedScratchCard.is_rare)
+            .order_by(func.count(SealedScratchCard.id).desc())
+        )
+
+        return {
+            "config_id": config_id,
+            "config_version": version,
+            "by_status": by_status,
+            "sealed_outcomes": [
+                {
+                    "prize_id": row.prize_id,
+                    "prize_name": row.prize_name,
+                    "is_rare": row.is_rare,
+                    "count": row.count,
+                }
+                for row in outcome_result.fetchall()
+            ],
+            "metrics": ScratchCardPoolService.get_metrics(),
+        }
+
+    @staticmethod
+    def get_metrics() -> Dict[str, int]:
+        """获取卡池指标快照"""
+        return dict(ScratchCardPoolService._metrics)
@@ -18,6 +18,8 @@ from app.models.slot_machine import (
 )
 from app.models.points import PointsReason
 from app.services.points_service import PointsService
+from app.services.play_history_service import PlayHistoryService
+from app.models.play_event import PlayGame
 
 
 class SlotMachineService:
@@ -525,6 +527,15 @@ class SlotMachineService:
             request_id=request_id or str(uuid.uuid4()),
         )
         db.add(draw)
+        await db.flush()
+
+        await PlayHistoryService.record(
+            db, user_id, PlayGame.SLOT, draw.id,
+            cost_points=cost,
+            payout_points=payout,
+            prize_name=win_name or None,
+            is_rare=is_jackpot
+        )
 
         await db.commit()
 
@@ -15,24 +15,25 @@
 """
 from __future__ import annotations
 
+import hashlib
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import Optional, Any, List
+from typing import Optional, Any, List, Dict, Tuple
 
-from sqlalchemy import select, and_, or_, func, case, update
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, and_, or_, func, case, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.mysql import insert
 
+from app.core.config import settings
 from app.models.task import (
     TaskDefinition,
     TaskSchedule,
     TaskType,
     UserTaskProgress,
-    UserTaskClaim,
     UserTaskEvent,
 )
-from app.models.points import PointsReason
 
 
 @dataclass(frozen=True)
@@ -43,6 +44,319 @@ class TaskPeriod:
     period_end: date
 
 
+@dataclass
+class TaskProgressState:
+    """
+    用户任务进度状态（record_event 单次请求内的进度缓存项）
+
+    由一次批量加锁查询得到，进度累加后在内存中按与 SQL 相同的规则推算，不再回读。
+    """
+    task_id: int
+    period_start: date
+    progress_value: int
+    target_value: int
+    completed_at: Optional[datetime] = None
+    claimed_at: Optional[datetime] = None
+    last_event_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class TaskDefinitionSnapshot:
+    """任务定义快照（进程内索引使用，脱离数据库会话）"""
+    id: int
+    task_key: str
+    name: str
+    description: Optional[str]
+    schedule: TaskSchedule
+    task_type: TaskType
+    target_value: int
+    reward_points: int
+    reward_payload: Optional[dict]
+    is_active: bool
+    auto_claim: bool
+    sort_order: int
+    starts_at: Optional[datetime]
+    ends_at: Optional[datetime]
+    chain_group_key: Optional[str]
+    chain_requires_group_key: Optional[str]
+    created_by: Optional[int]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, task: TaskDefinition) -> "TaskDefinitionSnapshot":
+        return cls(**{f: getattr(task, f) for f in cls.__dataclass_fields__})
+
+    def is_effective(self, now: datetime) -> bool:
+        """是否在有效期内"""
+        return (
+            (self.starts_at is None or self.starts_at <= now)
+            and (self.ends_at is None or self.ends_at >= now)
+        )
+
+
+class TaskDefinitionIndex:
+    """
+    进程内任务定义索引
+
+    按 (schedule, task_type) 和任务链分组索引全部启用的任务定义，
+    事件匹配与任务链检查不再查询 task_definitions。
+    本进程修改定义时立即失效；其他进程的修改通过定期比对版本指纹（数量、最大 ID、最近更新时间）发现。
+    """
+
+    _version = 0
+    _loaded_version = -1
+    _fingerprint: Optional[tuple] = None
+    _checked_at = 0.0
+
+    _by_id: Dict[int, TaskDefinitionSnapshot] = {}
+    _by_type: Dict[Tuple[TaskSchedule, TaskType], List[TaskDefinitionSnapshot]] = {}
+    _by_schedule: Dict[TaskSchedule, List[TaskDefinitionSnapshot]] = {}
+    _chain_tasks: Dict[TaskSchedule, List[TaskDefinitionSnapshot]] = {}
+    _group_tasks: Dict[Tuple[TaskSchedule, str], List[TaskDefinitionSnapshot]] = {}
+
+    @staticmethod
+    def invalidate() -> None:
+        """任务定义变更后调用，下次访问时重建索引"""
+        TaskDefinitionIndex._version += 1
+
+    @staticmethod
+    async def _load_fingerprint(db: AsyncSession) -> tuple:
+        result = await db.execute(
+            select(
+                func.count(TaskDefinition.id),
+                func.max(TaskDefinition.id),
+                func.max(TaskDefinition.updated_at),
+            )
+        )
+        return tuple(result.one())
+
+    @staticmethod
+    async def ensure(db: AsyncSession) -> None:
+        """确保索引为最新版本（TTL 内不访问数据库）"""
+        version = TaskDefinitionIndex._version
+        now = time.monotonic()
+        if (
+            TaskDefinitionIndex._loaded_version == version
+            and now - TaskDefinitionIndex._checked_at < settings.TASK_DEFINITION_INDEX_TTL_SECONDS
+        ):
+            return
+
+        fingerprint = await TaskDefinitionIndex._load_fingerprint(db)
+        if TaskDefinitionIndex._loaded_version == version and fingerprint == TaskDefinitionIndex._fingerprint:
+            TaskDefinitionIndex._checked_at = now
+            return
+
+        result = await db.execute(
+            select(TaskDefinition)
+            .where(TaskDefinition.is_active == True)
+            .order_by(TaskDefinition.sort_order.asc(), TaskDefinition.id.asc())
+        )
+        by_id: Dict[int, TaskDefinitionSnapshot] = {}
+        by_type: Dict[Tuple[TaskSchedule, TaskType], List[TaskDefinitionSnapshot]] = {}
+        by_schedule: Dict[TaskSchedule, List[TaskDefinitionSnapshot]] = {}
+        chain_tasks: Dict[TaskSchedule, List[TaskDefinitionSnapshot]] = {}
+        group_tasks: Dict[Tuple[TaskSchedule, str], List[TaskDefinitionSnapshot]] = {}
+
+        for task in result.scalars().all():
+            snapshot = TaskDefinitionSnapshot.from_model(task)
+            by_id[snapshot.id] = snapshot
+            by_schedule.setdefault(snapshot.schedule, []).append(snapshot)
+            by_type.setdefault((snapshot.schedule, snapshot.task_type), []).append(snapshot)
+            if snapshot.task_type == TaskType.CHAIN_BONUS:
+                chain_tasks.setdefault(snapshot.schedule, []).append(snapshot)
+            elif snapshot.chain_group_key:
+                group_tasks.setdefault((snapshot.schedule, snapshot.chain_group_key), []).append(snapshot)
+
+        TaskDefinitionIndex._by_id = by_id
+        TaskDefinitionIndex._by_type = by_type
+        TaskDefinitionIndex._by_schedule = by_schedule
+        TaskDefinitionIndex._chain_tasks = chain_tasks
+        TaskDefinitionIndex._group_tasks = group_tasks
+        TaskDefinitionIndex._fingerprint = fingerprint
+        TaskDefinitionIndex._loaded_version = version
+        TaskDefinitionIndex._checked_at = now
+
+    @staticmethod
+    def version_key() -> tuple:
+        """当前已加载索引的版本标识（含进程内版本号，只用于本进程缓存失效）"""
+        return (TaskDefinitionIndex._loaded_version, TaskDefinitionIndex._fingerprint)
+
+    @staticmethod
+    def fingerprint() -> Optional[tuple]:
+        """当前已加载索引的数据库指纹（各进程一致，可用于 ETag）"""
+        return TaskDefinitionIndex._fingerprint
+
+    @staticmethod
+    def get(task_id: int) -> Optional[TaskDefinitionSnapshot]:
+        """按ID获取启用的任务定义"""
+        return TaskDefinitionIndex._by_id.get(task_id)
+
+    @staticmethod
+    def match(schedule: TaskSchedule, task_type: TaskType, now: datetime) -> List[TaskDefinitionSnapshot]:
+        """匹配当前有效的任务定义（按 sort_order、id 排序）"""
+        return [
+            t for t in TaskDefinitionIndex._by_type.get((schedule, task_type), [])
+            if t.is_effective(now)
+        ]
+
+    @staticmethod
+    def active(schedule: TaskSchedule, now: datetime) -> List[TaskDefinitionSnapshot]:
+        """某周期类型下当前有效的全部任务定义"""
+        return [t for t in TaskDefinitionIndex._by_schedule.get(schedule, []) if t.is_effective(now)]
+
+    @staticmethod
+    def chain_tasks(schedule: TaskSchedule, now: datetime) -> List[TaskDefinitionSnapshot]:
+        """当前有效的任务链奖励定义"""
+        return [t for t in TaskDefinitionIndex._chain_tasks.get(schedule, []) if t.is_effective(now)]
+
+    @staticmethod
+    def group_tasks(schedule: TaskSchedule, group_key: str, now: datetime) -> List[TaskDefinitionSnapshot]:
+        """任务链依赖分组内当前有效的任务定义"""
+        return [
+            t for t in TaskDefinitionIndex._group_tasks.get((schedule, group_key), [])
+            if t.is_effective(now)
+        ]
+
+
+@dataclass
+class TaskBoardEntry:
+    """单个用户单个周期的任务面板快照"""
+    definitions_key: tuple
+    period: TaskPeriod
+    definitions: List[TaskDefinitionSnapshot]
+    serialized: List[dict]
+    progress: Dict[int, TaskProgressState]
+    board: Optional[dict] = None
+    etag: Optional[str] = None
+
+    def fingerprint(self) -> tuple:
+        """与 TaskBoardCache.load_fingerprint 口径一致的进度指纹"""
+        states = self.progress.values()
+        return (
+            len(self.progress),
+            sum(state.progress_value for state in states),
+            sum(1 for state in states if state.claimed_at),
+        )
+
+
+class TaskBoardCache:
+    """
+    进程内用户任务面板缓存
+
+    按 (user_id, schedule, period_start) 缓存组装好的任务面板，record_event / claim_task_reward
+    写入进度时原地更新。进度只增不减、领取只会新增，因此 (记录数, 进度之和, 已领取数) 的指纹
+    能反映面板的任何变化：读取时先用一条聚合查询校验指纹，其他进程的写入或回滚的原地更新都会被发现并重建。
+    周期切换后旧周期的快照不再命中，并在首次访问新周期时清理。
+    """
+
+    _entries: "OrderedDict[Tuple[int, TaskSchedule, date], TaskBoardEntry]" = OrderedDict()
+    _current_period: Dict[TaskSchedule, date] = {}
+
+    # 运行指标（进程内）
+    _metrics: Dict[str, int] = {
+        "hits": 0,
+        "rebuilds": 0,
+        "in_place_updates": 0,
+    }
+
+    @staticmethod
+    def get(user_id: int, schedule: TaskSchedule, period_start: date) -> Optional[TaskBoardEntry]:
+        key = (user_id, schedule, period_start)
+        entry = TaskBoardCache._entries.get(key)
+        if entry is not None:
+            TaskBoardCache._entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def put(user_id: int, entry: TaskBoardEntry) -> None:
+        schedule = entry.period.schedule
+        period_start = entry.period.period_start
+
+        # 周期切换：清理该周期类型下的旧快照
+        current = TaskBoardCache._current_period.get(schedule)
+        if current is None or period_start > current:
+            TaskBoardCache._current_period[schedule] = period_start
+            if current is not None:
+                for key in [k for k in TaskBoardCache._entries if k[1] == schedule and k[2] < period_start]:
+                    del TaskBoardCache._entries[key]
+
+        TaskBoardCache._entries[(user_id, schedule, period_start)] = entry
+        TaskBoardCache._entries.move_to_end((user_id, schedule, period_start))
+        while len(TaskBoardCache._entries) > settings.TASK_BOARD_CACHE_MAX_ENTRIES:
+            TaskBoardCache._entries.popitem(last=False)
+
+    @staticmethod
+    def apply(user_id: int, schedule: TaskSchedule, period_start: date, states) -> None:
+        """进度或领取状态变化后原地更新快照（快照不存在时忽略）"""
+        entry = TaskBoardCache._entries.get((user_id, schedule, period_start))
+        if entry is None:
+            return
+        task_ids = {d.id for d in entry.definitions}
+        changed = False
+        for state in states:
+            if state.task_id in task_ids:
+                entry.progress[state.task_id] = state
+                changed = True
+        if changed:
+            entry.board = None
+            entry.etag = None
+            TaskBoardCache._metrics["in_place_updates"] += 1
+
+    @staticmethod
+    def mark_claimed(
+        user_id: int,
+        schedule: TaskSchedule,
+        period_start: date,
+        task_id: int,
+        claimed_at: datetime,
+    ) -> None:
+        """任务奖励领取后原地更新快照"""
+        entry = TaskBoardCache._entries.get((user_id, schedule, period_start))
+        if entry is None:
+            return
+        state = entry.progress.get(task_id)
+        if state is None or state.claimed_at:
+            return
+        entry.progress[task_id] = TaskProgressState(**{**state.__dict__, "claimed_at": claimed_at})
+        entry.board = None
+        entry.etag = None
+        TaskBoardCache._metrics["in_place_updates"] += 1
+
+    @staticmethod
+    def clear() -> None:
+        TaskBoardCache._entries.clear()
+
+    @staticmethod
+    async def load_fingerprint(
+        db: AsyncSession,
+        user_id: int,
+        period_start: date,
+        task_ids: List[int],
+    ) -> tuple:
+        """从数据库读取进度指纹：(记录数, 进度之和, 已领取数)"""
+        if not task_ids:
+            return (0, 0, 0)
+        result = await db.execute(
+            select(
+                func.count(UserTaskProgress.id),
+                func.coalesce(func.sum(UserTaskProgress.progress_value), 0),
+                func.count(UserTaskProgress.claimed_at),
+            ).where(
+                UserTaskProgress.user_id == user_id,
+                UserTaskProgress.task_id.in_(task_ids),
+                UserTaskProgress.period_start == period_start,
+            )
+        )
+        count, total, claimed = result.one()
+        return (int(count or 0), int(total or 0), int(claimed or 0))
+
+    @staticmethod
+    def get_metrics() -> Dict[str, int]:
+        """获取任务面板缓存指标快照"""
+        return {**TaskBoardCache._metrics, "entries": len(TaskBoardCache._entries)}
+
+
 class TaskService:
     """任务系统服务"""
 
@@ -181,6 +495,7 @@ class TaskService:
         )
         db.add(task)
         await db.flush()
+        TaskDefinitionIndex.invalidate()
         return task
 
     @staticmethod
@@ -202,6 +517,7 @@ class TaskService:
                 setattr(task, key, value)
 
         await db.flush()
+        TaskDefinitionIndex.invalidate()
         return task
 
     @staticmethod
@@ -219,6 +535,7 @@ class TaskService:
 
         task.is_active = False
         await db.flush()
+        TaskDefinitionIndex.invalidate()
         return True
 
     @staticmethod
@@ -281,44 +598,93 @@ class TaskService:
                 "stats": {"total": 6, "completed": 3, "claimed": 2}
             }
         """
-        now = now or datetime.utcnow()
-        period = TaskService.get_period(schedule, on_date=on_date)
-
-        # 获取有效的任务定义
-        definitions = await TaskService.list_definitions(
+        board, _ = await TaskService.get_user_task_board(
             db=db,
+            user_id=user_id,
             schedule=schedule,
-            include_inactive=False,
+            on_date=on_date,
             now=now,
         )
+        return board
 
-        if not definitions:
-            return {
-                "schedule": schedule.value,
-                "period_start": period.period_start.isoformat(),
-                "period_end": period.period_end.isoformat(),
-                "items": [],
-                "stats": {"total": 0, "completed": 0, "claimed": 0},
-            }
+    @staticmethod
+    async def get_user_task_board(
+        db: AsyncSession,
+        user_id: int,
+        schedule: TaskSchedule,
+        on_date: Optional[date] = None,
+        now: Optional[datetime] = None,
+    ) -> Tuple[dict, str]:
+        """
+        获取用户任务面板及其 ETag
+
+        快照命中且指纹一致时只执行一条聚合查询，不再查询任务定义和逐条组装。
+
+        Returns:
+            (get_user_tasks 格式的面板, ETag)
+        """
+        now = now or datetime.utcnow()
+        period = TaskService.get_period(schedule, on_date=on_date)
 
-        # 批量查询用户进度
+        # 有效的任务定义（进程内索引）
+        await TaskDefinitionIndex.ensure(db)
+        definitions = TaskDefinitionIndex.active(schedule, now)
+        definitions_key = (TaskDefinitionIndex.version_key(), tuple(d.id for d in definitions))
         task_ids = [d.id for d in definitions]
-        result = await db.execute(
-            select(UserTaskProgress).where(
-                UserTaskProgress.user_id == user_id,
-                UserTaskProgress.task_id.in_(task_ids),
-                UserTaskProgress.period_start == period.period_start,
+
+        fingerprint = await TaskBoardCache.load_fingerprint(db, user_id, period.period_start, task_ids)
+
+        entry = TaskBoardCache.get(user_id, schedule, period.period_start)
+        if (
+            entry is not None
+            and entry.definitions_key == definitions_key
+            and entry.fingerprint() == fingerprint
+        ):
+            TaskBoardCache._metrics["hits"] += 1
+        else:
+            progress = await TaskService._load_progress_states(
+                db=db,
+                user_id=user_id,
+                period_start=period.period_start,
+                task_ids=task_ids,
             )
-        )
-        progress_map = {p.task_id: p for p in result.scalars().all()}
+            entry = TaskBoardEntry(
+                definitions_key=definitions_key,
+                period=period,
+                definitions=definitions,
+                serialized=[TaskService.serialize_definition(d) for d in definitions],
+                progress=progress,
+            )
+            TaskBoardCache.put(user_id, entry)
+            TaskBoardCache._metrics["rebuilds"] += 1
+
+        if entry.board is None:
+            entry.board = TaskService._render_task_board(entry)
+            # ETag 只由定义指纹和进度指纹构成，不含进程内版本号，切换 worker 后仍能命中 If-None-Match
+            digest = hashlib.sha1(
+                repr((
+                    user_id,
+                    schedule.value,
+                    period.period_start,
+                    TaskDefinitionIndex.fingerprint(),
+                    definitions_key[1],
+                    entry.fingerprint(),
+                )).encode("utf-8")
+            ).hexdigest()
+            entry.etag = f'"{digest[:32]}"'
+
+        return entry.board, entry.etag
 
-        # 组装结果
+    @staticmethod
+    def _render_task_board(entry: TaskBoardEntry) -> dict:
+        """根据快照组装任务面板"""
+        period = entry.period
         items = []
         completed_count = 0
         claimed_count = 0
 
-        for task in definitions:
-            progress = progress_map.get(task.id)
+        for task, serialized in zip(entry.definitions, entry.serialized):
+            progress = entry.progress.get(task.id)
             progress_value = progress.progress_value if progress else 0
             target_value = progress.target_value if progress else task.target_value
 
@@ -338,7 +704,7 @@ class TaskService:
             )
 
             items.append({
-                "task": TaskService.serialize_definition(task),
+                "task": serialized,
                 "progress": {
                     "period_start": period.period_start.isoformat(),
                     "period_end": period.period_end.isoformat(),
@@ -354,7 +720,7 @@ class TaskService:
             })
 
         return {
-            "schedule": schedule.value,
+            "schedule": period.schedule.value,
             "period_start": period.period_start.isoformat(),
             "period_end": period.period_end.isoformat(),
             "items": items,
@@ -414,6 +780,8 @@ class TaskService:
         claimed = 0
         skipped = 0
 
+        await TaskDefinitionIndex.ensure(db)
+
         # 同一事件同时驱动 DAILY 和 WEEKLY 任务
         for schedule in (TaskSchedule.DAILY, TaskSchedule.WEEKLY):
             period = TaskService.get_period(schedule, on_date=date.today())
@@ -434,32 +802,48 @@ class TaskService:
                     skipped += 1
                     continue
 
-            # 查找匹配的任务定义
-            definitions = await TaskService._match_definitions(
-                db=db,
-                schedule=schedule,
-                task_type=task_type,
-                now=now,
-            )
+            # 查找匹配的任务定义（CHAIN_BONUS 不由事件直接驱动）
+            definitions = [
+                task for task in TaskService._match_definitions(schedule, task_type, now)
+                if task.task_type != TaskType.CHAIN_BONUS
+            ]
 
             if not definitions:
                 continue
 
-            for task in definitions:
-                # CHAIN_BONUS 不由事件直接驱动
-                if task.task_type == TaskType.CHAIN_BONUS:
-                    continue
+            # 本周期进度缓存：一次加锁读取匹配任务及任务链相关任务的进度
+            # （只锁定已存在的记录，不产生间隙锁）
+            chain_definitions = TaskDefinitionIndex.chain_tasks(schedule, now)
+            task_ids = {task.id for task in definitions}
+            for chain_task in chain_definitions:
+                task_ids.add(chain_task.id)
+                if chain_task.chain_requires_group_key:
+                    task_ids.update(
+                        t.id for t in TaskDefinitionIndex.group_tasks(
+                            schedule, chain_task.chain_requires_group_key, now
+                        )
+                    )
+            progress_cache = await TaskService._load_progress_states(
+                db=db,
+                user_id=user_id,
+                period_start=period.period_start,
+                task_ids=task_ids,
+                for_update=True,
+            )
 
-                # 更新进度
-                progress = await TaskService._increment_progress(
-                    db=db,
-                    user_id=user_id,
-                    definition=task,
-                    period=period,
-                    delta=delta,
-                    now=now,
-                )
+            # 一条语句批量累加全部匹配任务的进度
+            progress_map = await TaskService._increment_progress_batch(
+                db=db,
+                user_id=user_id,
+                definitions=definitions,
+                period=period,
+                delta=delta,
+                now=now,
+                progress_cache=progress_cache,
+            )
 
+            for task in definitions:
+                progress = progress_map.get(task.id)
                 if progress:
                     updated += 1
 
@@ -470,43 +854,33 @@ class TaskService:
                             user_id=user_id,
                             progress=progress,
                             definition=task,
+                            now=now,
                         )
                         if result:
                             claimed += 1
 
             # 检查任务链奖励
-            chain_claimed = await TaskService._check_and_award_chain_bonuses(
-                db=db,
-                user_id=user_id,
-                schedule=schedule,
-                period=period,
-                now=now,
-            )
-            claimed += chain_claimed
+            if chain_definitions:
+                chain_claimed = await TaskService._check_and_award_chain_bonuses(
+                    db=db,
+                    user_id=user_id,
+                    schedule=schedule,
+                    period=period,
+                    now=now,
+                    progress_cache=progress_cache,
+                )
+                claimed += chain_claimed
 
         return {"updated": updated, "claimed": claimed, "skipped": skipped}
 
     @staticmethod
-    async def _match_definitions(
-        db: AsyncSession,
+    def _match_definitions(
         schedule: TaskSchedule,
         task_type: TaskType,
         now: datetime,
-    ) -> List[TaskDefinition]:
-        """匹配任务定义"""
-        stmt = (
-            select(TaskDefinition)
-            .where(
-                TaskDefinition.is_active == True,
-                TaskDefinition.schedule == schedule,
-                TaskDefinition.task_type == task_type,
-                or_(TaskDefinition.starts_at.is_(None), TaskDefinition.starts_at <= now),
-                or_(TaskDefinition.ends_at.is_(None), TaskDefinition.ends_at >= now),
-            )
-            .order_by(TaskDefinition.sort_order.asc(), TaskDefinition.id.asc())
-        )
-        result = await db.execute(stmt)
-        return list(result.scalars().all())
+    ) -> List[TaskDefinitionSnapshot]:
+        """匹配任务定义（从进程内索引读取，调用前需 TaskDefinitionIndex.ensure）"""
+        return TaskDefinitionIndex.match(schedule, task_type, now)
 
     @staticmethod
     async def _insert_event_dedupe(
@@ -543,81 +917,214 @@ class TaskService:
         # MySQL: INSERT IGNORE 成功返回 rowcount=1，重复返回 0
         return bool(getattr(result, "rowcount", 0))
 
+    @staticmethod
+    async def _load_progress_states(
+        db: AsyncSession,
+        user_id: int,
+        period_start: date,
+        task_ids,
+        for_update: bool = False,
+    ) -> Dict[int, TaskProgressState]:
+        """
+        批量读取用户在某周期的任务进度
+
+        for_update=True 时只对已存在的记录加行锁：先按唯一键查出主键，再按主键加锁读取最新值。
+        按唯一键直接加锁读取不存在的记录会在 REPEATABLE READ 下产生间隙锁，
+        同一用户的并发事件随后插入进度记录时会互相死锁。
+
+        Returns:
+            {task_id: TaskProgressState}，不存在的记录不包含在内
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+
+        stmt = select(
+            UserTaskProgress.task_id,
+            UserTaskProgress.progress_value,
+            UserTaskProgress.target_value,
+            UserTaskProgress.completed_at,
+            UserTaskProgress.claimed_at,
+            UserTaskProgress.last_event_at,
+        ).where(
+            UserTaskProgress.user_id == user_id,
+            UserTaskProgress.task_id.in_(task_ids),
+            UserTaskProgress.period_start == period_start,
+        )
+        if for_update:
+            id_result = await db.execute(
+                select(UserTaskProgress.id).where(
+                    UserTaskProgress.user_id == user_id,
+                    UserTaskProgress.task_id.in_(task_ids),
+                    UserTaskProgress.period_start == period_start,
+                )
+            )
+            progress_ids = list(id_result.scalars().all())
+            if not progress_ids:
+                return {}
+            stmt = stmt.where(UserTaskProgress.id.in_(progress_ids)).with_for_update()
+
+        result = await db.execute(stmt)
+        return {
+            row.task_id: TaskProgressState(
+                task_id=row.task_id,
+                period_start=period_start,
+                progress_value=int(row.progress_value or 0),
+                target_value=int(row.target_value or 1),
+                completed_at=row.completed_at,
+                claimed_at=row.claimed_at,
+                last_event_at=row.last_event_at,
+            )
+            for row in result.fetchall()
+        }
+
     @staticmethod
     async def _increment_progress(
         db: AsyncSession,
         user_id: int,
-        definition: TaskDefinition,
+        definition: TaskDefinitionSnapshot,
+        period: TaskPeriod,
+        delta: int,
+        now: datetime,
+        progress_cache: Optional[Dict[int, TaskProgressState]] = None,
+    ) -> Optional[TaskProgressState]:
+        """并发安全的单个任务进度累加"""
+        progress_map = await TaskService._increment_progress_batch(
+            db=db,
+            user_id=user_id,
+            definitions=[definition],
+            period=period,
+            delta=delta,
+            now=now,
+            progress_cache=progress_cache,
+        )
+        return progress_map.get(definition.id)
+
+    @staticmethod
+    async def _increment_progress_batch(
+        db: AsyncSession,
+        user_id: int,
+        definitions: List[TaskDefinitionSnapshot],
         period: TaskPeriod,
         delta: int,
         now: datetime,
-    ) -> Optional[UserTaskProgress]:
+        progress_cache: Optional[Dict[int, TaskProgressState]] = None,
+    ) -> Dict[int, TaskProgressState]:
         """
-        并发安全的进度累加
+        并发安全的批量进度累加
+
+        所有任务的进度用一条多行 INSERT ... ON DUPLICATE KEY UPDATE 原子累加。
+        累加前的进度来自 progress_cache（调用方已加锁读取，缓存中没有即记录不存在），
+        未传入时先按主键加锁读取一次；已有记录累加后的状态在内存中按与 SQL 相同的规则推算，不再回读。
+        不存在的记录（每周期首个事件）可能与并发插入合并，只对这部分加锁回读。
+        推算/回读结果写回 progress_cache。
 
-        使用 INSERT ... ON DUPLICATE KEY UPDATE 实现原子操作
+        Returns:
+            {task_id: TaskProgressState}
         """
-        target = max(1, int(definition.target_value or 1))
-        delta = int(delta)
+        if not definitions:
+            return {}
 
-        # 构建 INSERT ... ON DUPLICATE KEY UPDATE
-        stmt = insert(UserTaskProgress).values(
-            user_id=user_id,
-            task_id=definition.id,
-            period_start=period.period_start,
-            period_end=period.period_end,
-            progress_value=min(delta, target),
-            target_value=target,
-            completed_at=(now if delta >= target else None),
-            last_event_at=now,
-        )
+        if progress_cache is None:
+            progress_cache = await TaskService._load_progress_states(
+                db=db,
+                user_id=user_id,
+                period_start=period.period_start,
+                task_ids=[d.id for d in definitions],
+                for_update=True,
+            )
+
+        delta = int(delta)
+        rows = []
+        for definition in definitions:
+            target = max(1, int(definition.target_value or 1))
+            rows.append({
+                "user_id": user_id,
+                "task_id": definition.id,
+                "period_start": period.period_start,
+                "period_end": period.period_end,
+                "progress_value": min(delta, target),
+                "target_value": target,
+                "completed_at": (now if delta >= target else None),
+                "last_event_at": now,
+            })
 
-        # ON DUPLICATE KEY UPDATE
-        stmt = stmt.on_duplicate_key_update(
-            period_end=period.period_end,
-            target_value=target,
-            progress_value=func.least(target, UserTaskProgress.progress_value + delta),
-            completed_at=case(
-                (
-                    and_(
-                        UserTaskProgress.completed_at.is_(None),
-                        func.least(target, UserTaskProgress.progress_value + delta) >= target
+        stmt = insert(UserTaskProgress).values(rows)
+        target = stmt.inserted.target_value
+        new_progress = func.least(target, UserTaskProgress.progress_value + delta)
+
+        # MySQL 按从左到右的顺序执行赋值，completed_at 必须在 progress_value 之前计算，
+        # 否则引用的是已累加后的进度。传有序列表：字典会被 SQLAlchemy 按表列顺序重排
+        stmt = stmt.on_duplicate_key_update([
+            (
+                "completed_at",
+                case(
+                    (
+                        and_(
+                            UserTaskProgress.completed_at.is_(None),
+                            new_progress >= target
+                        ),
+                        now,
                     ),
-                    now,
+                    else_=UserTaskProgress.completed_at,
                 ),
-                else_=UserTaskProgress.completed_at,
             ),
-            last_event_at=now,
-        )
+            ("progress_value", new_progress),
+            ("period_end", period.period_end),
+            ("target_value", target),
+            ("last_event_at", now),
+        ])
 
         await db.execute(stmt)
-        await db.flush()
 
-        # 回读进度记录
-        result = await db.execute(
-            select(UserTaskProgress).where(
-                UserTaskProgress.user_id == user_id,
-                UserTaskProgress.task_id == definition.id,
-                UserTaskProgress.period_start == period.period_start,
+        # 按与上面 SQL 相同的规则推算已有记录累加后的状态
+        progress_map: Dict[int, TaskProgressState] = {}
+        inserted_ids = []
+        for row in rows:
+            task_id = row["task_id"]
+            previous = progress_cache.get(task_id)
+            if previous is None:
+                inserted_ids.append(task_id)
+                continue
+            target_value = row["target_value"]
+            progress_value = min(target_value, previous.progress_value + delta)
+            completed_at = previous.completed_at
+            if completed_at is None and progress_value >= target_value:
+                completed_at = now
+            progress_map[task_id] = TaskProgressState(
+                task_id=task_id,
+                period_start=period.period_start,
+                progress_value=progress_value,
+                target_value=target_value,
+                completed_at=completed_at,
+                claimed_at=previous.claimed_at,
+                last_event_at=now,
             )
-        )
-        return result.scalar_one_or_none()
+
+        if inserted_ids:
+            progress_map.update(await TaskService._load_progress_states(
+                db=db,
+                user_id=user_id,
+                period_start=period.period_start,
+                task_ids=inserted_ids,
+                for_update=True,
+            ))
+        progress_cache.update(progress_map)
+
+        TaskBoardCache.apply(user_id, period.schedule, period.period_start, progress_map.values())
+        return progress_map
 
     # =========================================================================
     # 奖励领取
     # =========================================================================
 
-    @staticmethod
-    def _derive_claim_request_id(user_id: int, task_id: int, period_start: date) -> str:
-        """生成稳定的领取请求ID"""
-        return f"task:{user_id}:{task_id}:{period_start.isoformat()}"[:64]
-
     @staticmethod
     async def _maybe_auto_claim(
         db: AsyncSession,
         user_id: int,
-        progress: UserTaskProgress,
-        definition: TaskDefinition,
+        progress: TaskProgressState,
+        definition: TaskDefinitionSnapshot,
+        now: Optional[datetime] = None,
     ) -> Optional[dict]:
         """尝试自动领取奖励"""
         if not progress:
@@ -632,6 +1139,9 @@ class TaskService:
             user_id=user_id,
             task_id=definition.id,
             request_id=None,
+            now=now,
+            definition=definition,
+            progress=progress,
         )
 
     @staticmethod
@@ -641,14 +1151,13 @@ class TaskService:
         task_id: int,
         request_id: Optional[str] = None,
         now: Optional[datetime] = None,
+        definition: Optional[TaskDefinitionSnapshot] = None,
+        progress: Optional[TaskProgressState] = None,
     ) -> dict:
         """
-        领取任务奖励（并发安全 + 幂等）
+        领取任务奖励（并发安全 + 幂等，见 RewardClaimService.claim_task）
 
-        设计要点：
-        1. user_task_claims 的 UNIQUE 约束防重复领取
-        2. request_id 贯穿到 points_ledger 保证积分发放幂等
-        3. INSERT IGNORE 处理并发冲突
+        自动领取时由 record_event 传入任务定义和进度缓存，领取后同步进度缓存。
 
         Returns:
             {
@@ -660,122 +1169,20 @@ class TaskService:
                 "request_id": "task:123:1:2025-01-15"
             }
         """
-        now = now or datetime.utcnow()
-
-        # 获取任务定义
-        result = await db.execute(
-            select(TaskDefinition).where(TaskDefinition.id == task_id)
-        )
-        task = result.scalar_one_or_none()
-        if not task or not task.is_active:
-            raise ValueError("任务不存在或未启用")
-
-        period = TaskService.get_period(task.schedule, on_date=date.today())
-        claim_request_id = (
-            request_id or TaskService._derive_claim_request_id(user_id, task_id, period.period_start)
-        )[:64]
-
-        # 获取进度
-        result = await db.execute(
-            select(UserTaskProgress).where(
-                UserTaskProgress.user_id == user_id,
-                UserTaskProgress.task_id == task_id,
-                UserTaskProgress.period_start == period.period_start,
-            )
-        )
-        progress = result.scalar_one_or_none()
-
-        if not progress or (not progress.completed_at and progress.progress_value < progress.target_value):
-            raise ValueError("任务未完成，无法领取")
-
-        # 插入领取记录（INSERT IGNORE 处理并发）
-        stmt = (
-            insert(UserTaskClaim)
-            .values(
-                user_id=user_id,
-                task_id=task_id,
-                period_start=period.period_start,
-                reward_points=int(task.reward_points or 0),
-                reward_payload=task.reward_payload,
-                request_id=claim_request_id,
-                claimed_at=now,
-            )
-            .prefix_with("IGNORE")
-        )
-        insert_result = await db.execute(stmt)
-        inserted = bool(getattr(insert_result, "rowcount", 0))
-
-        # 已存在：幂等返回
-        if not inserted:
-            existing = await db.execute(
-                select(UserTaskClaim).where(
-                    UserTaskClaim.user_id == user_id,
-                    UserTaskClaim.task_id == task_id,
-                    UserTaskClaim.period_start == period.period_start,
-                )
-            )
-            claim = existing.scalar_one_or_none()
-
-            # 更新 progress.claimed_at
-            if progress and not progress.claimed_at:
-                progress.claimed_at = claim.claimed_at if claim else now
-                await db.flush()
-
-            return {
-                "success": True,
-                "task_id": task_id,
-                "already_claimed": True,
-                "period_start": period.period_start.isoformat(),
-                "reward_points": claim.reward_points if claim else int(task.reward_points or 0),
-                "request_id": claim.request_id if claim else claim_request_id,
-            }
+        from app.services.reward_claim_service import RewardClaimService
 
-        # 回读 claim 记录
-        claim_result = await db.execute(
-            select(UserTaskClaim).where(UserTaskClaim.request_id == claim_request_id)
+        now = now or datetime.utcnow()
+        result = await RewardClaimService.claim_task(
+            db=db,
+            user_id=user_id,
+            task_id=task_id,
+            request_id=request_id,
+            now=now,
+            definition=definition,
         )
-        claim = claim_result.scalar_one_or_none()
-
-        # 发放积分
-        awarded_points = int(task.reward_points or 0)
-        if awarded_points > 0:
-            from app.services.points_service import PointsService
-
-            reason = (
-                PointsReason.TASK_CHAIN_BONUS
-                if task.task_type == TaskType.CHAIN_BONUS
-                else PointsReason.TASK_REWARD
-            )
-
-            try:
-                await PointsService.add_points(
-                    db=db,
-                    user_id=user_id,
-                    amount=awarded_points,
-                    reason=reason,
-                    ref_type="task_claim",
-                    ref_id=claim.id if claim else None,
-                    description=f"任务奖励：{task.name}",
-                    request_id=claim_request_id,
-                    auto_commit=False,
-                )
-            except IntegrityError:
-                # points_ledger.request_id 已存在：幂等处理
-                pass
-
-        # 更新 progress.claimed_at
-        if progress and not progress.claimed_at:
+        if progress is not None and not progress.claimed_at:
             progress.claimed_at = now
-            await db.flush()
-
-        return {
-            "success": True,
-            "task_id": task_id,
-            "already_claimed": False,
-            "period_start": period.period_start.isoformat(),
-            "reward_points": awarded_points,
-            "request_id": claim_request_id,
-        }
+        return result
 
     # =========================================================================
     # 任务链检查与发放
@@ -788,26 +1195,18 @@ class TaskService:
         schedule: TaskSchedule,
         period: TaskPeriod,
         now: datetime,
+        progress_cache: Dict[int, TaskProgressState],
     ) -> int:
         """
         检查并发放任务链奖励
 
         逻辑：
         1. 找到所有 CHAIN_BONUS 类型任务
-        2. 检查其依赖的 chain_requires_group_key 组内任务是否全部完成
+        2. 检查其依赖的 chain_requires_group_key 组内任务是否全部完成（读取进度缓存）
         3. 全部完成则自动完成链任务并发放奖励
         """
-        # 查找链奖励任务
-        result = await db.execute(
-            select(TaskDefinition).where(
-                TaskDefinition.is_active == True,
-                TaskDefinition.schedule == schedule,
-                TaskDefinition.task_type == TaskType.CHAIN_BONUS,
-                or_(TaskDefinition.starts_at.is_(None), TaskDefinition.starts_at <= now),
-                or_(TaskDefinition.ends_at.is_(None), TaskDefinition.ends_at >= now),
-            )
-        )
-        chain_definitions = list(result.scalars().all())
+        # 查找链奖励任务（进程内索引）
+        chain_definitions = TaskDefinitionIndex.chain_tasks(schedule, now)
 
         if not chain_definitions:
             return 0
@@ -820,47 +1219,31 @@ class TaskService:
                 continue
 
             # 查找依赖组内的任务
-            req_result = await db.execute(
-                select(TaskDefinition).where(
-                    TaskDefinition.is_active == True,
-                    TaskDefinition.schedule == schedule,
-                    TaskDefinition.task_type != TaskType.CHAIN_BONUS,
-                    TaskDefinition.chain_group_key == required_group,
-                    or_(TaskDefinition.starts_at.is_(None), TaskDefinition.starts_at <= now),
-                    or_(TaskDefinition.ends_at.is_(None), TaskDefinition.ends_at >= now),
-                )
-            )
-            required_tasks = list(req_result.scalars().all())
+            required_tasks = TaskDefinitionIndex.group_tasks(schedule, required_group, now)
 
             if not required_tasks:
                 continue
 
-            required_ids = [t.id for t in required_tasks]
-            total_required = len(required_ids)
-
-            # 统计已完成数量
-            completed_result = await db.execute(
-                select(func.count(UserTaskProgress.id)).where(
-                    UserTaskProgress.user_id == user_id,
-                    UserTaskProgress.period_start == period.period_start,
-                    UserTaskProgress.task_id.in_(required_ids),
-                    UserTaskProgress.completed_at.isnot(None),
-                )
+            # 依赖组内任务是否全部完成
+            all_completed = all(
+                progress_cache.get(t.id) and progress_cache[t.id].completed_at
+                for t in required_tasks
             )
-            completed_count = int(completed_result.scalar() or 0)
-
-            if completed_count < total_required:
+            if not all_completed:
                 continue
 
-            # 标记链任务完成
-            chain_progress = await TaskService._increment_progress(
-                db=db,
-                user_id=user_id,
-                definition=chain_task,
-                period=period,
-                delta=1,
-                now=now,
-            )
+            # 标记链任务完成（已完成的链任务不再重复写入）
+            chain_progress = progress_cache.get(chain_task.id)
+            if not chain_progress or not chain_progress.completed_at:
+                chain_progress = await TaskService._increment_progress(
+                    db=db,
+                    user_id=user_id,
+                    definition=chain_task,
+                    period=period,
+                    delta=1,
+                    now=now,
+                    progress_cache=progress_cache,
+                )
 
             if not chain_progress:
                 continue
@@ -872,8 +1255,121 @@ class TaskService:
                     user_id=user_id,
                     progress=chain_progress,
                     definition=chain_task,
+                    now=now,
                 )
                 if result:
                     claimed += 1
 
         return claimed
+
+    # =========================================================================
+    # 周期维护
+    # =========================================================================
+
+    @staticmethod
+    async def purge_event_dedupe(
+        db: AsyncSession,
+        schedule: TaskSchedule,
+        on_date: Optional[date] = None,
+        grace_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> int:
+        """
+        清理已结束周期的事件去重记录（会分批提交事务）
+
+        record_event 只按当前周期去重，周期结束后去重记录不再被读取；
+        保留 grace_days 天用于排查，之后按 period_start 分批删除。
+
+        Returns:
+            删除的记录数
+        """
+        on_date = on_date or date.today()
+        grace_days = settings.TASK_EVENT_DEDUPE_GRACE_DAYS if grace_days is None else grace_days
+        batch_size = batch_size or settings.TASK_MAINTENANCE_BATCH_SIZE
+
+        # 周期结束日早于 (on_date - grace_days) 的周期才清理
+        cutoff = on_date - timedelta(days=grace_days)
+        current = TaskService.get_period(schedule, on_date=cutoff)
+
+        deleted = 0
+        while True:
+            result = await db.execute(
+                delete(UserTaskEvent)
+                .where(
+                    UserTaskEvent.schedule == schedule,
+                    UserTaskEvent.period_start < current.period_start,
+                )
+                .with_dialect_options(mysql_limit=batch_size)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            deleted += result.rowcount or 0
+            if (result.rowcount or 0) < batch_size:
+                break
+        return deleted
+
+    @staticmethod
+    async def precreate_next_period_progress(
+        db: AsyncSession,
+        schedule: TaskSchedule,
+        on_date: Optional[date] = None,
+        batch_size: Optional[int] = None,
+    ) -> int:
+        """
+        为活跃用户预建下一周期的进度记录（会分批提交事务）
+
+        在周期最后一天执行：本周期有进度记录的用户视为活跃用户，为其插入下一周期全部有效任务的空进度，
+        使零点后的首次事件只需更新已有记录，避免零点集中插入。已存在的记录保持不变（INSERT IGNORE）。
+
+        Returns:
+            新建的记录数
+        """
+        on_date = on_date or date.today()
+        batch_size = batch_size or settings.TASK_MAINTENANCE_BATCH_SIZE
+
+        current = TaskService.get_period(schedule, on_date=on_date)
+        if on_date != current.period_end:
+            # 只在周期最后一天预建
+            return 0
+        next_period = TaskService.get_period(schedule, on_date=current.period_end + timedelta(days=1))
+
+        await TaskDefinitionIndex.ensure(db)
+        definitions = TaskDefinitionIndex.active(
+            schedule, datetime.combine(next_period.period_start, datetime.min.time())
+        )
+        if not definitions:
+            return 0
+
+        result = await db.execute(
+            select(UserTaskProgress.user_id)
+            .join(TaskDefinition, TaskDefinition.id == UserTaskProgress.task_id)
+            .where(
+                TaskDefinition.schedule == schedule,
+                UserTaskProgress.period_start == current.period_start,
+            )
+            .distinct()
+            .order_by(UserTaskProgress.user_id)
+        )
+        user_ids = [row[0] for row in result.fetchall()]
+
+        created = 0
+        users_per_batch = max(1, batch_size // len(definitions))
+        for i in range(0, len(user_ids), users_per_batch):
+            rows = [
+                {
+                    "user_id": user_id,
+                    "task_id": definition.id,
+                    "period_start": next_period.period_start,
+                    "period_end": next_period.period_end,
+                    "progress_value": 0,
+                    "target_value": max(1, int(definition.target_value or 1)),
+                }
+                for user_id in user_ids[i:i + users_per_batch]
+                for definition in definitions
+            ]
+            insert_result = await db.execute(
+                insert(UserTaskProgress).values(rows).prefix_with("IGNORE")
+            )
+            await db.commit()
+            created += insert_result.rowcount or 0
+        return created
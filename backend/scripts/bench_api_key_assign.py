@@ -0,0 +1,76 @@
+"""
+API Key 兑换码并发分配压测
+
+模拟多个中奖者同时分配同一库存池的兑换码，对比
+FOR UPDATE（排队等待同一行）与 FOR UPDATE SKIP LOCKED（各取一行）的吞吐。
+每个事务持锁 --hold-ms 毫秒模拟抽奖事务的后续写入，结束后回滚，不修改库存数据。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_api_key_assign --usage-type 抽奖 --concurrency 10 --user-id 1
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.database import async_session_maker
+from app.services.api_key_pool_service import ApiKeyPoolService
+
+
+async def _worker(index: int, args, skip_locked: bool) -> float:
+    """单个中奖者：分配、持锁、回滚，返回耗时（秒）"""
+    async with async_session_maker() as db:
+        start = time.perf_counter()
+        try:
+            info = await ApiKeyPoolService.assign(
+                db,
+                args.user_id,
+                usage_type=args.usage_type,
+                # 每个 worker 使用独立标记，避开 (assigned_user_id, description) 唯一约束
+                relabel=f"bench-{index}",
+                skip_locked=skip_locked,
+            )
+            if info is None:
+                print(f"  worker {index}: 库存不足")
+            await asyncio.sleep(args.hold_ms / 1000)
+        finally:
+            await db.rollback()
+        return time.perf_counter() - start
+
+
+async def _run(args, skip_locked: bool) -> None:
+    label = "SKIP LOCKED" if skip_locked else "FOR UPDATE"
+    start = time.perf_counter()
+    latencies = await asyncio.gather(
+        *[_worker(i, args, skip_locked) for i in range(args.concurrency)]
+    )
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"[{label}] {args.concurrency} 并发分配: 总耗时 {elapsed * 1000:.1f}ms, "
+        f"吞吐 {args.concurrency / elapsed:.1f}/s, p50 {p50 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="API Key 并发分配压测")
+    parser.add_argument("--usage-type", default=None, help="库存池用途（api_key_codes.description）")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发中奖者数量")
+    parser.add_argument("--hold-ms", type=int, default=50, help="每个事务持锁时间（毫秒）")
+    parser.add_argument("--user-id", type=int, required=True, help="用于分配的已存在用户ID")
+    args = parser.parse_args()
+
+    async with async_session_maker() as db:
+        available = await ApiKeyPoolService.count_available(db, args.usage_type)
+    print(f"库存池可用数量: {available}")
+    if available < args.concurrency:
+        print("⚠️ 可用数量小于并发数，SKIP LOCKED 模式下部分请求会返回库存不足")
+
+    await _run(args, skip_locked=False)
+    await _run(args, skip_locked=True)
+    print(f"分配指标: {ApiKeyPoolService.get_metrics()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+热门选手并发打气压测
+
+模拟大量用户同时给同一选手打气，对比
+单行累加（改造前的写法：读取 cheer_stats 行后经 ORM 改写，所有事务等待同一行的行锁）
+与分片累加（各自锁随机分片行）的吞吐。
+每个事务持锁 --hold-ms 毫秒模拟打气事务的后续写入（打气记录、热力榜、事件），结束后回滚，不修改统计数据。
+
+用法（在 backend 目录下执行，需要可连接的 MySQL 和已存在的报名）：
+    python -m scripts.bench_cheer_hot_row --registration-id 1 --concurrency 10
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.core.database import async_session_maker
+from app.models.cheer import CheerType, CheerStats
+from app.services.cheer_stats_service import CheerStatsService
+
+
+async def _increment_single_row(db, registration_id: int) -> None:
+    """改造前：读取 cheer_stats 单行，经 ORM 改写计数后 flush"""
+    result = await db.execute(
+        select(CheerStats).where(CheerStats.registration_id == registration_id)
+    )
+    stats = result.scalar_one_or_none()
+    if not stats:
+        stats = CheerStats(registration_id=registration_id)
+        db.add(stats)
+    stats.cheer_count = (stats.cheer_count or 0) + 1
+    stats.total_count = (stats.total_count or 0) + 1
+    await db.flush()
+
+
+async def _worker(args, sharded: bool) -> float:
+    """单个打气请求：累加、持锁、回滚，返回耗时（秒）"""
+    async with async_session_maker() as db:
+        start = time.perf_counter()
+        try:
+            if sharded:
+                await CheerStatsService.increment(db, args.registration_id, CheerType.CHEER, 1)
+            else:
+                await _increment_single_row(db, args.registration_id)
+            await asyncio.sleep(args.hold_ms / 1000)
+        finally:
+            await db.rollback()
+        return time.perf_counter() - start
+
+
+async def _run(args, sharded: bool) -> None:
+    label = "分片累加" if sharded else "单行累加"
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[_worker(args, sharded) for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"[{label}] {args.concurrency} 并发打气: 总耗时 {elapsed * 1000:.1f}ms, "
+        f"吞吐 {args.concurrency / elapsed:.1f}/s, p50 {p50 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="热门选手并发打气压测")
+    parser.add_argument("--registration-id", type=int, required=True, help="已存在的报名ID")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发打气数量（不超过连接池容量，默认 5 + 10 溢出）")
+    parser.add_argument("--hold-ms", type=int, default=20, help="每个事务持锁时间（毫秒）")
+    args = parser.parse_args()
+
+    await _run(args, sharded=False)
+    await _run(args, sharded=True)
+    print(f"打气统计指标: {CheerStatsService.get_metrics()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
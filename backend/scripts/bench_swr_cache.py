@@ -0,0 +1,54 @@
+"""
+缓存写满后的插入压测
+
+对比旧的额度缓存淘汰方式（写满时按 stale_until 排序全部 key，删除最旧 10%）
+与 SWRCache（OrderedDict 队首清理过期条目 + LRU 淘汰）在持续出现新 key 时的单次写入耗时。
+不访问数据库和第三方接口。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.bench_swr_cache --max-entries 1000 --inserts 100000
+"""
+import argparse
+import time
+
+from app.core.swr_cache import SWRCache
+
+
+def _bench_sorted_eviction(max_entries: int, inserts: int) -> float:
+    """改造前：dict + 写满时排序淘汰"""
+    cache = {}
+    start = time.perf_counter()
+    for i in range(inserts):
+        if len(cache) >= max_entries:
+            sorted_keys = sorted(cache.keys(), key=lambda k: cache[k])
+            for key in sorted_keys[:max(1, len(sorted_keys) // 10)]:
+                cache.pop(key, None)
+        cache[i] = time.monotonic() + 60
+    return time.perf_counter() - start
+
+
+def _bench_swr_cache(max_entries: int, inserts: int) -> float:
+    """改造后：SWRCache"""
+    cache = SWRCache("bench", ttl=60, stale_ttl=60, max_entries=max_entries)
+    start = time.perf_counter()
+    for i in range(inserts):
+        cache.set(i, i)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="缓存写满后的插入压测")
+    parser.add_argument("--max-entries", type=int, default=1000, help="缓存条目上限")
+    parser.add_argument("--inserts", type=int, default=100000, help="插入的新 key 数量")
+    args = parser.parse_args()
+
+    for label, bench in (("排序淘汰", _bench_sorted_eviction), ("SWRCache", _bench_swr_cache)):
+        elapsed = bench(args.max_entries, args.inserts)
+        print(
+            f"[{label}] {args.inserts} 次插入: 总耗时 {elapsed * 1000:.1f}ms, "
+            f"单次 {elapsed / args.inserts * 1e6:.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+排行榜重建
+
+从数据库重新计算排行榜并写入排行榜引擎（RANKING_BACKEND=redis 时写入 Redis，
+所有进程共享；进程内榜单只对当前进程有效，仅用于核对数据）。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.rebuild_rankings              # 重建全部榜单
+    python -m scripts.rebuild_rankings --board cheer:1 --top 10
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.database import async_session_maker
+from app.services.ranking_service import RankingService
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="从数据库重建排行榜")
+    parser.add_argument("--board", default=None, help="榜单名（如 cheer:1、puzzle），默认重建全部")
+    parser.add_argument("--top", type=int, default=0, help="重建后打印前 N 名")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    async with async_session_maker() as db:
+        if args.board:
+            boards = {args.board: await RankingService.rebuild(db, args.board)}
+        else:
+            boards = await RankingService.rebuild_all(db)
+
+        for board, size in boards.items():
+            print(f"{board}: {size} 名")
+            if args.top:
+                for rank, member, score in await RankingService.top(db, board, args.top):
+                    print(f"  #{rank} {member} {score:g}")
+
+    print(f"重建 {len(boards)} 个榜单，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+    print(f"排行榜指标: {RankingService.get_metrics()}")
+    await RankingService.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+-- 026_api_key_pool_index.sql
+-- API Key 兑换码库存分配索引
+-- 分配路径使用 SELECT ... WHERE status = 'AVAILABLE' [AND description = ?] [AND quota = ?]
+-- ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED，需要覆盖索引避免全表扫描和间隙锁
+
+SET @index_exists = (
+    SELECT COUNT(*) FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'api_key_codes'
+    AND INDEX_NAME = 'idx_api_key_status_desc'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE api_key_codes ADD INDEX idx_api_key_status_desc (status, description, id)',
+    'SELECT 1'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @index_exists2 = (
+    SELECT COUNT(*) FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'api_key_codes'
+    AND INDEX_NAME = 'idx_api_key_status_quota'
+);
+
+SET @sql2 = IF(@index_exists2 = 0,
+    'ALTER TABLE api_key_codes ADD INDEX idx_api_key_status_quota (status, quota, id)',
+    'SELECT 1'
+);
+
+PREPARE stmt2 FROM @sql2;
+EXECUTE stmt2;
+DEALLOCATE PREPARE stmt2;
+
+SELECT 'API key pool indexes added successfully' AS result;
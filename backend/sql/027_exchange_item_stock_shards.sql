@@ -0,0 +1,16 @@
+-- 027_exchange_item_stock_shards.sql
+-- 热门兑换商品库存分片
+-- 热门商品（is_hot）的库存按批从 exchange_items.stock 租借到分片行，
+-- 兑换时随机扣减一个分片，避免所有请求串行等待商品主行的行锁。
+-- 商品可用库存 = exchange_items.stock + SUM(exchange_item_stock_shards.stock)
+
+CREATE TABLE IF NOT EXISTS exchange_item_stock_shards (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    item_id INT NOT NULL COMMENT '兑换商品ID',
+    shard_no INT NOT NULL COMMENT '分片序号',
+    stock INT NOT NULL DEFAULT 0 COMMENT '分片剩余库存',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_item_shard (item_id, shard_no),
+    FOREIGN KEY (item_id) REFERENCES exchange_items(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='兑换商品库存分片';
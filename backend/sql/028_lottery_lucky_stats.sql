@@ -0,0 +1,59 @@
+-- 028_lottery_lucky_stats.sql
+-- 欧皇榜汇总表
+-- 抽奖事务内在稀有中奖时增量更新，排行榜直接按索引读取前 N 名，
+-- 不再每次聚合全部 lottery_draws 并 GROUP_CONCAT 奖品名称
+
+CREATE TABLE IF NOT EXISTS lottery_lucky_stats (
+    user_id INT NOT NULL PRIMARY KEY,
+    rare_win_count INT NOT NULL DEFAULT 0 COMMENT '稀有奖品中奖次数',
+    last_win_at DATETIME NULL COMMENT '最近一次稀有中奖时间',
+    recent_prizes JSON NULL COMMENT '最近获得的稀有奖品名称（去重，有上限）',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_lucky_rank (rare_win_count, last_win_at),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='欧皇榜汇总';
+
+-- 从历史抽奖记录回填
+-- recent_prizes 与运行时一致：按最近中奖时间倒序去重，最多 10 个（LotteryService.LUCKY_RECENT_PRIZES_LIMIT）
+SET SESSION group_concat_max_len = 65535;
+
+INSERT INTO lottery_lucky_stats (user_id, rare_win_count, last_win_at, recent_prizes)
+SELECT
+    agg.user_id,
+    agg.win_count,
+    agg.last_win_at,
+    prizes.recent_prizes
+FROM (
+    SELECT user_id, COUNT(*) AS win_count, MAX(created_at) AS last_win_at
+    FROM lottery_draws
+    WHERE is_rare = 1
+    GROUP BY user_id
+) agg
+JOIN (
+    SELECT
+        user_id,
+        CAST(
+            CONCAT('[', GROUP_CONCAT(JSON_QUOTE(prize_name) ORDER BY last_at DESC, prize_name SEPARATOR ','), ']')
+            AS JSON
+        ) AS recent_prizes
+    FROM (
+        SELECT
+            user_id,
+            prize_name,
+            last_at,
+            ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY last_at DESC, prize_name) AS rn
+        FROM (
+            SELECT user_id, prize_name, MAX(created_at) AS last_at
+            FROM lottery_draws
+            WHERE is_rare = 1
+            GROUP BY user_id, prize_name
+        ) distinct_prizes
+    ) ranked_prizes
+    WHERE rn <= 10
+    GROUP BY user_id
+) prizes ON prizes.user_id = agg.user_id
+ON DUPLICATE KEY UPDATE
+    rare_win_count = VALUES(rare_win_count),
+    last_win_at = VALUES(last_win_at),
+    recent_prizes = VALUES(recent_prizes);
@@ -0,0 +1,46 @@
+-- 029_play_events.sql
+-- 统一游戏记录表
+-- 抽奖、刮刮乐、扭蛋机、老虎机每次游玩写入一条紧凑记录，
+-- "我的活动"时间线按 (user_id, created_at) 游标分页，后台统计按 (game, created_at) 聚合，
+-- 不再对四张记录表分别 OFFSET 分页和统计
+
+CREATE TABLE IF NOT EXISTS play_events (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL COMMENT '用户ID',
+    game VARCHAR(20) NOT NULL COMMENT '游戏类型',
+    cost_points INT NOT NULL DEFAULT 0 COMMENT '消耗积分',
+    payout_points INT NOT NULL DEFAULT 0 COMMENT '获得积分（惩罚为负）',
+    ref_id INT NOT NULL COMMENT '原始记录ID（各游戏记录表）',
+    prize_name VARCHAR(100) NULL COMMENT '奖品名称',
+    is_rare TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否稀有',
+    created_at DATETIME NOT NULL COMMENT '游玩时间',
+    UNIQUE KEY uk_game_ref (game, ref_id),
+    INDEX idx_user_time (user_id, created_at),
+    INDEX idx_game_time (game, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='统一游戏记录';
+
+-- 从历史记录回填（uk_game_ref 保证重复执行幂等）
+INSERT IGNORE INTO play_events (user_id, game, cost_points, payout_points, ref_id, prize_name, is_rare, created_at)
+SELECT user_id, 'lottery', cost_points,
+       IF(prize_type = 'POINTS', CAST(COALESCE(NULLIF(prize_value, ''), '0') AS SIGNED), 0),
+       id, prize_name, is_rare, created_at
+FROM lottery_draws;
+
+INSERT IGNORE INTO play_events (user_id, game, cost_points, payout_points, ref_id, prize_name, is_rare, created_at)
+SELECT user_id, 'scratch', cost_points,
+       IF(status = 'REVEALED' AND prize_type = 'POINTS', CAST(COALESCE(NULLIF(prize_value, ''), '0') AS SIGNED), 0),
+       id,
+       IF(status = 'REVEALED', prize_name, NULL),
+       IF(status = 'REVEALED', is_rare, 0),
+       created_at
+FROM scratch_cards;
+
+INSERT IGNORE INTO play_events (user_id, game, cost_points, payout_points, ref_id, prize_name, is_rare, created_at)
+SELECT user_id, 'gacha', cost_points,
+       IF(prize_type = 'points', CAST(COALESCE(JSON_UNQUOTE(JSON_EXTRACT(prize_value, '$.amount')), '0') AS SIGNED), 0),
+       id, prize_name, is_rare, created_at
+FROM gacha_draws;
+
+INSERT IGNORE INTO play_events (user_id, game, cost_points, payout_points, ref_id, prize_name, is_rare, created_at)
+SELECT user_id, 'slot', cost_points, payout_points, id, NULL, is_jackpot, created_at
+FROM slot_machine_draws;
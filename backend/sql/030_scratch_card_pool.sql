@@ -0,0 +1,22 @@
+-- 030_scratch_card_pool.sql
+-- 刮刮乐预生成卡池
+-- 后台任务按奖池配置指纹预先抽取奖品并预占库存，购买时 SKIP LOCKED 领取一张封存卡片
+
+CREATE TABLE IF NOT EXISTS scratch_card_pool (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    config_id INT NOT NULL,
+    config_version VARCHAR(40) NOT NULL COMMENT '生成时的奖池配置指纹',
+    prize_id INT NOT NULL COMMENT '预定奖品ID',
+    prize_type VARCHAR(20) NOT NULL,
+    prize_name VARCHAR(100) NOT NULL,
+    prize_value VARCHAR(255) NULL,
+    is_rare TINYINT(1) NOT NULL DEFAULT 0,
+    stock_reserved TINYINT(1) NOT NULL DEFAULT 0 COMMENT '生成时是否预占了奖品库存',
+    status ENUM('SEALED', 'CLAIMED', 'VOIDED') NOT NULL DEFAULT 'SEALED',
+    card_id INT NULL COMMENT '售出后对应的刮刮乐卡片ID',
+    claimed_at DATETIME NULL COMMENT '售出时间',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_pool_claim (config_id, status, config_version, id),
+    FOREIGN KEY (config_id) REFERENCES lottery_configs(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='刮刮乐预生成卡池';
@@ -0,0 +1,19 @@
+-- 032_domain_events.sql
+-- 领域事件发件箱
+-- 打气、扭蛋、签到在业务事务内写入一条事件，后台消费者异步处理任务进度、成就和系统日志
+
+CREATE TABLE IF NOT EXISTS domain_events (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL COMMENT '事件类型',
+    event_key VARCHAR(128) NOT NULL COMMENT '幂等key',
+    user_id INT NULL COMMENT '用户ID',
+    payload JSON NULL COMMENT '事件数据',
+    status VARCHAR(16) NOT NULL DEFAULT 'PENDING' COMMENT '处理状态',
+    attempts INT NOT NULL DEFAULT 0 COMMENT '已尝试次数',
+    next_attempt_at DATETIME NOT NULL COMMENT '下次可处理时间',
+    last_error TEXT NULL COMMENT '最近一次失败原因',
+    created_at DATETIME NOT NULL COMMENT '发布时间',
+    processed_at DATETIME NULL COMMENT '处理完成时间',
+    UNIQUE KEY uk_event_key (event_key),
+    INDEX idx_status_next (status, next_attempt_at, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='领域事件发件箱';
@@ -0,0 +1,21 @@
+-- 033_task_event_dedupe_purge.sql
+-- 任务事件去重记录清理索引
+-- 定时任务按 DELETE ... WHERE schedule = ? AND period_start < ? LIMIT n 分批清理已结束周期的去重记录，
+-- 需要 (schedule, period_start) 索引避免全表扫描。
+-- user_task_events 带外键且主键不含 period_start，InnoDB 不支持按 period_start 分区，因此采用分批删除
+
+SET @index_exists = (
+    SELECT COUNT(*) FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'user_task_events'
+    AND INDEX_NAME = 'idx_schedule_period'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE user_task_events ADD INDEX idx_schedule_period (schedule, period_start)',
+    'SELECT 1'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,42 @@
+-- 034_user_cheered_projects.sql
+-- 用户打气过的项目去重集合
+-- 打气时 INSERT IGNORE 一条 (user_id, registration_id)，首次插入才累加 user_stats.unique_projects_cheered，
+-- "探索者"成就不再每次打气都对用户全部打气记录执行 COUNT(DISTINCT registration_id)
+
+CREATE TABLE IF NOT EXISTS user_cheered_projects (
+    user_id INT NOT NULL COMMENT '用户ID',
+    registration_id INT NOT NULL COMMENT '报名ID（项目）',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, registration_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户打气过的项目';
+
+SET @column_exists = (
+    SELECT COUNT(*) FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'user_stats'
+    AND COLUMN_NAME = 'unique_projects_cheered'
+);
+
+SET @sql = IF(@column_exists = 0,
+    'ALTER TABLE user_stats ADD COLUMN unique_projects_cheered INT NOT NULL DEFAULT 0 COMMENT ''打气过的不同项目数'' AFTER last_cheer_date',
+    'SELECT 1'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- 从历史打气记录回填（主键保证重复执行幂等）
+INSERT IGNORE INTO user_cheered_projects (user_id, registration_id, created_at)
+SELECT user_id, registration_id, MIN(created_at)
+FROM cheers
+GROUP BY user_id, registration_id;
+
+UPDATE user_stats s
+JOIN (
+    SELECT user_id, COUNT(*) AS project_count
+    FROM user_cheered_projects
+    GROUP BY user_id
+) p ON p.user_id = s.user_id
+SET s.unique_projects_cheered = p.project_count;
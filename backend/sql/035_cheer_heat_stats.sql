@@ -0,0 +1,59 @@
+-- 035_cheer_heat_stats.sql
+-- 热力榜汇总表
+-- 打气事务内按 (比赛, 打气用户) 增量累加次数和热力值，热力榜直接按索引读取前 N 名，
+-- 不再每次按比赛全部报名 ID 聚合 cheers 并在应用层计算热力值
+
+CREATE TABLE IF NOT EXISTS cheer_heat_stats (
+    contest_id INT NOT NULL COMMENT '比赛ID',
+    user_id INT NOT NULL COMMENT '打气用户ID',
+    cheer_count INT NOT NULL DEFAULT 0 COMMENT '普通打气数',
+    coffee_count INT NOT NULL DEFAULT 0 COMMENT '咖啡数',
+    energy_count INT NOT NULL DEFAULT 0 COMMENT '能量饮料数',
+    pizza_count INT NOT NULL DEFAULT 0 COMMENT '披萨数',
+    star_count INT NOT NULL DEFAULT 0 COMMENT '星星数',
+    total_count INT NOT NULL DEFAULT 0 COMMENT '总打气次数',
+    heat_value INT NOT NULL DEFAULT 0 COMMENT '热力值（道具分数之和）',
+    last_cheer_at DATETIME NULL COMMENT '最近一次打气时间',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (contest_id, user_id),
+    INDEX idx_heat_rank (contest_id, heat_value, last_cheer_at),
+    FOREIGN KEY (contest_id) REFERENCES contests(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='热力榜汇总';
+
+-- 从历史打气记录回填（道具分数：cheer 1, coffee 2, energy 3, pizza 4, star 5）
+INSERT INTO cheer_heat_stats
+    (contest_id, user_id, cheer_count, coffee_count, energy_count, pizza_count, star_count,
+     total_count, heat_value, last_cheer_at)
+SELECT
+    r.contest_id,
+    c.user_id,
+    SUM(c.cheer_type = 'cheer'),
+    SUM(c.cheer_type = 'coffee'),
+    SUM(c.cheer_type = 'energy'),
+    SUM(c.cheer_type = 'pizza'),
+    SUM(c.cheer_type = 'star'),
+    COUNT(*),
+    SUM(CASE c.cheer_type
+        WHEN 'cheer' THEN 1
+        WHEN 'coffee' THEN 2
+        WHEN 'energy' THEN 3
+        WHEN 'pizza' THEN 4
+        WHEN 'star' THEN 5
+        ELSE 1
+    END),
+    MAX(c.created_at)
+FROM cheers c
+JOIN registrations r ON r.id = c.registration_id
+WHERE r.status IN ('submitted', 'approved')
+GROUP BY r.contest_id, c.user_id
+ON DUPLICATE KEY UPDATE
+    cheer_count = VALUES(cheer_count),
+    coffee_count = VALUES(coffee_count),
+    energy_count = VALUES(energy_count),
+    pizza_count = VALUES(pizza_count),
+    star_count = VALUES(star_count),
+    total_count = VALUES(total_count),
+    heat_value = VALUES(heat_value),
+    last_cheer_at = VALUES(last_cheer_at);
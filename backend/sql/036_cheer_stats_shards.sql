@@ -0,0 +1,20 @@
+-- 036_cheer_stats_shards.sql
+-- 打气统计增量分片
+-- 打气时随机累加一个分片行，热门选手的并发打气不再串行等待 cheer_stats 单行的行锁。
+-- 选手打气统计 = cheer_stats + SUM(cheer_stats_shards)，定时任务每 10 分钟将分片并回 cheer_stats。
+
+CREATE TABLE IF NOT EXISTS cheer_stats_shards (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    registration_id INT NOT NULL COMMENT '关联报名ID',
+    shard_no INT NOT NULL COMMENT '分片序号',
+    cheer_count INT NOT NULL DEFAULT 0 COMMENT '普通打气数',
+    coffee_count INT NOT NULL DEFAULT 0 COMMENT '咖啡数',
+    energy_count INT NOT NULL DEFAULT 0 COMMENT '能量饮料数',
+    pizza_count INT NOT NULL DEFAULT 0 COMMENT '披萨数',
+    star_count INT NOT NULL DEFAULT 0 COMMENT '星星数',
+    total_count INT NOT NULL DEFAULT 0 COMMENT '总打气数',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_registration_shard (registration_id, shard_no),
+    FOREIGN KEY (registration_id) REFERENCES registrations(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='打气统计增量分片';
@@ -0,0 +1,26 @@
+-- 037_quota_snapshots.sql
+-- 额度快照
+-- 后台任务按周期轮询所有选手的 API 额度和在线状态，每轮每个报名写入一行（同一轮 polled_at 相同）。
+-- 额度排行榜和 API Key 监控读取最新一轮快照，不再在请求中实时扇出查询第三方接口。
+
+CREATE TABLE IF NOT EXISTS quota_snapshots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    registration_id INT NOT NULL COMMENT '关联报名ID',
+    contest_id INT NOT NULL COMMENT '比赛ID',
+    polled_at DATETIME NOT NULL COMMENT '轮次时间（同一轮相同）',
+    status VARCHAR(20) NOT NULL DEFAULT 'ok' COMMENT '查询状态 ok/error',
+    used DOUBLE NULL COMMENT '已使用额度',
+    remaining DOUBLE NULL COMMENT '剩余额度',
+    total DOUBLE NULL COMMENT '总额度',
+    today_used DOUBLE NULL COMMENT '今日消耗',
+    is_unlimited TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否无限额度',
+    quota_username VARCHAR(100) NULL COMMENT '上游用户名',
+    quota_group VARCHAR(100) NULL COMMENT '上游用户组',
+    is_online TINYINT(1) NULL COMMENT '在线状态（查询失败为空）',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_quota_snapshot_contest_polled (contest_id, polled_at),
+    INDEX idx_quota_snapshot_registration_polled (registration_id, polled_at),
+    INDEX idx_quota_snapshot_polled (polled_at),
+    FOREIGN KEY (registration_id) REFERENCES registrations(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='额度快照';
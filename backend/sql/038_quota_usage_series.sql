@@ -0,0 +1,20 @@
+-- 038_quota_usage_series.sql
+-- 额度用量日序列
+-- 已结束日期的 quota_snapshots 按天压缩为每个报名一行：降采样（默认 10 分钟，7 天前再降为 1 小时）后
+-- 的 (时间, 已使用额度) 点列，差分编码为 JSON 整数数组 [t0, v0, dt1, dv1, ...]，额度单位 0.0001 美元。
+-- 原始快照按保留期删除后，历史用量曲线由本表提供。
+
+CREATE TABLE IF NOT EXISTS quota_usage_series (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    registration_id INT NOT NULL COMMENT '关联报名ID',
+    contest_id INT NOT NULL COMMENT '比赛ID',
+    series_date DATE NOT NULL COMMENT '日期',
+    resolution_seconds INT NOT NULL COMMENT '采样间隔（秒）',
+    point_count INT NOT NULL DEFAULT 0 COMMENT '点数',
+    points TEXT NOT NULL COMMENT '差分编码点列 [t0, v0, dt1, dv1, ...]',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_quota_series_registration_date (registration_id, series_date),
+    INDEX idx_quota_series_contest_date (contest_id, series_date),
+    FOREIGN KEY (registration_id) REFERENCES registrations(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='额度用量日序列';
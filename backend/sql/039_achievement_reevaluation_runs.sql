@@ -0,0 +1,18 @@
+-- 039_achievement_reevaluation_runs.sql
+-- 成就批量重算任务记录
+-- 各 worker 各自运行调度器，重算进度写入本表供任意 worker 查询；
+-- 同一时刻只有一个任务由 MySQL GET_LOCK 保证，最新一条记录即当前/最近一次任务。
+
+CREATE TABLE IF NOT EXISTS achievement_reevaluation_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    status VARCHAR(16) NOT NULL DEFAULT 'running' COMMENT '状态 running/finished/failed',
+    achievement_keys JSON NULL COMMENT '本次重算的成就',
+    total INT NOT NULL DEFAULT 0 COMMENT '用户总数',
+    processed INT NOT NULL DEFAULT 0 COMMENT '已处理用户数',
+    updated INT NOT NULL DEFAULT 0 COMMENT '写入记录数',
+    unlocked INT NOT NULL DEFAULT 0 COMMENT '新解锁数',
+    last_user_id INT NOT NULL DEFAULT 0 COMMENT '已处理到的 user_id（游标）',
+    error VARCHAR(500) NULL COMMENT '失败原因',
+    started_at DATETIME NOT NULL COMMENT '开始时间',
+    finished_at DATETIME NULL COMMENT '结束时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='成就批量重算任务记录';
@@ -0,0 +1,49 @@
+"""
+成就进度 upsert 语句测试
+
+MySQL 的 ON DUPLICATE KEY UPDATE 按书写顺序逐个赋值，后面的 CASE 读到的是已更新的列。
+已有 LOCKED 记录解锁时，status 若先被改写，progress_value / unlocked_at 的 CASE
+会看到非锁定状态而保留旧值，记录变成 UNLOCKED 但 unlocked_at 为空。
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy.dialects import mysql
+
+from app.models.achievement import AchievementStatus
+from app.services.achievement_service import _user_achievements_upsert
+
+
+def _update_clause(rows: list[dict]) -> str:
+    sql = str(_user_achievements_upsert(rows).compile(dialect=mysql.dialect()))
+    return sql.split("ON DUPLICATE KEY UPDATE", 1)[1]
+
+
+def _assigned_columns(clause: str) -> list[str]:
+    return re.findall(r"\b(\w+) = CASE", clause)
+
+
+def test_unlock_existing_row_assigns_status_last():
+    """已有记录解锁：status 在 progress_value、unlocked_at 之后赋值"""
+    clause = _update_clause([{
+        "user_id": 1,
+        "achievement_key": "cheer_10",
+        "status": AchievementStatus.UNLOCKED.value,
+        "progress_value": 10,
+        "unlocked_at": datetime(2026, 1, 1),
+    }])
+
+    assert _assigned_columns(clause) == ["progress_value", "unlocked_at", "status"]
+
+
+def test_upsert_keeps_unlocked_rows():
+    """三个赋值都以更新前的 status 为条件，已解锁/领取的记录不回退"""
+    clause = _update_clause([{
+        "user_id": 1,
+        "achievement_key": "cheer_10",
+        "status": AchievementStatus.LOCKED.value,
+        "progress_value": 3,
+        "unlocked_at": None,
+    }])
+
+    assert clause.count("user_achievements.status =") == 3